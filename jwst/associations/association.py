@@ -375,7 +375,15 @@ class Association(MutableMapping):
                 - [ProcessItem[, ...]]: List of items to process again.
 
         """
-        cached_constraints = deepcopy(self.constraints)
+        # Most items cannot match most associations. Find out cheaply
+        # before copying the constraints to check and set them.
+        if self.constraints.rejects(item):
+            return False, []
+
+        # Constraints refer back to the association only through its
+        # methods. Share it, rather than copying it, its members and
+        # the pool they came from.
+        cached_constraints = deepcopy(self.constraints, {id(self): self})
         match, reprocess = cached_constraints.check_and_set(item)
         if match:
             self.constraints = cached_constraints
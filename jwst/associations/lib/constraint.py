@@ -6,7 +6,7 @@ from itertools import chain
 import logging
 import re
 
-from .process_list import ProcessList
+from .process_list import ItemView, ProcessList
 from .utilities import (
     evaluate,
     getattr_from_list,
@@ -83,6 +83,22 @@ class SimpleConstraintABC(abc.ABC):
         """Copy ourselves"""
         return deepcopy(self)
 
+    def rejects(self, item):
+        """Check, without setting, whether the item cannot match
+
+        Parameters
+        ----------
+        item : dict
+            The item to check on.
+
+        Returns
+        -------
+        rejects : bool
+            True only if `check_and_set` would certainly fail,
+            with nothing to reprocess. False if unknown.
+        """
+        return False
+
     # Make iterable to work with `Constraint`.
     # Since this is a leaf, simple return ourselves.
     def __iter__(self):
@@ -274,6 +290,24 @@ class SimpleConstraint(SimpleConstraintABC):
 
         return self.matched, reprocess
 
+    def rejects(self, item):
+        """Check, without setting, whether the item cannot match
+
+        Parameters
+        ----------
+        item : dict
+            The item to check on.
+
+        Returns
+        -------
+        rejects : bool
+            True only if `check_and_set` would certainly fail,
+            with nothing to reprocess. False if unknown.
+        """
+        if self.value is None or self.reprocess_on_fail:
+            return False
+        return not self.test(self.value, self.sources(item))
+
     def eq(self, value1, value2):
         """True if constraint.value and item are equal."""
         return value1 == value2
@@ -430,7 +464,7 @@ class AttrConstraint(SimpleConstraintABC):
             if is_iterable(evaled):
                 reprocess_items = []
                 for avalue in evaled:
-                    new_item = deepcopy(item)
+                    new_item = ItemView(item)
                     new_item[source] = str(avalue)
                     reprocess_items.append(new_item)
                 reprocess.append(ProcessList(
@@ -475,6 +509,47 @@ class AttrConstraint(SimpleConstraintABC):
         self.matched = True
         return self.matched, reprocess
 
+    def rejects(self, item):
+        """Check, without setting, whether the item cannot match
+
+        Follows `check_and_set` up to the value check, leaving the
+        constraint untouched. Items with list values to reprocess, or
+        constraints whose value is a function, are never rejected here.
+
+        Parameters
+        ----------
+        item : dict
+            The item to check on.
+
+        Returns
+        -------
+        rejects : bool
+            True only if `check_and_set` would certainly fail,
+            with nothing to reprocess. False if unknown.
+        """
+        if not self.onlyif(item):
+            return False
+
+        try:
+            source, value = getattr_from_list(
+                item,
+                self.sources,
+                invalid_values=self.invalid_values
+            )
+        except KeyError:
+            return self.required and not self.force_undefined
+        if self.force_undefined:
+            return True
+
+        if self.value is None or callable(self.value):
+            return False
+        if self.evaluate:
+            evaled = evaluate(value)
+            if is_iterable(evaled):
+                return False
+            value = str(evaled)
+        return not meets_conditions(value, self.value)
+
 
 class Constraint:
     """Constraint that is made up of SimpleConstraint
@@ -627,6 +702,37 @@ class Constraint:
         """Copy ourselves"""
         return deepcopy(self)
 
+    def rejects(self, item):
+        """Check, without setting, whether the item cannot match
+
+        Only constraints reduced by `Constraint.all` or
+        `Constraint.any`, without reprocessing on failure, are checked.
+
+        Parameters
+        ----------
+        item : dict
+            The item to check on.
+
+        Returns
+        -------
+        rejects : bool
+            True only if `check_and_set` would certainly fail,
+            with nothing to reprocess. False if unknown.
+        """
+        if self.reprocess_on_fail:
+            return False
+        if self.reduce is Constraint.all:
+            return any(
+                constraint.rejects(item)
+                for constraint in self.constraints
+            )
+        if self.reduce is Constraint.any:
+            return all(
+                constraint.rejects(item)
+                for constraint in self.constraints
+            )
+        return False
+
     @staticmethod
     def all(item, constraints):
         """Return positive only if all results are positive."""
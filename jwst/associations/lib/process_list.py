@@ -3,6 +3,7 @@ from collections import (defaultdict, deque)
 from functools import reduce
 
 __all__ = [
+    'ItemView',
     'ProcessList',
     'ProcessItem',
     'ProcessQueue',
@@ -54,6 +55,84 @@ class ProcessItem:
         return equality
 
 
+class ItemView:
+    """Copy-on-write view of an item
+
+    Values are read from the underlying item, usually a row of the
+    pool, until they are set on the view. The item itself is never
+    modified, so a view can replace a deep copy of the item, and of
+    the pool table behind it, when only a few values change.
+
+    Parameters
+    ----------
+    item : dict-like
+        The item to view.
+
+    Examples
+    --------
+    >>> item = {'a': 1, 'b': 2}
+    >>> view = ItemView(item)
+    >>> view['a'] = 10
+    >>> view['a'], view['b'], item['a']
+    (10, 2, 1)
+    """
+    def __init__(self, item):
+        self._item = item
+        self._values = {}
+
+    def keys(self):
+        return self._item.keys()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            return self._item[key]
+
+    def __setitem__(self, key, value):
+        self._values[key] = value
+
+    def __getattr__(self, name):
+        # Everything else, such as `meta` and `index`, comes from the item.
+        if name.startswith('__') or name in ('_item', '_values'):
+            raise AttributeError(name)
+        return getattr(self._item, name)
+
+    def __copy__(self):
+        view = ItemView(self._item)
+        view._values = dict(self._values)
+        return view
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def __eq__(self, other):
+        try:
+            keys = list(other.keys())
+        except AttributeError:
+            return NotImplemented
+        if keys != list(self.keys()):
+            return False
+        return all(
+            bool(self[key] == other[key])
+            for key in keys
+        )
+
+    def __hash__(self):
+        return hash(repr(self))
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(
+            self.__class__.__name__, self._item, self._values
+        )
+
+
 class ProcessList:
     """A Process list
 
@@ -2,6 +2,7 @@
 import pytest
 
 from ..lib.constraint import (
+    AttrConstraint,
     Constraint,
     SimpleConstraint,
     SimpleConstraintABC,
@@ -211,3 +212,38 @@ def test_copy():
     sc1_copy.check_and_set('value2')
     assert sc1_copy.value == 'value2'
     assert sc1.value == 'value1'
+
+
+@pytest.mark.parametrize(
+    'constraint, item',
+    [
+        (SimpleConstraint(value='value1'), 'value1'),
+        (SimpleConstraint(value='value1'), 'value2'),
+        (SimpleConstraint(value='value1', reprocess_on_fail=True), 'value2'),
+        (SimpleConstraint(), 'value2'),
+        (AttrConstraint(sources=['attr'], value='val.*'), {'attr': 'VALUE1'}),
+        (AttrConstraint(sources=['attr'], value='val.*'), {'attr': 'other'}),
+        (AttrConstraint(sources=['attr'], value='val.*'), {'other': 'value1'}),
+        (AttrConstraint(sources=['attr'], required=False), {'other': 'value1'}),
+        (AttrConstraint(sources=['attr'], force_undefined=True), {'attr': 'value1'}),
+        (AttrConstraint(sources=['attr'], value='val.*', onlyif=lambda item: False), {'attr': 'other'}),
+        (AttrConstraint(sources=['attr'], value='a', evaluate=True), {'attr': "['a', 'b']"}),
+        (AttrConstraint(sources=['attr'], value='1', evaluate=True), {'attr': '2'}),
+        (AttrConstraint(sources=['attr'], value=lambda: 'a'), {'attr': 'b'}),
+        (Constraint([SimpleConstraint(value='value1'), SimpleConstraint(value='value2')]), 'value2'),
+        (Constraint([SimpleConstraint(value='value1'), SimpleConstraint(value='value2')],
+                    reduce=Constraint.any), 'value2'),
+        (Constraint([SimpleConstraint(value='value1'), SimpleConstraint(value='value2')],
+                    reduce=Constraint.any), 'value3'),
+        (Constraint([SimpleConstraint(value='value1')], reduce=Constraint.notany), 'value1'),
+    ]
+)
+def test_rejects(constraint, item):
+    """Rejection agrees with check_and_set and leaves the constraint as is"""
+    before = str(constraint)
+    rejects = constraint.rejects(item)
+    assert str(constraint) == before
+
+    match, reprocess = constraint.copy().check_and_set(item)
+    if rejects:
+        assert not match and not reprocess
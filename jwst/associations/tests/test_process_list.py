@@ -1,5 +1,7 @@
 """Test ProcessList, ProcessQueue, ProcessQueueSorted"""
 
+from copy import copy
+
 from .helpers import (
     combine_pools,
     t_path
@@ -25,6 +27,24 @@ def test_item_iterable():
         assert isinstance(process_item, ProcessItem)
 
 
+def test_item_view():
+    pool = combine_pools(t_path('data/pool_013_coron_nircam.csv'))
+    item = pool[0]
+    view = ItemView(item)
+    assert view == item
+    assert view.index == item.index
+
+    view['exp_type'] = 'changed'
+    assert view['exp_type'] == 'changed'
+    assert item['exp_type'] != 'changed'
+    assert view['program'] == item['program']
+    assert view != item
+
+    view_copy = copy(view)
+    view_copy['exp_type'] = 'changed again'
+    assert view['exp_type'] == 'changed'
+
+
 def test_process_queue():
     queue = ProcessQueue()
     items_to_add = [
@@ -6,13 +6,15 @@ import numpy as np
 import logging
 from gwcs import wcstools
 
+from ..lib.parallel_utils import map_threaded
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 SLITRATIO = 1.15     # Ratio of slit spacing to slit height
 
 
-def do_correction(input_model, barshadow_model):
+def do_correction(input_model, barshadow_model, slit_workers=1):
     """Do the Bar Shadow Correction
 
     Parameters
@@ -23,6 +25,9 @@ def do_correction(input_model, barshadow_model):
     barshadow_model : `~jwst.datamodels.BarshadowModel`
         bar shadow data model from reference file
 
+    slit_workers : int
+        Number of threads correcting the slitlets
+
     Returns
     -------
     output_model : `~jwst.datamodels.MultiSlitModel`
@@ -54,8 +59,8 @@ def do_correction(input_model, barshadow_model):
     y_increment = barshadow_model.cdelt2
     shutter_height = 1.0 / y_increment
 
-    # Loop over all the slits in the input model
-    for slitlet in output_model.slits:
+    def correct_slitlet(slitlet):
+        """Apply the bar shadow correction to one slitlet"""
         slitlet_number = slitlet.slitlet_id
         log.info('Working on slitlet %d' % slitlet_number)
 
@@ -118,6 +123,9 @@ def do_correction(input_model, barshadow_model):
             # Put an array of ones in a correction extension
             slitlet.barshadow = np.ones(slitlet.data.shape)
 
+    # Correct all the slits in the input model, possibly concurrently
+    map_threaded(correct_slitlet, output_model.slits, slit_workers, label='slitlet')
+
     return output_model
 
 
@@ -18,6 +18,7 @@ class BarShadowStep(Step):
     """
 
     spec = """
+        slit_workers = integer(default=1, min=1)  # number of threads processing the slitlets
     """
 
     reference_file_types = ['barshadow']
@@ -58,7 +59,8 @@ class BarShadowStep(Step):
                 barshadow_model = datamodels.BarshadowModel(self.barshadow_name)
 
                 # Do the bar shadow correction
-                result = bar_shadow.do_correction(input_model, barshadow_model)
+                result = bar_shadow.do_correction(input_model, barshadow_model,
+                                                  slit_workers=self.slit_workers)
 
                 barshadow_model.close()
                 result.meta.cal_step.barshadow = 'COMPLETE'
@@ -191,27 +191,27 @@ class OutputSpectrumModel:
             out_pixel = self.wcs.invert(in_spec.right_ascension,
                                         in_spec.declination,
                                         in_spec.wavelength)
-            # i is a pixel number in the current input spectrum, and
-            # k is the corresponding pixel number in the output spectrum.
             nan_flag = np.isnan(out_pixel)
             n_nan += nan_flag.sum()
-            for i in range(len(out_pixel)):
-                if in_spec.dq[i] & datamodels.dqflags.pixel['DO_NOT_USE'] > 0:
-                    continue
-                # Round to the nearest pixel.
-                if nan_flag[i]:         # skip if the pixel number is NaN
-                    continue
-                k = round(float(out_pixel[i]))
-                if k < 0 or k >= nelem:
-                    continue
-                weight = in_spec.weight[i]
-                self.dq[k] |= in_spec.dq[i]
-                self.flux[k] += in_spec.flux[i] * weight
-                self.error[k] += (in_spec.error[i] * weight)**2
-                self.surf_bright[k] += (in_spec.surf_bright[i] * weight)
-                self.sb_error[k] += (in_spec.sb_error[i] * weight)**2
-                self.weight[k] += weight
-                self.count[k] += 1.
+            # Round to the nearest pixel, skipping input pixels that are
+            # flagged as DO_NOT_USE, have a NaN pixel number, or fall
+            # outside the output spectrum.
+            out_pixel = np.where(nan_flag, -1., out_pixel)
+            k = np.rint(out_pixel).astype(np.int64)
+            use = ((in_spec.dq & datamodels.dqflags.pixel['DO_NOT_USE']) == 0)
+            use &= ~nan_flag & (k >= 0) & (k < nelem)
+            k = k[use]
+            # ufunc.at adds the input pixels one at a time in order, so
+            # output pixels incremented by more than one input pixel get
+            # the same sums as adding them in a loop.
+            weight = in_spec.weight[use]
+            np.bitwise_or.at(self.dq, k, in_spec.dq[use].astype(dq_dtype))
+            np.add.at(self.flux, k, in_spec.flux[use] * weight)
+            np.add.at(self.error, k, (in_spec.error[use] * weight)**2)
+            np.add.at(self.surf_bright, k, in_spec.surf_bright[use] * weight)
+            np.add.at(self.sb_error, k, (in_spec.sb_error[use] * weight)**2)
+            np.add.at(self.weight, k, weight)
+            np.add.at(self.count, k, 1.)
         if n_nan > 0:
             log.warning("%d output pixel numbers were NaN", n_nan)
 
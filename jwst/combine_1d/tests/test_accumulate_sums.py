@@ -0,0 +1,78 @@
+"""
+Test for combine1d.OutputSpectrumModel.accumulate_sums
+"""
+import numpy as np
+
+from jwst import datamodels
+from jwst.combine_1d import combine1d
+
+
+class DummySpectrum:
+    """The attributes of an InputSpectrumModel used by accumulate_sums"""
+    def __init__(self, wavelength, rng, weight):
+        nelem = len(wavelength)
+        self.wavelength = wavelength
+        self.flux = rng.uniform(1., 10., nelem)
+        self.error = rng.uniform(0.1, 1., nelem)
+        self.surf_bright = rng.uniform(1., 10., nelem)
+        self.sb_error = rng.uniform(0.1, 1., nelem)
+        self.dq = rng.choice([0, 0, 0, 1, 4, 5], nelem).astype(np.uint32)
+        self.weight = np.full(nelem, weight)
+        self.right_ascension = np.full(nelem, 10.)
+        self.declination = np.full(nelem, -20.)
+        self.nelem = nelem
+
+
+def accumulate_one_by_one(output, input_spectra):
+    """Add each input pixel to the output spectrum in a loop"""
+    nelem = output.wavelength.shape[0]
+    sums = {name: np.zeros(nelem) for name in
+            ['flux', 'error', 'surf_bright', 'sb_error', 'weight', 'count']}
+    sums['dq'] = np.zeros(nelem, dtype=output.dq.dtype)
+    for in_spec in input_spectra:
+        out_pixel = output.wcs.invert(in_spec.right_ascension,
+                                      in_spec.declination,
+                                      in_spec.wavelength)
+        for i in range(len(out_pixel)):
+            if in_spec.dq[i] & datamodels.dqflags.pixel['DO_NOT_USE'] > 0:
+                continue
+            if np.isnan(out_pixel[i]):
+                continue
+            k = round(float(out_pixel[i]))
+            if k < 0 or k >= nelem:
+                continue
+            weight = in_spec.weight[i]
+            sums['dq'][k] |= in_spec.dq[i]
+            sums['flux'][k] += in_spec.flux[i] * weight
+            sums['error'][k] += (in_spec.error[i] * weight)**2
+            sums['surf_bright'][k] += in_spec.surf_bright[i] * weight
+            sums['sb_error'][k] += (in_spec.sb_error[i] * weight)**2
+            sums['weight'][k] += weight
+            sums['count'][k] += 1.
+    return sums
+
+
+def test_accumulate_sums():
+    rng = np.random.RandomState(11)
+    # Offset and oversampled spectra, so that some output pixels get more
+    # than one input pixel from the same spectrum and some get none
+    input_spectra = [
+        DummySpectrum(np.linspace(1.0, 2.0, 200), rng, 1.),
+        DummySpectrum(np.linspace(1.2, 2.2, 200), rng, 2.5),
+        DummySpectrum(np.linspace(1.1, 1.9, 500), rng, 0.7),
+    ]
+
+    output = combine1d.OutputSpectrumModel()
+    output.assign_wavelengths(input_spectra)
+    # Only the shape of the output arrays is known before accumulating
+    output.dq = np.zeros(output.wavelength.shape,
+                         dtype=datamodels.CombinedSpecModel().spec_table.dtype["DQ"])
+    expected = accumulate_one_by_one(output, input_spectra)
+
+    output.accumulate_sums(input_spectra)
+
+    good = expected['count'] > 0.
+    assert (~good).any()
+    assert expected['count'].max() > len(input_spectra)
+    for name, values in expected.items():
+        np.testing.assert_array_equal(getattr(output, name), values[good])
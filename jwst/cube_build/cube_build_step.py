@@ -55,6 +55,7 @@ class CubeBuildStep (Step):
          skip_dqflagging = boolean(default=false) # skip setting the DQ plane of the IFU
          search_output_file = boolean(default=false)
          output_use_model = boolean(default=true) # Use filenames in the output models
+         maximum_cores = max_cores(default='none') # max number of processes: 'none', 'quarter', 'half', 'all' or an integer
        """
 
     reference_file_types = ['cubepar', 'resol']
@@ -253,6 +254,7 @@ class CubeBuildStep (Step):
             'wavemin': self.wavemin,
             'wavemax': self.wavemax,
             'skip_dqflagging': self.skip_dqflagging,
+            'maximum_cores': self.maximum_cores,
             'xdebug': self.xdebug,
             'ydebug': self.ydebug,
             'zdebug': self.zdebug,
@@ -1,11 +1,19 @@
 """ Map the detector pixels to the cube coordinate system
 """
-import numpy as np
+from functools import partial
 import logging
 
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ..lib import parallel_utils
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Number of point cloud members matched to the spaxels at a time
+CLOUD_BATCH_SIZE = 20000
+
 
 def match_det2cube_msm(naxis1, naxis2, naxis3,
                        cdelt1, cdelt2,
@@ -21,7 +29,8 @@ def match_det2cube_msm(naxis1, naxis2, naxis3,
                        weighting_type,
                        rois_pixel, roiw_pixel, weight_pixel,
                        softrad_pixel, scalerad_pixel,
-                       cube_debug, debug_file):
+                       cube_debug, debug_file,
+                       num_processes=1):
 
     """ Map the detector pixels to the cube spaxels using the MSM parameters
 
@@ -31,6 +40,11 @@ def match_det2cube_msm(naxis1, naxis2, naxis3,
     according to modified shepard method of inverse weighting based on the
     distance between the point cloud member and the spaxel center.
 
+    The spaxels within the spatial ROI of the point cloud members are found
+    with a k-d tree of the spaxel centers. The cube is split into slabs of
+    wavelength planes, which are matched independently, in parallel if
+    `num_processes` is larger than 1, and added to the spaxel sums.
+
     Parameters
     ----------
     naxis1 : int
@@ -56,7 +70,7 @@ def match_det2cube_msm(naxis1, naxis2, naxis3,
     ycenter : numpy.ndarray
        spaxel center locations 2nd dimensions.
     zcoord : numpy.ndarray
-        spaxel center locations in 3rd dimensions
+        spaxel center locations in 3rd dimensions, in increasing order
     spaxel_flux : numpy.ndarray
        contains the weighted summed detector fluxes that fall
        within the roi
@@ -80,6 +94,8 @@ def match_det2cube_msm(naxis1, naxis2, naxis3,
        detector pixel
     wave : numpy.ndarray
        contains the spectral coordinate  for the mapped detector pixel
+    num_processes : int
+       number of processes matching the wavelength slabs
 
     Returns
     -------
@@ -87,61 +103,131 @@ def match_det2cube_msm(naxis1, naxis2, naxis3,
     from the detector pixels that fall within the roi if the spaxel center.
     """
     nplane = naxis1 * naxis2
+    cloud = dict(cdelt1=cdelt1, cdelt2=cdelt2, zcdelt3=zcdelt3,
+                 xcenters=xcenters, ycenters=ycenters, zcoord=zcoord,
+                 tree=cKDTree(np.column_stack((xcenters, ycenters))),
+                 flux=flux, err=err, coord1=coord1, coord2=coord2, wave=wave,
+                 weighting_type=weighting_type,
+                 rois_pixel=rois_pixel, roiw_pixel=roiw_pixel,
+                 weight_pixel=weight_pixel, softrad_pixel=softrad_pixel,
+                 scalerad_pixel=scalerad_pixel)
+
+    if num_processes > 1:
+        slabs = parallel_utils.row_chunks(naxis3, num_processes)
+    else:
+        slabs = [(0, naxis3)]
 
-    # now loop over the pixel values for this region and find the spaxels that fall
-    # within the region of interest.
-    nn = coord1.size
-    #    print('looping over n points mapping to cloud',nn)
-    # ________________________________________________________________________________
-    for ipt in range(0, nn - 1):
-        # xcenters, ycenters is a flattened 1-D array of the 2 X 2 xy plane
-        # cube coordinates.
-        # find the spaxels that fall withing ROI of point cloud defined  by
-        # coord1,coord2,wave
-        lower_limit = softrad_pixel[ipt]
-        xdistance = (xcenters - coord1[ipt])
-        ydistance = (ycenters - coord2[ipt])
-        radius = np.sqrt(xdistance * xdistance + ydistance * ydistance)
+    slab_sums = parallel_utils.map_forked(
+        partial(_match_slab_msm, cloud, cube_debug=cube_debug),
+        slabs, num_processes, label='wavelength slab')
 
-        indexr = np.where(radius <= rois_pixel[ipt])
-        indexz = np.where(abs(zcoord - wave[ipt]) <= roiw_pixel[ipt])
+    for (zstart, zstop), sums in zip(slabs, slab_sums):
+        cube_slice = slice(zstart * nplane, zstop * nplane)
+        for spaxel_sum, slab_sum in zip((spaxel_flux, spaxel_weight,
+                                         spaxel_iflux, spaxel_var), sums):
+            spaxel_sum[cube_slice] += slab_sum
+
+
+def _match_slab_msm(cloud, slab, cube_debug=None):
+    """Weighted sums of the point cloud members over a slab of wavelength planes
 
-        if len(indexz[0]) > 0:
-            d1 = np.array(coord1[ipt] - xcenters[indexr]) / cdelt1
-            d2 = np.array(coord2[ipt] - ycenters[indexr]) / cdelt2
-            d3 = np.array(wave[ipt] - zcoord[indexz]) / zcdelt3[indexz]
-
-            dxy = (d1 * d1) + (d2 * d2)
-
-            # shape of dxy is #indexr or number of overlaps in spatial plane
-            # shape of d3 is #indexz or number of overlaps in spectral plane
-            # shape of dxy_matrix & d3_matrix  (#indexr, #indexz)
-            # rows = number of overlaps in spatial plane
-            # cols = number of overlaps in spectral plane
-            dxy_matrix = np.tile(dxy[np.newaxis].T, [1, d3.shape[0]])
-            d3_matrix = np.tile(d3 * d3, [dxy_matrix.shape[0], 1])
-
-            wdistance = dxy_matrix + d3_matrix
-            if weighting_type == 'msm':
-                weight_distance = np.power(np.sqrt(wdistance), weight_pixel[ipt])
-                weight_distance[weight_distance < lower_limit] = lower_limit
-                weight_distance = 1.0 / weight_distance
-            elif weighting_type == 'emsm':
-                weight_distance = np.exp(-wdistance/(scalerad_pixel[ipt]/cdelt1))
-
-            weight_distance = weight_distance.flatten('F')
-            weighted_flux = weight_distance * flux[ipt]
-            weighted_var = (weight_distance * err[ipt]) * (weight_distance * err[ipt])
-
-            icube_index = [iz * nplane + ir for iz in indexz[0] for ir in indexr[0]]
-
-            if cube_debug in icube_index:
-                log.info('cube_debug %i %d %d',ipt,flux[ipt],weight_distance[icube_index.index(cube_debug)])
-
-            spaxel_flux[icube_index] = spaxel_flux[icube_index] + weighted_flux
-            spaxel_weight[icube_index] = spaxel_weight[icube_index] + weight_distance
-            spaxel_iflux[icube_index] = spaxel_iflux[icube_index] + 1
-            spaxel_var[icube_index] = spaxel_var[icube_index] + weighted_var
+    Parameters
+    ----------
+    cloud : dict
+       the point cloud and cube arguments of `match_det2cube_msm`, and the
+       k-d tree of the spaxel centers in the spatial plane
+    slab : tuple of int
+       first and last + 1 wavelength planes of the slab
+    cube_debug : int or None
+       cube index of a spaxel to log the matches of
+
+    Returns
+    -------
+    flux, weight, iflux, var : numpy.ndarray
+       sums over the spaxels of the slab, flattened as the cube arrays
+    """
+    zstart, zstop = slab
+    zcoord = cloud['zcoord']
+    xcenters = cloud['xcenters']
+    ycenters = cloud['ycenters']
+    nplane = xcenters.size
+    size = (zstop - zstart) * nplane
+    sums = [np.zeros(size) for _ in range(4)]
+
+    # point cloud members whose spectral ROI overlaps the slab
+    wave = cloud['wave']
+    roiw = cloud['roiw_pixel']
+    in_slab = np.nonzero((wave + roiw >= zcoord[zstart]) &
+                         (wave - roiw <= zcoord[zstop - 1]))[0]
+
+    for batch_start in range(0, in_slab.size, CLOUD_BATCH_SIZE):
+        ipt = in_slab[batch_start:batch_start + CLOUD_BATCH_SIZE]
+        coord1 = cloud['coord1'][ipt]
+        coord2 = cloud['coord2'][ipt]
+        wave = cloud['wave'][ipt]
+        rois = cloud['rois_pixel'][ipt]
+        roiw = cloud['roiw_pixel'][ipt]
+
+        # spaxels within the spatial ROI: query the tree with the largest
+        # ROI of the batch and keep those within the ROI of each member
+        neighbors = cloud['tree'].query_ball_point(np.column_stack((coord1, coord2)),
+                                                   r=rois.max())
+        counts = np.array([len(n) for n in neighbors])
+        if counts.sum() == 0:
+            continue
+        pt = np.repeat(np.arange(ipt.size), counts)
+        ir = np.concatenate([n for n in neighbors if n]).astype(np.intp)
+        xdistance = xcenters[ir] - coord1[pt]
+        ydistance = ycenters[ir] - coord2[pt]
+        radius = np.sqrt(xdistance * xdistance + ydistance * ydistance)
+        keep = radius <= rois[pt]
+        pt = pt[keep]
+        ir = ir[keep]
+
+        # planes of the slab within the spectral ROI of each member
+        zlow = np.searchsorted(zcoord, wave - roiw, side='left')
+        zhigh = np.searchsorted(zcoord, wave + roiw, side='right')
+        zlow = np.clip(zlow, zstart, zstop)[pt]
+        nz = np.clip(zhigh, zstart, zstop)[pt] - zlow
+        nz[nz < 0] = 0
+        pair = np.repeat(np.arange(pt.size), nz)
+        iz = zlow[pair] + np.arange(pair.size) - np.repeat(np.cumsum(nz) - nz, nz)
+        pt = pt[pair]
+        ir = ir[pair]
+        keep = np.abs(zcoord[iz] - wave[pt]) <= roiw[pt]
+        pt = pt[keep]
+        ir = ir[keep]
+        iz = iz[keep]
+
+        # modified shepard weighting of each (member, spaxel) pair
+        d1 = (coord1[pt] - xcenters[ir]) / cloud['cdelt1']
+        d2 = (coord2[pt] - ycenters[ir]) / cloud['cdelt2']
+        d3 = (wave[pt] - zcoord[iz]) / cloud['zcdelt3'][iz]
+        wdistance = d1 * d1 + d2 * d2 + d3 * d3
+        ipt_pair = ipt[pt]
+        if cloud['weighting_type'] == 'msm':
+            lower_limit = cloud['softrad_pixel'][ipt_pair]
+            weight_distance = np.power(np.sqrt(wdistance), cloud['weight_pixel'][ipt_pair])
+            weight_distance = np.where(weight_distance < lower_limit, lower_limit,
+                                       weight_distance)
+            weight_distance = 1.0 / weight_distance
+        elif cloud['weighting_type'] == 'emsm':
+            weight_distance = np.exp(-wdistance / (cloud['scalerad_pixel'][ipt_pair] /
+                                                   cloud['cdelt1']))
+        weighted_flux = weight_distance * cloud['flux'][ipt_pair]
+        weighted_err = weight_distance * cloud['err'][ipt_pair]
+
+        icube_index = (iz - zstart) * nplane + ir
+        if cube_debug is not None:
+            for index in np.nonzero(icube_index + zstart * nplane == cube_debug)[0]:
+                log.info('cube_debug %i %d %d', ipt_pair[index],
+                         cloud['flux'][ipt_pair[index]], weight_distance[index])
+
+        for spaxel_sum, values in zip(sums, (weighted_flux, weight_distance, None,
+                                             weighted_err * weighted_err)):
+            spaxel_sum += np.bincount(icube_index, weights=values, minlength=size)
+
+    return sums
 
 # _______________________________________________________________________
 
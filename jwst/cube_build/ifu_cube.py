@@ -14,6 +14,7 @@ from astropy import units as u
 from gwcs import wcstools
 from ..assign_wcs import nirspec
 from ..datamodels import dqflags
+from ..lib.parallel_utils import compute_num_processes
 from . import cube_build_wcs_util
 from . import cube_overlap
 from . import cube_cloud
@@ -73,6 +74,7 @@ class IFUCubeData():
         self.zdebug = pars_cube.get('zdebug')
         self.debug_file = pars_cube.get('debug_file')
         self.skip_dqflagging = pars_cube.get('skip_dqflagging')
+        self.num_processes = compute_num_processes(pars_cube.get('maximum_cores', 'none'))
 
         self.num_bands = 0
         self.output_name = ''
@@ -657,7 +659,8 @@ class IFUCubeData():
                                                       softrad_pixel,
                                                       scalerad_pixel,
                                                       cube_debug,
-                                                      self.debug_file)
+                                                      self.debug_file,
+                                                      num_processes=self.num_processes)
 
                         t1 = time.time()
                         log.info("Time to match file to ifucube = %.1f s" % (t1 - t0,))
@@ -848,7 +851,8 @@ class IFUCubeData():
                                           softrad_pixel,
                                           scalerad_pixel,
                                           cube_debug,
-                                          self.debug_file)
+                                          self.debug_file,
+                                          num_processes=self.num_processes)
 # _______________________________________________________________________
 # shove Flux and iflux in the  final ifucube
             self.find_spaxel_flux()
@@ -10,6 +10,7 @@ from jwst.cube_build import CubeBuildStep
 from jwst.cube_build.file_table import ErrorNoAssignWCS
 from jwst.cube_build.cube_build import ErrorNoChannels
 from jwst.pipeline.collect_pipeline_cfgs import collect_pipeline_cfgs
+from jwst.stpipe.config_parser import ValidationError
 
 
 @pytest.fixture(scope='module')
@@ -137,3 +138,9 @@ def test_call_cube_build(_jail, miri_cube_pars, miri_image):
         step.override_cubepar = miri_cube_pars
         step.channel = '3'
         step.run(miri_image)
+
+
+def test_maximum_cores_invalid():
+    """ test an invalid maximum_cores is rejected before the step runs """
+    with pytest.raises(ValidationError):
+        CubeBuildStep(maximum_cores='halve')
@@ -0,0 +1,82 @@
+"""
+Unit test for matching the point cloud to the ifucube spaxels
+"""
+
+import numpy as np
+import pytest
+
+from jwst.cube_build import cube_cloud
+
+
+def match_brute_force(naxis1, naxis2, naxis3, cdelt1, cdelt2, zcdelt3,
+                      xcenters, ycenters, zcoord, flux, err, coord1, coord2, wave,
+                      weighting_type, rois, roiw, weight_power, softrad, scalerad):
+    """Match every point cloud member to every spaxel, one member at a time"""
+    nplane = naxis1 * naxis2
+    sums = [np.zeros(nplane * naxis3) for _ in range(4)]
+    for ipt in range(coord1.size):
+        for iz in range(naxis3):
+            d3 = (wave[ipt] - zcoord[iz]) / zcdelt3[iz]
+            if abs(zcoord[iz] - wave[ipt]) > roiw[ipt]:
+                continue
+            for ir in range(nplane):
+                radius = np.hypot(xcenters[ir] - coord1[ipt], ycenters[ir] - coord2[ipt])
+                if radius > rois[ipt]:
+                    continue
+                d1 = (coord1[ipt] - xcenters[ir]) / cdelt1
+                d2 = (coord2[ipt] - ycenters[ir]) / cdelt2
+                wdistance = d1 * d1 + d2 * d2 + d3 * d3
+                if weighting_type == 'msm':
+                    weight = max(np.sqrt(wdistance) ** weight_power[ipt], softrad[ipt])
+                    weight = 1.0 / weight
+                else:
+                    weight = np.exp(-wdistance / (scalerad[ipt] / cdelt1))
+                index = iz * nplane + ir
+                sums[0][index] += weight * flux[ipt]
+                sums[1][index] += weight
+                sums[2][index] += 1
+                sums[3][index] += (weight * err[ipt]) ** 2
+    return sums
+
+
+@pytest.mark.parametrize('weighting_type', ['msm', 'emsm'])
+@pytest.mark.parametrize('num_processes', [1, 2])
+def test_match_det2cube_msm(weighting_type, num_processes, monkeypatch):
+    """The k-d tree, slab by slab matching gives the brute force sums"""
+    monkeypatch.setattr(cube_cloud, 'CLOUD_BATCH_SIZE', 70)
+    rng = np.random.RandomState(5)
+    naxis1, naxis2, naxis3 = 7, 6, 10
+    cdelt1 = cdelt2 = 0.1
+    x = (np.arange(naxis1) - naxis1 / 2) * cdelt1
+    y = (np.arange(naxis2) - naxis2 / 2) * cdelt2
+    xcenters, ycenters = [a.ravel() for a in np.meshgrid(x, y)]
+    zcoord = 5.0 + np.arange(naxis3) * 0.002
+    zcdelt3 = np.full(naxis3, 0.002)
+
+    npt = 300
+    coord1 = rng.uniform(x[0], x[-1], npt)
+    coord2 = rng.uniform(y[0], y[-1], npt)
+    wave = rng.uniform(zcoord[0] - 0.002, zcoord[-1] + 0.002, npt)
+    flux = rng.uniform(1, 10, npt)
+    err = rng.uniform(0.1, 1, npt)
+    rois = rng.uniform(0.1, 0.2, npt)
+    roiw = np.full(npt, 0.003)
+    weight_power = np.full(npt, 2.0)
+    softrad = np.full(npt, 0.01)
+    scalerad = np.full(npt, 0.1)
+
+    expected = match_brute_force(naxis1, naxis2, naxis3, cdelt1, cdelt2, zcdelt3,
+                                 xcenters, ycenters, zcoord, flux, err,
+                                 coord1, coord2, wave, weighting_type,
+                                 rois, roiw, weight_power, softrad, scalerad)
+
+    sums = [np.zeros(naxis1 * naxis2 * naxis3) for _ in range(4)]
+    cube_cloud.match_det2cube_msm(naxis1, naxis2, naxis3, cdelt1, cdelt2, zcdelt3,
+                                  xcenters, ycenters, zcoord, *sums, flux, err,
+                                  coord1, coord2, wave, weighting_type,
+                                  rois, roiw, weight_power, softrad, scalerad,
+                                  None, None, num_processes=num_processes)
+
+    assert expected[2].sum() > npt
+    for result, reference in zip(sums, expected):
+        np.testing.assert_allclose(result, reference, rtol=1e-10)
@@ -14,6 +14,7 @@ class DarkCurrentStep(Step):
 
     spec = """
         dark_output = output_file(default = None) # Dark model or averaged dark subtracted
+        average_dark_dir = string(default=None) # Directory in which averaged darks are kept for later runs
     """
 
     reference_file_types = ['dark']
@@ -31,7 +32,7 @@ class DarkCurrentStep(Step):
             if self.dark_name == 'N/A':
                 self.log.warning('No DARK reference file found')
                 self.log.warning('Dark current step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.dark = 'SKIPPED'
                 return result
 
@@ -45,13 +46,16 @@ class DarkCurrentStep(Step):
             # Open the dark ref file data model - based on Instrument
             instrument = input_model.meta.instrument.name
             if(instrument == 'MIRI'):
-                dark_model = datamodels.DarkMIRIModel(self.dark_name)
+                dark_model = self.open_reference_model(self.dark_name,
+                                                       datamodels.DarkMIRIModel)
             else:
-                dark_model = datamodels.DarkModel(self.dark_name)
+                dark_model = self.open_reference_model(self.dark_name,
+                                                       datamodels.DarkModel)
 
             # Do the dark correction
             result = dark_sub.do_correction(
-                input_model, dark_model, dark_output
+                input_model, dark_model, dark_output,
+                dark_name=self.dark_name, cache_dir=self.average_dark_dir
             )
             dark_model.close()
 
@@ -5,12 +5,14 @@
 import numpy as np
 import logging
 from .. import datamodels
+from ..stpipe.reference_cache import reference_cache
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def do_correction(input_model, dark_model, dark_output=None):
+def do_correction(input_model, dark_model, dark_output=None, dark_name=None,
+                  cache_dir=None):
     """
     Short Summary
     -------------
@@ -27,6 +29,15 @@ def do_correction(input_model, dark_model, dark_output=None):
     dark_output: string
         file name in which to optionally save averaged dark data
 
+    dark_name: string
+        path of the dark reference file; if given, the averaged dark
+        data are kept in the reference model cache for later exposures
+        with the same readout pattern
+
+    cache_dir: string
+        directory in which the cached averaged dark data are also
+        saved, for later runs
+
     Returns
     -------
     output_model: data model object
@@ -41,6 +52,10 @@ def do_correction(input_model, dark_model, dark_output=None):
     sci_nframes = input_model.meta.exposure.nframes
     sci_groupgap = input_model.meta.exposure.groupgap
 
+    # The MIRI darks depend on the integration number in the exposure, so
+    # a segment or block of integrations needs those up to its last one
+    int_end = (input_model.meta.exposure.integration_start or 1) - 1 + sci_nints
+
     if instrument == 'MIRI':
         drk_nints = dark_model.data.shape[0]
         drk_ngroups = dark_model.data.shape[1]
@@ -70,7 +85,7 @@ def do_correction(input_model, dark_model, dark_output=None):
         )
         log.warning("Input will be returned without subtracting dark current.")
         input_model.meta.cal_step.dark_sub = 'SKIPPED'
-        return input_model.copy()
+        return input_model.writable_copy()
 
     # Check that the value of nframes and groupgap in the dark
     # are not greater than those of the science data
@@ -81,10 +96,12 @@ def do_correction(input_model, dark_model, dark_output=None):
             "Input will be returned without subtracting dark current."
         )
         input_model.meta.cal_step.dark_sub = 'SKIPPED'
-        return input_model.copy()
+        return input_model.writable_copy()
 
-    # Replace NaN's in the dark with zeros
-    dark_model.data[np.isnan(dark_model.data)] = 0.0
+    # Replace NaN's in the dark with zeros, in a copy of the data, which
+    # may be shared with other models of the reference file
+    if np.isnan(dark_model.data).any():
+        dark_model.data = np.where(np.isnan(dark_model.data), 0.0, dark_model.data)
 
     # Check whether the dark and science data have matching
     # nframes and groupgap settings.
@@ -107,14 +124,33 @@ def do_correction(input_model, dark_model, dark_output=None):
         # If the data are from MIRI, the darks are integration-dependent and
         # we average them with a seperate routine.
 
+        # The averaged dark depends only on the dark reference file and
+        # the readout pattern, so it is cached for later exposures.
         if instrument == 'MIRI':
-            averaged_dark = average_MIRIdark_frames(
-                dark_model, sci_nints, sci_ngroups, sci_nframes, sci_groupgap
-            )
+            model_class = datamodels.DarkMIRIModel
+            params = (min(int_end, drk_nints), sci_ngroups, sci_nframes,
+                      sci_groupgap)
+
+            def average():
+                return average_MIRIdark_frames(
+                    dark_model, int_end, sci_ngroups, sci_nframes, sci_groupgap
+                )
         else:
-            averaged_dark = average_dark_frames(
-                dark_model, sci_ngroups, sci_nframes, sci_groupgap
+            model_class = datamodels.DarkModel
+            params = (sci_ngroups, sci_nframes, sci_groupgap)
+
+            def average():
+                return average_dark_frames(
+                    dark_model, sci_ngroups, sci_nframes, sci_groupgap
+                )
+
+        if isinstance(dark_name, str):
+            averaged_dark, hit = reference_cache.get_derived(
+                dark_name, model_class, params, average, directory=cache_dir
             )
+            log.info('Averaged dark cache %s', 'hit' if hit else 'miss')
+        else:
+            averaged_dark = average()
 
         # Save the frame-averaged dark data that was just created,
         # if requested by the user
@@ -316,7 +352,7 @@ def subtract_dark(input, dark):
               input.data.shape[2], input.data.shape[3])
 
     # Create output as a copy of the input science data model
-    output = input.copy()
+    output = input.writable_copy()
 
     if instrument == 'MIRI':
         # MIRI dark reference file has a DQ plane for each integration,
@@ -331,12 +367,16 @@ def subtract_dark(input, dark):
     # Combine the dark and science DQ data
     output.pixeldq = np.bitwise_or(input.pixeldq, darkdq)
 
+    # The first integration may be a later one of the exposure, for a
+    # segment or block of integrations
+    int_start = (input.meta.exposure.integration_start or 1) - 1
+
     # loop over all integrations and groups in input science data
     for i in range(input.data.shape[0]):
 
         if instrument == 'MIRI':
-            if i < dark_nints:
-                dark_int = dark.data[i]
+            if i + int_start < dark_nints:
+                dark_int = dark.data[i + int_start]
             else:
                 dark_int = dark.data[dark_nints - 1]
 
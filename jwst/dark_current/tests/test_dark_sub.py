@@ -6,11 +6,13 @@ import pytest
 import numpy as np
 from numpy.testing import assert_allclose
 
+from jwst.dark_current import dark_sub
 from jwst.dark_current.dark_sub import (
     average_dark_frames,
     do_correction as darkcorr
     )
 from jwst.datamodels import RampModel, DarkModel, DarkMIRIModel, dqflags
+from jwst.stpipe.reference_cache import ReferenceModelCache
 
 
 # Define frame_time and number of groups in the generated dark reffile
@@ -301,6 +303,32 @@ def test_2_int(make_rampmodel, make_darkmodel):
     np.testing.assert_array_equal(outfile.data[1], diff_int2)
 
 
+@pytest.mark.parametrize('nframes', [1, 4])
+def test_integration_block(make_rampmodel, make_darkmodel, nframes):
+    '''Verify MIRI darks are chosen by the integration number in the exposure'''
+    nints, ngroups, ysize, xsize = 3, 5, 4, 6
+
+    dm_ramp = make_rampmodel(nints, ngroups, ysize, xsize)
+    dm_ramp.meta.exposure.nframes = nframes
+    dm_ramp.meta.exposure.groupgap = 0
+    dm_ramp.data[...] = np.arange(nints)[:, None, None, None]
+
+    dark = make_darkmodel(ngroups * nframes, ysize, xsize)
+    dark.data[0] = 0.1
+    dark.data[1] = 0.2
+
+    whole = darkcorr(dm_ramp.copy(), dark.copy())
+
+    # integrations 2 and 3 as a block of the exposure
+    block = dm_ramp.copy()
+    block.data = dm_ramp.data[1:].copy()
+    block.meta.exposure.integration_start = 2
+    block.meta.exposure.integration_end = 3
+    result = darkcorr(block, dark.copy())
+
+    np.testing.assert_allclose(result.data, whole.data[1:], rtol=1e-6)
+
+
 def test_frame_avg(make_rampmodel, make_darkmodel):
     '''Check that if NFRAMES>1 or GROUPGAP>0, the frame-averaged dark data are
     subtracted group-by-group from science data groups and the ERR arrays are not modified'''
@@ -346,6 +374,47 @@ def test_frame_avg(make_rampmodel, make_darkmodel):
     np.testing.assert_array_equal(outfile.err[:, :], 0)
 
 
+def test_cached_frame_avg(make_rampmodel, make_darkmodel, tmp_path, monkeypatch):
+    '''Check that the frame-averaged dark is reused, from memory or from the
+    cache directory, for exposures with the same readout pattern'''
+
+    dm_ramp = make_rampmodel(1, 3, 20, 20)
+    dm_ramp.meta.exposure.nframes = 2
+    dm_ramp.meta.exposure.groupgap = 1
+    dark = make_darkmodel(10, 20, 20)
+    dark.data[:, :, 5, 5] = np.arange(10)
+    dark_name = str(tmp_path / 'dark.fits')
+    dark.save(dark_name)
+    cache_dir = str(tmp_path / 'averaged')
+
+    expected = darkcorr(dm_ramp, dark)
+
+    cache = ReferenceModelCache()
+    monkeypatch.setattr(dark_sub, 'reference_cache', cache)
+    for _ in range(2):
+        with DarkMIRIModel(dark_name) as dark:
+            outfile = darkcorr(dm_ramp, dark, dark_name=dark_name,
+                               cache_dir=cache_dir)
+        np.testing.assert_array_equal(outfile.data, expected.data)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A new process reads the averaged dark from the cache directory
+    cache = ReferenceModelCache()
+    monkeypatch.setattr(dark_sub, 'reference_cache', cache)
+    with DarkMIRIModel(dark_name) as dark:
+        outfile = darkcorr(dm_ramp, dark, dark_name=dark_name,
+                           cache_dir=cache_dir)
+    np.testing.assert_array_equal(outfile.data, expected.data)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    # Another readout pattern is averaged again
+    dm_ramp.meta.exposure.groupgap = 0
+    with DarkMIRIModel(dark_name) as dark:
+        darkcorr(dm_ramp, dark, dark_name=dark_name, cache_dir=cache_dir)
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.clear()
+
+
 @pytest.fixture(scope='function')
 def make_rampmodel():
     '''Make MIRI Ramp model for testing'''
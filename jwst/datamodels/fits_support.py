@@ -1,3 +1,4 @@
+from collections import namedtuple
 import datetime
 import hashlib
 import os
@@ -390,6 +391,10 @@ def _save_history(hdulist, tree):
 
 
 def to_fits(tree, schema):
+    # Arrays not read from the input file yet must be part of the tree
+    # so that they are linked to the HDUs they are written to
+    properties._load_lazy_arrays(tree)
+
     hdulist = fits.HDUList()
     hdulist.append(fits.PrimaryHDU())
 
@@ -408,11 +413,12 @@ def to_fits(tree, schema):
 # READER
 
 
-def _fits_keyword_loader(hdulist, fits_keyword, schema, hdu_index, known_keywords):
+def _fits_keyword_loader(hdulist, fits_keyword, schema, hdu_index, known_keywords,
+                         hdus=None):
 
     hdu_name = _get_hdu_name(schema)
     try:
-        hdu = get_hdu(hdulist, hdu_name, hdu_index)
+        hdu = _get_loaded_hdu(hdulist, hdu_name, hdu_index, hdus)
     except AttributeError:
         return None
 
@@ -430,18 +436,46 @@ def _fits_keyword_loader(hdulist, fits_keyword, schema, hdu_index, known_keyword
     return val
 
 
-def _fits_array_loader(hdulist, schema, hdu_index, known_datas):
+def _fits_array_loader(hdulist, schema, hdu_index, known_datas, lazy_load=False,
+                       hdus=None):
     hdu_name = _get_hdu_name(schema)
     _assert_non_primary_hdu(hdu_name)
     try:
-        hdu = get_hdu(hdulist, hdu_name, hdu_index)
+        hdu = _get_loaded_hdu(hdulist, hdu_name, hdu_index, hdus)
     except AttributeError:
         return None
 
     known_datas.add(hdu)
+    if lazy_load and properties.LazyFitsArray.can_defer(hdu, schema):
+        return properties.LazyFitsArray(hdu, schema)
     return from_fits_hdu(hdu, schema)
 
 
+def _get_loaded_hdu(hdulist, hdu_name, index, hdus=None):
+    """Look up an HDU by name, remembering the result in `hdus`.
+
+    Many keywords live in the same HDU, and finding an HDU by name
+    means a scan of the whole HDU list, so the lookups made while
+    loading a file are done once per HDU.
+    """
+    if hdus is None:
+        return get_hdu(hdulist, hdu_name, index)
+
+    key = (hdu_name, index)
+    try:
+        hdu = hdus[key]
+    except KeyError:
+        try:
+            hdu = get_hdu(hdulist, hdu_name, index)
+        except AttributeError as error:
+            hdu = error
+        hdus[key] = hdu
+
+    if isinstance(hdu, AttributeError):
+        raise hdu
+    return hdu
+
+
 def _schema_has_fits_hdu(schema):
     has_fits_hdu = [False]
 
@@ -452,7 +486,77 @@ def _schema_has_fits_hdu(schema):
     return has_fits_hdu[0]
 
 
-def _load_from_schema(hdulist, schema, tree, context, skip_fits_update=False):
+# The FITS keywords and HDUs used by the schema of each model class,
+# indexed by schema URL
+_LOAD_PLANS = {}
+
+
+class _LoadEntry(namedtuple('_LoadEntry', ['path', 'schema', 'fits_keyword',
+                                           'is_array', 'items'])):
+    """A schema node read from a FITS file.
+
+    `path` is the path of the node in the tree, relative to the enclosing
+    sequence, if any. `fits_keyword` is the keyword the node is read from,
+    if any, and `is_array` is `True` if the node is an array read from an
+    HDU. Sequences of HDUs with increasing EXTVER have `items`, the
+    entries of a single item of the sequence.
+    """
+
+
+def _compile_load_plan(schema):
+    """Flatten the FITS mapping of a schema into a list of `_LoadEntry`.
+
+    The entries are in the order in which `schema.walk_schema` visits
+    the nodes of the schema.
+    """
+    plan = []
+
+    def callback(schema, path, combiner, ctx, recurse):
+        fits_keyword = schema.get('fits_keyword')
+        is_array = 'fits_hdu' in schema and (
+            'max_ndim' in schema or 'ndim' in schema or 'datatype' in schema)
+        if fits_keyword is not None or is_array:
+            plan.append(_LoadEntry(tuple(path), schema, fits_keyword, is_array, None))
+
+        if schema.get('type') == 'array' and _schema_has_fits_hdu(schema):
+            items = _compile_load_plan(schema['items'])
+            plan.append(_LoadEntry(tuple(path), schema, None, False, items))
+            return True
+
+    mschema.walk_schema(schema, callback)
+    return plan
+
+
+def _get_load_plan(schema, schema_key=None):
+    """Return the load plan of a schema, cached by `schema_key` if given.
+
+    Parameters
+    ----------
+    schema : dict
+        The (merged) model schema.
+
+    schema_key : str or None
+        Key identifying the schema, usually the schema URL of a model
+        class whose schema has not been modified. `None` for schemas that
+        must not be cached.
+
+    Returns
+    -------
+    plan : list of `_LoadEntry`
+        The schema nodes read from FITS files.
+    """
+    if schema_key is None:
+        return _compile_load_plan(schema)
+
+    try:
+        return _LOAD_PLANS[schema_key]
+    except KeyError:
+        plan = _LOAD_PLANS[schema_key] = _compile_load_plan(schema)
+        return plan
+
+
+def _load_from_schema(hdulist, schema, tree, context, skip_fits_update=False,
+                      lazy_load=False):
     known_keywords = {}
     known_datas = set()
 
@@ -468,50 +572,37 @@ def _load_from_schema(hdulist, schema, tree, context, skip_fits_update=False):
     # This is needed to constrain the loop over HDU's when resolving arrays.
     max_extver = max(hdu.ver for hdu in hdulist) if len(hdulist) else 0
 
-    def callback(schema, path, combiner, ctx, recurse):
-        result = None
-        if not skip_fits_update and 'fits_keyword' in schema:
-            fits_keyword = schema['fits_keyword']
-            result = _fits_keyword_loader(
-                hdulist, fits_keyword, schema,
-                ctx.get('hdu_index'), known_keywords)
-
-            if result is None:
-                validate.value_change(path, result, schema,
-                                      context._pass_invalid_values,
-                                      context._strict_validation)
-            else:
-                if validate.value_change(path, result, schema,
-                                         context._pass_invalid_values,
-                                         context._strict_validation):
-                    properties.put_value(path, result, tree)
-
-        elif 'fits_hdu' in schema and (
-                'max_ndim' in schema or 'ndim' in schema or 'datatype' in schema):
-            result = _fits_array_loader(
-                hdulist, schema, ctx.get('hdu_index'), known_datas)
+    plan = _get_load_plan(schema, getattr(context, '_schema_key', None))
+    hdus = {}
 
-            if result is None:
-                validate.value_change(path, result, schema,
-                                      context._pass_invalid_values,
-                                      context._strict_validation)
+    def load(plan, prefix, hdu_index):
+        for entry in plan:
+            path = prefix + list(entry.path)
+            if entry.items is not None:
+                for i in range(max_extver):
+                    load(entry.items, path + [i], i)
+                continue
+
+            if not skip_fits_update and entry.fits_keyword is not None:
+                result = _fits_keyword_loader(
+                    hdulist, entry.fits_keyword, entry.schema,
+                    hdu_index, known_keywords, hdus)
+                stub = result
+            elif entry.is_array:
+                result = _fits_array_loader(
+                    hdulist, entry.schema, hdu_index, known_datas, lazy_load,
+                    hdus)
+                stub = properties._lazy_array_stubs(result)
             else:
-                if validate.value_change(path, result, schema,
-                                         context._pass_invalid_values,
-                                         context._strict_validation):
-                    properties.put_value(path, result, tree)
+                continue
 
-        if schema.get('type') == 'array':
-            has_fits_hdu = _schema_has_fits_hdu(schema)
-            if has_fits_hdu:
-                for i in range(max_extver):
-                    recurse(schema['items'],
-                            path + [i],
-                            combiner,
-                            {'hdu_index': i})
-                return True
+            if validate.value_change(path, stub, entry.schema,
+                                     context._pass_invalid_values,
+                                     context._strict_validation):
+                if result is not None:
+                    properties.put_value(path, result, tree)
 
-    mschema.walk_schema(schema, callback)
+    load(plan, [], None)
     return known_keywords, known_datas
 
 
@@ -557,7 +648,8 @@ def _load_history(hdulist, tree):
         history['entries'].append(HistoryEntry({'description': entry}))
 
 
-def from_fits(hdulist, schema, context, skip_fits_update=None, **kwargs):
+def from_fits(hdulist, schema, context, skip_fits_update=None, lazy_load=True,
+              **kwargs):
     """Read model information from a FITS HDU list
 
     Parameters
@@ -579,6 +671,11 @@ def from_fits(hdulist, schema, context, skip_fits_update=None, **kwargs):
         the model only from the ASDF extension.
         When `None`, the value is taken from the environmental SKIP_FITS_UPDATE.
         Otherwise, the default is `False`
+
+    lazy_load : bool
+        When `True`, image arrays of HDU lists opened from a file are only
+        read, or memory-mapped, when they are first accessed. When `False`,
+        all arrays are read right away.
     """
     try:
         ff = from_fits_asdf(hdulist, **kwargs)
@@ -591,7 +688,8 @@ def from_fits(hdulist, schema, context, skip_fits_update=None, **kwargs):
     )
 
     known_keywords, known_datas = _load_from_schema(
-        hdulist, schema, ff.tree, context, skip_fits_update=skip_fits_update
+        hdulist, schema, ff.tree, context, skip_fits_update=skip_fits_update,
+        lazy_load=lazy_load
     )
     if not skip_fits_update:
         _load_extra_fits(hdulist, known_keywords, known_datas, ff.tree)
@@ -2,6 +2,7 @@
 Data model class heirarchy
 """
 
+import contextlib
 import copy
 import datetime
 import os
@@ -30,6 +31,10 @@ from ..lib import s3_utils
 
 from .history import HistoryList
 
+# Identities of the trees of the models that have been handed over by their
+# owner, see `DataModel.handed_over`
+_handed_over = set()
+
 
 class DataModel(properties.ObjectNode, ndmodel.NDModel):
     """
@@ -99,6 +104,12 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
                   `True` to skip updating the ASDF tree from the FITS headers, if possible.
                   If `None`, value will be taken from the environmental SKIP_FITS_UPDATE.
                   Otherwise, the default value is `True`.
+
+              lazy_load - bool
+                  `True` (the default) to read each image array of a FITS file,
+                  or memory-map it if `memmap` is set, only when it is first
+                  accessed; see `release_arrays`. `False` to read all arrays
+                  when the file is opened.
         """
 
         # Override value of validation parameters if not explicitly set.
@@ -121,6 +132,10 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
             schema = asdf_schema.load_schema(self.schema_url,
                                              resolver=asdf_file.resolver,
                                              resolve_references=True)
+            # The schema of the class, whose FITS mapping can be cached
+            self._schema_key = self.schema_url
+        else:
+            self._schema_key = None
 
         self._schema = mschema.merge_property_trees(schema)
 
@@ -130,6 +145,7 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
         # Determine what kind of input we have (init) and execute the
         # proper code to intiailize the model
         self._files_to_close = []
+        self._lazy_arrays = []
         self._iscopy = False
         is_array = False
         is_shape = False
@@ -324,6 +340,21 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
             if fd is not None:
                 fd.close()
 
+    def release_arrays(self):
+        """
+        Release the arrays that were read from the input file on access.
+
+        The arrays are read from the file again when they are next
+        accessed. Arrays that have been replaced since they were read are
+        kept, but any changes made to the contents of a released array
+        are lost.
+        """
+        for node, attr, lazy, array_ref in self._lazy_arrays:
+            array = array_ref()
+            if array is not None and node.get(attr) is array:
+                node[attr] = lazy
+        self._lazy_arrays = []
+
     @staticmethod
     def clone(target, source, deepcopy=False, memo=None):
         if deepcopy:
@@ -337,6 +368,7 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
             target._iscopy = True
 
         target._files_to_close = []
+        target._lazy_arrays = []
         target._shape = source._shape
         target._ctx = target
         target._no_asdf_extension = source._no_asdf_extension
@@ -353,11 +385,42 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
 
     __copy__ = __deepcopy__ = copy
 
+    @contextlib.contextmanager
+    def handed_over(self):
+        """
+        Context in which the model may be modified in place.
+
+        The owner of a model that it does not use anymore, such as a
+        pipeline passing the output of a step on to the next step, hands
+        it over so that the first call of `writable_copy` on the model,
+        or on any model sharing its data, returns that model itself
+        instead of a copy.
+        """
+        key = id(self._instance)
+        _handed_over.add(key)
+        try:
+            yield self
+        finally:
+            _handed_over.discard(key)
+
+    def writable_copy(self):
+        """
+        Returns a copy of this model to be modified, or the model itself
+        if it has been handed over by its owner (see `handed_over`).
+        """
+        key = id(self._instance)
+        if key in _handed_over:
+            _handed_over.discard(key)
+            return self
+        return self.copy()
+
     def validate(self):
         """
         Re-validate the model instance againsst its schema
         """
-        validate.value_change(str(self), self._instance, self._schema,
+        validate.value_change(str(self),
+                              properties._lazy_array_stubs(self._instance),
+                              self._schema,
                               self._pass_invalid_values,
                               self._strict_validation)
 
@@ -540,6 +603,7 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
             `~asdf.AsdfFile.write_to`.
         """
         self.on_save(init)
+        properties._load_lazy_arrays(self._instance)
         asdffile = self.open_asdf(self._instance, **kwargs)
         asdffile.write_to(init, *args, **kwargs)
 
@@ -596,7 +660,10 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
         if self._shape is None:
             primary_array_name = self.get_primary_array_name()
             if primary_array_name and self.hasattr(primary_array_name):
-                primary_array = getattr(self, primary_array_name)
+                # The shape of an array that has not been read yet is known
+                primary_array = self._instance[primary_array_name]
+                if not isinstance(primary_array, properties.LazyFitsArray):
+                    primary_array = getattr(self, primary_array_name)
                 self._shape = primary_array.shape
         return self._shape
 
@@ -624,6 +691,7 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
         """
         schema = {'allOf': [self._schema, new_schema]}
         self._schema = mschema.merge_property_trees(schema)
+        self._schema_key = None
         self.validate()
         return self
 
@@ -759,6 +827,9 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
 
             ("meta.observation.date": "2012-04-22T03:22:05.432")
         """
+        return self._iteritems()
+
+    def _iteritems(self, load_arrays=True):
         def recurse(tree, path=[]):
             if isinstance(tree, dict):
                 for key, val in tree.items():
@@ -768,6 +839,8 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
                 for i, val in enumerate(tree):
                     for x in recurse(val, path + [i]):
                         yield x
+            elif isinstance(tree, properties.LazyFitsArray) and load_arrays:
+                yield ('.'.join(str(x) for x in path), tree.load())
             elif tree is not None:
                 yield ('.'.join(str(x) for x in path), tree)
 
@@ -942,8 +1015,9 @@ class DataModel(properties.ObjectNode, ndmodel.NDModel):
         if include_arrays:
             return dict((key, convert_val(val)) for (key, val) in self.iteritems())
         else:
-            return dict((key, convert_val(val)) for (key, val) in self.iteritems()
-                        if not isinstance(val, np.ndarray))
+            return dict((key, convert_val(val))
+                        for (key, val) in self._iteritems(load_arrays=False)
+                        if not isinstance(val, (np.ndarray, properties.LazyFitsArray)))
 
     @property
     def schema(self):
@@ -1,6 +1,8 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
 import copy
+import threading
+import weakref
 import numpy as np
 from collections.abc import Mapping
 from astropy.io import fits
@@ -20,7 +22,7 @@ log.setLevel(logging.DEBUG)
 log.addHandler(logging.NullHandler())
 
 
-__all__ = ['ObjectNode', 'ListNode']
+__all__ = ['ObjectNode', 'ListNode', 'LazyFitsArray']
 
 
 def _is_struct_array(val):
@@ -120,6 +122,116 @@ def _as_fitsrec(val):
         return fits_rec
 
 
+class LazyFitsArray:
+    """
+    An array in a FITS file that is only read when it is first accessed.
+
+    Arrays are memory-mapped if the file was opened with ``memmap=True``,
+    otherwise they are read from the file. If the file has been closed in
+    the meantime, it is opened again to read the array.
+
+    Parameters
+    ----------
+    hdu : `~astropy.io.fits.ImageHDU` or `~astropy.io.fits.PrimaryHDU`
+        The HDU holding the array, from an HDU list opened from a file.
+
+    schema : dict
+        The schema of the array, which must define its datatype.
+    """
+    # Reads share the file handle of the HDU list, so threads take turns
+    _read_lock = threading.Lock()
+
+    def __init__(self, hdu, schema):
+        fileinfo = hdu.fileinfo()
+        self._hdu = hdu
+        self._schema = schema
+        self._filename = fileinfo['file'].name
+        self._memmap = fileinfo['file'].memmap
+        self._key = (hdu.name, hdu.ver)
+        self.shape = hdu.shape
+        self.dtype = ndarray.asdf_datatype_to_numpy_dtype(schema['datatype'])
+
+    @classmethod
+    def can_defer(cls, hdu, schema):
+        """
+        Can the array of `hdu` be read later, instead of right away?
+        """
+        return (isinstance(hdu, (fits.PrimaryHDU, fits.ImageHDU)) and
+                'datatype' in schema and
+                not isinstance(schema['datatype'], list) and
+                hdu.fileinfo() is not None and
+                'data' not in hdu.__dict__)
+
+    def load(self):
+        """
+        Read the array from the file and cast it to the schema datatype.
+        """
+        with self._read_lock:
+            try:
+                if self._memmap:
+                    data = self._hdu.data
+                else:
+                    data = self._hdu.section[...]
+            except ValueError:
+                # Either the file has been closed, or the array is scaled,
+                # which prevents memory mapping
+                with fits.open(self._filename, memmap=False) as hdulist:
+                    data = hdulist[self._key].section[...]
+        return _cast(data, self._schema)
+
+    def as_tree(self):
+        """
+        Description of the array that validates like the array itself.
+        """
+        datatype, _ = ndarray.numpy_dtype_to_asdf_datatype(self.dtype)
+        return {'datatype': datatype, 'shape': list(self.shape)}
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.load(), dtype=dtype)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self.load()
+
+    def __repr__(self):
+        return '<{0} {1} {2} from {3}>'.format(
+            self.__class__.__name__, self.shape, self.dtype, self._filename)
+
+
+def _lazy_array_stubs(tree):
+    """
+    Copy of `tree` in which arrays that have not been read yet are
+    replaced by their descriptions, so that it can be validated without
+    reading them.
+    """
+    if isinstance(tree, dict):
+        return dict((key, _lazy_array_stubs(val)) for key, val in tree.items())
+    elif isinstance(tree, list):
+        return [_lazy_array_stubs(val) for val in tree]
+    elif isinstance(tree, LazyFitsArray):
+        return tree.as_tree()
+    return tree
+
+
+def _load_lazy_arrays(tree):
+    """
+    Read all arrays of `tree` that have not been read yet, in place.
+    """
+    if isinstance(tree, dict):
+        items = tree.items()
+    elif isinstance(tree, list):
+        items = enumerate(tree)
+    else:
+        return
+    for key, val in list(items):
+        if isinstance(val, LazyFitsArray):
+            tree[key] = val.load()
+        else:
+            _load_lazy_arrays(val)
+
+
 def _get_schema_type(schema):
     """
     Create a list of types used by a schema and its subschemas when
@@ -295,6 +407,16 @@ class ObjectNode(Node):
             if val is not None:
                 self._instance[attr] = val
 
+        if isinstance(val, LazyFitsArray):
+            # Read the array on first access, and remember where it came
+            # from so that it can be released again; only a weak reference
+            # is kept, so that the array is freed once it is replaced
+            lazy = val
+            val = self._instance[attr] = lazy.load()
+            loaded = getattr(self._ctx, '_lazy_arrays', None)
+            if loaded is not None:
+                loaded.append((self._instance, attr, lazy, weakref.ref(val)))
+
         if isinstance(val, dict):
             # Meta is special cased to support NDData interface
             if attr == 'meta':
@@ -1,6 +1,9 @@
+import gc
 import os
 import shutil
 import tempfile
+import tracemalloc
+import weakref
 
 import pytest
 
@@ -456,6 +459,146 @@ def test_metadata_from_fits():
         assert hdulist[2].name == 'ASDF'
 
 
+def write_image_without_asdf(path):
+    from astropy.io import fits
+
+    hdulist = fits.HDUList([fits.PrimaryHDU(),
+                            fits.ImageHDU(np.arange(12.).reshape(3, 4), name='SCI'),
+                            fits.ImageHDU(np.full((3, 4), 5, dtype=np.uint32), name='DQ')])
+    hdulist.writeto(path, overwrite=True)
+
+
+@pytest.mark.parametrize('memmap', [False, True])
+def test_lazy_load(tmp_path, memmap):
+    from ..properties import LazyFitsArray
+
+    path = str(tmp_path / 'lazy.fits')
+    write_image_without_asdf(path)
+
+    with ImageModel(path, memmap=memmap) as dm:
+        assert isinstance(dm.instance['data'], LazyFitsArray)
+        assert isinstance(dm.instance['dq'], LazyFitsArray)
+        assert dm.shape == (3, 4)
+        dm.validate()
+        assert isinstance(dm.instance['data'], LazyFitsArray)
+
+        data = dm.data
+        assert data.dtype == np.float32
+        assert_array_equal(data, np.arange(12.).reshape(3, 4))
+        assert dm.data is data
+        assert isinstance(dm.instance['dq'], LazyFitsArray)
+
+        dm.release_arrays()
+        assert isinstance(dm.instance['data'], LazyFitsArray)
+
+        dm_copy = dm.copy()
+        assert isinstance(dm_copy.instance['dq'], np.ndarray)
+
+    # Arrays not read before the file was closed are still available
+    assert_array_equal(dm.dq, 5)
+    assert_array_equal(dm_copy.dq, 5)
+
+
+def test_lazy_load_disabled(tmp_path):
+    path = str(tmp_path / 'lazy.fits')
+    write_image_without_asdf(path)
+
+    with ImageModel(path, lazy_load=False) as dm:
+        assert isinstance(dm.instance['data'], np.ndarray)
+        assert isinstance(dm.instance['dq'], np.ndarray)
+
+
+def test_lazy_load_release_keeps_replaced_arrays(tmp_path):
+    path = str(tmp_path / 'lazy.fits')
+    write_image_without_asdf(path)
+
+    with ImageModel(path) as dm:
+        dm.data
+        dm.dq = np.zeros((3, 4), dtype=np.uint32)
+        dm.release_arrays()
+        assert_array_equal(dm.dq, 0)
+
+
+def test_lazy_load_replaced_array_freed(tmp_path):
+    path = str(tmp_path / 'lazy.fits')
+    write_image_without_asdf(path)
+
+    with ImageModel(path) as dm:
+        data = weakref.ref(dm.data)
+        dm.data = np.zeros((3, 4), dtype=np.float32)
+        gc.collect()
+        assert data() is None
+
+        dm.release_arrays()
+        assert_array_equal(dm.data, 0)
+
+
+@pytest.mark.parametrize('lazy_load', [True, False])
+def test_lazy_load_memory(tmp_path, lazy_load):
+    from astropy.io import fits
+
+    path = str(tmp_path / 'big.fits')
+    nbytes = 4 * 1024**2
+    fits.HDUList([fits.PrimaryHDU(),
+                  fits.ImageHDU(np.ones((1024, 1024), dtype=np.float32),
+                                name='SCI')]).writeto(path)
+
+    tracemalloc.start()
+    try:
+        with ImageModel(path, lazy_load=lazy_load) as dm:
+            dm.meta.instrument.name
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Reading only the metadata does not read the arrays
+    if lazy_load:
+        assert peak < nbytes / 2
+    else:
+        assert peak >= nbytes
+
+
+def test_lazy_load_save(tmp_path):
+    path = str(tmp_path / 'lazy.fits')
+    write_image_without_asdf(path)
+
+    with ImageModel(path) as dm:
+        dm.save(path)
+
+    with ImageModel(path) as dm:
+        assert_array_equal(dm.data, np.arange(12.).reshape(3, 4))
+        assert_array_equal(dm.dq, 5)
+
+
+def test_load_plan(tmp_path):
+    from astropy.io import fits
+    from .. import MultiSlitModel, fits_support
+
+    path = str(tmp_path / 'slits.fits')
+    hdulist = fits.HDUList([fits.PrimaryHDU()])
+    hdulist[0].header['TELESCOP'] = 'JWST'
+    for i, name in enumerate(['S200A1', 'S200A2']):
+        hdu = fits.ImageHDU(np.full((3, 4), i, dtype=np.float32), name='SCI', ver=i + 1)
+        hdu.header['SLTNAME'] = name
+        hdulist.append(hdu)
+    hdulist.writeto(path)
+
+    fits_support._LOAD_PLANS.pop(MultiSlitModel.schema_url, None)
+    for _ in range(2):
+        with MultiSlitModel(path) as dm:
+            assert dm.meta.telescope == 'JWST'
+            assert [slit.name for slit in dm.slits] == ['S200A1', 'S200A2']
+            assert_array_equal(dm.slits[1].data, 1)
+        assert MultiSlitModel.schema_url in fits_support._LOAD_PLANS
+
+    # Modified schemas are not cached
+    with MultiSlitModel() as dm:
+        schema = dm.schema
+    with MultiSlitModel(path, schema=schema) as dm:
+        assert dm._schema_key is None
+        assert [slit.name for slit in dm.slits] == ['S200A1', 'S200A2']
+
+
 # def test_float_as_int():
 #     from astropy.io import fits
 
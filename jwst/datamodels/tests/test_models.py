@@ -256,6 +256,24 @@ def test_copy():
             assert dm.meta.observation.obs_id is None
 
 
+def test_writable_copy():
+    with ImageModel((5, 5)) as dm:
+        copied = dm.writable_copy()
+        assert copied is not dm
+        assert copied.data is not dm.data
+
+        with dm.handed_over():
+            # models sharing the data are handed over as well, but only to
+            # the first call
+            with ImageModel(dm) as dm2:
+                assert dm2.writable_copy() is dm2
+            assert dm.writable_copy() is not dm
+
+        with dm.handed_over():
+            pass
+        assert dm.writable_copy() is not dm
+
+
 def test_stringify():
     im = DataModel()
     assert str(im) == '<DataModel>'
@@ -66,7 +66,7 @@ class DQInitStep(Step):
         if self.mask_filename == 'N/A':
             self.log.warning('No MASK reference file found')
             self.log.warning('DQ initialization step will be skipped')
-            result = input_model.copy()
+            result = input_model.writable_copy()
             result.meta.cal_step.dq_init = 'SKIPPED'
             return result
 
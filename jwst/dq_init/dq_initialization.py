@@ -57,7 +57,7 @@ def do_dqinit(input_model, mask_model):
     check_dimensions(input_model)
 
     # Create output model as copy of input
-    output_model = input_model.copy()
+    output_model = input_model.writable_copy()
 
     # Extract subarray from reference data, if necessary
     if reffile_utils.ref_matches_sci(output_model, mask_model):
@@ -1774,8 +1774,10 @@ class ExtractModel(ExtractBase):
 
         Parameters
         ----------
-        data : ndarray, 2-D
-            Data array from which the spectrum will be extracted.
+        data : ndarray, 2-D or 3-D
+            Data array from which the spectrum will be extracted.  If it is
+            3-D, the spectra of all the planes (integrations) are extracted
+            together, and the arrays of the spectra are 2-D.
 
         wl_array : ndarray, 2-D, or None
             Wavelengths corresponding to `data`, or None if no WAVELENGTH
@@ -1896,7 +1898,7 @@ class ExtractModel(ExtractBase):
         if self.dispaxis == HORIZONTAL:
             image = data
         else:
-            image = np.transpose(data, (1, 0))
+            image = np.swapaxes(data, -2, -1)
 
         if wavelength is None:
             if verbose:
@@ -3081,19 +3083,46 @@ def do_extract1d(
                     log.info(f"Beginning loop over {shape[0]} integrations ...")
                     integrations = range(shape[0])
 
-                for integ in integrations:
+                # With a JSON (or no) reference file, the extraction geometry is the same for every
+                # integration, so extract all of them at once and just pick out the rows below.
+                extract_all = len(integrations) > 1 and extract_params['ref_file_type'] != FILE_TYPE_IMAGE
+                apcorr = None
+
+                if extract_all:
                     try:
-                        ra, dec, wavelength, temp_flux, background, npixels, dq, prev_offset = extract_one_slit(
+                        (ra, dec, wavelength, all_flux, all_background, all_npixels, all_dq,
+                         prev_offset) = extract_one_slit(
                             input_model,
                             slit,
-                            integ,
+                            None,
                             prev_offset,
                             verbose,
                             extract_params
                         )
                     except InvalidSpectralOrderNumberError as e:
                         log.info(f'{str(e)}, skipping ...')
-                        break
+                        integrations = []
+                        progress_msg_printed = True
+
+                for integ in integrations:
+                    if extract_all:
+                        temp_flux = all_flux[integ]
+                        background = all_background[integ]
+                        npixels = all_npixels[integ]
+                        dq = all_dq[integ]
+                    else:
+                        try:
+                            ra, dec, wavelength, temp_flux, background, npixels, dq, prev_offset = extract_one_slit(
+                                input_model,
+                                slit,
+                                integ,
+                                prev_offset,
+                                verbose,
+                                extract_params
+                            )
+                        except InvalidSpectralOrderNumberError as e:
+                            log.info(f'{str(e)}, skipping ...')
+                            break
 
                     # Convert the sum to an average, for surface brightness.
                     npixels_temp = np.where(npixels > 0., npixels, 1.)
@@ -3122,12 +3151,10 @@ def do_extract1d(
                     sb_error = np.zeros_like(flux)
                     berror = np.zeros_like(flux)
 
-                    otab = np.array(
-                        list(
-                            zip(wavelength, flux, error, surf_bright, sb_error, dq, background, berror, npixels)
-                        ),
-                        dtype=spec_dtype
-                    )
+                    otab = np.zeros(len(wavelength), dtype=spec_dtype)
+                    for name, column in zip(spec_dtype.names, (wavelength, flux, error, surf_bright, sb_error,
+                                                               dq, background, berror, npixels)):
+                        otab[name] = column
 
                     spec = datamodels.SpecModel(spec_table=otab)
                     spec.meta.wcs = spec_wcs.create_spectral_wcs(ra, dec, wavelength)
@@ -3156,9 +3183,12 @@ def do_extract1d(
                         if exp_type in ['NRS_FIXEDSLIT', 'NRS_BRIGHTOBJ']:
                             match_kwargs['slit'] = slitname
 
-                        apcorr = select_apcorr(input_model)(
-                            input_model, apcorr_ref_model.apcorr_table, apcorr_ref_model.sizeunit, **match_kwargs
-                        )
+                        # The location is the same for all integrations extracted together.
+                        if apcorr is None or not extract_all:
+                            apcorr = select_apcorr(input_model)(
+                                input_model, apcorr_ref_model.apcorr_table, apcorr_ref_model.sizeunit,
+                                **match_kwargs
+                            )
                         apcorr.apply(spec.spec_table)
 
                     output_model.spec.append(spec)
@@ -3507,7 +3537,7 @@ def copy_keyword_info(
 def extract_one_slit(
         input_model: DataModel,
         slit: SlitModel,
-        integ: int,
+        integ: Union[int, None],
         prev_offset: Union[float, str],
         verbose: bool,
         extract_params: dict
@@ -3534,10 +3564,13 @@ def extract_one_slit(
         In the former case, if `integ` is zero or larger, the spectrum
         will be extracted from the 2-D slice input_model.data[integ].
 
-    integ : int
+    integ : int or None
         For the case that input_model is a SlitModel or a CubeModel,
         `integ` is the integration number.  If the integration number is
         not relevant (i.e. the data array is 2-D), `integ` should be -1.
+        If None, the spectra of all the integrations of a CubeModel are
+        extracted at once, and `temp_flux`, `background`, `npixels` and
+        `dq` are 2-D arrays, with one row per integration.
 
     prev_offset : float or str
         When extracting from multi-integration data, the source position
@@ -3596,7 +3629,7 @@ def extract_one_slit(
     except AttributeError:
         exp_type = slit.meta.exposure.type
 
-    if integ > -1:
+    if integ is not None and integ > -1:
         data = input_model.data[integ]
         input_dq = input_model.dq[integ]
     elif slit is None:
@@ -3618,7 +3651,7 @@ def extract_one_slit(
     else:
         # If there is an extract1d reference file (there doesn't have to be), it's in JSON format.
         extract_model = ExtractModel(input_model=input_model, slit=slit, verbose=verbose, **extract_params)
-        ap = get_aperture(data.shape, extract_model.wcs, verbose, extract_params)
+        ap = get_aperture(data.shape[-2:], extract_model.wcs, verbose, extract_params)
         extract_model.update_extraction_limits(ap)
 
     if extract_model.use_source_posn:
@@ -3640,7 +3673,7 @@ def extract_one_slit(
 
     # Add the source position offset to the polynomial coefficients, or shift the reference image
     # (depending on the type of reference file).
-    extract_model.add_position_correction(verbose, data.shape)
+    extract_model.add_position_correction(verbose, data.shape[-2:])
 
     if verbose:
         extract_model.log_extraction_parameters()
@@ -3669,7 +3702,7 @@ def replace_bad_values(
     Parameters
     ----------
     data : ndarray
-        The science data array.
+        The science data array, 2-D, or 3-D for all integrations.
 
     input_dq : ndarray or None
         If not None, this will be checked for flag value DO_NOT_USE.  The
@@ -3697,7 +3730,7 @@ def replace_bad_values(
 
     if np.any(mask):
         mod_data = data.copy()
-        mod_data[mask] = np.nan
+        mod_data[..., mask] = np.nan
         return mod_data
 
     return data
@@ -3715,7 +3748,9 @@ def nans_at_endpoints(
 
     Extended summary
     ----------------
-    All five input arrays should be 1-D and have the same shape.
+    All five input arrays should be 1-D and have the same shape, except
+    that `temp_flux`, `background`, `npixels` and `dq` can be 2-D, with
+    one spectrum per row.
     If NaNs are present at endpoints of `wavelength`, the arrays will be
     trimmed to remove the NaNs.  NaNs at interior elements of `wavelength`
     will be left in place, but they will be flagged with DO_NOT_USE in the
@@ -3757,7 +3792,7 @@ def nans_at_endpoints(
     nelem = wavelength.shape[0]
 
     nan_mask = np.isnan(wavelength)
-    new_dq[nan_mask] = np.bitwise_or(new_dq[nan_mask], dqflags.pixel['DO_NOT_USE'])
+    new_dq[..., nan_mask] = np.bitwise_or(new_dq[..., nan_mask], dqflags.pixel['DO_NOT_USE'])
     not_nan = np.logical_not(nan_mask)
     flag = np.where(not_nan)
 
@@ -3770,10 +3805,10 @@ def nans_at_endpoints(
 
             slc = slice(flag[0][0], flag[0][-1] + 1)
             new_wl = new_wl[slc]
-            new_temp_flux = new_temp_flux[slc]
-            new_bkg = new_bkg[slc]
-            new_npixels = new_npixels[slc]
-            new_dq = new_dq[slc]
+            new_temp_flux = new_temp_flux[..., slc]
+            new_bkg = new_bkg[..., slc]
+            new_npixels = new_npixels[..., slc]
+            new_dq = new_dq[..., slc]
     else:
         new_dq |= dqflags.pixel['DO_NOT_USE']
 
@@ -21,6 +21,10 @@ __author__ = 'Mihai Cara'
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Maximum number of pixel values, over all planes and columns, of the
+# extraction regions extracted at once from a stack of images
+STACK_BATCH_SIZE = 2**22
+
 def extract1d(image, lambdas, disp_range,
               p_src, p_bkg=None, independent_var="wavelength",
               smoothing_length=0, bkg_order=0, weights=None):
@@ -28,9 +32,11 @@ def extract1d(image, lambdas, disp_range,
 
     Parameters:
     -----------
-    image : 2-D ndarray
+    image : 2-D or 3-D ndarray
         The array may have been transposed so that the dispersion direction
-        is the second index.
+        is the last index.  If it is 3-D, such as the integrations of a
+        time series, the spectra of all the planes are extracted together,
+        with the same extraction regions.
 
     lambdas : 1-D array
         Wavelength at each pixel within `disp_range`.  For example,
@@ -69,22 +75,114 @@ def extract1d(image, lambdas, disp_range,
     weights : function or None
         If not None, this computes the weights for the source extraction
         region as a function of the wavelength (a single float) for the
-        current column and an array of Y pixel coordinates.
+        current column and an array of Y pixel coordinates.  Weights are
+        not supported for a 3-D `image`.
 
     Returns:
     --------
-    countrate : ndarray, 1-D, float64
+    countrate : ndarray, 1-D (2-D for a 3-D `image`), float64
         The extracted spectrum in units of counts / s.
 
-    background : ndarray, 1-D, float64
+    background : ndarray, 1-D (2-D for a 3-D `image`), float64
         The background that was subtracted from the source.
 
-    npixels : ndarray, 1-D, float64
+    npixels : ndarray, 1-D (2-D for a 3-D `image`), float64
         For each column, this is the number of pixels that were added
         together to get `countrate`.
     """
     nl = lambdas.shape[0]
 
+    srclim, bkglim = _extraction_limits(image.shape[-2], lambdas, disp_range,
+                                        p_src, p_bkg, independent_var)
+    nbkglim = len(bkglim)
+
+    if image.ndim == 3:
+        if weights is not None:
+            raise ValueError("Weights are not supported for a stack of images")
+        return _extract1d_stack(image, nl, disp_range, srclim, bkglim,
+                                smoothing_length, bkg_order)
+
+    # Smooth the input image, and use the smoothed image for extracting
+    # the background.  temp_image is only needed for background data.
+    if nbkglim > 0 and smoothing_length > 1:
+        temp_image = bxcar(image, smoothing_length)
+    else:
+        temp_image = image
+
+    #################################################
+    ##         Perform spectral extraction:        ##
+    #################################################
+
+    bkg_model = None
+
+    countrate = np.zeros(nl, dtype=np.float64)
+    background = np.zeros(nl, dtype=np.float64)
+    npixels = np.zeros(nl, dtype=np.float64)
+    # x is an index (column number) within `image`, while j is an index in
+    # lambdas, countrate, background, npixels, and the arrays in
+    # srclim and bkglim.
+    x = disp_range[0]
+    for j in range(nl):
+        lam = lambdas[j]
+
+        if nbkglim > 0:
+
+            # Compute a polynomial fit to the background for the current
+            # column, using the (optionally) smoothed background.
+            bkg_model, bkg_npts = _fit_background_model(
+                temp_image, x, j, bkglim, bkg_order
+            )
+
+            if bkg_npts == 0:
+                bkg_model = None
+                log.warning("Not enough valid pixels to determine background "
+                             "for lambda={} (column {:d})".format(lam, x))
+
+            elif len(bkg_model) < bkg_order:
+                log.warning("Not enough valid pixels to determine background "
+                             "with the required order for lambda={} "
+                             "(column {:d}).\n"
+                             "Lowering background order to {:d}"
+                             .format(lam, x, len(bkg_model)))
+
+        # Extract the source, and optionally subtract background using the
+        # polynomial fit to the background for this column.  Even if
+        # background smoothing was done, we must extract the source from
+        # the original, unsmoothed image.
+        # source total flux, background total flux, area, total weight
+        (total_flux, bkg_flux, tarea, twht) = _extract_src_flux(
+            image, x, j, lam, srclim,
+            weights=weights, bkgmodel=bkg_model
+        )
+        countrate[j] = total_flux
+        npixels[j] = tarea
+        if nbkglim > 0:
+            background[j] = bkg_flux
+
+        x += 1
+        continue
+
+    return (countrate, background, npixels)
+
+def _extraction_limits(nrows, lambdas, disp_range,
+                       p_src, p_bkg, independent_var):
+    """Evaluate the limits of the source and background regions.
+
+    Parameters:
+    -----------
+    nrows : int
+        Size of the image in the cross-dispersion direction.
+
+    lambdas, disp_range, p_src, p_bkg, independent_var :
+        See `extract1d`.
+
+    Returns:
+    --------
+    srclim, bkglim : list of two-element lists of ndarrays
+        The lower and upper limits of the source and background regions
+        for each pixel within `disp_range`, truncated to the image.
+        `bkglim` is empty if there are no background regions.
+    """
     # Evaluate the functions for source and (optionally) background limits,
     # saving the resulting arrays of lower and upper limits in srclim and
     # bkglim.
@@ -114,11 +212,11 @@ def extract1d(image, lambdas, disp_range,
         else:
             srclim.append([lower(pixels), upper(pixels)])
 
+    bkglim = []                 # this will be a list of lists, like p_bkg
     if p_bkg is None:
         nbkglim = 0
     else:
         nbkglim = len(p_bkg)
-        bkglim = []             # this will be a list of lists, like p_bkg
         for i in range(nbkglim):
             lower = p_bkg[i][0]
             upper = p_bkg[i][1]
@@ -131,7 +229,6 @@ def extract1d(image, lambdas, disp_range,
     # or a lower limit that's above the upper limit (limit curves just
     # swapped, or crossing each other).
     # Truncate extraction limits that are out of bounds, but log a warning.
-    shape = image.shape
     for i in range(n_srclim):
         lower = srclim[i][0]
         upper = srclim[i][1]
@@ -152,7 +249,7 @@ def extract1d(image, lambdas, disp_range,
             log.warning("Source extraction limit extends below -0.5")
             srclim[i][0][:] = np.where(lower < -0.5, -0.5, lower)
             srclim[i][1][:] = np.where(upper < -0.5, -0.5, upper)
-        upper_limit = float(shape[0]) - 0.5
+        upper_limit = float(nrows) - 0.5
         if np.any(lower > upper_limit) or np.any(upper > upper_limit):
             log.warning("Source extraction limit extends above %g", upper_limit)
             srclim[i][0][:] = np.where(lower > upper_limit, upper_limit, lower)
@@ -177,74 +274,235 @@ def extract1d(image, lambdas, disp_range,
             log.warning("Background limit extends below -0.5")
             bkglim[i][0][:] = np.where(lower < -0.5, -0.5, lower)
             bkglim[i][1][:] = np.where(upper < -0.5, -0.5, upper)
-        upper_limit = float(shape[0]) - 0.5
+        upper_limit = float(nrows) - 0.5
         if np.any(lower > upper_limit) or np.any(upper > upper_limit):
             log.warning("Background limit extends above %g", upper_limit)
             bkglim[i][0][:] = np.where(lower > upper_limit, upper_limit, lower)
             bkglim[i][1][:] = np.where(upper > upper_limit, upper_limit, upper)
 
-    # Smooth the input image, and use the smoothed image for extracting
-    # the background.  temp_image is only needed for background data.
-    if nbkglim > 0 and smoothing_length > 1:
-        temp_image = bxcar(image, smoothing_length)
-    else:
-        temp_image = image
+    return srclim, bkglim
 
-    #################################################
-    ##         Perform spectral extraction:        ##
-    #################################################
 
-    bkg_model = None
+def _extract1d_stack(images, nl, disp_range, srclim, bkglim,
+                     smoothing_length, bkg_order):
+    """Extract the spectra of a stack of images.
 
-    countrate = np.zeros(nl, dtype=np.float64)
-    background = np.zeros(nl, dtype=np.float64)
-    npixels = np.zeros(nl, dtype=np.float64)
-    # x is an index (column number) within `image`, while j is an index in
-    # lambdas, countrate, background, npixels, and the arrays in
-    # srclim and bkglim.
-    x = disp_range[0]
-    for j in range(nl):
-        lam = lambdas[j]
+    Extended summary
+    ----------------
+    The pixels of the source and background regions, and their fractional
+    areas, are found once for each column.  The spectra of all the planes
+    are then weighted sums of those pixels, and the background fits are
+    solved for all planes and columns at once, planes being processed in
+    batches of bounded memory.  The results are those of `extract1d` for
+    each plane, to rounding errors.
 
-        if nbkglim > 0:
+    Parameters:
+    -----------
+    images : 3-D ndarray
+        The images, with the dispersion direction along the last axis.
 
-            # Compute a polynomial fit to the background for the current
-            # column, using the (optionally) smoothed background.
-            bkg_model, bkg_npts = _fit_background_model(
-                temp_image, x, j, bkglim, bkg_order
-            )
+    nl : int
+        Number of pixels of the extracted spectra.
 
-            if bkg_npts == 0:
-                bkg_model = None
-                log.warning("Not enough valid pixels to determine background "
-                             "for lambda={} (column {:d})".format(lam, x))
+    disp_range : two-element list
+        Limits of a slice for extracting the spectra from `images`.
 
-            elif len(bkg_model) < bkg_order:
-                log.warning("Not enough valid pixels to determine background "
-                             "with the required order for lambda={} "
-                             "(column {:d}).\n"
-                             "Lowering background order to {:d}"
-                             .format(lam, x, len(bkg_model)))
+    srclim, bkglim : list of two-element lists of ndarrays
+        The limits of the source and background regions, as returned by
+        `_extraction_limits`.
 
-        # Extract the source, and optionally subtract background using the
-        # polynomial fit to the background for this column.  Even if
-        # background smoothing was done, we must extract the source from
-        # the original, unsmoothed image.
-        # source total flux, background total flux, area, total weight
-        (total_flux, bkg_flux, tarea, twht) = _extract_src_flux(
-            image, x, j, lam, srclim,
-            weights=weights, bkgmodel=bkg_model
-        )
-        countrate[j] = total_flux
-        npixels[j] = tarea
-        if nbkglim > 0:
-            background[j] = bkg_flux
+    smoothing_length, bkg_order : int
+        See `extract1d`.
 
-        x += 1
-        continue
+    Returns:
+    --------
+    countrate, background, npixels : ndarray, 2-D, float64
+        The spectra of `extract1d` for each plane.
+    """
+    nplanes = images.shape[0]
+    shape = images.shape[1:]
+    columns = np.arange(disp_range[0], disp_range[0] + nl)[:, np.newaxis]
+
+    src_rows, src_area, src_valid = _region_samples(shape, disp_range, nl,
+                                                    srclim)
+    nsamples = src_rows.shape[1]
+
+    if bkglim:
+        bkg_rows, bkg_wht, bkg_valid = _region_samples(shape, disp_range, nl,
+                                                       bkglim)
+        nsamples += bkg_rows.shape[1]
+
+        # The background polynomials of each column are fitted in terms of
+        # the row number scaled to about [-1, 1] over the background pixels
+        lowest = np.where(bkg_valid, bkg_rows, shape[0]).min(axis=1)
+        highest = np.where(bkg_valid, bkg_rows, -1).max(axis=1)
+        center = np.where(highest >= lowest, (lowest + highest) / 2., 0.)
+        scale = np.maximum((highest - lowest) / 2., 1.)
+        powers = np.arange(bkg_order + 1)
+        bkg_t = ((bkg_rows - center[:, np.newaxis]) /
+                 scale[:, np.newaxis])[..., np.newaxis] ** powers
+        src_t = ((src_rows - center[:, np.newaxis]) /
+                 scale[:, np.newaxis])[..., np.newaxis] ** powers
+
+        if smoothing_length > 1:
+            bkg_images = bxcar(images, smoothing_length)
+        else:
+            bkg_images = images
+        n_no_bkg = 0
+        n_lowered = 0
+
+    countrate = np.empty((nplanes, nl), dtype=np.float64)
+    background = np.zeros((nplanes, nl), dtype=np.float64)
+    npixels = np.empty((nplanes, nl), dtype=np.float64)
+
+    batch = max(1, STACK_BATCH_SIZE // (nl * nsamples))
+    for start in range(0, nplanes, batch):
+        planes = slice(start, start + batch)
+
+        values = images[planes][:, src_rows, columns].astype(np.float64)
+        good = np.isfinite(values) & src_valid
+        area = np.where(good, src_area, 0.)
+        values[~good] = 0.
+        flux = (values * area).sum(axis=-1)
+        empty = ~good.any(axis=-1)
+
+        if bkglim:
+            coeffs, order = _fit_background_stack(
+                bkg_images[planes][:, bkg_rows, columns], bkg_wht, bkg_valid,
+                bkg_t, bkg_order)
+            bkg_flux = (np.einsum('pck,csk->pcs', coeffs, src_t) *
+                        area).sum(axis=-1)
+            flux -= bkg_flux
+            background[planes] = np.where(empty, 0., bkg_flux)
+            n_no_bkg += (order < 0).sum()
+            n_lowered += ((order >= 0) & (order < bkg_order)).sum()
+
+        flux[empty] = np.nan
+        countrate[planes] = flux
+        npixels[planes] = area.sum(axis=-1)
+
+    if bkglim and n_no_bkg > 0:
+        log.warning("Not enough valid pixels to determine background "
+                    "for {} columns of the {} planes".format(n_no_bkg, nplanes))
+    if bkglim and n_lowered > 0:
+        log.warning("Not enough valid pixels to determine background "
+                    "with the required order for {} columns of the {} "
+                    "planes; the background order was lowered"
+                    .format(n_lowered, nplanes))
 
     return (countrate, background, npixels)
 
+
+def _region_samples(shape, disp_range, nl, limits):
+    """Find the pixels of extraction regions, column by column.
+
+    Parameters:
+    -----------
+    shape : tuple
+        Shape of an image.
+
+    disp_range : two-element list
+        Limits of a slice for extracting the spectrum from the image.
+
+    nl : int
+        Number of columns of the extracted spectrum.
+
+    limits : list of two-element lists of ndarrays
+        The limits of the extraction regions, see `_extract_colpix`.
+
+    Returns:
+    --------
+    rows : ndarray, 2-D, intp
+        For each column of the spectrum, the row numbers of the pixels
+        that `_extract_colpix` extracts, padded to the same length.
+
+    wht : ndarray, 2-D, float64
+        The fraction of each pixel included in the regions; zero for
+        padding.
+
+    valid : ndarray, 2-D, bool
+        False for padding.
+    """
+    # Extracting from an image of row numbers gives the row of each pixel
+    row_image = np.broadcast_to(
+        np.arange(shape[0], dtype=np.float64)[:, np.newaxis], shape)
+    samples = [_extract_colpix(row_image, disp_range[0] + j, j, limits)[1:]
+               for j in range(nl)]
+
+    nmax = max(len(y) for y, _ in samples)
+    rows = np.zeros((nl, nmax), dtype=np.intp)
+    wht = np.zeros((nl, nmax), dtype=np.float64)
+    valid = np.zeros((nl, nmax), dtype=bool)
+    for j, (y, w) in enumerate(samples):
+        rows[j, :len(y)] = y
+        wht[j, :len(y)] = w
+        valid[j, :len(y)] = True
+
+    return rows, wht, valid
+
+
+def _fit_background_stack(values, wht, valid, t, bkg_order):
+    """Fit polynomials to the background of the columns of a stack of images.
+
+    Extended summary
+    ----------------
+    This is `_fit_background_model` for all the columns of all the planes
+    at once: weighted least-squares fits, of an order lowered to the
+    number of good pixels minus one, and no fit (zero background) with
+    fewer than two good pixels.
+
+    Parameters:
+    -----------
+    values : ndarray, 3-D
+        Values of the background pixels of each plane and column, as
+        given by `_region_samples`.
+
+    wht, valid : ndarray, 2-D
+        Weights of the background pixels of each column, and whether
+        they are not padding.
+
+    t : ndarray, 3-D
+        Powers 0 to `bkg_order` of the scaled row numbers of the
+        background pixels of each column.
+
+    bkg_order : int
+        Polynomial order of the fits.
+
+    Returns:
+    --------
+    coeffs : ndarray, 3-D, float64
+        Coefficients of the powers of the scaled row numbers for each
+        plane and column, zero beyond the order of the fit.
+
+    order : ndarray, 2-D, int
+        Order of each fit, -1 if there was no fit.
+    """
+    good = np.isfinite(values) & valid
+    npts = good.sum(axis=-1)
+    order = np.where(npts > 1, np.minimum(bkg_order, npts - 1), -1)
+
+    w2 = np.where(good, wht**2, 0.)
+    values = np.where(good, values, 0.)
+    lhs = np.einsum('pcs,csi,csj->pcij', w2, t, t)
+    rhs = np.einsum('pcs,csi->pci', w2 * values, t)
+
+    # Coefficients beyond the order of each fit are set to zero
+    unused = np.arange(bkg_order + 1) > order[..., np.newaxis]
+    lhs[unused] = 0.
+    lhs[np.broadcast_to(unused[..., np.newaxis, :], lhs.shape)] = 0.
+    diagonal = np.arange(bkg_order + 1)
+    lhs[..., diagonal, diagonal] += unused
+    rhs[unused] = 0.
+
+    try:
+        coeffs = np.linalg.solve(lhs, rhs[..., np.newaxis])[..., 0]
+    except np.linalg.LinAlgError:
+        # Degenerate fits get the minimum-norm solution, as with lstsq
+        coeffs = np.matmul(np.linalg.pinv(lhs), rhs[..., np.newaxis])[..., 0]
+
+    return coeffs, order
+
+
 def bxcar(image, smoothing_length):
     """Smooth with a 1-D interval, along the last axis.
 
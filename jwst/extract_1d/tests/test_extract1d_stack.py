@@ -0,0 +1,78 @@
+"""
+Test that extract1d.extract1d gives the same spectra for a 3-D stack of
+integrations as it does for each integration separately.
+"""
+import numpy as np
+import pytest
+from astropy.modeling import models
+
+from jwst.extract_1d import extract1d
+from jwst.extract_1d.extract import nans_at_endpoints
+
+
+@pytest.fixture
+def stack():
+    rng = np.random.RandomState(1)
+    nint, ny, nx = 6, 40, 120
+    y = np.arange(ny)[:, None]
+    image = (5. + 0.1 * y + 100. * np.exp(-0.5 * ((y - 20.3) / 1.5)**2) +
+             rng.normal(0., 1., (nint, ny, nx))).astype(np.float32)
+    image[1, 10:14, 50] = np.nan        # some background pixels
+    image[2, :, 60] = np.nan            # an entire column
+    image[3, 25:, 70] = np.nan          # the upper background region
+    image[4, 16:24, 80] = np.nan        # all of the source pixels
+
+    wavelength = np.linspace(1., 5., 100)
+    disp_range = [10, 110]
+    p_src = [[models.Polynomial1D(1, c0=15.7, c1=0.001),
+              models.Polynomial1D(1, c0=24.2, c1=0.001)]]
+    p_bkg = [[models.Polynomial1D(0, c0=1.2), models.Polynomial1D(0, c0=6.6)],
+             [models.Polynomial1D(0, c0=30.4), models.Polynomial1D(0, c0=38.9)]]
+
+    return image, wavelength, disp_range, p_src, p_bkg
+
+
+@pytest.mark.parametrize("bkg_order, smoothing_length, use_bkg",
+                         [(0, 0, True), (1, 0, True), (2, 3, True),
+                          (0, 0, False)])
+def test_extract1d_stack(stack, bkg_order, smoothing_length, use_bkg):
+    image, wavelength, disp_range, p_src, p_bkg = stack
+    if not use_bkg:
+        p_bkg = None
+
+    expected = [extract1d.extract1d(plane, wavelength, disp_range, p_src,
+                                    p_bkg, 'pixel', smoothing_length,
+                                    bkg_order)
+                for plane in image]
+    result = extract1d.extract1d(image, wavelength, disp_range, p_src, p_bkg,
+                                 'pixel', smoothing_length, bkg_order)
+
+    for k in range(3):
+        planes = np.array([spectra[k] for spectra in expected])
+        assert result[k].shape == planes.shape
+        np.testing.assert_array_equal(np.isnan(result[k]), np.isnan(planes))
+        np.testing.assert_allclose(result[k], planes, rtol=1.e-7,
+                                   atol=1.e-6)
+
+
+def test_extract1d_stack_weights(stack):
+    image, wavelength, disp_range, p_src, p_bkg = stack
+
+    with pytest.raises(ValueError):
+        extract1d.extract1d(image, wavelength, disp_range, p_src, p_bkg,
+                            'pixel', 0, 0, weights=lambda x, y: 1.)
+
+
+def test_nans_at_endpoints_2d():
+    wavelength = np.array([np.nan, 1., 2., np.nan, 4., np.nan])
+    flux = np.arange(12, dtype=np.float64).reshape((2, 6))
+    dq = np.zeros((2, 6), dtype=np.uint32)
+
+    wl, flux, bkg, npixels, dq = nans_at_endpoints(
+        wavelength, flux, flux.copy(), flux.copy(), dq, False)
+
+    assert wl.shape == (4,)
+    assert flux.shape == (2, 4)
+    np.testing.assert_array_equal(flux[1], [7., 8., 9., 10.])
+    assert np.all(dq[:, 2] != 0)
+    assert np.all(dq[:, [0, 1, 3]] == 0)
@@ -18,7 +18,8 @@ def extract2d(input_model,
               tsgrism_extract_height=None,
               wfss_extract_half_height=None,
               extract_orders=None,
-              mmag_extract=99.):
+              mmag_extract=99.,
+              slit_workers=1):
     """
     The main extract_2d function
 
@@ -43,6 +44,8 @@ def extract2d(input_model,
         A list of spectral orders to be extracted.
     mmag_extract : float
         Minimum abmag to extract.
+    slit_workers : int
+        Number of threads extracting the slits of NIRSpec exposures.
 
     Returns
     -------
@@ -63,7 +66,8 @@ def extract2d(input_model,
             log.info(f'EXP_TYPE {exp_type} with grating=MIRROR not supported for extract 2D')
             input_model.meta.cal_step.extract_2d = 'SKIPPED'
             return input_model
-        output_model = nrs_extract2d(input_model, slit_name=slit_name)
+        output_model = nrs_extract2d(input_model, slit_name=slit_name,
+                                     slit_workers=slit_workers)
     elif exp_type in slitless_modes:
         if exp_type == 'NRC_TSGRISM':
             if tsgrism_extract_height is None:
@@ -20,6 +20,7 @@ class Extract2dStep(Step):
         wfss_extract_half_height =  integer(default=5)  # extraction half height in pixels, WFSS mode
         grism_objects = list(default=None)  # list of grism objects to use
         mmag_extract = float(default=99.)  # minimum abmag to extract
+        slit_workers = integer(default=1, min=1)  # number of threads extracting NIRSpec slits
     """
 
     reference_file_types = ['wavelengthrange']
@@ -37,6 +38,7 @@ class Extract2dStep(Step):
                                                 tsgrism_extract_height=self.tsgrism_extract_height,
                                                 wfss_extract_half_height=self.wfss_extract_half_height,
                                                 extract_orders=self.extract_orders,
-                                                mmag_extract=self.mmag_extract)
+                                                mmag_extract=self.mmag_extract,
+                                                slit_workers=self.slit_workers)
 
         return output_model
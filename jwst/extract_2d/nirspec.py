@@ -11,12 +11,13 @@ from .. import datamodels
 from ..assign_wcs import nirspec
 from ..assign_wcs import util
 from ..lib import pipe_utils
+from ..lib.parallel_utils import map_threaded
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def nrs_extract2d(input_model, slit_name=None):
+def nrs_extract2d(input_model, slit_name=None, slit_workers=1):
     """
     Main extract_2d function for NIRSpec exposures.
 
@@ -26,6 +27,8 @@ def nrs_extract2d(input_model, slit_name=None):
         Input data model.
     slit_name : str or int
         Slit name.
+    slit_workers : int
+        Number of threads extracting the slits.
     """
     exp_type = input_model.meta.exposure.type.upper()
 
@@ -63,13 +66,11 @@ def nrs_extract2d(input_model, slit_name=None):
     else:
         output_model = datamodels.MultiSlitModel()
         output_model.update(input_model)
-        slits = []
 
-        # Loop over all slit instances that are present
-        for slit in open_slits:
+        def extract_open_slit(slit):
+            """Extract one slit instance into a new SlitModel"""
             new_model, xlo, xhi, ylo, yhi = process_slit(input_model, slit, exp_type)
 
-            slits.append(new_model)
             orig_s_region = new_model.meta.wcsinfo.s_region.strip()
             # set x/ystart values relative to the image (screen) frame.
             # The overall subarray offset is recorded in model.meta.subarray.
@@ -85,6 +86,10 @@ def nrs_extract2d(input_model, slit_name=None):
             new_model.meta.bunit_data = input_model.meta.bunit_data
             new_model.meta.bunit_err = input_model.meta.bunit_err
 
+            return new_model
+
+        # Extract all slit instances that are present, possibly concurrently
+        slits = map_threaded(extract_open_slit, open_slits, slit_workers, label='slit')
         output_model.slits.extend(slits)
 
     return output_model
@@ -11,6 +11,7 @@ from gwcs.wcstools import grid_from_bounding_box
 from .. import datamodels
 from .. datamodels import dqflags
 from .. lib import reffile_utils
+from .. lib.parallel_utils import map_threaded
 from .. assign_wcs import nirspec
 
 log = logging.getLogger(__name__)
@@ -27,7 +28,8 @@ HORIZONTAL = 1
 VERTICAL = 2
 
 
-def do_correction(input_model, flat=None, fflat=None, sflat=None, dflat=None):
+def do_correction(input_model, flat=None, fflat=None, sflat=None, dflat=None,
+                  slit_workers=1):
     """Flat-field a JWST data model using a flat-field model
 
     Parameters
@@ -48,6 +50,10 @@ def do_correction(input_model, flat=None, fflat=None, sflat=None, dflat=None):
     dflat : ~jwst.datamodels.NirspecFlatModel or None
         Flat field for the detector.  Used only for NIRSpec data.
 
+    slit_workers : int
+        Number of threads flat-fielding the slits of NIRSpec MSA and
+        fixed-slit data.
+
     Returns
     -------
     output_model : data model
@@ -64,7 +70,8 @@ def do_correction(input_model, flat=None, fflat=None, sflat=None, dflat=None):
     # types of data (including NIRSpec imaging).  The test on flat is
     # needed because NIRSpec imaging data are processed by do_flat_field().
     if input_model.meta.instrument.name == 'NIRSPEC' and flat is None:
-        interpolated_flats = do_nirspec_flat_field(output_model, fflat, sflat, dflat)
+        interpolated_flats = do_nirspec_flat_field(output_model, fflat, sflat, dflat,
+                                                   slit_workers=slit_workers)
     else:
         do_flat_field(output_model, flat)
         interpolated_flats = None
@@ -197,7 +204,8 @@ def apply_flat_field(science, flat):
 # The following functions are for NIRSpec spectrographic data.
 #
 
-def do_nirspec_flat_field(output_model, f_flat_model, s_flat_model, d_flat_model):
+def do_nirspec_flat_field(output_model, f_flat_model, s_flat_model, d_flat_model,
+                          slit_workers=1):
     """Apply flat-fielding for NIRSpec data, updating in-place.
 
     Calls one of 3 functions depending on whether the data is 1) NIRSpec IFU,
@@ -217,6 +225,9 @@ def do_nirspec_flat_field(output_model, f_flat_model, s_flat_model, d_flat_model
     d_flat_model : ~jwst.datamodels.NirspecFlatModel or None
         Flat field for the detector.
 
+    slit_workers : int
+        Number of threads flat-fielding the slits of MSA and fixed-slit data.
+
     Returns
     -------
     ~jwst.datamodels.MultiSlitModel or ~jwst.datamodels.ImageModel
@@ -261,11 +272,11 @@ def do_nirspec_flat_field(output_model, f_flat_model, s_flat_model, d_flat_model
     # For datamodels with slits, MSA and Fixed slit modes:
     else:
         return nirspec_fs_msa(output_model, f_flat_model, s_flat_model,
-                              d_flat_model, dispaxis)
+                              d_flat_model, dispaxis, slit_workers=slit_workers)
 
 
 def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model,
-                   dispaxis):
+                   dispaxis, slit_workers=1):
     """Apply flat-fielding for NIRSpec fixed slit and MSA data, in-place
 
     Parameters
@@ -285,6 +296,9 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model,
     dispaxis : int
         1 means horizontal dispersion, 2 means vertical dispersion.
 
+    slit_workers : int
+        Number of threads flat-fielding the slits.
+
     Returns
     -------
     interpolated_flats: `~jwst.datamodels.MultiSlitModel`
@@ -293,16 +307,8 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model,
 
     exposure_type = output_model.meta.exposure.type
 
-    # Create a list to hold the list of slits.  This will eventually be used
-    # to extend the MultiSlitModel.slits attribute.  We do it this way to
-    # postpone validation until the end, which is faster.
-    flat_slits = []
-
-    # A flag to make sure at least one slit was flatfielded, so we can set
-    # "COMPLETE", otherwise we set "SKIP"
-    any_updated = False
-
-    for slit in output_model.slits:
+    def flat_field_slit(slit):
+        """Flat-field one slit, returning its flat and whether it was updated"""
         log.info("Working on slit %s", slit.name)
         if exposure_type == "NRS_MSASPEC":
             slit_nt = slit                      # includes quadrant info
@@ -360,9 +366,8 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model,
                 dummy_flat.ystart = slit.ystart
                 dummy_flat.ysize = slit.ysize
                 dummy_flat.wavelength = np.zeros_like(slit.data)
-                flat_slits.append(dummy_flat)
 
-                continue
+                return dummy_flat, False
         else:
             log.debug("Wavelengths are from the wavelength array.")
 
@@ -406,8 +411,6 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model,
         # Copy the WCS info from output (same as input).
         if got_wcs:
             new_flat.meta.wcs = slit.meta.wcs
-        # Append the SlitDataModel to the list of slits
-        flat_slits.append(new_flat)
 
         # Now let's apply the correction to science data and error arrays.  Rely
         # on array broadcasting to handle the cubes
@@ -423,7 +426,20 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model,
         # Combine the science and flat DQ arrays
         slit.dq |= flat_dq_2d
 
-        any_updated = True
+        return new_flat, True
+
+    # The slits are independent, so they can be processed concurrently
+    results = map_threaded(flat_field_slit, output_model.slits, slit_workers,
+                           label='slit')
+
+    # Create a list to hold the list of slits.  This will eventually be used
+    # to extend the MultiSlitModel.slits attribute.  We do it this way to
+    # postpone validation until the end, which is faster.
+    flat_slits = [flat_slit for flat_slit, _ in results]
+
+    # Make sure at least one slit was flatfielded, so we can set
+    # "COMPLETE", otherwise we set "SKIP"
+    any_updated = any(updated for _, updated in results)
 
     if any_updated:
         output_model.meta.cal_step.flat_field = 'COMPLETE'
@@ -1367,28 +1383,24 @@ def combine_fast_slow(wl, flat_2d, flat_dq, tab_wl, tab_flat, dispaxis):
         dwl[0:-1, :] = wl_c[1:, :] - wl_c[0:-1, :]
         dwl[-1, :] = dwl[-2, :]
 
-    # Values averaged within tab_flat.
-    values = np.zeros_like(wl_c)
-    (ny, nx) = wl_c.shape
     # Abscissas and weights for 3-point Gaussian integration, but taking
     # the width of the interval to be 1, so the result will be the average
     # over the interval.
     d = math.sqrt(0.6) / 2.
     dx = np.array([-d, 0., d])
     wgt = np.array([5., 8., 5.]) / 18.
-    for j in range(ny):
-        for i in range(nx):
-            if wl[j, i] <= 0.:          # note:  wl, not wl_c
-                values[j, i] = 1.
-            else:
-                # average the tabular data over the range of wavelengths
-                temp = g_average(wl_c[j, i], dwl[j, i],
-                                 tab_wl, tab_flat, dx, wgt)
-                if temp is None:
-                    values[j, i] = 1.
-                    combined_dq[j, i] |= dqflags.pixel['NO_FLAT_FIELD']
-                else:
-                    values[j, i] = temp
+
+    # Values averaged within tab_flat, for all pixels at once.
+    values = np.ones_like(wl_c)
+    good = wl > 0.                      # note:  wl, not wl_c
+    averages = g_average_array(wl_c[good], dwl[good], tab_wl, tab_flat,
+                               dx, wgt)
+    outside = np.isnan(averages)
+    averages[outside] = 1.
+    values[good] = averages
+    no_flat = np.zeros(wl.shape, dtype=bool)
+    no_flat[good] = outside
+    combined_dq[no_flat] |= dqflags.pixel['NO_FLAT_FIELD']
 
     return (flat_2d * values, combined_dq)
 
@@ -1500,6 +1512,90 @@ def g_average(wl0, dwl0, tab_wl, tab_flat, dx, wgt):
     return sum
 
 
+def g_average_array(wl0, dwl0, tab_wl, tab_flat, dx, wgt):
+    """Gaussian integration over many pixels.
+
+    This is the same as `g_average`, but for arrays of pixels.
+
+    Parameters
+    ----------
+    wl0 : ndarray
+        Wavelength at the center of each pixel.
+
+    dwl0 : ndarray
+        Width (in wavelength units) of each pixel.
+
+    tab_wl : ndarray, 1-D
+        Array of wavelengths corresponding to `tab_flat` flat-field values.
+
+    tab_flat : ndarray, 1-D
+        Array of flat-field values.
+
+    dx : ndarray, 1-D
+        Array of offsets within a pixel, e.g. -0.3873, 0.0, +0.3873
+
+    wgt : ndarray, 1-D
+        Array of weights, e.g. 5/18, 8/18, 5/18
+
+    Returns
+    -------
+    ndarray
+        The average value of `tab_flat` over each pixel.  NaN will be
+        returned for pixels for which any of the wavelengths used for
+        computing the average is outside the range of wavelengths in
+        `tab_wl`.
+    """
+
+    wl0 = np.asarray(wl0, dtype=np.float64)
+    dwl0 = np.asarray(dwl0, dtype=np.float64)
+    sum = np.zeros(wl0.shape)
+    for k in range(len(dx)):
+        sum += wl_interpolate_array(wl0 + dwl0 * dx[k], tab_wl, tab_flat) * wgt[k]
+
+    return sum
+
+
+def wl_interpolate_array(wavelength, tab_wl, tab_flat):
+    """Interpolate the flat field at an array of wavelengths.
+
+    This is the same as `wl_interpolate`, but for an array of wavelengths.
+
+    Parameters
+    ----------
+    wavelength : ndarray
+        The wavelengths (microns) at which to find the flat-field values.
+
+    tab_wl : ndarray, 1-D
+        Array of wavelengths corresponding to `tab_flat` flat-field values.
+        These are assumed to be strictly increasing.
+
+    tab_flat : ndarray, 1-D
+        Array of flat-field values.
+
+    Returns
+    -------
+    ndarray
+        The flat-field values (from `tab_flat`) at `wavelength`.  NaN
+        will be returned where `wavelength` is not positive, is NaN, or is
+        outside the range of `tab_wl`.
+    """
+
+    wavelength = np.asarray(wavelength, dtype=np.float64)
+    outside = ~((wavelength > 0.) & (wavelength >= tab_wl[0]) &
+                (wavelength <= tab_wl[-1]))
+
+    # Indexing as in wl_interpolate, including n0 = -1 at tab_wl[0]
+    n0 = np.searchsorted(tab_wl, wavelength) - 1
+    n0[outside] = 0
+    p = (wavelength - tab_wl[n0]) / (tab_wl[n0 + 1] - tab_wl[n0])
+    q = 1. - p
+
+    value = q * tab_flat[n0] + p * tab_flat[n0 + 1]
+    value[outside] = np.nan
+
+    return value
+
+
 def wl_interpolate(wavelength, tab_wl, tab_flat):
     """Interpolate the flat field at the specified wavelength.
 
@@ -42,6 +42,7 @@ class FlatFieldStep(Step):
 
     spec = """
         save_interpolated_flat = boolean(default=False) # Save interpolated NRS flat
+        slit_workers = integer(default=1, min=1) # Number of threads processing NRS slits
     """
 
     reference_file_types = ["flat", "fflat", "sflat", "dflat"]
@@ -103,6 +104,7 @@ class FlatFieldStep(Step):
         output_model, interpolated_flats = flat_field.do_correction(
             input_model,
             **reference_file_models,
+            slit_workers=self.slit_workers,
             )
 
         # Close the input and reference files
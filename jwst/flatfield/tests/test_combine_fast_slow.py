@@ -0,0 +1,66 @@
+"""
+Test for flat_field.combine_fast_slow
+"""
+import math
+
+import numpy as np
+import pytest
+
+from jwst.datamodels import dqflags
+from jwst.flatfield.flat_field import (combine_fast_slow, clean_wl, g_average,
+                                       HORIZONTAL, VERTICAL)
+
+
+def combine_fast_slow_by_pixel(wl, flat_2d, tab_wl, tab_flat, dispaxis):
+    """Average the table over each pixel with the scalar g_average"""
+    wl_c = clean_wl(wl, dispaxis)
+    dwl = np.zeros_like(wl_c)
+    if dispaxis == HORIZONTAL:
+        dwl[:, 0:-1] = wl_c[:, 1:] - wl_c[:, 0:-1]
+        dwl[:, -1] = dwl[:, -2]
+    else:
+        dwl[0:-1, :] = wl_c[1:, :] - wl_c[0:-1, :]
+        dwl[-1, :] = dwl[-2, :]
+
+    d = math.sqrt(0.6) / 2.
+    dx = np.array([-d, 0., d])
+    wgt = np.array([5., 8., 5.]) / 18.
+    values = np.ones_like(wl_c)
+    dq = np.zeros(wl.shape, dtype=np.uint32)
+    for j in range(wl.shape[0]):
+        for i in range(wl.shape[1]):
+            if wl[j, i] > 0.:
+                temp = g_average(wl_c[j, i], dwl[j, i], tab_wl, tab_flat, dx, wgt)
+                if temp is None:
+                    dq[j, i] = dqflags.pixel['NO_FLAT_FIELD']
+                else:
+                    values[j, i] = temp
+    return flat_2d * values, dq
+
+
+@pytest.mark.parametrize('dispaxis', [HORIZONTAL, VERTICAL])
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_combine_fast_slow(dispaxis, dtype):
+    """All pixels at once give the same values and flags as pixel by pixel"""
+    rng = np.random.RandomState(3)
+    tab_wl = np.linspace(1.0, 2.0, 500)
+    tab_flat = 1. + 0.1 * rng.normal(size=tab_wl.size)
+
+    # The wavelengths run past both ends of the table, with some zeros
+    wl = np.linspace(0.95, 2.05, 40)[np.newaxis, :] + np.linspace(0., 0.01, 12)[:, np.newaxis]
+    if dispaxis == VERTICAL:
+        wl = wl.T
+    wl = wl.astype(dtype)
+    wl[3, 5] = 0.
+    wl[7, 7] = -1.
+    flat_2d = rng.uniform(0.9, 1.1, size=wl.shape)
+    flat_dq = np.zeros(wl.shape, dtype=np.uint32)
+    flat_dq[0, 0] = dqflags.pixel['DO_NOT_USE']
+
+    flat, dq = combine_fast_slow(wl, flat_2d, flat_dq, tab_wl, tab_flat, dispaxis)
+    expected_flat, expected_dq = combine_fast_slow_by_pixel(wl, flat_2d, tab_wl,
+                                                            tab_flat, dispaxis)
+
+    assert np.any(expected_dq)
+    np.testing.assert_allclose(flat, expected_flat, rtol=1e-12)
+    np.testing.assert_array_equal(dq, expected_dq | flat_dq)
@@ -38,7 +38,7 @@ class IPCStep(Step):
             if self.ipc_name == 'N/A':
                 self.log.warning('No IPC reference file found')
                 self.log.warning('IPC step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.ipc = 'SKIPPED'
                 return result
 
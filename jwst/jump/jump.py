@@ -3,9 +3,9 @@ import logging
 
 import numpy as np
 from ..datamodels import dqflags
+from ..lib import parallel_utils
 from ..lib import reffile_utils
 from . import twopoint_difference as twopt
-import multiprocessing
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -30,25 +30,16 @@ def detect_jumps (input_model, gain_model, readnoise_model,
     appropriate instrument- and detector-dependent values for each pixel of an
     image.  Also, a 2-dimensional read noise array with appropriate values for
     each pixel is passed to the detection methods.
+
+    With multiprocessing (`max_cores` other than 'none', either a fraction
+    of the available cores or a number of processes), the rows are split into
+    several chunks per process, which are handed out to the processes as
+    they become free.
     """
-    if max_cores is None:
-        numslices = 1
-    else:
-        num_cores = multiprocessing.cpu_count()
-        log.info("Found %d possible cores to use for jump detection " % num_cores)
-        if max_cores == 'quarter':
-            numslices = num_cores // 4 or 1
-        elif max_cores == 'half':
-            numslices = num_cores // 2 or 1
-        elif max_cores == 'all':
-            numslices = num_cores
-        else:
-            numslices = 1
+    numprocs = parallel_utils.compute_num_processes(max_cores)
 
     # Load the data arrays that we need from the input model
-    output_model = input_model.copy()
-    data = input_model.data
-    err  = input_model.err
+    output_model = input_model.writable_copy()
     gdq  = input_model.groupdq
     pdq  = input_model.pixeldq
 
@@ -77,12 +68,12 @@ def detect_jumps (input_model, gain_model, readnoise_model,
         pdq[wh_g] = np.bitwise_or( pdq[wh_g], dqflags.pixel['NO_GAIN_VALUE'] )
         pdq[wh_g] = np.bitwise_or( pdq[wh_g], dqflags.pixel['DO_NOT_USE'] )
 
-    # Apply gain to the SCI, ERR, and readnoise arrays so they're in units
-    # of electrons
+    # Apply gain to the SCI and readnoise arrays so they're in units
+    # of electrons, in copies that leave the input and reference models
+    # unchanged
 
-    data *= gain_2d
-    err  *= gain_2d
-    readnoise_2d *= gain_2d
+    data = input_model.data * gain_2d
+    readnoise_2d = readnoise_2d * gain_2d
 
     # Apply the 2-point difference method as a first pass
     log.info('Executing two-point difference method')
@@ -96,58 +87,37 @@ def detect_jumps (input_model, gain_model, readnoise_model,
     previous_row_above_gdq = np.zeros((num_ints, num_groups, ncols), dtype=np.uint8)
     row_below_gdq = np.zeros((num_ints, num_groups, ncols), dtype=np.uint8)
 
-    yincrement = int(nrows / numslices)
-    slices = []
-    # Slice up data, gdq, readnoise_2d into slices
-    # Each element of slices is a tuple of
-    # (data, gdq, readnoise_2d, rejection_threshold, nframes)
-    for i in range(numslices - 1):
-        slices.insert(i, (data[:, :, i * yincrement:(i + 1) * yincrement, :],
-                          gdq[:, :, i * yincrement:(i + 1) * yincrement, :],
-                          readnoise_2d[i * yincrement:(i + 1) * yincrement, :],
-                          rejection_threshold, frames_per_group, flag_4_neighbors,
-                          max_jump_to_flag_neighbors, min_jump_to_flag_neighbors))
-    # last slice get the rest
-    slices.insert(numslices - 1, (data[:, :, (numslices - 1) * yincrement:nrows, :],
-                                 gdq[:, :, (numslices - 1) * yincrement:nrows, :],
-                                 readnoise_2d[(numslices - 1) * yincrement:nrows, :],
-                                 rejection_threshold, frames_per_group, flag_4_neighbors,
-                                 max_jump_to_flag_neighbors, min_jump_to_flag_neighbors))
-    if numslices == 1:
+    if numprocs == 1:
         gdq, row_below_dq, row_above_dq = twopt.find_crs(data, gdq, readnoise_2d, rejection_threshold,
                                                                         frames_per_group, flag_4_neighbors,
                                                                         max_jump_to_flag_neighbors,
                                                                         min_jump_to_flag_neighbors)
-        elapsed = time.time() - start
     else:
-        log.info("Creating %d processes for jump detection " % numslices)
-        pool = multiprocessing.Pool(processes=numslices)
-        # Starts each slice in it's own process. Starmap allows more than one parameter to be passed.
-        real_result = pool.starmap(twopt.find_crs, slices)
-        pool.close()
-        pool.join()
-        k = 0
-        # Reconstruct gdq, the row_above_gdq, and the row_below_gdq from the slice result
-        for resultslice in real_result:
-
-            if len(real_result) == k + 1:  # last result
-                gdq[:, :, k * yincrement:nrows, :] = resultslice[0]
-            else:
-                gdq[:, :, k * yincrement:(k + 1) * yincrement, :] = resultslice[0]
+        # Slice up data, gdq, readnoise_2d into row chunks
+        # Each element of slices is a tuple of
+        # (data, gdq, readnoise_2d, rejection_threshold, nframes, ...)
+        row_ranges = parallel_utils.row_chunks(nrows, numprocs)
+        slices = [(data[:, :, lo:hi, :], gdq[:, :, lo:hi, :], readnoise_2d[lo:hi, :],
+                   rejection_threshold, frames_per_group, flag_4_neighbors,
+                   max_jump_to_flag_neighbors, min_jump_to_flag_neighbors)
+                  for lo, hi in row_ranges]
+
+        log.info("Using %d processes for jump detection of %d row chunks" % (numprocs, len(slices)))
+        pool = parallel_utils.get_pool(numprocs)
+        real_result = parallel_utils.map_chunks(pool, twopt.find_crs, slices,
+                                                label='jump detection row chunk')
+
+        # Reconstruct gdq, the row_above_gdq, and the row_below_gdq from the chunk results
+        for k, ((lo, hi), resultslice) in enumerate(zip(row_ranges, real_result)):
+            gdq[:, :, lo:hi, :] = resultslice[0]
             row_below_gdq[:, :, :] = resultslice[1]
             row_above_gdq[:, :, :] = resultslice[2]
-            if k != 0: # for all but the first slice, flag any CR neighbors in the top row of the previous slice and
-                # flag any neighbors in the bottom row of this slice saved from the top of the previous slice
-                gdq[:, :, k * yincrement - 1, :] = np.bitwise_or(gdq[:, :, k * yincrement - 1, :],
-                                                                     row_below_gdq[:, :, :])
-                gdq[:, :, k * yincrement, :] = np.bitwise_or(gdq[:, :, k * yincrement, :],
-                                                                     previous_row_above_gdq[:, :, :])
-            # save the neighbors to be flagged that will be in the next slice
+            if k != 0: # for all but the first chunk, flag any CR neighbors in the top row of the previous chunk and
+                # flag any neighbors in the bottom row of this chunk saved from the top of the previous chunk
+                gdq[:, :, lo - 1, :] = np.bitwise_or(gdq[:, :, lo - 1, :], row_below_gdq[:, :, :])
+                gdq[:, :, lo, :] = np.bitwise_or(gdq[:, :, lo, :], previous_row_above_gdq[:, :, :])
+            # save the neighbors to be flagged that will be in the next chunk
             previous_row_above_gdq = row_above_gdq.copy()
-            k += 1
-        pool.terminate()
-        pool.close()
-        elapsed = time.time() - start
 
     elapsed = time.time() - start
     log.info('Total elapsed time = %g sec' % elapsed)
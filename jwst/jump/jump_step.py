@@ -16,7 +16,7 @@ class JumpStep(Step):
 
     spec = """
         rejection_threshold = float(default=4.0,min=0) # CR sigma rejection threshold
-        maximum_cores = option('none', 'quarter', 'half', 'all', default='none') # max number of processes to create
+        maximum_cores = max_cores(default='none') # max number of processes: 'none', 'quarter', 'half', 'all' or an integer
         flag_4_neighbors = boolean(default=True) # flag the four perpendicular neighbors of each CR
         max_jump_to_flag_neighbors = float(default=200) # maximum jump sigma that will trigger neighbor flagging
         min_jump_to_flag_neighbors = float(default=10) # minimum jump sigma that will trigger neighbor flagging
@@ -33,7 +33,7 @@ class JumpStep(Step):
             if ngroups <= 2:
                 self.log.warning('Can not apply jump detection when NGROUPS<=2;')
                 self.log.warning('Jump step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.jump = 'SKIPPED'
                 return result
 
@@ -52,13 +52,15 @@ class JumpStep(Step):
             gain_filename = self.get_reference_file(input_model, 'gain')
             self.log.info('Using GAIN reference file: %s', gain_filename)
 
-            gain_model = datamodels.GainModel( gain_filename )
+            gain_model = self.open_reference_model(gain_filename,
+                                                   datamodels.GainModel)
 
             readnoise_filename = self.get_reference_file(input_model,
                                                           'readnoise')
             self.log.info('Using READNOISE reference file: %s',
                           readnoise_filename)
-            readnoise_model = datamodels.ReadnoiseModel( readnoise_filename )
+            readnoise_model = self.open_reference_model(readnoise_filename,
+                                                        datamodels.ReadnoiseModel)
 
             # Call the jump detection routine
             result = detect_jumps(input_model, gain_model, readnoise_model,
@@ -4,6 +4,7 @@ import pytest
 from jwst.datamodels import GainModel, ReadnoiseModel
 from jwst.datamodels import RampModel
 from jwst.jump.jump import detect_jumps
+from jwst.lib import parallel_utils
 import multiprocessing
 from jwst.datamodels import dqflags
 
@@ -39,6 +40,20 @@ def test_nocrs_noflux_subarray(setup_inputs):
     out_model = detect_jumps(model1, gain, rnModel, 4.0,  1, 200, 4, True)
     assert (0 == np.max(out_model.groupdq))
 
+def test_read_only_references(setup_inputs):
+    """"
+    The reference arrays may be shared, read-only arrays of cached models
+    """
+    model1, gdq, rnModel, pixdq, err, gain = setup_inputs(ngroups=5, gain=5, readnoise=7)
+    model1.data[0, 3:, 5, 5] = 1000.
+    data = model1.data.copy()
+    gain.data.flags.writeable = False
+    rnModel.data.flags.writeable = False
+    out_model = detect_jumps(model1, gain, rnModel, 4.0,  1, 200, 4, True)
+    assert np.bitwise_and(out_model.groupdq[0, 3, 5, 5], dqflags.group['JUMP_DET'])
+    assert (rnModel.data == 7).all()
+    np.testing.assert_array_equal(model1.data, data)
+
 def test_onecr_10_groups_neighbors_flagged(setup_inputs):
     """"
     A single CR in a 10 group exposure
@@ -528,6 +543,32 @@ def test_proc(setup_inputs):
     assert( out_model_a.groupdq == out_model_c.groupdq ).all()
 
 
+def test_proc_row_chunks(setup_inputs, monkeypatch):
+    """"
+    CRs on and next to the boundaries of the row chunks handed out to the
+    processes. Verify that an integer number of processes flags the same
+    pixels, including the neighbors in adjacent chunks, as no multiprocessing.
+    """
+    monkeypatch.setattr(parallel_utils, 'available_cpu_count', lambda: 3)
+    ngroups = 10
+    nrows = 24
+    results = []
+    for max_cores in ['none', 3, '2']:
+        model1, gdq, rnModel, pixdq, err, gain = \
+            setup_inputs(ngroups=ngroups, nrows=nrows, ncols=6, nints=1, gain=5,
+                         readnoise=np.float64(7), deltatime=3.0)
+        model1.data[0, :, :, :] = np.arange(ngroups)[:, np.newaxis, np.newaxis] * 5.0
+        for row in [1, 2, 11, 12]:
+            model1.data[0, 5:, row, 3] += 100.0
+        results.append(detect_jumps(model1, gain, rnModel, 4.0, max_cores, 200, 4, True))
+    parallel_utils.close_pool()
+
+    assert np.bitwise_and(results[0].groupdq[0, 5, 0, 3], dqflags.group['JUMP_DET'])
+    assert np.bitwise_and(results[0].groupdq[0, 5, 13, 3], dqflags.group['JUMP_DET'])
+    for result in results[1:]:
+        np.testing.assert_array_equal(result.groupdq, results[0].groupdq)
+
+
 def test_adjacent_CRs( setup_inputs ):
     """
     Three CRs in a 10 group exposure; the CRs have overlapping neighboring
@@ -6,6 +6,7 @@ import numpy as np
 from jwst.datamodels import RampModel
 from jwst.datamodels import GainModel, ReadnoiseModel
 from jwst.jump import JumpStep
+from jwst.stpipe.config_parser import ValidationError
 
 MAXIMUM_CORES = ['none', 'quarter','half','all']
 
@@ -245,3 +246,9 @@ def test_two_group_integration(generate_miri_reffiles, max_cores, setup_inputs):
     out_model = JumpStep.call(model1, override_gain=override_gain,
                               override_readnoise=override_readnoise, maximum_cores=max_cores)
     assert(out_model.meta.cal_step.jump == 'SKIPPED')
+
+
+def test_maximum_cores_invalid():
+    """An invalid maximum_cores is rejected when the step is configured"""
+    with pytest.raises(ValidationError):
+        JumpStep(maximum_cores='halve')
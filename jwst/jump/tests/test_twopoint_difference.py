@@ -645,6 +645,27 @@ def test_first_last_group(setup_cube):
     assert outgdq[0, 3, 100, 100] == dqflags.group['JUMP_DET']
 
 
+def test_different_numbers_of_crs_per_pixel(setup_cube):
+    ngroups = 10
+    data, gdq, nframes, read_noise, rej_threshold = setup_cube(ngroups, readnoise=5.0)
+    data[0, :, :, :] = np.arange(ngroups, dtype=np.float32)[:, np.newaxis, np.newaxis] * 10.0
+
+    # Pixels with one, two and three CRs, found in successive passes
+    data[0, 3:, 50, 50] += 500.0
+    data[0, 2:, 60, 60] += 500.0
+    data[0, 6:, 60, 60] += 700.0
+    data[0, 2:, 70, 70] += 500.0
+    data[0, 5:, 70, 70] += 700.0
+    data[0, 8:, 70, 70] += 900.0
+    out_gdq, row_below_gdq, row_above_gdq = find_crs(data, gdq, read_noise, rej_threshold, nframes, False, 200, 10)
+
+    jump = dqflags.group['JUMP_DET']
+    assert np.where(out_gdq[0, :, 50, 50] == jump)[0].tolist() == [3]
+    assert np.where(out_gdq[0, :, 60, 60] == jump)[0].tolist() == [2, 6]
+    assert np.where(out_gdq[0, :, 70, 70] == jump)[0].tolist() == [2, 5, 8]
+    assert np.count_nonzero(out_gdq) == 6
+
+
 @pytest.fixture(scope='function')
 def setup_cube():
 
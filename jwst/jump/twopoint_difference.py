@@ -3,10 +3,12 @@ Two-Point Difference method for finding outliers in a 3-d ramp data cube.
 The scheme used in this variation of the method uses numpy array methods
 to compute first-differences and find the max outlier in each pixel while
 still working in the full 3-d data array. This makes detection of the first
-outlier very fast. We then iterate pixel-by-pixel over only those pixels
-that are already known to contain an outlier, to look for any additional
-outliers and set the appropriate DQ mask for all outliers in the pixel.
-This is MUCH faster than doing all the work on a pixel-by-pixel basis.
+outlier very fast. We then iterate over only those pixels that are already
+known to contain an outlier, to look for any additional outliers and set the
+appropriate DQ mask for all outliers in the pixel. Each iteration works on
+all of the remaining pixels at once, and the set of pixels shrinks as their
+outliers are all found, so this is MUCH faster than doing all the work on a
+pixel-by-pixel basis.
 """
 
 import logging
@@ -130,90 +132,156 @@ def find_crs(data, group_dq, read_noise, rej_threshold, nframes, flag_4_neighbor
         # Get the row and column indices of pixels whose largest non-saturated ratio is above the threshold
         row1, col1 = np.where(ratio[r, c, max_index1] > rej_threshold)
         log.info('From highest outlier Two point found %d pixels with at least one CR' % (len(row1)))
-        number_pixels_with_cr = len(row1)
-        # Loop over all pixels that we found the first CR in
-        for j in range(number_pixels_with_cr):
-            # Extract the first diffs for the this pixel with at least one CR yielding a 1D array
-            pixel_masked_diffs = first_diffs[row1[j], col1[j]]
-            # Get the scalar readnoise^2 and number of saturated groups for this pixel.
-            pixel_rn2 = read_noise_2[row1[j], col1[j]]
-            pixel_sat_groups = number_sat_groups[row1[j], col1[j]]
-
-            # Create a CR mask and set 1st CR to be found
-            # cr_mask=0 designates a CR
-            pixel_cr_mask = np.ones(pixel_masked_diffs.shape, dtype=bool)
-            number_CRs_found = 1
-            pixel_sorted_index = sort_index[row1[j], col1[j], :]
-            pixel_cr_mask[pixel_sorted_index[ndiffs - pixel_sat_groups - 1]] = 0  #setting largest diff to be a CR
-            new_CR_found = True
-
-            # Loop and see if there is more than one CR, setting the mask as you go
-            while new_CR_found and ((ndiffs - number_CRs_found - pixel_sat_groups) > 1):
-                new_CR_found = False
-                # For this pixel get a new median difference excluding the number of CRs found and
-                # the number of saturated groups
-                pixel_med_diff = get_clipped_median(ndiffs, number_CRs_found + pixel_sat_groups,
-                                                       pixel_masked_diffs, pixel_sorted_index)
-                #recalculate the noise and ratio for this pixel now that we have rejected a CR
-                pixel_poisson_noise = np.sqrt(np.abs(pixel_med_diff))
-                pixel_sigma = np.sqrt(pixel_poisson_noise * pixel_poisson_noise + pixel_rn2 / nframes)
-                pixel_ratio = np.abs(pixel_masked_diffs - pixel_med_diff) / pixel_sigma
-
-                # Check if largest remaining difference is above threshold
-                if pixel_ratio[pixel_sorted_index[ndiffs - number_CRs_found - pixel_sat_groups - 1]] > rej_threshold:
-                    new_CR_found = True
-                    pixel_cr_mask[pixel_sorted_index[ndiffs - number_CRs_found - pixel_sat_groups - 1]] = 0
-                    number_CRs_found += 1
-
-            # Found all CRs for this pixel. Set CR flags in input DQ array for this pixel
-            gdq[integration, 1:, row1[j], col1[j]] = \
-                np.bitwise_or(gdq[integration, 1:, row1[j], col1[j]],
-                              dqflags.group['JUMP_DET'] * np.invert(pixel_cr_mask))
-
-            # Save the CR-cleaned median slope for this pixel
-            if not new_CR_found:  # the while loop ran at least one time
-                median_slopes[integration, row1[j], col1[j]] = pixel_med_diff
-
-        # Next pixel with an outlier (j loop)
+
+        # Look for any additional CRs in the pixels that have at least one,
+        # working on all of those pixels at once
+        cr_mask, pixel_med_diff, clipped = find_additional_crs(
+            first_diffs[row1, col1], sort_index[row1, col1], number_sat_groups[row1, col1],
+            read_noise_2[row1, col1], nframes, rej_threshold)
+
+        # Found all CRs for these pixels. Set CR flags in input DQ array
+        gdq[integration, 1:, row1, col1] = \
+            np.bitwise_or(gdq[integration, 1:, row1, col1],
+                          dqflags.group['JUMP_DET'] * np.invert(cr_mask))
+
+        # Save the CR-cleaned median slope for the pixels where the search
+        # stopped because no further CR was found
+        median_slopes[integration, row1[clipped], col1[clipped]] = pixel_med_diff[clipped]
+
     # Next integration (integration loop)
     if flag_4_neighbors: # We need to flag the neighbors of jumps
 
         cr_int, cr_group, cr_row, cr_col = np.where(np.bitwise_and(gdq, dqflags.group['JUMP_DET']))
-        number_pixels_with_cr = len(cr_int)
-        #loop over all jumps
-        for j in range(number_pixels_with_cr):
-            #jumps must be within a certain range to have neighbors flagged
-            if all_ratios[cr_int[j], cr_row[j], cr_col[j], cr_group[j] - 1] < max_jump_to_flag_neighbors and \
-                    all_ratios[cr_int[j], cr_row[j], cr_col[j], cr_group[j] - 1] > min_jump_to_flag_neighbors:
-                # This section saves flagged neighbors that are above or below the current range of row. If this
-                # method is running in a single process, the row above and below are not used. If it is running in
-                # multiprocessing mode, then the rows above and below need to be returned to find_jumps to use when
-                # it reconstructs the full group dq array from the slices.
-                if cr_row[j] != 0:
-                    gdq[cr_int[j], cr_group[j], cr_row[j] - 1, cr_col[j]] = np.bitwise_or(
-                        gdq[cr_int[j], cr_group[j], cr_row[j] - 1, cr_col[j]],
-                        dqflags.group['JUMP_DET'])
-                else:
-                    row_below_gdq[cr_int[j], cr_group[j], cr_col[j]] =  dqflags.group['JUMP_DET']
-                if cr_row[j] != nrows - 1:
-                    gdq[cr_int[j], cr_group[j], cr_row[j] + 1, cr_col[j]] = np.bitwise_or(
-                        gdq[cr_int[j], cr_group[j], cr_row[j] + 1, cr_col[j]],
-                        dqflags.group['JUMP_DET'])
-                else:
-                    row_above_gdq[cr_int[j], cr_group[j], cr_col[j]] = dqflags.group['JUMP_DET']
-                # Here we are just checking that we don't flag neighbors of jumps that are off the detector.
-                if cr_col[j] != 0:
-                    gdq[cr_int[j], cr_group[j], cr_row[j], cr_col[j] - 1] = np.bitwise_or(
-                        gdq[cr_int[j], cr_group[j], cr_row[j], cr_col[j] - 1],
-                        dqflags.group['JUMP_DET'])
-                if cr_col[j] != ncols - 1:
-                    gdq[cr_int[j], cr_group[j], cr_row[j], cr_col[j] + 1] = np.bitwise_or(
-                        gdq[cr_int[j], cr_group[j], cr_row[j], cr_col[j] + 1],
-                        dqflags.group['JUMP_DET'])
+
+        # Jumps must be within a certain range to have neighbors flagged.
+        # The ratios are compared in double precision.
+        cr_ratio = all_ratios[cr_int, cr_row, cr_col, cr_group - 1].astype(np.float64)
+        in_range = (cr_ratio < max_jump_to_flag_neighbors) & (cr_ratio > min_jump_to_flag_neighbors)
+        cr_int = cr_int[in_range]
+        cr_group = cr_group[in_range]
+        cr_row = cr_row[in_range]
+        cr_col = cr_col[in_range]
+
+        # Flagged neighbors that are above or below the current range of rows
+        # are saved separately. If this method is running in a single process,
+        # the row above and below are not used. If it is running in
+        # multiprocessing mode, then the rows above and below need to be
+        # returned to find_jumps to use when it reconstructs the full group dq
+        # array from the slices.
+        below = cr_row == 0
+        row_below_gdq[cr_int[below], cr_group[below], cr_col[below]] = dqflags.group['JUMP_DET']
+        above = cr_row == nrows - 1
+        row_above_gdq[cr_int[above], cr_group[above], cr_col[above]] = dqflags.group['JUMP_DET']
+
+        # Flag the neighbors that are on the detector
+        for inside, drow, dcol in [(~below, -1, 0), (~above, 1, 0),
+                                   (cr_col != 0, 0, -1), (cr_col != ncols - 1, 0, 1)]:
+            neighbor = (cr_int[inside], cr_group[inside], cr_row[inside] + drow, cr_col[inside] + dcol)
+            gdq[neighbor] = np.bitwise_or(gdq[neighbor], dqflags.group['JUMP_DET'])
 
     return gdq, row_below_gdq, row_above_gdq
 
 
+def find_additional_crs(diffs, sorted_index, sat_groups, read_noise_2, nframes, rej_threshold):
+    """
+    Iteratively search for additional CRs in pixels known to have at least one.
+
+    The largest non-saturated difference of each pixel is taken to be a CR.
+    For all pixels at once, the clipped median and the ratio of the largest
+    remaining difference to the noise are then recomputed, and that
+    difference is flagged if it is above the threshold. Each pass only works
+    on the pixels that found a new CR in the previous pass and still have
+    more than one unflagged difference left.
+
+    The arithmetic mirrors the precision of the original per-pixel
+    computation, so the flags are identical to it.
+
+    Parameters
+    ----------
+    diffs : ndarray
+        2-D (npixels, ndiffs) first differences of each pixel
+
+    sorted_index : ndarray
+        2-D (npixels, ndiffs) indices that sort the absolute differences
+
+    sat_groups : ndarray
+        1-D number of saturated differences of each pixel
+
+    read_noise_2 : ndarray
+        1-D read noise squared of each pixel
+
+    nframes : int
+        Number of frames per group
+
+    rej_threshold : float
+        CR rejection threshold, in units of sigma
+
+    Returns
+    -------
+    cr_mask : ndarray
+        2-D (npixels, ndiffs) boolean mask, False where a CR was found
+
+    pixel_med_diff : ndarray
+        1-D float64 clipped median difference from the last pass of each pixel
+
+    clipped : ndarray
+        1-D boolean, True for pixels whose search stopped because no further
+        CR was found (rather than because too few differences remain)
+    """
+    npix, ndiffs = diffs.shape
+    pix = np.arange(npix)
+    threshold = np.float64(rej_threshold)
+
+    # Set the largest non-saturated difference to be a CR; cr_mask=0 designates a CR
+    cr_mask = np.ones((npix, ndiffs), dtype=bool)
+    cr_mask[pix, sorted_index[pix, ndiffs - sat_groups - 1]] = False
+    number_crs_found = np.ones(npix, dtype=np.intp)
+
+    pixel_med_diff = np.zeros(npix, dtype=np.float64)
+    clipped = np.zeros(npix, dtype=bool)
+    active = pix[(ndiffs - number_crs_found - sat_groups) > 1]
+
+    while active.size > 0:
+        act_diffs = diffs[active]
+        act_index = sorted_index[active]
+        act = np.arange(active.size)
+        num_remaining = ndiffs - number_crs_found[active] - sat_groups[active]
+
+        # Clipped median excluding the CRs found and the saturated groups.
+        # When the number of differences left is even, the median is the mean
+        # of the two central values, computed in double precision.
+        med_pos = (num_remaining - 1) // 2
+        med_value = act_diffs[act, act_index[act, med_pos]]
+        even = (num_remaining - 1) % 2 == 0
+        med_64 = med_value.astype(np.float64)
+        if even.any():
+            pair_sum = med_value[even] + act_diffs[act[even], act_index[act[even], med_pos[even] - 1]]
+            med_64[even] = pair_sum.astype(np.float64) / 2.0
+        pixel_med_diff[active] = med_64
+
+        # Recalculate the noise and ratio now that CRs have been rejected.
+        # The Poisson noise is computed in the precision of the median and
+        # the ratio in the precision of the differences.
+        poisson_2 = np.square(np.sqrt(np.abs(med_value))).astype(np.float64)
+        poisson_2[even] = np.square(np.sqrt(np.abs(med_64[even])))
+        sigma = np.sqrt(poisson_2 + read_noise_2[active].astype(np.float64) / nframes)
+
+        # Check if largest remaining difference is above threshold
+        cand = act_index[act, num_remaining - 1]
+        cand_ratio = (np.abs(act_diffs[act, cand] - med_64.astype(diffs.dtype)) /
+                      sigma.astype(diffs.dtype))
+        new_cr = cand_ratio.astype(np.float64) > threshold
+
+        cr_mask[active[new_cr], cand[new_cr]] = False
+        number_crs_found[active[new_cr]] += 1
+        clipped[active[~new_cr]] = True
+
+        still_active = active[new_cr]
+        active = still_active[(ndiffs - number_crs_found[still_active] - sat_groups[still_active]) > 1]
+
+    return cr_mask, pixel_med_diff, clipped
+
+
 def get_clipped_median(num_differences, diffs_to_ignore, differences, sorted_index):
     """
     This routine will return the clipped median for the input array or pixel.
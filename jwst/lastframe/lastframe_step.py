@@ -25,7 +25,7 @@ class LastFrameStep(Step):
             else:
                 self.log.warning('Last Frame Correction is only for MIRI data')
                 self.log.warning('Last frame step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.lastframe = 'SKIPPED'
 
         return result
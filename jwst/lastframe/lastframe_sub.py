@@ -32,7 +32,7 @@ def do_correction(input_model):
     sci_ngroups = input_model.data.shape[1]
 
     # Create output as a copy of the input science data model
-    output = input_model.copy()
+    output = input_model.writable_copy()
 
     # Update the step status, and if ngroups > 2, set all of the GROUPDQ in
     # the final group to 'DO_NOT_USE'
@@ -0,0 +1,496 @@
+"""Utilities for running detector-row chunks on a persistent pool of worker
+processes, with large arrays optionally shared between the processes"""
+
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ['SharedArray', 'attach_shared_array', 'get_pool', 'close_pool',
+           'has_shared_memory', 'available_cpu_count', 'check_max_cores',
+           'compute_num_processes',
+           'row_chunks', 'map_chunks', 'map_forked', 'map_threaded']
+
+# Process-wide worker pool, reused across calls and steps
+_POOL = None
+_POOL_SIZE = 0
+
+# Function and items of the current `map_forked` call, inherited by the
+# forked workers
+_FORKED_TASK = None
+
+# Number of row chunks created per worker process, so that workers that
+# finish early can pick up the remaining work
+CHUNKS_PER_PROCESS = 4
+
+# Fractions of the available cores selected by the named maximum_cores values
+_CORE_FRACTIONS = {'quarter': 0.25, 'half': 0.5, 'all': 1.0}
+
+
+def available_cpu_count():
+    """Number of CPUs this process may actually use.
+
+    Takes into account the CPU affinity mask of the process and any CPU
+    quota imposed through Linux control groups (v1 or v2), both of which
+    can be much smaller than `os.cpu_count` on shared batch nodes and in
+    containers.
+
+    Returns
+    -------
+    count : int
+        Number of usable CPUs, at least 1.
+    """
+    try:
+        count = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        count = os.cpu_count() or 1
+
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, max(int(math.ceil(quota)), 1))
+
+    return max(count, 1)
+
+
+def _cgroup_cpu_quota():
+    """CPU quota, in CPUs, from the cgroup filesystem, or None if unlimited"""
+    # cgroup v2
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as fh:
+            quota, period = fh.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as fh:
+            quota = int(fh.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as fh:
+            period = int(fh.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def check_max_cores(max_cores):
+    """Check a `maximum_cores` value, without looking up the usable CPUs.
+
+    Parameters
+    ----------
+    max_cores : str, int or None
+        The value to check, as for `compute_num_processes`.
+
+    Returns
+    -------
+    max_cores : str, int or None
+        None for no multiprocessing, the name of a fraction of the usable
+        CPUs in lower case, or the explicit number of processes.
+
+    Raises
+    ------
+    ValueError
+        If `max_cores` is not one of the allowed values.
+    """
+    if max_cores is None:
+        return None
+    if isinstance(max_cores, str):
+        value = max_cores.strip().lower()
+        if value == 'none':
+            return None
+        if value in _CORE_FRACTIONS:
+            return value
+        if not value.isdigit():
+            raise ValueError(f"maximum_cores must be 'none', 'quarter', 'half', "
+                             f"'all' or a positive integer, not {max_cores!r}")
+        max_cores = int(value)
+
+    num_processes = int(max_cores)
+    if num_processes < 1:
+        raise ValueError(f'maximum_cores must be at least 1, not {max_cores}')
+    return num_processes
+
+
+def compute_num_processes(max_cores):
+    """Number of worker processes to use for a `maximum_cores` value.
+
+    Parameters
+    ----------
+    max_cores : str, int or None
+        'none' (or None) for no multiprocessing; 'quarter', 'half' or
+        'all' for that fraction of the usable CPUs; or an explicit number
+        of processes, given as an integer or a string of digits. Explicit
+        numbers larger than the number of usable CPUs are reduced to it.
+
+    Returns
+    -------
+    num_processes : int
+        Number of processes, at least 1.
+
+    Raises
+    ------
+    ValueError
+        If `max_cores` is not one of the allowed values.
+    """
+    num_processes = check_max_cores(max_cores)
+    if num_processes is None:
+        return 1
+    if num_processes in _CORE_FRACTIONS:
+        num_cores = available_cpu_count()
+        log.debug(f'Found {num_cores} usable cores')
+        return int(num_cores * _CORE_FRACTIONS[num_processes]) or 1
+
+    num_cores = available_cpu_count()
+    if num_processes > num_cores:
+        log.warning(f'Requested {num_processes} processes, but only {num_cores} '
+                    f'cores are available; using {num_cores}')
+        num_processes = num_cores
+    return num_processes
+
+
+def row_chunks(nrows, num_processes, chunks_per_process=CHUNKS_PER_PROCESS):
+    """Split detector rows into contiguous chunks for dynamic scheduling.
+
+    Parameters
+    ----------
+    nrows : int
+        Total number of rows.
+
+    num_processes : int
+        Number of worker processes.
+
+    chunks_per_process : int
+        Number of chunks to create for each process.
+
+    Returns
+    -------
+    chunks : list of (int, int)
+        ``(start_row, stop_row)`` of each chunk, in row order. Chunk sizes
+        differ by at most one row, and no chunk is empty.
+    """
+    nchunks = max(min(nrows, num_processes * chunks_per_process), 1)
+    bounds = [(nrows * i) // nchunks for i in range(nchunks + 1)]
+    return [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def _timed_call(task):
+    """Pool worker wrapper that times a single chunk"""
+    func, index, args = task
+    start = time.time()
+    result = func(*args)
+    return index, time.time() - start, result
+
+
+def map_chunks(pool, func, chunk_args, label='chunk'):
+    """Run `func` over chunks, handing them out to workers as they free up.
+
+    Chunks are submitted one at a time, so a worker that finishes a cheap
+    chunk immediately takes the next pending one instead of waiting on a
+    fixed share of the work. The time spent on every chunk is logged.
+
+    Parameters
+    ----------
+    pool : `multiprocessing.pool.Pool`
+        The worker pool.
+
+    func : callable
+        Module-level function called as ``func(*args)`` for each chunk.
+
+    chunk_args : list of tuple
+        Arguments for each chunk.
+
+    label : str
+        Description of the chunks, used in the log messages.
+
+    Returns
+    -------
+    results : list
+        The return values of `func`, in the same order as `chunk_args`.
+    """
+    tasks = [(func, index, args) for index, args in enumerate(chunk_args)]
+    results = [None] * len(tasks)
+    timings = []
+    start = time.time()
+    for index, elapsed, result in pool.imap_unordered(_timed_call, tasks, chunksize=1):
+        log.debug(f'{label} {index + 1} of {len(tasks)} done in {elapsed:.3f} sec')
+        results[index] = result
+        timings.append(elapsed)
+
+    if timings:
+        timings.sort()
+        log.info(f'Processed {len(timings)} {label}s in {time.time() - start:.3f} sec; '
+                 f'time per {label}: min {timings[0]:.3f}, '
+                 f'median {timings[len(timings) // 2]:.3f}, max {timings[-1]:.3f} sec')
+    return results
+
+
+def _call_forked(index):
+    """Forked worker wrapper that runs the inherited task on one item"""
+    func, items = _FORKED_TASK
+    return func(items[index])
+
+
+def map_forked(func, items, num_processes, label='item'):
+    """Call `func` on each item in worker processes forked for this call.
+
+    Unlike the persistent pool of `get_pool`, the workers are forked after
+    `func` and `items` are set up, and inherit them from this process
+    instead of receiving them pickled. This allows items such as data
+    models with their WCS objects, which cannot be pickled, to be handed
+    to the workers; only the return values of `func` must be picklable.
+    Items are handed out to the workers one at a time, as in `map_chunks`.
+
+    When fewer than two processes are requested, there are fewer than two
+    items, the platform cannot fork, or this is not the main thread, the
+    items are processed serially in this process. Forking from another
+    thread, such as a worker of `map_threaded`, would leave the workers
+    with copies of any locks the other threads hold.
+
+    Parameters
+    ----------
+    func : callable
+        Called as ``func(item)`` for each item.
+
+    items : list
+        The items to process.
+
+    num_processes : int
+        Number of worker processes.
+
+    label : str
+        Description of the items, used in the log messages.
+
+    Returns
+    -------
+    results : list
+        The return values of `func`, in the same order as `items`.
+    """
+    global _FORKED_TASK
+
+    items = list(items)
+    num_processes = min(num_processes, len(items))
+    if (num_processes < 2 or _FORKED_TASK is not None or
+            'fork' not in multiprocessing.get_all_start_methods() or
+            threading.current_thread() is not threading.main_thread()):
+        return [func(item) for item in items]
+
+    log.debug(f'Forking {num_processes} worker processes for {len(items)} {label}s')
+    _FORKED_TASK = (func, items)
+    try:
+        with multiprocessing.get_context('fork').Pool(processes=num_processes) as pool:
+            return map_chunks(pool, _call_forked,
+                              [(index,) for index in range(len(items))], label=label)
+    finally:
+        _FORKED_TASK = None
+
+
+def _timed_item(func, item):
+    """Thread wrapper that times a single item"""
+    start = time.time()
+    result = func(item)
+    return time.time() - start, result
+
+
+def map_threaded(func, items, num_threads, label='item'):
+    """Call `func` on each item in a pool of threads.
+
+    This is meant for work that updates the items in place, such as the
+    slits of a `~jwst.datamodels.MultiSlitModel`, which therefore cannot
+    be handed to other processes. The threads run concurrently while
+    `func` is in numpy array operations, which release the GIL, such as
+    the evaluation of WCS transforms over the pixels of a slit.
+
+    When fewer than two threads are requested, or there are fewer than
+    two items, the items are processed serially in this thread.
+
+    Parameters
+    ----------
+    func : callable
+        Called as ``func(item)`` for each item. Calls for different items
+        must not modify shared state.
+
+    items : iterable
+        The items to process.
+
+    num_threads : int
+        Number of threads.
+
+    label : str
+        Description of the items, used in the log messages.
+
+    Returns
+    -------
+    results : list
+        The return values of `func`, in the same order as `items`.
+    """
+    items = list(items)
+    num_threads = min(num_threads, len(items))
+    if num_threads < 2:
+        return [func(item) for item in items]
+
+    log.debug(f'Processing {len(items)} {label}s in {num_threads} threads')
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        timed_results = list(executor.map(lambda item: _timed_item(func, item), items))
+
+    timings = sorted(elapsed for elapsed, _ in timed_results)
+    log.info(f'Processed {len(timings)} {label}s in {time.time() - start:.3f} sec; '
+             f'time per {label}: min {timings[0]:.3f}, '
+             f'median {timings[len(timings) // 2]:.3f}, max {timings[-1]:.3f} sec')
+    return [result for _, result in timed_results]
+
+
+def has_shared_memory():
+    """Is `multiprocessing.shared_memory` available?
+
+    Returns
+    -------
+    available : bool
+        `True` if arrays can be placed in shared memory (Python >= 3.8).
+    """
+    return shared_memory is not None
+
+
+class SharedArray:
+    """A numpy array backed by a named shared memory block.
+
+    The owning process creates the block; workers attach to it by name
+    using the lightweight `spec` tuple, so only the name, shape and
+    dtype cross the process boundary, never the array contents.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the array.
+
+    dtype : numpy dtype
+        Data type of the array.
+
+    data : numpy.ndarray or None
+        If given, the shared array is initialized from this array;
+        otherwise it is filled with zeros.
+    """
+
+    def __init__(self, shape, dtype, data=None):
+        if shared_memory is None:
+            raise RuntimeError('Shared memory requires Python 3.8 or later')
+        dtype = np.dtype(dtype)
+        nbytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        if data is None:
+            self.array[...] = 0
+        else:
+            self.array[...] = data
+
+    @classmethod
+    def from_array(cls, data, dtype=None):
+        """Create a shared copy of an existing array"""
+        data = np.asarray(data)
+        return cls(data.shape, dtype or data.dtype, data=data)
+
+    @property
+    def spec(self):
+        """Picklable description used by workers to attach to the block"""
+        return (self._shm.name, self.array.shape, self.array.dtype.str)
+
+    def copy_array(self):
+        """Return a private (non-shared) copy of the array contents"""
+        return self.array.copy()
+
+    def close(self):
+        """Release and unlink the shared memory block"""
+        if self._shm is None:
+            return
+        self.array = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach_shared_array(spec):
+    """Attach to a shared array created by `SharedArray`.
+
+    Parameters
+    ----------
+    spec : tuple
+        The `SharedArray.spec` tuple ``(name, shape, dtype)``.
+
+    Returns
+    -------
+    shm, array : `multiprocessing.shared_memory.SharedMemory`, numpy.ndarray
+        The attached block and an array view of it. The caller must
+        drop all references to `array` and call ``shm.close()`` when done;
+        the block must not be unlinked by the worker.
+    """
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return shm, array
+
+
+def get_pool(processes):
+    """Return the persistent worker pool, creating it if necessary.
+
+    The pool is kept alive for the lifetime of the process so that
+    repeated step invocations do not pay the start-up cost of the
+    workers again. A pool of a different size replaces the existing one.
+
+    Parameters
+    ----------
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    pool : `multiprocessing.pool.Pool`
+        The shared pool.
+    """
+    global _POOL, _POOL_SIZE
+
+    if _POOL is not None and _POOL_SIZE != processes:
+        close_pool()
+    if _POOL is None:
+        log.debug(f'Starting persistent pool of {processes} worker processes')
+        _POOL = multiprocessing.Pool(processes=processes)
+        _POOL_SIZE = processes
+    return _POOL
+
+
+def close_pool():
+    """Shut down the persistent worker pool, if any"""
+    global _POOL, _POOL_SIZE
+
+    if _POOL is not None:
+        _POOL.close()
+        _POOL.join()
+        _POOL = None
+        _POOL_SIZE = 0
+
+
+atexit.register(close_pool)
@@ -0,0 +1,102 @@
+"""Test parallel processing utilities"""
+import os
+
+import pytest
+
+import numpy as np
+
+from .. import parallel_utils
+
+
+def test_compute_num_processes(monkeypatch):
+    """Named fractions and explicit counts, limited to the usable cores"""
+    monkeypatch.setattr(parallel_utils, 'available_cpu_count', lambda: 8)
+    assert parallel_utils.compute_num_processes('none') == 1
+    assert parallel_utils.compute_num_processes(None) == 1
+    assert parallel_utils.compute_num_processes('quarter') == 2
+    assert parallel_utils.compute_num_processes('half') == 4
+    assert parallel_utils.compute_num_processes('All') == 8
+    assert parallel_utils.compute_num_processes('6') == 6
+    assert parallel_utils.compute_num_processes(20) == 8
+
+
+@pytest.mark.parametrize('max_cores', ['most', '-2', 0])
+def test_compute_num_processes_invalid(max_cores):
+    with pytest.raises(ValueError):
+        parallel_utils.compute_num_processes(max_cores)
+
+
+def test_check_max_cores():
+    """Values are checked without looking up the usable cores"""
+    assert parallel_utils.check_max_cores('None') is None
+    assert parallel_utils.check_max_cores(' half') == 'half'
+    assert parallel_utils.check_max_cores('64') == 64
+    with pytest.raises(ValueError):
+        parallel_utils.check_max_cores('halve')
+
+
+def test_available_cpu_count():
+    assert parallel_utils.available_cpu_count() >= 1
+
+
+@pytest.mark.parametrize('nrows, nprocs', [(2048, 6), (10, 4), (3, 8), (1, 1)])
+def test_row_chunks(nrows, nprocs):
+    """Chunks cover all rows, in order, with nearly equal sizes"""
+    chunks = parallel_utils.row_chunks(nrows, nprocs)
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == nrows
+    for (lo, hi), (next_lo, _) in zip(chunks[:-1], chunks[1:]):
+        assert hi == next_lo
+    sizes = [hi - lo for lo, hi in chunks]
+    assert min(sizes) >= 1
+    assert max(sizes) - min(sizes) <= 1
+    assert len(chunks) == min(nrows, nprocs * parallel_utils.CHUNKS_PER_PROCESS)
+
+
+@pytest.mark.skipif(not parallel_utils.has_shared_memory(),
+                    reason="Shared memory requires Python 3.8 or later")
+def test_shared_array():
+    data = np.arange(12, dtype=np.float32).reshape(3, 4)
+    with parallel_utils.SharedArray.from_array(data) as shared:
+        shm, view = parallel_utils.attach_shared_array(shared.spec)
+        view[1, 1] = -1.
+        del view
+        shm.close()
+        assert shared.array[1, 1] == -1.
+        copy = shared.copy_array()
+    assert copy[0, 3] == 3.
+
+
+@pytest.mark.parametrize('num_processes', [1, 3])
+def test_map_forked(num_processes):
+    # A closure over a local object cannot be pickled, so the workers
+    # must inherit it
+    offset = np.arange(3)
+    results = parallel_utils.map_forked(lambda item: offset + item, range(5),
+                                        num_processes)
+    for item, result in enumerate(results):
+        np.testing.assert_array_equal(result, offset + item)
+    assert parallel_utils._FORKED_TASK is None
+
+
+def test_map_forked_in_thread():
+    """Worker processes are not forked from threads other than the main one"""
+    pids = parallel_utils.map_threaded(
+        lambda item: parallel_utils.map_forked(lambda _: os.getpid(), range(3), 3),
+        range(2), 2)
+    assert pids == [[os.getpid()] * 3] * 2
+
+
+@pytest.mark.parametrize('num_threads', [1, 3])
+def test_map_threaded(num_threads):
+    """Items are updated in place and the results keep their order"""
+    arrays = [np.zeros(4) for _ in range(5)]
+
+    def fill(array):
+        array += len(arrays)
+        return array.sum()
+
+    results = parallel_utils.map_threaded(fill, arrays, num_threads)
+    assert results == [4. * len(arrays)] * len(arrays)
+    for array in arrays:
+        np.testing.assert_array_equal(array, len(arrays))
@@ -30,7 +30,7 @@ def do_correction(input_model, lin_model):
 
     """
     # Create the output model as a copy of the input
-    output_model = input_model.copy()
+    output_model = input_model.writable_copy()
 
     # Propagate the DQ flags from the linearity ref data into the 2D science DQ
     propagate_dq_info(output_model, lin_model)
@@ -102,7 +102,7 @@ def apply_linearity(input, linearity_ref_model):
 
     # Check for subarray mode
     if reffile_utils.ref_matches_sci(input, linearity_ref_model):
-        lin_coeffs = linearity_ref_model.coeffs
+        lin_coeffs = linearity_ref_model.coeffs.copy()
         lin_dq = linearity_ref_model.dq
     else:
         sub_lin_model = reffile_utils.get_subarray_model(input, linearity_ref_model)
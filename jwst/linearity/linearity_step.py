@@ -27,12 +27,13 @@ class LinearityStep(Step):
             if self.lin_name == 'N/A':
                 self.log.warning('No Linearity reference file found')
                 self.log.warning('Linearity step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.linearity = 'SKIPPED'
                 return result
 
             # Open the linearity reference file data model
-            lin_model = datamodels.LinearityModel(self.lin_name)
+            lin_model = self.open_reference_model(self.lin_name,
+                                                  datamodels.LinearityModel)
 
             # Do the linearity correction
             result = linearity.do_correction(input_model, lin_model)
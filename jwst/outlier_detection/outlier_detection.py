@@ -1,6 +1,8 @@
 """Primary code for performing outlier detection on JWST observations."""
 
 from functools import partial
+import tempfile
+
 import numpy as np
 
 from astropy.stats import sigma_clip
@@ -8,8 +10,11 @@ from scipy import ndimage
 from drizzle.cdrizzle import tblot
 
 from .. import datamodels
+from ..lib.parallel_utils import compute_num_processes, map_forked
 from ..resample import resample
-from ..resample.resample_utils import build_driz_weight, calc_gwcs_pixmap
+from ..resample.resample_utils import (build_driz_weight, calc_gwcs_pixmap,
+                                       pixmap_cache)
+from ..stpipe.background_writer import background_writer
 from ..stpipe.step import Step
 
 import logging
@@ -20,6 +25,10 @@ CRBIT = np.uint32(
     datamodels.dqflags.pixel['DO_NOT_USE'] + datamodels.dqflags.pixel['OUTLIER']
 )
 
+# Default memory, in MB, for each section of the stack of resampled images
+# that are combined at a time into the median image
+MEDIAN_BUFFER_SIZE = 10.
+
 
 __all__ = ["OutlierDetection", "flag_cr", "abs_deriv"]
 
@@ -181,13 +190,29 @@ class OutlierDetection:
         self._convert_inputs()
         self.build_suffix(**self.outlierpars)
 
+        # The blot reuses the pixel maps computed to drizzle the images
+        if not self.outlierpars.get('in_memory', True):
+            # The pixel maps are kept on disk too, where the blot, possibly
+            # in other processes, finds them
+            with tempfile.TemporaryDirectory(prefix='outlier_detection_') as tmpdir:
+                with pixmap_cache.active(tmpdir):
+                    self._do_detection(tmpdir)
+        else:
+            with pixmap_cache.active():
+                self._do_detection()
+
+    def _do_detection(self, tmpdir=None):
+        """Run the detection, keeping resampled images in `tmpdir` if given"""
         pars = self.outlierpars
         save_intermediate_results = pars['save_intermediate_results']
         if pars['resample_data']:
             # Start by creating resampled/mosaic images for
             # each group of exposures
+            # Without in_memory, each resampled image is moved to disk as
+            # soon as it is drizzled
             sdriz = resample.ResampleData(self.input_models, single=True,
-                                          blendheaders=False, **pars)
+                                          blendheaders=False,
+                                          memmap_dir=tmpdir, **pars)
             sdriz.do_drizzle()
             drizzled_models = sdriz.output_models
             for model in drizzled_models:
@@ -196,7 +221,7 @@ class OutlierDetection:
                     model_output_path = self.make_output_path(
                         basepath=model.meta.filename,
                         suffix='outlier_i2d')
-                    model.save(model_output_path)
+                    background_writer.save(model, model_output_path)
         else:
             drizzled_models = self.input_models
             for i in range(len(self.input_models)):
@@ -222,7 +247,7 @@ class OutlierDetection:
             log.info("Writing out MEDIAN image to: {}".format(
                 median_output_path
             ))
-            median_model.save(median_output_path)
+            background_writer.save(median_model, median_output_path)
 
         if pars['resample_data']:
             # Blot the median image back to recreate each input image specified
@@ -235,7 +260,7 @@ class OutlierDetection:
                         basename=model.meta.filename,
                         suffix='blot'
                     )
-                    model.save(model_path)
+                    background_writer.save(model, model_path)
         else:
             # Median image will serve as blot image
             blot_models = datamodels.ModelContainer()
@@ -259,43 +284,42 @@ class OutlierDetection:
         following ways:
         - type of combination: fixed to 'median'
         - 'minmed' not implemented as an option
-        """
-        resampled_sci = [i.data.copy() for i in resampled_models]
-        resampled_weight = [i.wht for i in resampled_models]
 
+        The median is computed over sections of rows of the stack of
+        resampled images at a time, so that only the median image and one
+        section of the stack are held in memory in addition to the
+        resampled images themselves. The size of the sections is set
+        by the ``median_buffer_size`` parameter, in MB.
+        """
         maskpt = self.outlierpars.get('maskpt', 0.7)
-
-        # Create a mask for each input image, masking out areas where there is
-        # no data or the data has very low weight
-        badmasks = []
-        for weight in resampled_weight:
-            # Create boolean masks for weight being zero or NaN
-            mask_zero_weight = np.equal(weight, 0.)
-            mask_nans = np.isnan(weight)
-            # Combine the masks
-            weight_masked = np.ma.array(weight, mask=np.logical_or(
-                mask_zero_weight, mask_nans))
-            # Sigma-clip the unmasked data
-            weight_masked = sigma_clip(weight_masked, sigma=3, maxiters=5)
-            mean_weight = np.mean(weight_masked)
-            # Mask pixels where weight falls below maskpt percent
-            weight_threshold = mean_weight * maskpt
-            badmask = np.less(weight, weight_threshold)
-            log.debug("Percentage of pixels with low weight: {}".format(
-                np.sum(badmask) / len(weight.flat) * 100))
-            badmasks.append(badmask)
-
-        # Fill resampled_sci array with nan's where mask values are True
-        #pdb.set_trace()
-        for f1, f2 in zip(resampled_sci, badmasks):
-            for elem1, elem2 in zip(f1, f2):
-                elem1[elem2] = np.nan
-
-        # For a of stack of images with "bad" data replaced with Nan
-        # use np.nanmedian to compute the median.
-        log.info("Generating median from {} images".format(len(resampled_sci)))
-        median_image = np.nanmedian(resampled_sci, axis = 0)
-        del resampled_sci
+        buffer_size = self.outlierpars.get('median_buffer_size')
+        if buffer_size is None:
+            buffer_size = MEDIAN_BUFFER_SIZE
+
+        # Mask out areas where there is no data or the data has very low
+        # weight, one image at a time
+        weight_thresholds = [weight_threshold(model.wht, maskpt)
+                             for model in resampled_models]
+
+        shape = resampled_models[0].data.shape
+        nrows = rows_per_section(len(resampled_models), shape, buffer_size)
+        log.info("Generating median from {} images in sections of {} rows".format(
+            len(resampled_models), nrows))
+
+        median_image = np.empty(shape, dtype=np.float32)
+        stack = np.empty((len(resampled_models), nrows) + shape[1:],
+                         dtype=np.float32)
+        for row1 in range(0, shape[0], nrows):
+            row2 = min(row1 + nrows, shape[0])
+            section = stack[:, :row2 - row1]
+            for model, threshold, plane in zip(resampled_models,
+                                               weight_thresholds, section):
+                plane[...] = model.data[row1:row2]
+                plane[model.wht[row1:row2] < threshold] = np.nan
+
+            # For a stack of images with "bad" data replaced with NaN
+            # use np.nanmedian to compute the median.
+            median_image[row1:row2] = np.nanmedian(section, axis=0)
 
         return median_image
 
@@ -303,13 +327,22 @@ class OutlierDetection:
         """Blot resampled median image back to the detector images."""
         interp = self.outlierpars.get('interp', 'poly5')
         sinscl = self.outlierpars.get('sinscl', 1.0)
+        pixmap_step = self.outlierpars.get('pixmap_step', 1)
 
         # Initialize container for output blot images
         blot_models = datamodels.ModelContainer()
 
         log.info("Blotting median...")
 
-        for model in self.input_models:
+        # The input images are blotted independently, possibly in parallel
+        num_processes = compute_num_processes(
+            self.outlierpars.get('maximum_cores', 'none'))
+        blotted_data = map_forked(
+            partial(gwcs_blot, median_model, interp=interp, sinscl=sinscl,
+                    pixmap_step=pixmap_step),
+            self.input_models, num_processes, label='blotted image')
+
+        for model, data in zip(self.input_models, blotted_data):
             blotted_median = model.copy()
             blot_root = '_'.join(model.meta.filename.replace(
                 '.fits', '').split('_')[:-1])
@@ -318,9 +351,8 @@ class OutlierDetection:
             # clean out extra data not related to blot result
             blotted_median.err = None
             blotted_median.dq = None
-            # apply blot to re-create model.data from median image
-            blotted_median.data = gwcs_blot(median_model, model, interp=interp,
-                                                     sinscl=sinscl)
+            # re-create model.data from the blotted median image
+            blotted_median.data = data
             blot_models.append(blotted_median)
 
         return blot_models
@@ -358,6 +390,63 @@ class OutlierDetection:
                 self.inputs.dq[i, :, :] = self.input_models[i].dq
 
 
+def weight_threshold(weight, maskpt):
+    """Compute the weight below which resampled pixels are left out of the median.
+
+    Parameters
+    ----------
+    weight : numpy.ndarray
+        The weight image of a resampled image.
+
+    maskpt : float
+        Fraction of the sigma-clipped mean weight below which pixels
+        are rejected.
+
+    Returns
+    -------
+    threshold : float
+        The weight threshold.
+    """
+    # Create boolean masks for weight being zero or NaN
+    mask_zero_weight = np.equal(weight, 0.)
+    mask_nans = np.isnan(weight)
+    # Combine the masks
+    weight_masked = np.ma.array(weight, mask=np.logical_or(
+        mask_zero_weight, mask_nans))
+    # Sigma-clip the unmasked data
+    weight_masked = sigma_clip(weight_masked, sigma=3, maxiters=5)
+    mean_weight = np.mean(weight_masked)
+    # Mask pixels where weight falls below maskpt percent
+    threshold = mean_weight * maskpt
+    log.debug("Percentage of pixels with low weight: {}".format(
+        np.sum(np.less(weight, threshold)) / weight.size * 100))
+    return threshold
+
+
+def rows_per_section(nimages, shape, buffer_size):
+    """Number of rows of a stack of images that fit in a buffer.
+
+    Parameters
+    ----------
+    nimages : int
+        Number of images in the stack.
+
+    shape : tuple of int
+        Shape of each image.
+
+    buffer_size : float
+        Size of the buffer, in MB.
+
+    Returns
+    -------
+    nrows : int
+        Number of rows, between 1 and the number of rows of the images.
+    """
+    row_bytes = nimages * int(np.prod(shape[1:])) * np.dtype(np.float32).itemsize
+    nrows = int(buffer_size * 1024 * 1024 // max(row_bytes, 1))
+    return min(max(nrows, 1), shape[0])
+
+
 def flag_cr(sci_image, blot_image, **pars):
     """Masks outliers in science image by updating DQ in-place
 
@@ -526,7 +615,8 @@ def _absolute_subtract(array, tmp, out):
     return tmp, out
 
 
-def gwcs_blot(median_model, blot_img, interp='poly5', sinscl=1.0):
+def gwcs_blot(median_model, blot_img, interp='poly5', sinscl=1.0,
+              pixmap_step=1):
     """
     Resample the output/resampled image to recreate an input image based on
     the input image's world coordinate system
@@ -548,11 +638,16 @@ def gwcs_blot(median_model, blot_img, interp='poly5', sinscl=1.0):
 
     sincscl : float, optional
         The scaling factor for sinc interpolation.
+
+    pixmap_step : int, optional
+        Spacing, in pixels, of the grid on which the WCS transforms are
+        evaluated to map the pixels of ``blot_img`` to the median image.
     """
     blot_wcs = blot_img.meta.wcs
 
     # Compute the mapping between the input and output pixel coordinates
-    pixmap = calc_gwcs_pixmap(blot_wcs, median_model.meta.wcs, blot_img.data.shape)
+    pixmap = calc_gwcs_pixmap(blot_wcs, median_model.meta.wcs, blot_img.data.shape,
+                              grid_step=pixmap_step)
     log.debug("Pixmap shape: {}".format(pixmap[:, :, 0].shape))
     log.debug("Sci shape: {}".format(blot_img.data.shape))
 
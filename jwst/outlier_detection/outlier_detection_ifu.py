@@ -10,6 +10,7 @@ from .outlier_detection import OutlierDetection
 from ..cube_build.cube_build_step import CubeBuildStep
 from ..cube_build import blot_cube_build
 from .. import datamodels
+from ..stpipe.background_writer import background_writer
 
 
 import logging
@@ -142,7 +143,7 @@ class OutlierDetectionIFU(OutlierDetection):
 
                 if save_intermediate_results:
                     log.info("Writing out resampled IFU cubes...")
-                    model.save(model.meta.filename)
+                    background_writer.save(model, model.meta.filename)
 
             # Initialize intermediate products used in the outlier detection
             median_model = datamodels.IFUCubeModel(
@@ -160,7 +161,7 @@ class OutlierDetectionIFU(OutlierDetection):
             if save_intermediate_results:
                 log.info("Writing out MEDIAN image to: {}".format(
                           median_model.meta.filename))
-                median_model.save(median_model.meta.filename)
+                background_writer.save(median_model, median_model.meta.filename)
 
             # Blot the median image back to recreate each input image specified
             # in the original input list/ASN/ModelContainer
@@ -174,7 +175,8 @@ class OutlierDetectionIFU(OutlierDetection):
         if save_intermediate_results:
             log.info("Writing out BLOT images...")
 
-            self.blot_models.save(
+            background_writer.save(
+                self.blot_models,
                 partial(self.make_output_path, suffix='blot')
                 )
 
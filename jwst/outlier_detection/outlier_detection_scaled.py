@@ -10,6 +10,7 @@ import astropy.units as u
 
 from .. import datamodels
 from ..resample import resample_utils
+from ..stpipe.background_writer import background_writer
 from ..tso_photometry.tso_photometry import tso_aperture_photometry
 from .outlier_detection import OutlierDetection
 
@@ -144,7 +145,7 @@ class OutlierDetectionScaled(OutlierDetection):
         if save_intermediate_results:
             log.info("Writing out MEDIAN image to: {}".format(
                      median_model.meta.filename))
-            median_model.save(median_model.meta.filename)
+            background_writer.save(median_model, median_model.meta.filename)
 
         # Scale the median image by the initial photometry (only in aperture)
         # to create equivalent of 'blot' images
@@ -169,7 +170,7 @@ class OutlierDetectionScaled(OutlierDetection):
                 )
                 return output_path
 
-            blot_models.save(make_output_path)
+            background_writer.save(blot_models, make_output_path)
 
         # Perform outlier detection using statistical comparisons between
         # each original input image and its blotted version of the median image
@@ -3,6 +3,7 @@ from functools import partial
 
 from .. import datamodels
 from ..resample import resample_spec, resample_utils
+from ..stpipe.background_writer import background_writer
 from .outlier_detection import OutlierDetection
 
 import logging
@@ -79,7 +80,7 @@ class OutlierDetectionSpec(OutlierDetection):
                 )
                 if save_intermediate_results:
                     log.info("Writing out resampled spectra...")
-                    model.save(model.meta.filename)
+                    background_writer.save(model, model.meta.filename)
         else:
             drizzled_models = self.input_models
             for i in range(len(self.input_models)):
@@ -104,7 +105,7 @@ class OutlierDetectionSpec(OutlierDetection):
         if save_intermediate_results:
             log.info("Writing out MEDIAN image to: {}".format(
                      median_model.meta.filename))
-            median_model.save(median_model.meta.filename)
+            background_writer.save(median_model, median_model.meta.filename)
 
         if pars['resample_data'] is True:
             # Blot the median image back to recreate each input image specified
@@ -112,7 +113,8 @@ class OutlierDetectionSpec(OutlierDetection):
             blot_models = self.blot_median(median_model)
             if save_intermediate_results:
                 log.info("Writing out BLOT images...")
-                blot_models.save(
+                background_writer.save(
+                    blot_models,
                     partial(self.make_output_path, suffix='blot')
                 )
         else:
@@ -62,6 +62,10 @@ class OutlierDetectionStep(Step):
         good_bits = string(default="~DO_NOT_USE")  # DQ flags to allow
         scale_detection = boolean(default=False)
         search_output_file = boolean(default=False)
+        in_memory = boolean(default=True)  # keep resampled images in memory
+        median_buffer_size = float(default=10.0)  # MB of image stack per median section
+        pixmap_step = integer(default=1, min=1)  # pixels between exact WCS evaluations
+        maximum_cores = max_cores(default='none')  # max number of processes: 'none', 'quarter', 'half', 'all' or an integer
     """
 
     def process(self, user_input):
@@ -107,6 +111,10 @@ class OutlierDetectionStep(Step):
                 'save_intermediate_results': self.save_intermediate_results,
                 'resample_data': self.resample_data,
                 'good_bits': self.good_bits,
+                'in_memory': self.in_memory,
+                'median_buffer_size': self.median_buffer_size,
+                'pixmap_step': self.pixmap_step,
+                'maximum_cores': self.maximum_cores,
                 'make_output_path': self.make_output_path,
             }
 
@@ -1,9 +1,16 @@
 import pytest
 import numpy as np
 from scipy.ndimage.filters import gaussian_filter
-
-from jwst.outlier_detection.outlier_detection import flag_cr
+from astropy import coordinates as coord
+from astropy import units as u
+from astropy.modeling import models
+from gwcs import coordinate_frames as cf
+from gwcs import wcs
+
+from jwst.outlier_detection.outlier_detection import (
+    OutlierDetection, flag_cr, rows_per_section, weight_threshold)
 from jwst import datamodels
+from jwst.resample import resample
 
 
 @pytest.fixture
@@ -54,3 +61,135 @@ def test_flag_cr_with_subtracted_background(sci_blot_image_pair):
 
     flag_cr(sci, blot)
     assert sci.dq[5, 5] > 0
+
+
+@pytest.fixture
+def resampled_models():
+    """Provide resampled images with random weights, some of them low."""
+    rng = np.random.RandomState(7)
+    shape = (23, 17)
+    models = datamodels.ModelContainer()
+    for i in range(5):
+        model = datamodels.ImageModel(shape)
+        model.data = rng.normal(10., 1., size=shape).astype(np.float32)
+        model.wht = rng.uniform(0.5, 1., size=shape).astype(np.float32)
+        model.wht[rng.uniform(size=shape) < 0.2] = 0.
+        models.append(model)
+    return models
+
+
+@pytest.mark.parametrize('buffer_size', [None, 0.001, 1e-6])
+def test_create_median(resampled_models, buffer_size):
+    """Median computed by sections matches the median of the whole stack"""
+    maskpt = 0.7
+    stack = np.array([model.data for model in resampled_models])
+    for plane, model in zip(stack, resampled_models):
+        plane[model.wht < weight_threshold(model.wht, maskpt)] = np.nan
+    expected = np.nanmedian(stack, axis=0)
+
+    detection = OutlierDetection(resampled_models, reffiles={}, maskpt=maskpt,
+                                 median_buffer_size=buffer_size)
+    median = detection.create_median(resampled_models)
+
+    assert median.dtype == np.float32
+    np.testing.assert_allclose(median, expected)
+    # The weight mask is not applied to the resampled images themselves
+    assert not np.isnan(resampled_models[0].data).any()
+
+
+def test_rows_per_section():
+    assert rows_per_section(4, (100, 256), 0.1) == 25
+    assert rows_per_section(4, (100, 256), 1e-9) == 1
+    assert rows_per_section(4, (100, 256), 1000.) == 100
+
+
+def make_tan_wcs(crval, shape, scale=0.1 / 3600):
+    """Simple tangent-plane WCS centered on the image"""
+    transform = (models.Shift(-shape[1] / 2) & models.Shift(-shape[0] / 2) |
+                 models.Scale(scale) & models.Scale(scale) |
+                 models.Pix2Sky_TAN() |
+                 models.RotateNative2Celestial(crval[0], crval[1], 180))
+    detector = cf.Frame2D(name='detector', axes_names=('x', 'y'),
+                          unit=(u.pix, u.pix))
+    sky = cf.CelestialFrame(reference_frame=coord.ICRS(), name='world')
+    return wcs.WCS([(detector, transform), (sky, None)])
+
+
+def test_blot_median_parallel():
+    """Blotting in worker processes gives the same images as serially"""
+    median = datamodels.ImageModel((60, 70))
+    median.data = np.random.RandomState(1).normal(size=(60, 70)).astype(np.float32)
+    median.meta.wcs = make_tan_wcs((10, 20), (60, 70))
+
+    input_models = datamodels.ModelContainer()
+    for i in range(4):
+        model = datamodels.ImageModel((40, 50))
+        model.meta.wcs = make_tan_wcs((10 + i * 2e-4, 20), (40, 50))
+        model.meta.filename = 'image{}_cal.fits'.format(i)
+        input_models.append(model)
+
+    blot_models = {}
+    for maximum_cores in ['none', '2']:
+        detection = OutlierDetection(input_models, reffiles={},
+                                     maximum_cores=maximum_cores)
+        detection.input_models = input_models
+        blot_models[maximum_cores] = detection.blot_median(median)
+
+    for serial, parallel in zip(blot_models['none'], blot_models['2']):
+        assert parallel.meta.filename == serial.meta.filename
+        assert np.abs(serial.data).sum() > 0
+        np.testing.assert_array_equal(parallel.data, serial.data)
+
+
+@pytest.mark.parametrize('maximum_cores', ['none', '2'])
+def test_resample_to_memmap(tmp_path, monkeypatch, maximum_cores):
+    """Resampled images moved to disk as drizzled match those in memory"""
+    # An output WCS laid out as those built by resample
+    transform = (models.Shift(-27.5) & models.Shift(-22.5) |
+                 models.AffineTransformation2D() |
+                 models.Scale(0.1 / 3600) & models.Scale(0.1 / 3600) |
+                 models.Pix2Sky_TAN() |
+                 models.RotateNative2Celestial(10, 20, 180))
+    detector = cf.Frame2D(name='detector', axes_names=('x', 'y'),
+                          unit=(u.pix, u.pix))
+    sky = cf.CelestialFrame(reference_frame=coord.ICRS(), name='world')
+    output_wcs = wcs.WCS([(detector, transform), (sky, None)])
+    output_wcs.data_size = (45, 55)
+    monkeypatch.setattr(resample.resample_utils, 'make_output_wcs',
+                        lambda input_models: output_wcs)
+
+    input_models = datamodels.ModelContainer()
+    for i in range(3):
+        model = datamodels.ImageModel((40, 50))
+        model.data = np.random.RandomState(i).normal(size=(40, 50)).astype(np.float32)
+        model.meta.wcs = make_tan_wcs((10 + i * 2e-4, 20), (40, 50))
+        model.meta.wcsinfo.cdelt1 = 0.1 / 3600
+        model.meta.exposure.exposure_time = 1.
+        model.meta.exposure.start_time = 1.
+        model.meta.exposure.end_time = 2.
+        model.meta.observation.exposure_number = str(i + 1)
+        model.meta.filename = 'image{}_cal.fits'.format(i)
+        input_models.append(model)
+
+    pars = dict(single=True, blendheaders=False, pixfrac=1., kernel='square',
+                fillval='INDEF', weight_type='exptime', good_bits=0)
+    in_memory = resample.ResampleData(input_models, **pars)
+    in_memory.do_drizzle()
+    on_disk = resample.ResampleData(input_models, memmap_dir=str(tmp_path),
+                                    maximum_cores=maximum_cores, **pars)
+    on_disk.do_drizzle()
+
+    assert len(on_disk.output_models) == len(input_models)
+    assert len(list(tmp_path.iterdir())) == 3 * len(input_models)
+    for expected, model in zip(in_memory.output_models, on_disk.output_models):
+        assert expected.wht.sum() > 0
+        assert isinstance(model.data, np.memmap)
+        assert isinstance(model.wht, np.memmap)
+        np.testing.assert_array_equal(model.data, expected.data)
+        np.testing.assert_array_equal(model.wht, expected.wht)
+        np.testing.assert_array_equal(model.con, expected.con)
+
+    # Release the memory maps
+    for model in on_disk.output_models:
+        model.close()
+        del model.data, model.wht, model.con
@@ -4,6 +4,7 @@ import math
 import numpy as np
 import logging
 from jwst.assign_wcs import nirspec, util
+from jwst.lib.parallel_utils import map_threaded
 from gwcs import wcstools
 
 log = logging.getLogger(__name__)
@@ -162,7 +163,7 @@ def calculate_pathloss_vector(pathloss_refdata,
         return wavelength, pathloss_vector, is_inside_slitlet
 
 
-def do_correction(input_model, pathloss_model):
+def do_correction(input_model, pathloss_model, slit_workers=1):
     """
     Short Summary
     -------------
@@ -176,6 +177,10 @@ def do_correction(input_model, pathloss_model):
     pathloss_model : pathloss model object
         pathloss correction data
 
+    slit_workers : int
+        Number of threads correcting the slits of NIRSpec MOS and
+        fixed-slit data
+
     Returns
     -------
     output_model : data model object
@@ -188,11 +193,9 @@ def do_correction(input_model, pathloss_model):
 
     # NIRSpec MOS data
     if exp_type == 'NRS_MSASPEC':
-        slit_number = 0
-
-        # Loop over all MOS slitlets
-        for slit in output_model.slits:
-            slit_number = slit_number + 1
+        def correct_mos_slit(numbered_slit):
+            """Apply the pathloss correction to one MOS slitlet"""
+            slit_number, slit = numbered_slit
             log.info(f'Working on slit {slit_number}')
             size = slit.data.size
 
@@ -260,23 +263,22 @@ def do_correction(input_model, pathloss_model):
                     log.warning("Cannot find matching pathloss model for slit with"
                                 f"{nshutters} shutters")
                     log.warning("Skipping pathloss correction for this slit")
-                    continue
             else:
                 log.warning(f"Slit has data size = {size}")
                 log.warning("Skipping pathloss correction for this slitlet")
 
+        # Correct all MOS slitlets, possibly concurrently
+        map_threaded(correct_mos_slit, enumerate(output_model.slits, 1),
+                     slit_workers, label='slit')
+
         # Set step status to complete
         output_model.meta.cal_step.pathloss = 'COMPLETE'
 
     # NIRSpec fixed-slit data
     elif exp_type in ['NRS_FIXEDSLIT', 'NRS_BRIGHTOBJ']:
-        slit_number = 0
-        is_inside_slit = True
-
-        # Loop over all slits contained in the input
-        for slit in output_model.slits:
+        def correct_fixed_slit(slit):
+            """Apply the pathloss correction to one fixed slit"""
             log.info(f'Working on slit {slit.name}')
-            slit_number = slit_number + 1
 
             # Get centering
             xcenter, ycenter = get_center(exp_type, slit)
@@ -339,7 +341,10 @@ def do_correction(input_model, pathloss_model):
             else:
                 log.warning(f'Cannot find matching pathloss model for {slit.name}')
                 log.warning('Skipping pathloss correction for this slit')
-                continue
+
+        # Correct all slits contained in the input, possibly concurrently
+        map_threaded(correct_fixed_slit, output_model.slits, slit_workers,
+                     label='slit')
 
         # Set step status to complete
         output_model.meta.cal_step.pathloss = 'COMPLETE'
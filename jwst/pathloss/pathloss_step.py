@@ -14,6 +14,7 @@ class PathLossStep(Step):
     """
 
     spec = """
+        slit_workers = integer(default=1, min=1)  # number of threads processing NIRSpec slits
     """
 
     reference_file_types = ['pathloss']
@@ -39,7 +40,8 @@ class PathLossStep(Step):
             pathloss_model = datamodels.PathlossModel(self.pathloss_name)
 
             # Do the pathloss correction
-            result = pathloss.do_correction(input_model, pathloss_model)
+            result = pathloss.do_correction(input_model, pathloss_model,
+                                            slit_workers=self.slit_workers)
 
             pathloss_model.close()
 
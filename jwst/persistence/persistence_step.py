@@ -38,7 +38,7 @@ class PersistenceStep(Step):
                 len(self.input_trapsfilled) == 0):
                 self.input_trapsfilled = None
 
-        output_obj = datamodels.RampModel(input).copy()
+        output_obj = datamodels.RampModel(input).writable_copy()
 
         self.trap_density_filename = self.get_reference_file(output_obj,
                                                              "trapdensity")
@@ -7,6 +7,7 @@ from astropy import units as u
 
 from .. import datamodels
 from .. datamodels import dqflags
+from .. lib.parallel_utils import map_threaded
 from .. lib.wcs_utils import get_wavelengths
 
 log = logging.getLogger(__name__)
@@ -76,7 +77,7 @@ class DataSet():
     ----------
 
     """
-    def __init__(self, model):
+    def __init__(self, model, slit_workers=1):
         """
         Short Summary
         -------------
@@ -88,6 +89,10 @@ class DataSet():
         model : `~jwst.datamodels.DataModel`
             input Data Model object
 
+        slit_workers : int
+            Number of threads calibrating the slits of NIRSpec MSA and
+            fixed-slit data
+
         """
         # Create a copy of the input model
         self.input = model.copy()
@@ -108,6 +113,7 @@ class DataSet():
         if model.meta.instrument.band is not None:
             self.band = model.meta.instrument.band.upper()
         self.slitnum = -1
+        self.slit_workers = slit_workers
 
         # Let the user know what we're working with
         log.info('Using instrument: %s', self.instrument)
@@ -151,16 +157,19 @@ class DataSet():
 
             # We have to find and apply a separate set of flux cal
             # data for each of the fixed slits in the input
-            for slit in self.input.slits:
-
+            def calibrate_slit(numbered_slit):
+                slitnum, slit = numbered_slit
                 log.info('Working on slit %s' % slit.name)
-                self.slitnum += 1
 
                 fields_to_match = {'filter': self.filter, 'grating': self.grating, 'slit': slit.name}
                 row = find_row(ftab.phot_table, fields_to_match)
                 if row is None:
-                    continue
-                self.photom_io(ftab.phot_table[row])
+                    return
+                self.photom_io(ftab.phot_table[row], slitnum=slitnum)
+
+            map_threaded(calibrate_slit, enumerate(self.input.slits),
+                         self.slit_workers, label='slit')
+            self.slitnum = len(self.input.slits) - 1
         # Bright object fixed-slit exposures use a SlitModel
         elif self.exptype == 'NRS_BRIGHTOBJ':
 
@@ -182,12 +191,15 @@ class DataSet():
             if (isinstance(self.input, datamodels.MultiSlitModel) and
                 self.exptype == 'NRS_MSASPEC'):
 
-                # Loop over the MSA slits, applying the same photom
-                # ref data to all slits
-                for slit in self.input.slits:
+                # Apply the same photom ref data to all MSA slits
+                def calibrate_slit(numbered_slit):
+                    slitnum, slit = numbered_slit
                     log.info('Working on slit %s' % slit.name)
-                    self.slitnum += 1
-                    self.photom_io(ftab.phot_table[row])
+                    self.photom_io(ftab.phot_table[row], slitnum=slitnum)
+
+                map_threaded(calibrate_slit, enumerate(self.input.slits),
+                             self.slit_workers, label='slit')
+                self.slitnum = len(self.input.slits) - 1
 
             # IFU data
             else:
@@ -563,7 +575,7 @@ class DataSet():
 
         return wave2d, area2d, dqmap
 
-    def photom_io(self, tabdata, order=None):
+    def photom_io(self, tabdata, order=None, slitnum=None):
         """
         Short Summary
         -------------
@@ -578,10 +590,17 @@ class DataSet():
         order : int
             Spectral order number
 
+        slitnum : int
+            Index of the slit to calibrate, for a MultiSlitModel.
+            Defaults to the current slit, `slitnum`.
+
         Returns
         -------
 
         """
+        if slitnum is None:
+            slitnum = self.slitnum
+
         # First get the scalar conversion factor.
         # For most modes, the scalar conversion factor in the photom reference
         # file is in units of (MJy / sr) / (DN / s), and the output from
@@ -599,7 +618,7 @@ class DataSet():
         except KeyError:
             conversion = tabdata['photmj']              # unit is MJy
             if isinstance(self.input, datamodels.MultiSlitModel):
-                slit = self.input.slits[self.slitnum]
+                slit = self.input.slits[slitnum]
                 if self.input.meta.exposure.type == 'NRS_MSASPEC':
                     srctype = slit.source_type
                 else:
@@ -630,9 +649,9 @@ class DataSet():
         # Store the conversion factor in the meta data
         log.info('PHOTMJSR value: %g', conversion)
         if isinstance(self.input, datamodels.MultiSlitModel):
-            self.input.slits[self.slitnum].meta.photometry.conversion_megajanskys = \
+            self.input.slits[slitnum].meta.photometry.conversion_megajanskys = \
                 conversion
-            self.input.slits[self.slitnum].meta.photometry.conversion_microjanskys = \
+            self.input.slits[slitnum].meta.photometry.conversion_microjanskys = \
                 conversion * MJSR_TO_UJA2
         else:
             self.input.meta.photometry.conversion_megajanskys = conversion
@@ -682,7 +701,7 @@ class DataSet():
 
             # Compute a 2-D grid of conversion factors, as a function of wavelength
             if isinstance(self.input, datamodels.MultiSlitModel):
-                wl_array = get_wavelengths(self.input.slits[self.slitnum],
+                wl_array = get_wavelengths(self.input.slits[slitnum],
                                            self.input.meta.exposure.type,
                                            order)
             else:
@@ -701,7 +720,7 @@ class DataSet():
 
         # Apply the conversion to the data and all uncertainty arrays
         if isinstance(self.input, datamodels.MultiSlitModel):
-            slit = self.input.slits[self.slitnum]
+            slit = self.input.slits[slitnum]
             slit.data *= conversion
             slit.err *= conversion
             if slit.var_poisson is not None and np.size(slit.var_poisson) > 0:
@@ -14,6 +14,10 @@ class PhotomStep(Step):
         data model
     """
 
+    spec = """
+        slit_workers = integer(default=1, min=1)  # number of threads processing NIRSpec slits
+    """
+
     reference_file_types = ['photom', 'area']
 
     def process(self, input):
@@ -47,7 +51,7 @@ class PhotomStep(Step):
             return result
 
         # Do the correction
-        phot = photom.DataSet(input_model)
+        phot = photom.DataSet(input_model, slit_workers=self.slit_workers)
         result = phot.apply_photom(phot_filename, area_filename)
 
         result.meta.cal_step.photom = 'COMPLETE'
@@ -1149,13 +1149,14 @@ def test_nirspec_bright():
     assert np.alltrue(result)
 
 
-def test_nirspec_msa():
+@pytest.mark.parametrize('slit_workers', [1, 2])
+def test_nirspec_msa(slit_workers):
     """Test calc_nirspec, MSA data"""
 
     input_model = create_input('NIRSPEC', 'NRS1', 'NRS_MSASPEC',
                                filter='F170LP', grating='G235M')
     save_input = input_model.copy()
-    ds = photom.DataSet(input_model)
+    ds = photom.DataSet(input_model, slit_workers=slit_workers)
 
     ftab = create_photom_nrs_msa(min_wl=1.0, max_wl=5.0,
                                  min_r=8.0, max_r=9.0)
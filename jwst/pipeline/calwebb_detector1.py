@@ -1,7 +1,13 @@
 #!/usr/bin/env python
+import copy
 import logging
+
+import numpy as np
+from astropy.io import fits
+
 from ..stpipe import Pipeline
 from .. import datamodels
+from ..datamodels import dqflags
 
 # step imports
 from ..group_scale import group_scale_step
@@ -38,6 +44,8 @@ class Detector1Pipeline(Pipeline):
 
     spec = """
         save_calibrated_ramp = boolean(default=False)
+        integration_block_size = integer(default=0, min=0) # number of integrations processed at a time; 0 for all
+        in_place = boolean(default=True) # let the steps modify the intermediate ramps instead of copying them
     """
 
     # Define aliases to steps
@@ -63,29 +71,156 @@ class Detector1Pipeline(Pipeline):
 
         log.info('Starting calwebb_detector1 ...')
 
-        # open the input as a RampModel
-        input = datamodels.RampModel(input)
-
         # propagate output_dir to steps that might need it
         self.dark_current.output_dir = self.output_dir
         self.ramp_fit.output_dir = self.output_dir
 
+        result, ints_model = self.process_exposure(input)
+
+        # apply the gain_scale step to the exposure-level product
+        self.gain_scale.suffix = 'gain_scale'
+        result = self.gain_scale(result)
+
+        # apply the gain scale step to the multi-integration product,
+        # if it exists, and then save it
+        if ints_model is not None:
+            self.gain_scale.suffix = 'gain_scaleints'
+            ints_model = self.gain_scale(ints_model)
+            self.save_model(ints_model, 'rateints')
+
+        # setup output_file for saving
+        self.setup_output(result)
+
+        log.info('... ending calwebb_detector1')
+
+        return result
+
+    def process_exposure(self, input):
+        """Run the steps up to and including ramp_fit on the exposure.
+
+        If `integration_block_size` is set and the exposure has more
+        integrations than that, the integrations are read and processed
+        one block at a time, and the rate products are assembled from the
+        results of the blocks.
+
+        Parameters
+        ----------
+        input : str or `~jwst.datamodels.RampModel`
+            The input exposure.
+
+        Returns
+        -------
+        result, ints_model : `~jwst.datamodels.DataModel`
+            The exposure-level product and the multi-integration product,
+            which is None if ramp fitting was skipped.
+        """
+        block_size = self.integration_block_size
+        if block_size > 0 and (self.ramp_fit.skip or self.ramp_fit.save_opt):
+            log.warning('Processing by blocks of integrations is not possible '
+                        'if ramp_fit is skipped or saves the optional fit '
+                        'results; processing all integrations at once')
+            block_size = 0
+
+        if block_size == 0:
+            return self.process_ramp(datamodels.RampModel(input))
+
+        if isinstance(input, str):
+            # read only the requested integrations from the file
+            input = fits.open(input, memmap=False)
+            nints = input['SCI'].shape[0]
+        else:
+            input = datamodels.RampModel(input)
+            nints = input.data.shape[0]
+
+        try:
+            if nints <= block_size:
+                return self.process_ramp(datamodels.RampModel(input))
+
+            rates = None
+            missing = []
+            for index, start in enumerate(range(0, nints, block_size)):
+                stop = min(start + block_size, nints)
+                log.info(f'Processing integrations {start + 1} to {stop} of {nints}')
+
+                block = read_integration_block(input, start, stop)
+                first_int = block.meta.exposure.integration_start or 1
+                block.meta.exposure.integration_start = first_int + start
+                block.meta.exposure.integration_end = first_int + stop - 1
+
+                result, ints_model = self.process_ramp(block, idx=index)
+                block.close()
+
+                if ints_model is None:
+                    # ramp_fit found no usable groups in the block
+                    missing.append((start, stop))
+                    continue
+                if rates is None:
+                    rates = IntegrationRates(nints, ints_model)
+                    rate_model, rateints_model = result, ints_model
+                else:
+                    result.close()
+                rates.add(start, ints_model)
+                if ints_model is not rateints_model:
+                    ints_model.close()
+        finally:
+            if isinstance(input, fits.HDUList):
+                input.close()
+
+        if rates is None:
+            return None, None
+        for start, stop in missing:
+            rates.dq[start:stop] = dqflags.pixel['DO_NOT_USE']
+
+        rates.to_rate(rate_model)
+        rates.to_rateints(rateints_model)
+        for model in (rate_model, rateints_model):
+            model.meta.exposure.integration_start = first_int
+            model.meta.exposure.integration_end = first_int + nints - 1
+
+        return rate_model, rateints_model
+
+    def process_ramp(self, input, idx=None):
+        """Run the steps up to and including ramp_fit on a RampModel.
+
+        Parameters
+        ----------
+        input : `~jwst.datamodels.RampModel`
+            The ramps to process.
+
+        idx : int or None
+            Index of the block of integrations, used to name the saved
+            calibrated ramps when processing by blocks.
+
+        Returns
+        -------
+        result, ints_model : `~jwst.datamodels.DataModel`
+            The products of the ramp_fit step; if it is skipped, the
+            calibrated ramps and None.
+        """
+        def run(step, model):
+            # The intermediate ramps are handed over to the step, unless
+            # they are still those of the input
+            if not self.in_place or model._instance is input._instance:
+                return step(model)
+            with model.handed_over():
+                return step(model)
+
         if input.meta.instrument.name == 'MIRI':
 
             # process MIRI exposures;
             # the steps are in a different order than NIR
             log.debug('Processing a MIRI exposure')
 
-            result = self.group_scale(input)
-            result = self.dq_init(result)
-            result = self.saturation(result)
-            result = self.ipc(result)
-            result = self.firstframe(result)
-            result = self.lastframe(result)
-            result = self.linearity(result)
-            result = self.rscd(result)
-            result = self.dark_current(result)
-            result = self.refpix(result)
+            result = run(self.group_scale, input)
+            result = run(self.dq_init, result)
+            result = run(self.saturation, result)
+            result = run(self.ipc, result)
+            result = run(self.firstframe, result)
+            result = run(self.lastframe, result)
+            result = run(self.linearity, result)
+            result = run(self.rscd, result)
+            result = run(self.dark_current, result)
+            result = run(self.refpix, result)
 
             # skip until MIRI team has figured out an algorithm
             #result = self.persistence(result)
@@ -95,26 +230,29 @@ class Detector1Pipeline(Pipeline):
             # process Near-IR exposures
             log.debug('Processing a Near-IR exposure')
 
-            result = self.group_scale(input)
-            result = self.dq_init(result)
-            result = self.saturation(result)
-            result = self.ipc(result)
-            result = self.superbias(result)
-            result = self.refpix(result)
-            result = self.linearity(result)
+            result = run(self.group_scale, input)
+            result = run(self.dq_init, result)
+            result = run(self.saturation, result)
+            result = run(self.ipc, result)
+            result = run(self.superbias, result)
+            result = run(self.refpix, result)
+            result = run(self.linearity, result)
 
             # skip persistence for NIRSpec
             if result.meta.instrument.name != 'NIRSPEC':
-                result = self.persistence(result)
+                if idx is not None and not self.persistence.skip:
+                    log.warning('The persistence trap state is not carried '
+                                'over between blocks of integrations')
+                result = run(self.persistence, result)
 
-            result = self.dark_current(result)
+            result = run(self.dark_current, result)
 
         # apply the jump step
-        result = self.jump(result)
+        result = run(self.jump, result)
 
         # save the corrected ramp data, if requested
         if self.save_calibrated_ramp:
-            self.save_model(result, 'ramp')
+            self.save_model(result, 'ramp', idx=idx)
 
         # apply the ramp_fit step
         # This explicit test on self.ramp_fit.skip is a temporary workaround
@@ -127,23 +265,7 @@ class Detector1Pipeline(Pipeline):
         else:
             result, ints_model = self.ramp_fit(result)
 
-        # apply the gain_scale step to the exposure-level product
-        self.gain_scale.suffix = 'gain_scale'
-        result = self.gain_scale(result)
-
-        # apply the gain scale step to the multi-integration product,
-        # if it exists, and then save it
-        if ints_model is not None:
-            self.gain_scale.suffix = 'gain_scaleints'
-            ints_model = self.gain_scale(ints_model)
-            self.save_model(ints_model, 'rateints')
-
-        # setup output_file for saving
-        self.setup_output(result)
-
-        log.info('... ending calwebb_detector1')
-
-        return result
+        return result, ints_model
 
     def setup_output(self, input):
         # Determine the proper file name suffix to use later
@@ -151,3 +273,150 @@ class Detector1Pipeline(Pipeline):
             self.suffix = 'rate'
         else:
             self.suffix = 'ramp'
+
+
+def read_integration_block(input, start, stop):
+    """Read a block of integrations of an exposure.
+
+    Parameters
+    ----------
+    input : `~astropy.io.fits.HDUList` or `~jwst.datamodels.RampModel`
+        The exposure. For an HDUList, only the requested integrations
+        of the per-integration arrays are read from the file.
+
+    start, stop : int
+        Range of the integrations to read.
+
+    Returns
+    -------
+    block : `~jwst.datamodels.RampModel`
+        The block of integrations. Arrays that do not have an integration
+        axis, and the tables, are those of the whole exposure.
+    """
+    if isinstance(input, fits.HDUList):
+        nints = input['SCI'].shape[0]
+        hdulist = fits.HDUList()
+        for hdu in input:
+            if isinstance(hdu, (fits.PrimaryHDU, fits.ImageHDU)) and hdu.shape:
+                # sections are read from the file with any scaling applied
+                header = hdu.header.copy()
+                for keyword in ('BZERO', 'BSCALE', 'BLANK'):
+                    header.remove(keyword, ignore_missing=True)
+                if len(hdu.shape) >= 3 and hdu.shape[0] == nints:
+                    data = hdu.section[start:stop]
+                else:
+                    data = hdu.section[...]
+                hdulist.append(type(hdu)(data=data, header=header))
+            else:
+                hdulist.append(hdu)
+        return datamodels.RampModel(hdulist)
+
+    nints = input.data.shape[0]
+    tree = {}
+    for key, value in input._instance.items():
+        if isinstance(value, np.ndarray) and value.ndim >= 3 and value.shape[0] == nints:
+            tree[key] = value[start:stop].copy()
+        else:
+            tree[key] = copy.deepcopy(value)
+    return datamodels.RampModel(tree)
+
+
+class IntegrationRates:
+    """Assemble the rate products of an exposure from blocks of integrations.
+
+    The integration-specific rates of each block are stored in the
+    multi-integration product as they arrive, and the sums needed for the
+    exposure-level rate are accumulated, so that no more than a single
+    block of ramps has to be held in memory.
+
+    The exposure-level rate is the average of the integration rates
+    weighted by their inverse variances, the same weighting that
+    ramp_fit applies over all integrations at once. The variances due to
+    Poisson noise are computed from the median rates of each block, so
+    they can differ slightly from those of the whole exposure.
+
+    Parameters
+    ----------
+    nints : int
+        Number of integrations in the exposure.
+
+    ints_model : `~jwst.datamodels.CubeModel`
+        The multi-integration product of the first block.
+    """
+
+    def __init__(self, nints, ints_model):
+        shape = (nints,) + ints_model.data.shape[1:]
+        self.has_variances = ints_model.hasattr('var_poisson')
+
+        self.data = np.zeros(shape, dtype=ints_model.data.dtype)
+        self.dq = np.zeros(shape, dtype=ints_model.dq.dtype)
+        self.err = np.zeros(shape, dtype=ints_model.err.dtype)
+        if self.has_variances:
+            self.var_poisson = np.zeros(shape, dtype=ints_model.var_poisson.dtype)
+            self.var_rnoise = np.zeros(shape, dtype=ints_model.var_rnoise.dtype)
+
+        self.sum_weights = np.zeros(shape[1:], dtype=np.float64)
+        self.sum_weighted_rates = np.zeros(shape[1:], dtype=np.float64)
+        self.sum_inv_var_poisson = np.zeros(shape[1:], dtype=np.float64)
+        self.sum_inv_var_rnoise = np.zeros(shape[1:], dtype=np.float64)
+        self.dq_all = np.zeros(shape[1:], dtype=ints_model.dq.dtype)
+
+    def add(self, start, ints_model):
+        """Add the multi-integration product of a block.
+
+        Parameters
+        ----------
+        start : int
+            Index of the first integration of the block in the exposure.
+
+        ints_model : `~jwst.datamodels.CubeModel`
+            The multi-integration product of the block.
+        """
+        stop = start + ints_model.data.shape[0]
+        self.data[start:stop] = ints_model.data
+        self.dq[start:stop] = ints_model.dq
+        self.err[start:stop] = ints_model.err
+        if self.has_variances:
+            self.var_poisson[start:stop] = ints_model.var_poisson
+            self.var_rnoise[start:stop] = ints_model.var_rnoise
+
+        # Zero variances correspond to non-existing segments
+        for integ in range(stop - start):
+            weight = _inverse(ints_model.err[integ].astype(np.float64) ** 2)
+            self.sum_weights += weight
+            self.sum_weighted_rates += weight * ints_model.data[integ]
+            if self.has_variances:
+                self.sum_inv_var_poisson += _inverse(ints_model.var_poisson[integ])
+                self.sum_inv_var_rnoise += _inverse(ints_model.var_rnoise[integ])
+            self.dq_all |= ints_model.dq[integ]
+
+    def to_rate(self, model):
+        """Store the exposure-level rates in `model`"""
+        model.data = (self.sum_weighted_rates * _inverse(self.sum_weights)).astype(np.float32)
+        model.dq = self.dq_all.astype(np.uint32)
+        if self.has_variances:
+            var_poisson = _inverse(self.sum_inv_var_poisson)
+            var_rnoise = _inverse(self.sum_inv_var_rnoise)
+            model.var_poisson = var_poisson.astype(np.float32)
+            model.var_rnoise = var_rnoise.astype(np.float32)
+            model.err = np.sqrt(var_poisson + var_rnoise).astype(np.float32)
+        else:
+            model.err = np.sqrt(_inverse(self.sum_weights)).astype(np.float32)
+
+    def to_rateints(self, model):
+        """Store the integration-specific rates of all blocks in `model`"""
+        model.data = self.data
+        model.dq = self.dq
+        model.err = self.err
+        if self.has_variances:
+            model.var_poisson = self.var_poisson
+            model.var_rnoise = self.var_rnoise
+
+
+def _inverse(values):
+    """Inverse of `values`, with 0 where the values are not positive"""
+    values = np.asarray(values, dtype=np.float64)
+    inverse = np.zeros_like(values)
+    positive = values > 0
+    inverse[positive] = 1. / values[positive]
+    return inverse
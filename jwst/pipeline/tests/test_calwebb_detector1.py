@@ -0,0 +1,159 @@
+"""Test the processing of exposures by calwebb_detector1"""
+import numpy as np
+from astropy.io import fits
+import pytest
+
+from jwst.datamodels import RampModel, GainModel, ReadnoiseModel, DarkMIRIModel
+from jwst.pipeline.calwebb_detector1 import (Detector1Pipeline, IntegrationRates,
+                                              read_integration_block)
+from jwst.ramp_fitting.ramp_fit import ramp_fit
+from jwst.stpipe import crds_client
+
+
+def make_ramp(nints=5, ngroups=6, nrows=8, ncols=9):
+    """Ramps with a different constant slope in each pixel"""
+    rng = np.random.RandomState(42)
+    slopes = rng.uniform(1., 50., size=(nrows, ncols))
+    data = np.zeros((nints, ngroups, nrows, ncols), dtype=np.float32)
+    data[...] = np.arange(ngroups)[:, np.newaxis, np.newaxis] * slopes
+    data += rng.normal(scale=0.1, size=data.shape)
+
+    model = RampModel(data=data)
+    model.zeroframe = data[:, 0].copy()
+    model.meta.instrument.name = 'MIRI'
+    model.meta.instrument.detector = 'MIRIMAGE'
+    model.meta.exposure.type = 'MIR_IMAGE'
+    model.meta.exposure.nints = nints
+    model.meta.exposure.ngroups = ngroups
+    model.meta.exposure.nframes = 1
+    model.meta.exposure.groupgap = 0
+    model.meta.exposure.drop_frames1 = 0
+    model.meta.exposure.frame_time = 1.
+    model.meta.exposure.group_time = 1.
+    model.meta.subarray.name = 'FULL'
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.ystart = 1
+    model.meta.subarray.xsize = ncols
+    model.meta.subarray.ysize = nrows
+    return model
+
+
+@pytest.mark.parametrize('from_file', [False, True])
+def test_read_integration_block(tmp_path, from_file):
+    model = make_ramp()
+    model.pixeldq[2, 3] = 4
+
+    if from_file:
+        path = str(tmp_path / 'test_uncal.fits')
+        model.save(path)
+        input = fits.open(path, memmap=False)
+    else:
+        input = model
+
+    block = read_integration_block(input, 1, 3)
+
+    np.testing.assert_array_equal(block.data, model.data[1:3])
+    np.testing.assert_array_equal(block.groupdq, model.groupdq[1:3])
+    np.testing.assert_array_equal(block.zeroframe, model.zeroframe[1:3])
+    np.testing.assert_array_equal(block.pixeldq, model.pixeldq)
+    assert block.meta.instrument.name == 'MIRI'
+    if from_file:
+        assert block.meta.filename == 'test_uncal.fits'
+        input.close()
+
+
+def test_integration_rates_match_whole_exposure():
+    model = make_ramp()
+    nints, _, nrows, ncols = model.data.shape
+    gain = GainModel(data=np.full((nrows, ncols), 2., dtype=np.float32))
+    readnoise = ReadnoiseModel(data=np.full((nrows, ncols), 5., dtype=np.float32))
+    for ref in (gain, readnoise):
+        ref.meta.subarray.xstart = 1
+        ref.meta.subarray.ystart = 1
+        ref.meta.subarray.xsize = ncols
+        ref.meta.subarray.ysize = nrows
+
+    rate, rateints, _, _ = ramp_fit(model, 512, False, readnoise, gain,
+                                    'OLS', 'optimal', 'none')
+
+    rates = None
+    for start in range(0, nints, 2):
+        block = read_integration_block(model, start, min(start + 2, nints))
+        block_rate, block_rateints, _, _ = ramp_fit(
+            block, 512, False, readnoise, gain, 'OLS', 'optimal', 'none')
+        if rates is None:
+            rates = IntegrationRates(nints, block_rateints)
+            rate_model, rateints_model = block_rate, block_rateints
+        rates.add(start, block_rateints)
+    rates.to_rate(rate_model)
+    rates.to_rateints(rateints_model)
+
+    # The Poisson variances are based on the median rates of each block
+    for name, rtol in [('data', 1e-6), ('dq', 0), ('var_rnoise', 1e-6),
+                       ('err', 1e-2), ('var_poisson', 2e-2)]:
+        np.testing.assert_allclose(getattr(rateints_model, name),
+                                   getattr(rateints, name), rtol=rtol)
+        np.testing.assert_allclose(getattr(rate_model, name),
+                                   getattr(rate, name), rtol=max(rtol, 1e-3))
+
+
+@pytest.mark.parametrize('in_place, ncopies', [(True, 1), (False, 2)])
+def test_in_place(monkeypatch, in_place, ncopies):
+    """Only the input ramps are copied when the steps work in place"""
+    model = make_ramp()
+    model.meta.exposure.readpatt = 'FAST'
+    steps = {name: {'skip': name not in ('firstframe', 'lastframe')}
+             for name in Detector1Pipeline.step_defs}
+
+    copies = []
+    copy = RampModel.copy
+
+    def count_copies(self, memo=None):
+        copies.append(self)
+        return copy(self, memo)
+
+    monkeypatch.setattr(RampModel, 'copy', count_copies)
+    result = Detector1Pipeline(steps=steps, in_place=in_place).run(model)
+
+    assert len(copies) == ncopies
+    assert result.meta.cal_step.firstframe == 'COMPLETE'
+    assert result.meta.cal_step.lastframe == 'COMPLETE'
+    assert np.all(result.groupdq[:, [0, -1]] != 0)
+    assert np.all(model.groupdq == 0)
+
+
+def test_integration_blocks_match_whole_exposure(monkeypatch):
+    """MIRI integration-dependent darks are applied alike to blocks"""
+    monkeypatch.setattr(crds_client, 'get_context_used', lambda telescope: None)
+    model = make_ramp()
+    nints, ngroups, nrows, ncols = model.data.shape
+    gain = GainModel(data=np.full((nrows, ncols), 2., dtype=np.float32))
+    readnoise = ReadnoiseModel(data=np.full((nrows, ncols), 5., dtype=np.float32))
+    dark = DarkMIRIModel(data=np.zeros((2, ngroups, nrows, ncols), dtype=np.float32))
+    dark.data[0] = np.arange(ngroups)[:, np.newaxis, np.newaxis] * 0.3
+    dark.data[1] = np.arange(ngroups)[:, np.newaxis, np.newaxis] * 0.7
+    dark.meta.exposure.nframes = 1
+    dark.meta.exposure.groupgap = 0
+    for ref in (gain, readnoise, dark):
+        ref.meta.instrument.name = 'MIRI'
+        ref.meta.subarray.xstart = 1
+        ref.meta.subarray.ystart = 1
+        ref.meta.subarray.xsize = ncols
+        ref.meta.subarray.ysize = nrows
+
+    def run(block_size):
+        steps = {name: {'skip': name not in ('dark_current', 'ramp_fit')}
+                 for name in Detector1Pipeline.step_defs}
+        steps['dark_current']['override_dark'] = dark
+        steps['ramp_fit'].update(override_gain=gain, override_readnoise=readnoise)
+        pipeline = Detector1Pipeline(steps=steps,
+                                     integration_block_size=block_size)
+        return pipeline.process_exposure(model.copy())
+
+    rate, rateints = run(0)
+    block_rate, block_rateints = run(2)
+
+    np.testing.assert_allclose(block_rateints.data, rateints.data, rtol=1e-6)
+    # The exposure rates are weighted by the median rates of each block
+    np.testing.assert_allclose(block_rate.data, rate.data, rtol=2e-3)
+    np.testing.assert_array_equal(block_rateints.dq, rateints.dq)
@@ -26,6 +26,11 @@ HUGE_FOR_LOW_WEIGHT = 1.e20
 # zero or negative.
 FIT_MUST_BE_POSITIVE = 1.e10
 
+# This is the memory, in bytes, of the stack of covariance matrices that
+# gls_fit solves at one time.  Pixels with the same number of cosmic rays
+# are fit in batches of this size.
+BATCH_MEMORY = 64 * 1024 * 1024
+
 
 def determine_slope(data_sect, input_var_sect,
                     gdq_sect, readnoise_sect, gain_sect,
@@ -186,6 +191,11 @@ def determine_slope(data_sect, input_var_sect,
 
     use_extra_terms = True
 
+    # Pixels still to be fit.  After the first iteration, pixels whose
+    # slope has converged keep their fit and are not fit again.
+    active = None
+    fit = None
+
     iter = 0
     done = False
     if NUM_ITER_NO_EXTRA_TERMS <= 0:
@@ -194,14 +204,19 @@ def determine_slope(data_sect, input_var_sect,
     else:
         temp_use_extra_terms = False
     while not done:
+        new_fit = compute_slope(data_sect, input_var_sect,
+                                gdq_sect, readnoise_sect, gain_sect,
+                                prev_fit, prev_slope_sect,
+                                frame_time, group_time, nframes_used,
+                                max_num_cr, saturated_flag, jump_flag,
+                                temp_use_extra_terms, active=active)
+        if fit is None:
+            fit = new_fit
+        else:
+            for fit_sect, new_fit_sect in zip(fit, new_fit):
+                fit_sect[active] = new_fit_sect[active]
         (intercept_sect, int_var_sect, slope_sect, slope_var_sect,
-         cr_sect, cr_var_sect) = \
-                compute_slope(data_sect, input_var_sect,
-                              gdq_sect, readnoise_sect, gain_sect,
-                              prev_fit, prev_slope_sect,
-                              frame_time, group_time, nframes_used,
-                              max_num_cr, saturated_flag, jump_flag,
-                              temp_use_extra_terms)
+         cr_sect, cr_var_sect) = fit
         iter += 1
         if iter == NUM_ITER_NO_EXTRA_TERMS:
             temp_use_extra_terms = use_extra_terms
@@ -216,6 +231,8 @@ def determine_slope(data_sect, input_var_sect,
             max_slope_diff = np.abs(slope_diff).max()
             if iter >= MIN_ITER and max_slope_diff < slope_diff_cutoff:
                 done = True
+            if iter >= MIN_ITER:
+                active = np.abs(slope_diff) >= slope_diff_cutoff
             current_fit = evaluate_fit(intercept_sect, slope_sect, cr_sect,
                                        frame_time, group_time,
                                        gdq_sect, jump_flag)
@@ -329,7 +346,7 @@ def compute_slope(data_sect, input_var_sect,
                   prev_fit, prev_slope_sect,
                   frame_time, group_time, nframes_used,
                   max_num_cr, saturated_flag, jump_flag,
-                  use_extra_terms):
+                  use_extra_terms, active=None):
     """Set up the call to fit a slope to ramp data.
 
     This loops over the number of cosmic rays (jumps).  That is, all the
@@ -392,6 +409,10 @@ def compute_slope(data_sect, input_var_sect,
         covariance matrix.
         See JWST-STScI-003193.pdf
 
+    active: 2-D ndarray of bool, shape (ny, nx), or None
+        The pixels to fit.  The results are zero for other pixels.  If
+        None, all pixels are fit.
+
     Returns
     -------
     tuple:  (intercept_sect, int_var_sect, slope_sect, slope_var_sect,
@@ -474,61 +495,56 @@ def compute_slope(data_sect, input_var_sect,
         slope_sect[one_group_mask] = data_sect[0, one_group_mask] / group_time
     del one_group_mask
 
+    if active is not None:
+        sum_flagged[~active] = -1
+
     # Fit slopes for all pixels that have no cosmic ray hits anywhere in
     # the ramp, then fit slopes with one CR hit, then with two, etc.
+    # All the pixels with the same number of CR hits have design and
+    # covariance matrices of the same shape, so they are fit together, as
+    # stacks of matrices, in batches limited by BATCH_MEMORY.
+    ngroups = len(data_sect)
+    batch_size = max(1, BATCH_MEMORY // (8 * ngroups * ngroups))
     for num_cr in range(max_num_cr + 1):
-        ngroups = len(data_sect)
-        ncr_mask = (sum_flagged == num_cr)
-        # Number of detector pixels flagged with num_cr CRs within the ramp.
-        nz = ncr_mask.sum(dtype=np.int32)
-        if nz <= 0:
-            continue
-
-        # ramp_data will be a ramp with a 1-D array of pixels copied out
-        # of data_sect.
-        ramp_data = np.empty((ngroups, nz), dtype=data_sect.dtype)
-        input_var_data = np.empty((ngroups, nz), dtype=data_sect.dtype)
-        prev_fit_data = np.empty((ngroups, nz), dtype=prev_fit.dtype)
-        prev_slope_data = np.empty(nz, dtype=prev_slope_sect.dtype)
-        prev_slope_data[:] = prev_slope_sect[ncr_mask]
-        readnoise = np.empty(nz, dtype=readnoise_sect.dtype)
-        readnoise[:] = readnoise_sect[ncr_mask]
-        if gain_sect is None:
-            gain = None
-        else:
-            gain = np.empty(nz, dtype=gain_sect.dtype)
-            gain[:] = gain_sect[ncr_mask]
-        cr_flagged_2d = np.empty((ngroups, nz), dtype=cr_flagged.dtype)
-        saturated_data = np.empty((ngroups, nz), dtype=prev_fit.dtype)
-        for k in range(ngroups):
-            ramp_data[k] = data_sect[k][ncr_mask]
-            input_var_data[k] = input_var_sect[k][ncr_mask]
-            prev_fit_data[k] = prev_fit[k][ncr_mask]
-            cr_flagged_2d[k] = cr_flagged[k][ncr_mask]
-            # This is for clobbering saturated pixels.
-            saturated_data[k] = saturated[k][ncr_mask]
-
-        (result, variances) = \
-                gls_fit(ramp_data,
-                        prev_fit_data, prev_slope_data,
-                        readnoise, gain,
-                        frame_time, group_time, nframes_used,
-                        num_cr, cr_flagged_2d, saturated_data)
-        # Copy the intercept, slope, and cosmic-ray amplitudes and their
-        # variances to the arrays to be returned.
-        # ncr_mask is a mask array that is True for each pixel that has the
-        # current number (num_cr) of cosmic rays.  Thus, the output arrays
-        # are being populated here in sets, a different set of pixels with
-        # each iteration of this loop.
-        intercept_sect[ncr_mask] = result[:, 0].copy()
-        int_var_sect[ncr_mask] = variances[:, 0].copy()
-        slope_sect[ncr_mask] = result[:, 1].copy()
-        slope_var_sect[ncr_mask] = variances[:, 1].copy()
-        # In this loop, i is just an index.  cr_sect is populated for
-        # number of cosmic rays = 1 to num_cr, inclusive.
-        for i in range(num_cr):
-            cr_sect[ncr_mask, i] = result[:, 2 + i].copy()
-            cr_var_sect[ncr_mask, i] = variances[:, 2 + i].copy()
+        # ncr_y, ncr_x are the pixels with num_cr CRs within the ramp.
+        ncr_y, ncr_x = np.nonzero(sum_flagged == num_cr)
+        nz = len(ncr_y)
+        for start in range(0, nz, batch_size):
+            y = ncr_y[start:start + batch_size]
+            x = ncr_x[start:start + batch_size]
+
+            # ramp_data will be a ramp with a 1-D array of pixels copied
+            # out of data_sect.  saturated_data is for clobbering
+            # saturated pixels.
+            ramp_data = data_sect[:, y, x]
+            prev_fit_data = prev_fit[:, y, x]
+            prev_slope_data = prev_slope_sect[y, x]
+            readnoise = readnoise_sect[y, x]
+            if gain_sect is None:
+                gain = None
+            else:
+                gain = gain_sect[y, x]
+            cr_flagged_2d = cr_flagged[:, y, x]
+            saturated_data = saturated[:, y, x]
+
+            (result, variances) = \
+                    gls_fit(ramp_data,
+                            prev_fit_data, prev_slope_data,
+                            readnoise, gain,
+                            frame_time, group_time, nframes_used,
+                            num_cr, cr_flagged_2d, saturated_data)
+            # Copy the intercept, slope, and cosmic-ray amplitudes and
+            # their variances to the arrays to be returned.  The output
+            # arrays are being populated here in sets, a different set of
+            # pixels with each batch of each number of cosmic rays.
+            intercept_sect[y, x] = result[:, 0]
+            int_var_sect[y, x] = variances[:, 0]
+            slope_sect[y, x] = result[:, 1]
+            slope_var_sect[y, x] = variances[:, 1]
+            # cr_sect is populated for number of cosmic rays = 1 to num_cr,
+            # inclusive.
+            cr_sect[y, x, :num_cr] = result[:, 2:]
+            cr_var_sect[y, x, :num_cr] = variances[:, 2:]
 
     return (intercept_sect, int_var_sect, slope_sect, slope_var_sect,
             cr_sect, cr_var_sect)
@@ -637,44 +653,32 @@ def gls_fit(ramp_data,
                  frame_time * (M + 1.) / 2.
 
     if num_cr > 0:
+        # The column for the n-th cosmic ray is 1 from the group where
+        # the cumulative number of cosmic rays reaches n.
         sum_crs = cr_flagged_2d.cumsum(axis=0)
-        for k in range(ngroups):
-            s = slice(k, ngroups)
-            for n in range(1, num_cr + 1):
-                temp = np.where(np.logical_and(cr_flagged_2d[k] == 1,
-                                               sum_crs[k] == n))
-                if len(temp[0]) > 0:
-                    index = (temp[0], s, n + 1)
-                    x[index] = 1
-        del temp, index
+        for n in range(1, num_cr + 1):
+            x[:, :, n + 1] = np.transpose(sum_crs >= n, (1, 0))
 
     y = np.transpose(ramp_data, (1, 0)).reshape((nz, ngroups, 1))
 
     # ramp_cov is an array of nz matrices, each ngroups x ngroups.
     # each matrix gives the covariance of that pixel's ramp data
-    ramp_cov = np.ones((nz, ngroups, ngroups), dtype=np.float64)
-
+    #
     # Use the previous fit to the data to populate the covariance matrix,
-    # for each of the nz pixels.  prev_fit_data has shape (ngroups, nz),
-    # similar to the ramp data, but we want the nz axis to be the first
-    # (we're constructing an array of nz matrix equations), so transpose
-    # prev_fit_data.
-    prev_fit_T = np.transpose(prev_fit_data, (1, 0))
-    for k in range(ngroups):
-        # Populate the upper right, row by row.
-        ramp_cov[:, k, k:ngroups] = prev_fit_T[:, k:k + 1]
-        # Populate the lower left, column by column.
-        ramp_cov[:, k:ngroups, k] = prev_fit_T[:, k:k + 1]
-        # Give saturated pixels a very high high variance (hence a low weight)
-        ramp_cov[:, k, k] += saturated_data[k, :]
+    # for each of the nz pixels.  Element (i, j) of a matrix is the
+    # previous fit at group min(i, j).  prev_fit_data has shape
+    # (ngroups, nz), similar to the ramp data, but we want the nz axis to
+    # be the first (we're constructing an array of nz matrix equations),
+    # so transpose prev_fit_data.
+    prev_fit_T = np.transpose(prev_fit_data, (1, 0)).astype(np.float64)
+    groups = np.arange(ngroups)
+    ramp_cov = prev_fit_T[:, np.minimum.outer(groups, groups)]
     del prev_fit_T
 
-    # I is 2-D, but it can broadcast to 4-D.  This is used to add terms to
-    # the diagonal of the covariance matrix.
-    I = np.identity(ngroups)
-
-    rn3d = readnoise.reshape((nz, 1, 1))
-    ramp_cov += (I * rn3d**2)
+    # Give saturated pixels a very high high variance (hence a low weight),
+    # and add the read noise to the diagonal.
+    ramp_cov[:, groups, groups] += np.transpose(saturated_data, (1, 0))
+    ramp_cov[:, groups, groups] += readnoise.reshape((nz, 1))**2
 
     # prev_slope_data must be non-negative.
     flags = prev_slope_data < 0.
@@ -688,20 +692,20 @@ def gls_fit(ramp_data,
     # shape of xT is (nz, 2 + num_cr, ngroups)
     xT = np.transpose(x, (0, 2, 1))
 
-    # shape of `ramp_invcov` is (nz, ngroups, ngroups)
-    I = I.reshape((1, ngroups, ngroups))
-    ramp_invcov = la.solve(ramp_cov, I)
-
-    del I
-
-    # temp1 = xT @ ramp_invcov
-    # np.einsum use is equivalent to matrix multiplication
-    # shape of temp1 is (nz, 2 + num_cr, ngroups)
-    temp1 = np.einsum('...ij,...jk->...ik', xT, ramp_invcov)
+    # Rather than inverting ramp_cov, solve for ramp_cov^-1 @ x and
+    # ramp_cov^-1 @ y together, for all nz matrices at once.
+    # shape of invcov_xy is (nz, ngroups, 2 + num_cr + 1)
+    invcov_xy = la.solve(ramp_cov, np.concatenate((x, y), axis=2))
+    del ramp_cov
 
     # temp_var = xT @ ramp_invcov @ x
     # shape of temp_var is (nz, 2 + num_cr, 2 + num_cr)
-    temp_var = np.einsum('...ij,...jk->...ik', temp1, x)
+    # temp2 = [xT @ ramp_invcov @ y]
+    # shape of temp2 is (nz, 2 + num_cr, 1)
+    temp = np.matmul(xT, invcov_xy)
+    temp_var = temp[:, :, :-1]
+    temp2 = temp[:, :, -1:]
+    del invcov_xy
 
     # `fitparam_cov` is an array of nz covariance matrices.
     # fitparam_cov = (xT @ ramp_invcov @ x)^-1
@@ -720,12 +724,8 @@ def gls_fit(ramp_data,
                 raise la.LinAlgError(msg2)
     del I_2
 
-    # [xT @ ramp_invcov @ y]
-    # shape of temp2 is (nz, 2 + num_cr, 1)
-    temp2 = np.einsum('...ij,...jk->...ik', temp1, y)
-
     # shape of fitparam is (nz, 2 + num_cr, 1)
-    fitparam = np.einsum('...ij,...jk->...ik', fitparam_cov, temp2)
+    fitparam = np.matmul(fitparam_cov, temp2)
     r_shape = fitparam.shape
     fitparam2d = fitparam.reshape((r_shape[0], r_shape[1]))
     del fitparam
@@ -17,11 +17,11 @@ import time
 import logging
 import numpy as np
 from multiprocessing.pool import Pool as Pool
-import multiprocessing
 
 import warnings
 from .. import datamodels
 from ..datamodels import dqflags
+from ..lib import parallel_utils
 from ..lib import pipe_utils
 
 from . import gls_fit           # used only if algorithm is "GLS"
@@ -34,7 +34,7 @@ BUFSIZE = 1024 * 300000  # 300Mb cache size for data section
 
 
 def ramp_fit(model, buffsize, save_opt, readnoise_model, gain_model,
-             algorithm, weighting, max_cores):
+             algorithm, weighting, max_cores, use_shared_memory=False):
     """
     Calculate the count rate for each pixel in all data cube sections and all
     integrations, equal to the slope for all sections (intervals between
@@ -68,10 +68,16 @@ def ramp_fit(model, buffsize, save_opt, readnoise_model, gain_model,
         'optimal' specifies that optimal weighting should be used;
          currently the only weighting supported.
 
-    max_cores : string
+    max_cores : string or int
         Number of cores to use for multiprocessing. If set to 'none' (the default), then no multiprocessing will be done.
-        The other allowable values are 'quarter', 'half', and 'all'. This is the fraction of cores to use for multi-proc.
-        The total number of cores includes the SMT cores (Hyper Threading for Intel).
+        The other allowable values are 'quarter', 'half', and 'all', the fraction of cores to use for multi-proc,
+        or an explicit number of processes. The available cores are those allowed by the CPU affinity and cgroup
+        limits of the process, and include the SMT cores (Hyper Threading for Intel).
+
+    use_shared_memory : boolean
+        If True and more than one process is used, OLS fitting places the
+        input and output arrays in shared memory and uses a persistent
+        worker pool, instead of pickling data slices to new processes.
 
     Returns
     -------
@@ -104,7 +110,7 @@ def ramp_fit(model, buffsize, save_opt, readnoise_model, gain_model,
 
         new_model, int_model, opt_model = \
                ols_ramp_fit_multi(model, buffsize, save_opt, readnoise_2d,
-               gain_2d, weighting, max_cores)
+               gain_2d, weighting, max_cores, use_shared_memory)
         gls_opt_model = None
 
     # Update data units in output models
@@ -119,10 +125,11 @@ def ramp_fit(model, buffsize, save_opt, readnoise_model, gain_model,
     return new_model, int_model, opt_model, gls_opt_model
 
 def ols_ramp_fit_multi(input_model, buffsize, save_opt, readnoise_2d, gain_2d,
-                 weighting, max_cores):
+                 weighting, max_cores, use_shared_memory=False):
     """
-       Setup the inputs to ols_ramp_fit with and without multiprocessing. The inputs will be sliced into the
-       number of cores that are being used for multiprocessing. Because the data models cannot be pickled, only
+       Setup the inputs to ols_ramp_fit with and without multiprocessing. With multiprocessing, the inputs
+       are sliced into several chunks of rows per process, which are handed out to the processes as they
+       become free. Because the data models cannot be pickled, only
        numpy arrays are passed and returned as parameters to ols_ramp_fit.
 
        Parameters
@@ -150,10 +157,16 @@ def ols_ramp_fit_multi(input_model, buffsize, save_opt, readnoise_2d, gain_2d,
            'optimal' specifies that optimal weighting should be used;
             currently the only weighting supported.
 
-       max_cores : string
+       max_cores : string or int
            Number of cores to use for multiprocessing. If set to 'none' (the default), then no multiprocessing will be done.
-           The other allowable values are 'quarter', 'half', and 'all'. This is the fraction of cores to use for multi-proc.
-           The total number of cores includes the SMT cores (Hyper Threading for Intel).
+           The other allowable values are 'quarter', 'half', and 'all', the fraction of cores to use for multi-proc,
+           or an explicit number of processes. The available cores are those allowed by the CPU affinity and cgroup
+           limits of the process, and include the SMT cores (Hyper Threading for Intel).
+
+       use_shared_memory : boolean
+           If True and more than one process is used, pass the data to a
+           persistent worker pool through shared memory (see
+           `ols_ramp_fit_shared`).
 
        Returns
        -------
@@ -173,20 +186,8 @@ def ols_ramp_fit_multi(input_model, buffsize, save_opt, readnoise_2d, gain_2d,
            exposure
        """
 
-    # Determine number of slices to use for multi-processor computations
-    if max_cores == 'none':
-        number_slices = 1
-    else:
-        num_cores = multiprocessing.cpu_count()
-        log.debug(f'Found {num_cores} possible cores to use for ramp fitting')
-        if max_cores == 'quarter':
-            number_slices = num_cores // 4 or 1
-        elif max_cores == 'half':
-            number_slices = num_cores // 2 or 1
-        elif max_cores == 'all':
-            number_slices = num_cores
-        else:
-            number_slices = 1
+    # Determine number of processes to use for multi-processor computations
+    number_slices = parallel_utils.compute_num_processes(max_cores)
 
     # Copy the int_times table for TSO data
     if pipe_utils.is_tso(input_model) and hasattr(input_model, 'int_times'):
@@ -198,6 +199,15 @@ def ols_ramp_fit_multi(input_model, buffsize, save_opt, readnoise_2d, gain_2d,
     total_cols = input_model.data.shape[3]
     number_of_integrations = input_model.data.shape[0]
 
+    # Call ramp fitting using the persistent pool and shared memory
+    if use_shared_memory and number_slices > 1:
+        if parallel_utils.has_shared_memory():
+            return ols_ramp_fit_shared(input_model, buffsize, save_opt,
+                                       readnoise_2d, gain_2d, weighting,
+                                       number_slices, int_times)
+        log.warning('Shared memory is not available, so data slices will '
+                    'be copied to the worker processes')
+
     # Call ramp fitting for the single processor (1 data slice) case
     if number_slices == 1:
         max_segments, max_CRs = calc_num_seg(input_model.groupdq, number_of_integrations)
@@ -238,114 +248,277 @@ def ols_ramp_fit_multi(input_model, buffsize, save_opt, readnoise_2d, gain_2d,
 
         return out_model, int_model, opt_model
 
-    # Call ramp fitting for multi-processor (multiple data slices) case
+    # Call ramp fitting for multi-processor (multiple row chunks) case
     else:
-        log.debug(f'number of processes being used is {number_slices}')
-        rows_per_slice = round(total_rows / number_slices)
-        pool = Pool(processes=number_slices)
-        slices = []
-
-        # Populate the first n-1 slices
-        for i in range(number_slices - 1):
-            start_row = i * rows_per_slice
-            stop_row = (i + 1) * rows_per_slice
-            readnoise_slice = readnoise_2d[start_row: stop_row, :]
-            gain_slice = gain_2d[start_row: stop_row, :]
-            data_slice = input_model.data[:,:,start_row: stop_row, :].copy()
-            err_slice = input_model.err[:, :, start_row: stop_row, :].copy()
-            groupdq_slice = input_model.groupdq[:, :, start_row: stop_row, :].copy()
-            pixeldq_slice = input_model.pixeldq[ start_row: stop_row, :].copy()
-
-            slices.insert(i, (data_slice, err_slice, groupdq_slice, pixeldq_slice, buffsize, save_opt, readnoise_slice,
-                            gain_slice, weighting,
-                            input_model.meta.instrument.name, input_model.meta.exposure.frame_time,
-                            input_model.meta.exposure.ngroups, input_model.meta.exposure.group_time,
-                            input_model.meta.exposure.groupgap, input_model.meta.exposure.nframes,
-                            input_model.meta.exposure.drop_frames1, int_times))
+        groups = exposure_groups(input_model)
+        if groups is None:
+            return None, None, None
+        data, err, groupdq, ngroups = groups
 
-        # last slice gets the rest
-        start_row = (number_slices - 1) * rows_per_slice
-        readnoise_slice = readnoise_2d[start_row: total_rows, :]
-        gain_slice = gain_2d[start_row: total_rows, :]
-        data_slice = input_model.data[:, :, start_row: total_rows, :].copy()
-        err_slice = input_model.err[:, :, start_row: total_rows, :].copy()
-        groupdq_slice = input_model.groupdq[:, :, start_row: total_rows, :].copy()
-        pixeldq_slice = input_model.pixeldq[start_row: total_rows, :].copy()
-        slices.insert(number_slices - 1, (data_slice, err_slice, groupdq_slice, pixeldq_slice, buffsize, save_opt,
-                                          readnoise_slice, gain_slice, weighting,
-                                          input_model.meta.instrument.name, input_model.meta.exposure.frame_time,
-                                          input_model.meta.exposure.ngroups, input_model.meta.exposure.group_time,
-                                          input_model.meta.exposure.groupgap, input_model.meta.exposure.nframes,
-                                          input_model.meta.exposure.drop_frames1, int_times))
-
-        # Start up the processes for each slice
-        log.debug("Creating %d processes for ramp fitting " % number_slices)
-        real_results = pool.starmap(ols_ramp_fit, slices)
-        pool.close()
-        pool.join()
-        k = 0
+        row_ranges = parallel_utils.row_chunks(total_rows, number_slices)
+        log.debug(f'number of processes being used is {number_slices}')
+        exposure = input_model.meta.exposure
+        chunks = []
+        for start_row, stop_row in row_ranges:
+            rows = slice(start_row, stop_row)
+            chunks.append((data[:, :, rows, :], err[:, :, rows, :],
+                           groupdq[:, :, rows, :], input_model.pixeldq[rows, :],
+                           buffsize, save_opt, readnoise_2d[rows, :], gain_2d[rows, :],
+                           weighting, input_model.meta.instrument.name,
+                           exposure.frame_time, ngroups, exposure.group_time,
+                           exposure.groupgap, exposure.nframes, exposure.drop_frames1,
+                           int_times, False))
+
+        # Chunks are handed out to the processes as they become free
+        log.debug("Fitting %d row chunks for ramp fitting " % len(chunks))
+        pool = parallel_utils.get_pool(number_slices)
+        real_results = parallel_utils.map_chunks(pool, ols_ramp_fit, chunks,
+                                                 label='ramp fitting row chunk')
         log.debug("All processes complete")
 
         # Create new model for the primary output.
-        actual_segments = real_results[0][20]
-        actual_CRs = real_results[0][21]
+        actual_segments = max(resultslice[20] for resultslice in real_results)
+        actual_CRs = max(resultslice[21] for resultslice in real_results)
         int_model, opt_model, out_model = create_output_models(input_model,
                             number_of_integrations, save_opt, total_cols, total_rows,
                                                                actual_segments, actual_CRs)
 
-        # iterate over the number of slices and place the results into the output models
-        for resultslice in real_results:
-            start_row = k * rows_per_slice
-            if len(real_results) == k + 1:  # last result
-                out_model.data[start_row: total_rows, :] = resultslice[0]
-                out_model.dq[start_row:total_rows, :] = resultslice[1]
-                out_model.var_poisson[start_row:total_rows, :] = resultslice[2]
-                out_model.var_rnoise[start_row:total_rows, :] = resultslice[3]
-                out_model.err[start_row:total_rows, :] = resultslice[4]
-                if resultslice[5] is not None: #Integration results exist
-                    int_model.data[: , start_row:total_rows, :] = resultslice[5]
-                    int_model.dq[:, start_row:total_rows, :] = resultslice[6]
-                    int_model.var_poisson[:, start_row:total_rows, :] = resultslice[7]
-                    int_model.var_rnoise[:, start_row:total_rows, :] = resultslice[8]
-                    int_model.err[:, start_row:total_rows, :] = resultslice[9]
-                if resultslice[11] is not None: #Optional results exist
-                    opt_model.slope[:, :, start_row:total_rows, :] = resultslice[11]
-                    opt_model.sigslope[:, :, start_row:total_rows, :] = resultslice[12]
-                    opt_model.var_poisson[:,:, start_row:total_rows, :] = resultslice[13]
-                    opt_model.var_rnoise[:, :, start_row:total_rows, :] = resultslice[14]
-                    opt_model.yint[:, :, start_row:total_rows, :] = resultslice[15]
-                    opt_model.sigyint[:, :, start_row:total_rows, :] = resultslice[16]
-                    opt_model.pedestal[:, start_row:total_rows, :] = resultslice[17]
-                    opt_model.weights[:, :, start_row:total_rows, :] = resultslice[18]
-                    opt_model.crmag[:, :, start_row:total_rows, :] = resultslice[19]
-            else: #all but last slice
-                stop_row = (k + 1) * rows_per_slice
-                out_model.data[start_row: stop_row, :] = resultslice[0]
-                out_model.dq[start_row: stop_row, :] = resultslice[1]
-                out_model.var_poisson[ start_row: stop_row, :] = resultslice[2]
-                out_model.var_rnoise[ start_row: stop_row, :] = resultslice[3]
-                out_model.err[start_row: stop_row, :] = resultslice[4]
-                if resultslice[5] is not None: #Multiple integration results exist
-                    int_model.data[:, start_row: stop_row, :] = resultslice[5]
-                    int_model.dq[:, start_row: stop_row, :] = resultslice[6]
-                    int_model.var_poisson[:, start_row: stop_row, :] = resultslice[7]
-                    int_model.var_rnoise[:, start_row: stop_row, :] = resultslice[8]
-                    int_model.err[:, start_row: stop_row, :] = resultslice[9]
-                if resultslice[11] is not None: #Optional Results exist
-                    opt_model.slope[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[11]
-                    opt_model.sigslope[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[12]
-                    opt_model.var_poisson[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[13]
-                    opt_model.var_rnoise[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[14]
-                    opt_model.yint[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[15]
-                    opt_model.sigyint[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[16]
-                    opt_model.pedestal[:, start_row: (k + 1) *rows_per_slice, :] = resultslice[17]
-                    opt_model.weights[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[18]
-                    opt_model.crmag[:, :, start_row: (k + 1) *rows_per_slice, :] = resultslice[19]
-            k = k + 1
+        # iterate over the row chunks and place the results into the output models
+        for (start_row, stop_row), resultslice in zip(row_ranges, real_results):
+            rows = slice(start_row, stop_row)
+            for name, array in zip(_OLS_IMAGE_ARRAYS, resultslice[0:5]):
+                getattr(out_model, name)[rows, :] = array
+            if resultslice[5] is not None:  # Integration results exist
+                for name, array in zip(_OLS_INT_ARRAYS, resultslice[5:10]):
+                    getattr(int_model, name[4:])[:, rows, :] = array
+            if resultslice[11] is not None:  # Optional results exist
+                place_opt_results(opt_model, rows, resultslice[11:20])
 
         return out_model, int_model, opt_model
 
 
+def exposure_groups(input_model):
+    """
+    Groups of an exposure to fit in chunks of rows.
+
+    The leading and final groups of MIRI data to exclude are chosen for the
+    whole exposure, as when it is fit in one piece, rather than for each
+    chunk; see `trim_miri_groups`.
+
+    Parameters
+    ----------
+    input_model : data model
+        input data model, assumed to be of type RampModel
+
+    Returns
+    -------
+    data, err, groupdq, ngroups : 4-D ndarray, int
+        The ramp data, error and group DQ of the groups to fit, and their
+        number; or None if the exposure cannot be fit.
+    """
+    data, err, groupdq = input_model.data, input_model.err, input_model.groupdq
+    ngroups = input_model.meta.exposure.ngroups
+    if input_model.meta.instrument.name == 'MIRI' and data.shape[1] > 1:
+        return trim_miri_groups(data, err, groupdq, ngroups)
+    return data, err, groupdq, ngroups
+
+
+# Names of the 2-D and 3-D arrays returned by ols_ramp_fit, in return order
+_OLS_IMAGE_ARRAYS = ('data', 'dq', 'var_poisson', 'var_rnoise', 'err')
+_OLS_INT_ARRAYS = ('int_data', 'int_dq', 'int_var_poisson', 'int_var_rnoise',
+                   'int_err')
+_OLS_OPT_ARRAYS = ('slope', 'sigslope', 'var_poisson', 'var_rnoise', 'yint',
+                   'sigyint', 'pedestal', 'weights', 'crmag')
+
+
+def ols_ramp_fit_shared(input_model, buffsize, save_opt, readnoise_2d, gain_2d,
+                        weighting, number_slices, int_times):
+    """
+    OLS ramp fitting with the data shared between processes.
+
+    The input cubes, read noise and gain are copied once into shared memory
+    blocks, and the primary and per-integration outputs are allocated in
+    shared memory as well. Workers of the persistent pool (see
+    `jwst.lib.parallel_utils.get_pool`) attach to these blocks and receive
+    only the row range to fit, writing their results directly into the
+    shared output arrays. Only the optional output arrays, which are sized
+    by the number of segments found in each row range, are returned to the
+    parent process.
+
+    Parameters
+    ----------
+    input_model : data model
+        input data model, assumed to be of type RampModel
+
+    buffsize : int
+        size of data section (buffer) in bytes
+
+    save_opt : boolean
+       calculate optional fitting results
+
+    readnoise_2d : 2D float32
+        The read noise of each pixel
+
+    gain_2d : 2D float32
+        The gain of each pixel
+
+    weighting : string
+        'optimal' is the only valid value
+
+    number_slices : int
+        Number of worker processes.
+
+    int_times : table or None
+        The times of the integrations of TSO data, passed on to
+        `ols_ramp_fit`.
+
+    Returns
+    -------
+    out_model, int_model, opt_model : Data Model objects
+        Same as `ols_ramp_fit_multi`; all are None if the data could not
+        be fit.
+    """
+    n_int, _, total_rows, total_cols = input_model.data.shape
+    imshape = (total_rows, total_cols)
+    row_ranges = parallel_utils.row_chunks(total_rows, number_slices)
+
+    groups = exposure_groups(input_model)
+    if groups is None:
+        return None, None, None
+    data, err, groupdq, ngroups = groups
+
+    exposure = input_model.meta.exposure
+    params = (buffsize, save_opt, weighting, input_model.meta.instrument.name,
+              exposure.frame_time, ngroups, exposure.group_time,
+              exposure.groupgap, exposure.nframes, exposure.drop_frames1,
+              int_times)
+
+    shared = {}
+    try:
+        shared['ramp_data'] = parallel_utils.SharedArray.from_array(data)
+        shared['ramp_err'] = parallel_utils.SharedArray.from_array(err)
+        shared['groupdq'] = parallel_utils.SharedArray.from_array(groupdq)
+        shared['pixeldq'] = parallel_utils.SharedArray.from_array(input_model.pixeldq)
+        shared['readnoise'] = parallel_utils.SharedArray.from_array(readnoise_2d)
+        shared['gain'] = parallel_utils.SharedArray.from_array(gain_2d)
+        for name in _OLS_IMAGE_ARRAYS:
+            dtype = np.uint32 if name == 'dq' else np.float32
+            shared[name] = parallel_utils.SharedArray(imshape, dtype)
+        for name in _OLS_INT_ARRAYS:
+            dtype = np.uint32 if name == 'int_dq' else np.float32
+            shared[name] = parallel_utils.SharedArray((n_int,) + imshape, dtype)
+        specs = {name: array.spec for name, array in shared.items()}
+
+        pool = parallel_utils.get_pool(number_slices)
+        log.debug(f'Fitting {len(row_ranges)} row chunks with {number_slices} '
+                  'processes using shared memory')
+        results = parallel_utils.map_chunks(
+            pool, _ols_ramp_fit_shared_slice,
+            [(specs, lo, hi, params) for lo, hi in row_ranges],
+            label='ramp fitting row chunk')
+
+        actual_segments = max(result[2] for result in results)
+        actual_CRs = max(result[3] for result in results)
+        int_model, opt_model, out_model = create_output_models(input_model,
+                n_int, save_opt, total_cols, total_rows, actual_segments, actual_CRs)
+
+        for name in _OLS_IMAGE_ARRAYS:
+            setattr(out_model, name, shared[name].copy_array())
+        if results[0][0]:
+            for name in _OLS_INT_ARRAYS:
+                setattr(int_model, name[4:], shared[name].copy_array())
+
+        if opt_model is not None:
+            for (lo, hi), result in zip(row_ranges, results):
+                place_opt_results(opt_model, slice(lo, hi), result[1])
+    finally:
+        for array in shared.values():
+            array.close()
+
+    return out_model, int_model, opt_model
+
+
+def place_opt_results(opt_model, rows, opt_arrays):
+    """
+    Copy the optional results for a chunk of rows into the optional output.
+
+    The number of segments and cosmic rays of a chunk may be smaller than
+    the maximum over the whole exposure, which sets the size of the
+    corresponding axis of the output arrays.
+
+    Parameters
+    ----------
+    opt_model : RampFitOutputModel
+        The optional output model for the whole exposure
+
+    rows : slice
+        The rows of the output covered by the chunk
+
+    opt_arrays : sequence of ndarray or None
+        The optional arrays returned by `ols_ramp_fit` for the chunk, in
+        return order
+    """
+    for name, array in zip(_OLS_OPT_ARRAYS, opt_arrays):
+        if array is None:
+            continue
+        if array.ndim == 4:
+            getattr(opt_model, name)[:, :array.shape[1], rows, :] = array
+        else:
+            getattr(opt_model, name)[:, rows, :] = array
+
+
+def _ols_ramp_fit_shared_slice(specs, start_row, stop_row, params):
+    """
+    Worker for `ols_ramp_fit_shared`: fit the rows [start_row, stop_row).
+
+    Returns
+    -------
+    result : tuple
+        (integration results present, optional output arrays,
+        actual_segments, actual_CRs).
+    """
+    (buffsize, save_opt, weighting, instrume, frame_time, ngroups, group_time,
+     groupgap, nframes, dropframes1, int_times) = params
+
+    handles = []
+    arrays = {}
+    try:
+        for name, spec in specs.items():
+            shm, arrays[name] = parallel_utils.attach_shared_array(spec)
+            handles.append(shm)
+
+        rows = slice(start_row, stop_row)
+        fit = ols_ramp_fit(arrays['ramp_data'][:, :, rows, :], arrays['ramp_err'][:, :, rows, :],
+                           arrays['groupdq'][:, :, rows, :], arrays['pixeldq'][rows, :],
+                           buffsize, save_opt, arrays['readnoise'][rows, :],
+                           arrays['gain'][rows, :], weighting, instrume, frame_time,
+                           ngroups, group_time, groupgap, nframes, dropframes1,
+                           int_times, trim_groups=False)
+
+        for name, array in zip(_OLS_IMAGE_ARRAYS, fit[0:5]):
+            arrays[name][rows, :] = array
+        int_present = fit[5] is not None
+        if int_present:
+            for name, array in zip(_OLS_INT_ARRAYS, fit[5:10]):
+                arrays[name][:, rows, :] = array
+        opt_arrays = [None if array is None else np.array(array)
+                      for array in fit[11:20]]
+        result = (int_present, opt_arrays, fit[20], fit[21])
+        del fit
+    finally:
+        # All views must be released before the blocks can be closed
+        arrays.clear()
+        for shm in handles:
+            try:
+                shm.close()
+            except BufferError:
+                # Views are still held by a traceback; the block is
+                # released when they are garbage collected.
+                pass
+
+    return result
+
+
 def create_output_models(input_model, number_of_integrations, save_opt, total_cols, total_rows,
                          actual_segments, actual_CRs):
     """
@@ -419,9 +592,94 @@ def create_output_models(input_model, number_of_integrations, save_opt, total_co
     return int_model, opt_model, out_model
 
 
+def trim_miri_groups(data, err, groupdq, ngroups):
+    """
+    Exclude the leading groups of a MIRI exposure, and the final group, in
+    which all pixels are flagged as DO_NOT_USE.
+
+    This is decided for the whole exposure, even when it is fit in chunks
+    of rows. Where the new first group is flagged as a jump, the flag is
+    removed from `groupdq`, in place, so that the group is fit.
+
+    Parameters
+    ----------
+    data, err, groupdq : 4-D ndarray
+        The ramp data, error and group DQ of the exposure.
+
+    ngroups : int
+        The number of groups in each integration.
+
+    Returns
+    -------
+    data, err, groupdq, ngroups : 4-D ndarray, int
+        Views of the input arrays without the excluded groups, and the
+        number of groups left; or None, if fewer than 2 groups are left.
+    """
+    first_gdq = groupdq[:,0,:,:]
+    num_bad_slices = 0 # number of initial groups that are all DO_NOT_USE
+
+    while (np.all(np.bitwise_and( first_gdq, dqflags.group['DO_NOT_USE']))):
+        num_bad_slices += 1
+        ngroups -= 1
+
+        # Check if there are remaining groups before accessing data
+        if ngroups < 1 :  # no usable data
+            log.error('1. All groups have all pixels flagged as DO_NOT_USE,')
+            log.error('  so will not process this dataset.')
+            return None
+
+        data = data[:,1:,:,:]
+        err = err[:,1:,:,:]
+        groupdq = groupdq[:,1:,:,:]
+
+        # Where the initial group of the just-truncated data is a cosmic ray,
+        #   remove the JUMP_DET flag from the group dq for those pixels so
+        #   that those groups will be included in the fit.
+        wh_cr = np.where( np.bitwise_and(groupdq[:,0,:,:],
+                          dqflags.group['JUMP_DET']) != 0 )
+        num_cr_1st = len(wh_cr[0])
+
+        for ii in range(num_cr_1st):
+            groupdq[ wh_cr[0][ii], 0, wh_cr[1][ii],
+                wh_cr[2][ii]] -=  dqflags.group['JUMP_DET']
+
+        first_gdq = groupdq[:,0,:,:]
+
+    log.info('Number of leading groups that are flagged as DO_NOT_USE: %s', num_bad_slices)
+
+    # If all groups were flagged, the final group would have been picked up
+    #   in the while loop above, ngroups would have been set to 0, and Nones
+    #   would have been returned.  If execution has gotten here, there must
+    #   be at least 1 remaining group that is not all flagged.
+    last_gdq = groupdq[:,-1,:,:]
+    if np.all(np.bitwise_and( last_gdq, dqflags.group['DO_NOT_USE'] )):
+        ngroups -= 1
+
+        # Check if there are remaining groups before accessing data
+        if ngroups < 1 :  # no usable data
+            log.error('2. All groups have all pixels flagged as DO_NOT_USE,')
+            log.error('  so will not process this dataset.')
+            return None
+
+        data = data[:,:-1,:,:]
+        err = err[:,:-1,:,:]
+        groupdq = groupdq[:,:-1,:,:]
+
+        log.info('MIRI dataset has all pixels in the final group flagged as DO_NOT_USE.')
+
+    # Next block is to satisfy github issue 1681:
+    # "MIRI FirstFrame and LastFrame minimum number of groups"
+    if (ngroups < 2):
+        log.warning('MIRI datasets require at least 2 groups/integration')
+        log.warning('(NGROUPS), so will not process this dataset.')
+        return None
+
+    return data, err, groupdq, ngroups
+
+
 def ols_ramp_fit(data, err, groupdq, inpixeldq, buffsize, save_opt, readnoise_2d, gain_2d,
                  weighting, instrume, frame_time, ngroups, group_time, groupgap, nframes,
-                 dropframes1, int_times):
+                 dropframes1, int_times, trim_groups=True):
 
     """
     Fit a ramp using ordinary least squares. Calculate the count rate for each
@@ -462,6 +720,10 @@ def ols_ramp_fit(data, err, groupdq, inpixeldq, buffsize, save_opt, readnoise_2d
         The number of frames dropped at the beginning of every integration
     int_times : None
         Not used
+    trim_groups : bool
+        Whether to exclude the leading and final groups of MIRI data that are
+        flagged as DO_NOT_USE for all pixels, with `trim_miri_groups`. False
+        if this was already decided for the whole exposure.
 
     Returns
     -------
@@ -533,71 +795,13 @@ def ols_ramp_fit(data, err, groupdq, inpixeldq, buffsize, save_opt, readnoise_2d
     #   the input model arrays will be resized appropriately. If all pixels in
     #   all groups are flagged, return None for the models.
 
-    if (instrume == 'MIRI' and nreads > 1):
-
-        first_gdq = groupdq[:,0,:,:]
-        num_bad_slices = 0 # number of initial groups that are all DO_NOT_USE
-
-        while (np.all(np.bitwise_and( first_gdq, dqflags.group['DO_NOT_USE']))):
-            num_bad_slices += 1
-            nreads -= 1
-            ngroups -= 1
-
-            # Check if there are remaining groups before accessing data
-            if ngroups < 1 :  # no usable data
-                log.error('1. All groups have all pixels flagged as DO_NOT_USE,')
-                log.error('  so will not process this dataset.')
-                return None, None, None
-
-            data = data[:,1:,:,:]
-            err = err[:,1:,:,:]
-            groupdq = groupdq[:,1:,:,:]
-
-            cubeshape = (nreads,) + imshape
-
-            # Where the initial group of the just-truncated data is a cosmic ray,
-            #   remove the JUMP_DET flag from the group dq for those pixels so
-            #   that those groups will be included in the fit.
-            wh_cr = np.where( np.bitwise_and(groupdq[:,0,:,:],
-                              dqflags.group['JUMP_DET']) != 0 )
-            num_cr_1st = len(wh_cr[0])
-
-            for ii in range(num_cr_1st):
-                groupdq[ wh_cr[0][ii], 0, wh_cr[1][ii],
-                    wh_cr[2][ii]] -=  dqflags.group['JUMP_DET']
-
-            first_gdq = groupdq[:,0,:,:]
-
-        log.info('Number of leading groups that are flagged as DO_NOT_USE: %s', num_bad_slices)
-
-        # If all groups were flagged, the final group would have been picked up
-        #   in the while loop above, ngroups would have been set to 0, and Nones
-        #   would have been returned.  If execution has gotten here, there must
-        #   be at least 1 remaining group that is not all flagged.
-        last_gdq = groupdq[:,-1,:,:]
-        if np.all(np.bitwise_and( last_gdq, dqflags.group['DO_NOT_USE'] )):
-            nreads -= 1
-            ngroups -= 1
-
-            # Check if there are remaining groups before accessing data
-            if ngroups < 1 :  # no usable data
-                log.error('2. All groups have all pixels flagged as DO_NOT_USE,')
-                log.error('  so will not process this dataset.')
-                return None, None, None
-
-            data = data[:,:-1,:,:]
-            err = err[:,:-1,:,:]
-            groupdq = groupdq[:,:-1,:,:]
-            cubeshape = (nreads,)+imshape
-
-            log.info('MIRI dataset has all pixels in the final group flagged as DO_NOT_USE.')
-
-        # Next block is to satisfy github issue 1681:
-        # "MIRI FirstFrame and LastFrame minimum number of groups"
-        if (ngroups < 2):
-            log.warning('MIRI datasets require at least 2 groups/integration')
-            log.warning('(NGROUPS), so will not process this dataset.')
+    if (instrume == 'MIRI' and nreads > 1 and trim_groups):
+        trimmed = trim_miri_groups(data, err, groupdq, ngroups)
+        if trimmed is None:
             return None, None, None
+        data, err, groupdq, ngroups = trimmed
+        nreads = data.shape[1]
+        cubeshape = (nreads,) + imshape
 
     if (ngroups == 1):
         log.warning('Dataset has NGROUPS=1, so count rates for each integration')
@@ -1200,20 +1404,9 @@ def gls_ramp_fit(input_model, buffsize, save_opt,
         Object containing optional GLS-specific ramp fitting data for the
         exposure; this will be None if save_opt is False.
     """
-    if max_cores == 'none':
-        number_slices = 1
-    else:
-        num_cores = multiprocessing.cpu_count()
-        log.info("Found %d possible cores to use for ramp fitting " % num_cores)
-        if max_cores == 'quarter':
-            number_slices = num_cores // 4 or 1
-        elif max_cores == 'half':
-            number_slices = num_cores // 2 or 1
-        elif max_cores == 'all':
-            number_slices = num_cores
-        else:
-            number_slices = 1
-        # Get needed sizes and shapes
+    number_slices = parallel_utils.compute_num_processes(max_cores)
+
+    # Get needed sizes and shapes
     nreads, npix, imshape, cubeshape, n_int, instrume, frame_time, ngroups, \
     group_time = utils.get_dataset_info(input_model)
 
@@ -23,7 +23,8 @@ class RampFitStep (Step):
         int_name = string(default='')
         save_opt = boolean(default=False) # Save optional output
         opt_name = string(default='')
-        maximum_cores = option('none', 'quarter', 'half', 'all', default='none') # max number of processes to create
+        maximum_cores = max_cores(default='none') # max number of processes: 'none', 'quarter', 'half', 'all' or an integer
+        use_shared_memory = boolean(default=False) # share data with a persistent pool of processes
     """
 
     # Prior to 04/26/17, the following were also in the spec above:
@@ -49,9 +50,11 @@ class RampFitStep (Step):
             gain_filename = self.get_reference_file(input_model, 'gain')
 
             log.info('Using READNOISE reference file: %s', readnoise_filename)
-            readnoise_model = datamodels.ReadnoiseModel(readnoise_filename)
+            readnoise_model = self.open_reference_model(readnoise_filename,
+                                                        datamodels.ReadnoiseModel)
             log.info('Using GAIN reference file: %s', gain_filename)
-            gain_model = datamodels.GainModel(gain_filename)
+            gain_model = self.open_reference_model(gain_filename,
+                                                   datamodels.GainModel)
 
             # Try to retrieve the gain factor from the gain reference file.
             # If found, store it in the science model meta data, so that it's
@@ -71,7 +74,7 @@ class RampFitStep (Step):
             out_model, int_model, opt_model, gls_opt_model = ramp_fit.ramp_fit(
                 input_model, buffsize,
                 self.save_opt, readnoise_model, gain_model, self.algorithm,
-                self.weighting, max_cores
+                self.weighting, max_cores, self.use_shared_memory
             )
 
             readnoise_model.close()
@@ -0,0 +1,99 @@
+"""
+Unit tests for the GLS ramp fit of sections of pixels
+"""
+import numpy as np
+import pytest
+
+from jwst.ramp_fitting import gls_fit
+
+JUMP = 4
+SATURATED = 2
+GROUP_TIME = 10.7
+
+
+def make_ramps(ngroups=8, ny=6, nx=7, seed=11):
+    """Ramps with zero, one or two jumps per pixel"""
+    rng = np.random.RandomState(seed)
+    slope = rng.uniform(5., 50., (ny, nx))
+    times = np.arange(ngroups)[:, np.newaxis, np.newaxis] * GROUP_TIME
+    data = 100. + times * slope + rng.normal(0., 3., (ngroups, ny, nx))
+    gdq = np.zeros(data.shape, dtype=np.uint8)
+    for y, x in zip(*np.nonzero(rng.uniform(size=(ny, nx)) < 0.4)):
+        for group in rng.choice(np.arange(1, ngroups), rng.randint(1, 3),
+                                replace=False):
+            gdq[group, y, x] = JUMP
+            data[group:, y, x] += 300.
+    return data.astype(np.float32), gdq
+
+
+def fit_pixel(ramp, flags, readnoise):
+    """Direct GLS fit of a single ramp, with the data as the previous fit"""
+    ngroups = len(ramp)
+    crs = np.cumsum(flags[1:] > 0)
+    crs = np.concatenate(([0], crs))
+    num_cr = crs[-1]
+    x = np.zeros((ngroups, 2 + num_cr))
+    x[:, 0] = 1.
+    x[:, 1] = np.arange(ngroups) * GROUP_TIME + GROUP_TIME
+    for n in range(1, num_cr + 1):
+        x[:, n + 1] = crs >= n
+    groups = np.arange(ngroups)
+    cov = ramp[np.minimum.outer(groups, groups)].astype(np.float64)
+    cov += np.identity(ngroups) * readnoise**2
+    invcov = np.linalg.inv(cov)
+    fitparam_cov = np.linalg.inv(x.T @ invcov @ x)
+    fitparam = fitparam_cov @ x.T @ invcov @ ramp
+    return fitparam, np.diag(fitparam_cov)
+
+
+@pytest.mark.parametrize('batch_memory', [gls_fit.BATCH_MEMORY, 8 * 8 * 8 * 5])
+def test_determine_slope(batch_memory, monkeypatch):
+    """Stacked fits, in batches or not, match the fit of each pixel"""
+    monkeypatch.setattr(gls_fit, 'BATCH_MEMORY', batch_memory)
+    data, gdq = make_ramps()
+    readnoise = np.full(data.shape[1:], 5.)
+    max_num_cr = int((gdq[1:] == JUMP).sum(axis=0).max())
+    assert max_num_cr == 2
+
+    (intercept, int_var, slope, slope_var, cr, cr_var) = \
+        gls_fit.determine_slope(data, np.ones_like(data), gdq, readnoise, None,
+                                GROUP_TIME, GROUP_TIME, 1, max_num_cr,
+                                SATURATED, JUMP)
+
+    for y, x in np.ndindex(*data.shape[1:]):
+        fitparam, variances = fit_pixel(data[:, y, x], gdq[:, y, x], 5.)
+        num_cr = len(fitparam) - 2
+        np.testing.assert_allclose(intercept[y, x], fitparam[0], rtol=1e-4, atol=1e-3)
+        np.testing.assert_allclose(slope[y, x], fitparam[1], rtol=1e-5)
+        np.testing.assert_allclose(slope_var[y, x], variances[1], rtol=1e-5)
+        np.testing.assert_allclose(cr[y, x, :num_cr], fitparam[2:], rtol=1e-4)
+        np.testing.assert_allclose(cr_var[y, x, :num_cr], variances[2:], rtol=1e-5)
+        assert np.all(cr[y, x, num_cr:] == 0.)
+
+
+def test_determine_slope_iterations(monkeypatch):
+    """Further iterations refit only the pixels whose slope has not converged"""
+    data, gdq = make_ramps()
+    readnoise = np.full(data.shape[1:], 5.)
+    args = (data, np.ones_like(data), gdq, readnoise, None,
+            GROUP_TIME, GROUP_TIME, 1, 2, SATURATED, JUMP)
+    monkeypatch.setattr(gls_fit, 'MAX_ITER', 8)
+
+    compute_slope = gls_fit.compute_slope
+    active_pixels = []
+
+    def refit_all(*args, active=None):
+        return compute_slope(*args)
+
+    def count_active(*args, active=None):
+        active_pixels.append(data[0].size if active is None else active.sum())
+        return compute_slope(*args, active=active)
+
+    monkeypatch.setattr(gls_fit, 'compute_slope', refit_all)
+    expected = gls_fit.determine_slope(*args)
+    monkeypatch.setattr(gls_fit, 'compute_slope', count_active)
+    result = gls_fit.determine_slope(*args)
+
+    assert active_pixels[0] == data[0].size
+    assert 0 < active_pixels[-1] < data[0].size
+    np.testing.assert_allclose(result[2], expected[2], rtol=0., atol=1e-5)
@@ -1,10 +1,15 @@
 import pytest
 import numpy as np
 
-from jwst.ramp_fitting.ramp_fit import ramp_fit
+from jwst.ramp_fitting import RampFitStep
+from jwst.ramp_fitting.ramp_fit import ramp_fit, ols_ramp_fit_shared
+from jwst.ramp_fitting import utils as rf_utils
+from jwst.lib import parallel_utils
 from jwst.datamodels import dqflags
 from jwst.datamodels import RampModel
 from jwst.datamodels import GainModel, ReadnoiseModel
+from jwst.stpipe.config_parser import ValidationError
+from jwst.stpipe.reference_cache import ReferenceModelCache
 
 
 # single group intergrations fail in the GLS fitting
@@ -19,6 +24,31 @@ def test_one_group_small_buffer_fit_ols():
     np.testing.assert_allclose(slopes[0].data[50, 50],10.0, 1e-6)
 
 
+def test_subarray_cached_references(tmp_path):
+    """Subarray data with the read-only arrays of cached reference models"""
+    model1, gdq, rnModel, pixdq, err, gain = setup_subarray_inputs(
+        ngroups=5, subxstart=10, subystart=20, subxsize=5, subysize=15,
+        readnoise=50)
+    model1.data[0, :, 12, 1] = [10., 15., 25., 33., 60.]
+    expected = ramp_fit(model1.copy(), 64000, False, rnModel, gain, 'OLS',
+                        'optimal', 'none')
+
+    gain_file = str(tmp_path / 'gain.fits')
+    readnoise_file = str(tmp_path / 'readnoise.fits')
+    gain.save(gain_file)
+    rnModel.save(readnoise_file)
+    cache = ReferenceModelCache(max_memory=100.)
+    cached_gain, _ = cache.get(gain_file, GainModel)
+    cached_readnoise, _ = cache.get(readnoise_file, ReadnoiseModel)
+    assert not cached_readnoise.data.flags.writeable
+
+    slopes = ramp_fit(model1, 64000, False, cached_readnoise, cached_gain,
+                      'OLS', 'optimal', 'none')
+    np.testing.assert_allclose(slopes[0].data, expected[0].data)
+    np.testing.assert_array_equal(cached_readnoise.data, 50.)
+    cache.clear()
+
+
 def test_drop_frames1_not_set():
     model1, gdq, rnModel, pixdq, err, gain = setup_inputs(ngroups=1,gain=1,readnoise=10)
     model1.data[0, 0, 50, 50] = 10.0
@@ -117,6 +147,91 @@ def test_multiprocessing2():
     np.testing.assert_allclose(slopes.data, slopes_multi.data, rtol=1e-5)
 
 
+@pytest.mark.skipif(not parallel_utils.has_shared_memory(),
+                    reason="Shared memory requires Python 3.8 or later")
+@pytest.mark.parametrize("save_opt", [False, True])
+def test_shared_memory_matches_single_process(save_opt):
+    nrows = 20
+    ncols = 10
+    ngroups = 8
+    nints = 2
+    model1, gdq, rnModel, pixdq, err, gain = setup_inputs(ngroups=ngroups, gain=1, readnoise=10, nints=nints,
+                                                          nrows=nrows, ncols=ncols)
+    model1.meta.instrument.name = 'NIRCAM'
+    rng = np.random.RandomState(42)
+    ramp = np.arange(ngroups, dtype=np.float32)[np.newaxis, :, np.newaxis, np.newaxis] * 10.
+    model1.data = np.round(ramp + rng.normal(0, 2, (nints, ngroups, nrows, ncols))).astype(np.float32)
+    model1.groupdq[0, 4, 3, 3] = dqflags.group['JUMP_DET']
+    model1.groupdq[1, 5:, 15, 7] = dqflags.group['SATURATED']
+
+    slopes, int_model, opt_model, gls_opt_model = ramp_fit(model1, 1024 * 30000., save_opt, rnModel, gain,
+                                                           'OLS', 'optimal', 'none')
+
+    readnoise_2d, gain_2d = rf_utils.get_ref_subs(model1, rnModel, gain, 1)
+    try:
+        slopes_sh, int_model_sh, opt_model_sh = ols_ramp_fit_shared(model1, 1024 * 30000., save_opt,
+                                                                    readnoise_2d, gain_2d, 'optimal', 3, None)
+    finally:
+        parallel_utils.close_pool()
+
+    np.testing.assert_allclose(slopes.data, slopes_sh.data, rtol=1e-6)
+    np.testing.assert_array_equal(slopes.dq, slopes_sh.dq)
+    np.testing.assert_allclose(slopes.var_poisson, slopes_sh.var_poisson, rtol=1e-6)
+    np.testing.assert_allclose(slopes.err, slopes_sh.err, rtol=1e-6)
+    np.testing.assert_allclose(int_model.data, int_model_sh.data, rtol=1e-6)
+    np.testing.assert_array_equal(int_model.dq, int_model_sh.dq)
+    if save_opt:
+        np.testing.assert_allclose(opt_model.slope, opt_model_sh.slope, rtol=1e-6)
+        np.testing.assert_allclose(opt_model.crmag, opt_model_sh.crmag, rtol=1e-6)
+
+
+@pytest.mark.parametrize("use_shared_memory", [False, True])
+def test_multiprocessing_miri_groups_per_exposure(monkeypatch, use_shared_memory):
+    """The MIRI groups to fit are chosen for the exposure, not each row chunk"""
+    if use_shared_memory and not parallel_utils.has_shared_memory():
+        pytest.skip("Shared memory requires Python 3.8 or later")
+    monkeypatch.setattr(parallel_utils, 'available_cpu_count', lambda: 3)
+    nrows = 12
+    ncols = 5
+    ngroups = 6
+    model1, gdq, rnModel, pixdq, err, gain = setup_inputs(ngroups=ngroups, gain=1, readnoise=10, nints=2,
+                                                          nrows=nrows, ncols=ncols)
+    model1.data = (np.arange(ngroups, dtype=np.float32)[np.newaxis, :, np.newaxis, np.newaxis] *
+                   np.arange(1., nrows + 1)[:, np.newaxis] * np.ones((2, 1, 1, ncols), dtype=np.float32))
+    # The first group is unusable in the rows of the first chunks only, and
+    # a jump in the second group is kept only if the first group is fit
+    model1.groupdq[:, 0, :6, :] = dqflags.group['DO_NOT_USE']
+    model1.groupdq[0, 1, 1, 1] = dqflags.group['JUMP_DET']
+    model1.data[0, 1:, 1, 1] += 50.
+
+    try:
+        for _ in range(2):
+            slopes = ramp_fit(model1.copy(), 1024 * 30000., False, rnModel, gain,
+                              'OLS', 'optimal', 'none')
+            slopes_multi = ramp_fit(model1.copy(), 1024 * 30000., False, rnModel, gain,
+                                    'OLS', 'optimal', '3', use_shared_memory)
+            np.testing.assert_allclose(slopes_multi[0].data, slopes[0].data, rtol=1e-6)
+            np.testing.assert_array_equal(slopes_multi[0].dq, slopes[0].dq)
+            np.testing.assert_allclose(slopes_multi[1].data, slopes[1].data, rtol=1e-6)
+
+            # Rows with no usable groups do not keep the others from being fit
+            model1.groupdq[:, :, :4, :] = dqflags.group['DO_NOT_USE']
+
+        # An exposure with no usable groups cannot be fit at all
+        model1.groupdq[...] = dqflags.group['DO_NOT_USE']
+        slopes_multi = ramp_fit(model1, 1024 * 30000., False, rnModel, gain,
+                                'OLS', 'optimal', '3', use_shared_memory)
+        assert slopes_multi[0] is None
+    finally:
+        parallel_utils.close_pool()
+
+
+def test_maximum_cores_invalid():
+    """An invalid maximum_cores is rejected when the step is configured"""
+    with pytest.raises(ValidationError):
+        RampFitStep(maximum_cores='halve')
+
+
 @pytest.mark.xfail(reason="GLS code does not [yet] handle single group integrations.")
 def test_one_group_two_ints_fit_gls():
     model1, gdq, rnModel, pixdq, err, gain = setup_inputs(ngroups=1,gain=1,readnoise=10,nints=2)
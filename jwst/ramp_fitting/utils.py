@@ -1148,14 +1148,15 @@ def get_ref_subs(model, readnoise_model, gain_model, nframes):
         gain_2d = reffile_utils.get_subarray_data(model, gain_model)
 
     if reffile_utils.ref_matches_sci(model, readnoise_model):
-        readnoise_2d = readnoise_model.data.copy()
+        readnoise_2d = readnoise_model.data
     else:
         log.info('Extracting readnoise subarray to match science data')
         readnoise_2d = reffile_utils.get_subarray_data(model, readnoise_model)
 
     # convert read noise to correct units & scale down for single groups,
-    #   and account for the number of frames per group
-    readnoise_2d *= gain_2d/np.sqrt(2. * nframes)
+    #   and account for the number of frames per group, in a new array,
+    #   since the reference arrays may be shared read-only views
+    readnoise_2d = readnoise_2d * (gain_2d / np.sqrt(2. * nframes))
 
     return readnoise_2d, gain_2d
 
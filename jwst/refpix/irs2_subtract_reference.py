@@ -7,7 +7,8 @@ log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 def correct_model(input_model, irs2_model,
-                  scipix_n_default=16, refpix_r_default=4, pad=8):
+                  scipix_n_default=16, refpix_r_default=4, pad=8,
+                  groups_per_batch=None):
     """Process IRS2 data.
 
     Parameters
@@ -31,6 +32,11 @@ def correct_model(input_model, irs2_model,
         of each row (new-row overhead).  The padding is needed to preserve
         the phase of temporally periodic signals.
 
+    groups_per_batch: int or None
+        Number of groups of an integration that are corrected together.
+        Larger batches use more memory; None corrects all the groups of
+        an integration at once.
+
     Returns
     -------
     output_model: ramp model
@@ -68,7 +74,7 @@ def correct_model(input_model, irs2_model,
     This agrees with the above value of tframe (14.5889 s) if NFOH = 714.
     """
 
-    output_model = input_model.copy()
+    output_model = input_model.writable_copy()
     output_model.meta.cal_step.refpix = 'not specified yet'
 
     # Get reference data.
@@ -157,7 +163,7 @@ def correct_model(input_model, irs2_model,
         # below.  The last axis of output_model.data should be 2048.
         data0 = data[integ, :, :, :]
         data0 = subtract_reference(data0, alpha, beta, irs2_mask,
-                                   scipix_n, refpix_r, pad)
+                                   scipix_n, refpix_r, pad, groups_per_batch)
         data[integ, :, :, nx - ny:] = data0
     temp_data = data[:, :, :, nx - ny:]
     del data
@@ -330,6 +336,9 @@ def clobber_ref(data, output, odd_even, mask, scipix_n=16, refpix_r=4):
     nx = data.shape[-1]                 # 3200
     nrows = len(output)
 
+    # Collect the bad columns of all the rows, and set them to zero with a
+    # single pass over the data.
+    columns = []
     for row in range(nrows):
         # `offset` is the offset in pixels from the beginning of the row
         # to the start of the current amp output.  `offset` starts with
@@ -348,7 +357,9 @@ def clobber_ref(data, output, odd_even, mask, scipix_n=16, refpix_r=4):
                    2 * (odd_even_row - 1))
             log.debug("bad interleaved reference at pixels {} {}"
                       .format(ref, ref+1))
-            data[..., ref:ref+2] = 0.
+            columns.extend([ref, ref + 1])
+    if columns:
+        data[..., np.array(columns, dtype=np.intp)] = 0.
 
 
 def decode_mask(output, mask):
@@ -397,7 +408,7 @@ def decode_mask(output, mask):
 
 
 def subtract_reference(data0, alpha, beta, irs2_mask,
-                       scipix_n, refpix_r, pad):
+                       scipix_n, refpix_r, pad, groups_per_batch=None):
     """Subtract reference output and pixels for the current integration.
 
     Parameters
@@ -437,6 +448,11 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
         The effective number of pixels sampled during the pause at the end
         of each row (new-row overhead).
 
+    groups_per_batch: int or None
+        The groups are corrected together in batches of this many groups,
+        which bounds the memory used for the time-ordered data and their
+        Fourier transforms.  None corrects all the groups at once.
+
     Returns
     -------
     data0: ramp data
@@ -450,11 +466,219 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     shape = data0.shape
     ngroups = shape[0]
     ny = shape[1]
-    nx = shape[2]
 
-    # See expression in equation 1 in IRS2_Handoff.pdf.
-    # row = 712, if scipix_n = 16, refpix_r = 4, pad = 8.
-    row = (scipix_n + refpix_r + 2) * 512 // scipix_n + pad
+    # Subtract the average over the ramp for each pixel.  After this, the
+    # groups are independent of each other, and can be corrected in
+    # batches.
+    b_offset = data0.sum(axis=0, dtype=np.float64) / float(ngroups)
+    # Save b_offset, and add it back in at the end.
+
+    if not groups_per_batch:
+        groups_per_batch = ngroups
+
+    irs2 = IRS2Arrays(alpha, beta, ny, scipix_n, refpix_r, pad)
+    output = np.empty((ngroups, ny, ny), dtype=data0.dtype)
+    for start in range(0, ngroups, groups_per_batch):
+        stop = min(start + groups_per_batch, ngroups)
+        batch = (data0[start:stop] - b_offset).astype(np.float32)
+        batch = subtract_reference_groups(batch, irs2)
+        # b_offset is the average over the ramp that we subtracted near the
+        # beginning; add it back in.
+        # Shape of b_offset is (2048, 3200), batch is (ngroups, 2048, 2048).
+        output[start:stop] = batch + b_offset[..., irs2_mask]
+        log.debug("IRS2 correction of groups {} to {} done".format(start, stop - 1))
+
+    return output
+
+
+class IRS2Arrays:
+    """Index arrays and filters for correcting batches of IRS2 groups.
+
+    These depend only on the readout pattern and the reference file, so
+    they are computed once for all the groups of an integration.
+
+    Parameters
+    ----------
+    alpha, beta: ndarray
+        The complex factors read from the reference file, with shape
+        (4, 2048 * 712).  See `subtract_reference`.
+
+    ny: int
+        The pixel height of the image.
+
+    scipix_n, refpix_r, pad: int
+        The readout parameters.  See `subtract_reference`.
+    """
+
+    def __init__(self, alpha, beta, ny, scipix_n, refpix_r, pad):
+
+        # See expression in equation 1 in IRS2_Handoff.pdf.
+        # row = 712, if scipix_n = 16, refpix_r = 4, pad = 8.
+        row = (scipix_n + refpix_r + 2) * 512 // scipix_n + pad
+        self.row = row
+
+        ind_n = np.arange(512, dtype=np.intp)
+        ind_ref = np.arange(512 // scipix_n * refpix_r, dtype=np.intp)
+
+        # hnorm is an array of column indices of normal pixels.
+        # len(hnorm) = 512; len(href) = 128
+        # len(hnorm1) = 512; len(href1) = 128
+        self.hnorm = ind_n + refpix_r * ((ind_n + scipix_n // 2) // scipix_n)
+
+        # href is an array of column indices of reference pixels.
+        self.href = ind_ref + scipix_n * (ind_ref // refpix_r) + scipix_n // 2
+
+        self.hnorm1 = ind_n + (refpix_r + 2) * ((ind_n + scipix_n // 2) // scipix_n)
+        self.href1 = ind_ref + (scipix_n + 2) * (ind_ref // refpix_r) + \
+                     scipix_n // 2 + 1
+
+        #; <<<<< Fitting and removal of slopes per frame to remove issues at
+        # frame boundaries.
+        # IDL:  time = findgen(row, s[2])
+        time_arr = np.arange(ny * row, dtype=np.float32).reshape((ny, row))
+        time_arr -= time_arr.mean(dtype=np.float64)
+        self.time_arr = time_arr
+        self.row4plus4 = np.array([0, 1, 2, 3, 2044, 2045, 2046, 2047],
+                                  dtype=np.intp)
+
+        # ; Use cosine weighted interpolation to replace 0.0 values and bad
+        # pixels and gaps. (initial guess)
+        w_ind = np.arange(1, 32, dtype=np.float32) / 32.
+        self.w = np.sin(w_ind * np.pi)
+
+        # Parameters for the filter to be used.
+        # length of apodization cosine filter
+        elen = 110000 // (scipix_n + refpix_r + 2)
+        # max unfiltered frequency
+        blen = (512 + 512 // scipix_n * (refpix_r + 2) + pad) // \
+               (scipix_n + refpix_r + 2) * ny // 2 - elen // 2
+
+        # Construct the filter [1, cos, 0, cos, 1].
+
+        temp_a1 = (np.cos(np.arange(elen, dtype=np.float32) *
+                          np.pi / float(elen)) + 1.) / 2.
+
+        # elen = 5000
+        # blen = 30268
+        # row * ny // 2 - 2 * blen - 2 * elen = 658552
+        # len(temp_a2) = 729088
+
+        temp_a2 = np.concatenate((np.ones(blen, dtype=np.float32),
+                                  temp_a1.copy(),
+                                  np.zeros(row * ny // 2 - 2 * blen - 2 * elen,
+                                           dtype=np.float32),
+                                  temp_a1[::-1].copy(),
+                                  np.ones(blen, dtype=np.float32)))
+        roll_a2 = np.roll(temp_a2, -1)
+        aa = np.concatenate((temp_a2, roll_a2[::-1]))
+        # The filter is symmetric, aa[k] == aa[-k], so applying it to real
+        # data gives real data, and only the non-negative frequencies of
+        # the real FFT are needed.
+        self.aa = hermitian_filter(aa)
+        self.n_iter_norm = 3
+
+        # The comments in this section are for scipix_n = 16, refpix_r = 4.
+        # ; indices for keeping/shuffling reference pixels
+        n0 = 512 // scipix_n
+        n1 = scipix_n + refpix_r + 2
+        ht = np.arange(n0 * n1, dtype=np.int32).reshape((n0, n1))   # (32, 22)
+        ht[:, 0:(scipix_n - refpix_r) // 2 + 1] = -1
+        ht[:, scipix_n // 2 + 1 + 3 * refpix_r // 2:] = -1
+        hs = ht.copy()
+        # ht is like href1, but extended over gaps and 1st and last norm pix.
+        mask = (ht >= 0)
+        ht = ht[mask]           # 1-D, length = 2 * refpix_r * 512 / scipix_n
+        # IDL:  hs[scipix_n/2 + 1-refpix_r/2:scipix_n/2 + refpix_r + refpix_r/2,*] =
+        #       hs[reform([transpose(reform(indgen(refpix_r),refpix_r/2,2)),
+        #           transpose(reform(indgen(refpix_r),refpix_r/2,2))],refpix_r * 2)
+        #           + scipix_n/2 + 1,*]  ; WIRED for R=2^(int)
+
+        indr = np.arange(refpix_r, dtype=np.intp).reshape((2, refpix_r // 2))
+        # indr_t =
+        # [[0 2]
+        #  [1 3]]
+        indr_t = indr.transpose()
+        # Before flattening, two_indr_t =
+        # [[0 2 0 2]
+        #  [1 3 1 3]]
+        # After flattening, two_indr_t = [0 2 0 2 1 3 1 3].
+        two_indr_t = np.concatenate((indr_t, indr_t), axis=1).flatten()
+        two_indr_t += (scipix_n // 2 + 1)     # [9 11 9 11 10 12 10 12]
+        hs[:, scipix_n // 2 + 1 - refpix_r // 2:
+              scipix_n // 2 + 1 + refpix_r // 2 + refpix_r] = hs[:, two_indr_t]
+        mask = (hs >= 0)
+        hs = hs[mask]                       # hs is now 1-D
+
+        if refpix_r % 4 == 2:
+            len_hs = len(hs)
+            temp_hs = hs.reshape(len_hs // 2, 2)
+            temp_hs = temp_hs[:, ::-1]
+            hs = temp_hs.flatten()
+        self.ht = ht
+        self.hs = hs
+
+        # Only the real part of the corrected reference data is used, so the
+        # Fourier-domain factors are reduced to the non-negative frequencies
+        # of the real FFTs of the reference data and reference output.
+        self.alpha = hermitian_filter(alpha)
+        self.beta = None if beta is None else hermitian_filter(beta)
+
+
+def hermitian_filter(filt):
+    """Reduce a Fourier-domain filter to the non-negative frequencies.
+
+    For real data ``d``, ``np.fft.ifft(np.fft.fft(d) * filt).real`` is equal
+    to ``np.fft.irfft(np.fft.rfft(d) * hermitian_filter(filt), len(d))``,
+    at about half the cost.
+
+    Parameters
+    ----------
+    filt: ndarray
+        The filter, for all frequencies, along the last axis.
+
+    Returns
+    -------
+    ndarray
+        The Hermitian part of the filter, ``(filt[k] + conj(filt[-k])) / 2``,
+        for the ``len // 2 + 1`` non-negative frequencies.
+    """
+
+    n = filt.shape[-1]
+    positive = filt[..., :n // 2 + 1]
+    negative = np.roll(filt[..., ::-1], 1, axis=-1)[..., :n // 2 + 1]
+    if np.isrealobj(filt):
+        if np.array_equal(positive, negative):
+            return positive.copy()
+        return (positive + negative) / 2.
+    return (positive + np.conj(negative)) / 2.
+
+
+def subtract_reference_groups(data0, irs2):
+    """Subtract reference output and pixels for a batch of groups.
+
+    Parameters
+    ----------
+    data0: ndarray
+        The science data for a batch of groups of an integration, with the
+        average over the ramp subtracted; shape (ngroups, ny, 3200).  All
+        the groups are processed together.
+
+    irs2: IRS2Arrays
+        Index arrays and filters for the readout pattern.
+
+    Returns
+    -------
+    data0: ndarray
+        The batch of groups, with reference output and embedded reference
+        pixels subtracted and also removed, with shape (ngroups, ny, ny).
+    """
+
+    shape = data0.shape
+    ngroups = shape[0]
+    ny = shape[1]
+    nx = shape[2]
+    row = irs2.row
+    hnorm, hnorm1 = irs2.hnorm, irs2.hnorm1
 
     # s = size(data0)
     # If data0 is the data for one integration, then:
@@ -463,26 +687,6 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     # s[2] = shape[1] = ny, the length of the Y axis
     # s[3] = shape[0] = ngroups, the number of groups (or frames)
 
-    ind_n = np.arange(512, dtype=np.intp)
-    ind_ref = np.arange(512 // scipix_n * refpix_r, dtype=np.intp)
-
-    # hnorm is an array of column indices of normal pixels.
-    # len(hnorm) = 512; len(href) = 128
-    # len(hnorm1) = 512; len(href1) = 128
-    hnorm = ind_n + refpix_r * ((ind_n + scipix_n // 2) // scipix_n)
-
-    # href is an array of column indices of reference pixels.
-    href = ind_ref + scipix_n * (ind_ref // refpix_r) + scipix_n // 2
-
-    hnorm1 = ind_n + (refpix_r + 2) * ((ind_n + scipix_n // 2) // scipix_n)
-    href1 = ind_ref + (scipix_n + 2) * (ind_ref // refpix_r) + \
-            scipix_n // 2 + 1
-
-    # Subtract the average over the ramp for each pixel.
-    b_offset = data0.sum(axis=0, dtype=np.float64) / float(ngroups)
-    data0 -= b_offset
-    # Save b_offset, and add it back in at the end.
-
     # IDL:  data0 = reform(data0, s[1]/5, 5, s[2], s[3], /over)
     #                             nx/5,   5, ny,   ngroups    (IDL)
     data0 = data0.reshape((ngroups, ny, 5, nx // 5))
@@ -519,34 +723,25 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     # IDL:  d0[href1,*,*,*] = data0[href,*,*,*]
     # IDL:  data0 = temporary(d0)
     d0[:, :, :, hnorm1] = data0[:, :, :, hnorm]
-    d0[:, :, :, href1] = data0[:, :, :, href]
-    data0 = d0.copy()
+    d0[:, :, :, irs2.href1] = data0[:, :, :, irs2.href]
+    data0 = d0
     del d0
 
     #; <<<<< Fitting and removal of slopes per frame to remove issues at frame
     # boundaries.
-    # IDL:  time = findgen(row, s[2])
-    time_arr = np.arange(ny * row, dtype=np.float32).reshape((ny, row))
-    time_arr -= time_arr.mean(dtype=np.float64)
-    row4plus4 = np.array([0, 1, 2, 3, 2044, 2045, 2046, 2047], dtype=np.intp)
-
     # For ab_3, it should be OK to use the same index order as the IDL code.
-    ab_3 = np.zeros((2, ngroups, 5), dtype=np.float32)
-    for i in range(5):
-        for k in range(ngroups):
-            # mask is 2-D, since both row4plus4 and : have more than one
-            # element.
-            mask = (data0[i, k, row4plus4, :] != 0.)
-            (intercept, slope) = ols_line(time_arr[row4plus4, :][mask],
-                                          data0[i, k, row4plus4, :][mask])
-            ab_3[0, k, i] = intercept
-            ab_3[1, k, i] = slope
+    # The lines are fitted to the nonzero pixels of the first and last four
+    # rows, for all groups and outputs at once.
+    time_arr = irs2.time_arr
+    ab_3 = ols_lines(time_arr[irs2.row4plus4, :],
+                     data0[:, :, irs2.row4plus4, :])
+    ab_3 = np.transpose(ab_3, (0, 2, 1)).astype(np.float32)
     for i in range(5):
-        for k in range(ngroups):
-            # weight is 0 where data0 is 0, else 1.
-            weight = (data0[i, k, :, :] != 0.).astype(np.float32)
-            data0[i, k, :, :] -= (ab_3[0, k, i] +
-                                  time_arr * ab_3[1, k, i]) * weight
+        # weight is 0 where data0 is 0, else 1.
+        fit = (ab_3[0, :, i, np.newaxis, np.newaxis] +
+               time_arr * ab_3[1, :, i, np.newaxis, np.newaxis])
+        data0[i] -= np.where(data0[i] != 0., fit, 0.)
+    del fit
 
     # <<<<<<<
 
@@ -554,22 +749,20 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     # pixels and gaps. (initial guess)
 
     # s[1] = nx  s[2] = ny  s[3] = ngroups
-    w_ind = np.arange(1, 32, dtype=np.float32) / 32.
-    w = np.sin(w_ind * np.pi)
     kk = 0
-    for jj in range(ngroups):
-        dat = data0[kk, jj, :, :].reshape(row * ny)
-        mask = (dat != 0.).astype(np.float32)
-        numerator = convolve1d(dat, w, mode='wrap')
-        denominator = convolve1d(mask, w, mode='wrap')
-        div_zero = (denominator == 0.)          # check for divide by zero
-        numerator = np.where(div_zero, 0., numerator)
-        denominator = np.where(div_zero, 1., denominator)
-        dat = numerator / denominator
-        dat = dat.reshape(ny, row)
-        mask = mask.reshape(ny, row)
-        # xxx why '+=' instead of just '=' ?
-        data0[kk, jj, :, :] += dat * (1. - mask)
+    dat = data0[kk].reshape((ngroups, row * ny))
+    mask = (dat != 0.).astype(np.float32)
+    numerator = convolve1d(dat, irs2.w, axis=1, mode='wrap')
+    denominator = convolve1d(mask, irs2.w, axis=1, mode='wrap')
+    div_zero = (denominator == 0.)          # check for divide by zero
+    numerator = np.where(div_zero, 0., numerator)
+    denominator = np.where(div_zero, 1., denominator)
+    dat = numerator / denominator
+    dat = dat.reshape((ngroups, ny, row))
+    mask = mask.reshape((ngroups, ny, row))
+    # xxx why '+=' instead of just '=' ?
+    data0[kk] += dat * (1. - mask)
+    del numerator, denominator, div_zero, dat, mask
 
     #;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;
     # Use Fourier filter/interpolation to replace
@@ -577,91 +770,21 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     # (b) gaps and normal data in the time-ordered reference data
     # This "improves" upon the cosine interpolation performed above.
 
-    # Parameters for the filter to be used.
-    # length of apodization cosine filter
-    elen = 110000 // (scipix_n + refpix_r + 2)
-    # max unfiltered frequency
-    blen = (512 + 512 // scipix_n * (refpix_r + 2) + pad) // \
-           (scipix_n + refpix_r + 2) * ny // 2 - elen // 2
-
-    # Construct the filter [1, cos, 0, cos, 1].
-
-    temp_a1 = (np.cos(np.arange(elen, dtype=np.float32) *
-                      np.pi / float(elen)) + 1.) / 2.
-
-    # elen = 5000
-    # blen = 30268
-    # row * ny // 2 - 2 * blen - 2 * elen = 658552
-    # len(temp_a2) = 729088
-
-    temp_a2 = np.concatenate((np.ones(blen, dtype=np.float32),
-                              temp_a1.copy(),
-                              np.zeros(row * ny // 2 - 2 * blen - 2 * elen,
-                                       dtype=np.float32),
-                              temp_a1[::-1].copy(),
-                              np.ones(blen, dtype=np.float32)))
-    roll_a2 = np.roll(temp_a2, -1)
-    aa = np.concatenate((temp_a2, roll_a2[::-1]))
-    del temp_a1, temp_a2, roll_a2
-
     # IDL:  aa = a # replicate(1, s[3]) ; for application to the data
     # In IDL, aa is a 2-D array with one column of `a` for each group.  In
     # Python, numpy broadcasting should take care of this.
 
-    n_iter_norm = 3
-    dd0 = data0[0, :, :, :]
     # IDL:  fft_interp_norm, dd0, 2, replicate(1, s[1] / 4, s[2], 4),
     #                        row, hnorm, hnorm1, s, aa , n_iter_norm
-    fft_interp_norm(dd0, np.ones((ny, nx // 4), dtype=np.int64),
+    fft_interp_norm(data0[0], np.ones((ny, nx // 4), dtype=np.int64),
                     row, hnorm, hnorm1,
-                    ny, ngroups, aa, n_iter_norm)
-    data0[0, :, :, :] = dd0.copy()
-    del aa, dd0
+                    ny, ngroups, irs2.aa, irs2.n_iter_norm)
 
 #;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;
 
-#;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;
-    # The comments in this section are for scipix_n = 16, refpix_r = 4.
-    # ; indices for keeping/shuffling reference pixels
-    n0 = 512 // scipix_n
-    n1 = scipix_n + refpix_r + 2
-    ht = np.arange(n0 * n1, dtype=np.int32).reshape((n0, n1))   # (32, 22)
-    ht[:, 0:(scipix_n - refpix_r) // 2 + 1] = -1
-    ht[:, scipix_n // 2 + 1 + 3 * refpix_r // 2:] = -1
-    hs = ht.copy()
-    # ht is like href1, but extended over gaps and 1st and last norm pix.
-    mask = (ht >= 0)
-    ht = ht[mask]               # 1-D, length = 2 * refpix_r * 512 / scipix_n
-    # IDL:  hs[scipix_n/2 + 1-refpix_r/2:scipix_n/2 + refpix_r + refpix_r/2,*] =
-    #       hs[reform([transpose(reform(indgen(refpix_r),refpix_r/2,2)),
-    #           transpose(reform(indgen(refpix_r),refpix_r/2,2))],refpix_r * 2)
-    #           + scipix_n/2 + 1,*]  ; WIRED for R=2^(int)
-
-    indr = np.arange(refpix_r, dtype=np.intp).reshape((2, refpix_r // 2))
-    # indr_t =
-    # [[0 2]
-    #  [1 3]]
-    indr_t = indr.transpose()
-    # Before flattening, two_indr_t =
-    # [[0 2 0 2]
-    #  [1 3 1 3]]
-    # After flattening, two_indr_t = [0 2 0 2 1 3 1 3].
-    two_indr_t = np.concatenate((indr_t, indr_t), axis=1).flatten()
-    two_indr_t += (scipix_n // 2 + 1)     # [9 11 9 11 10 12 10 12]
-    hs[:, scipix_n // 2 + 1 - refpix_r // 2:
-          scipix_n // 2 + 1 + refpix_r // 2 + refpix_r] = hs[:, two_indr_t]
-    mask = (hs >= 0)
-    hs = hs[mask]                       # hs is now 1-D
-
-    if refpix_r % 4 == 2:
-        len_hs = len(hs)
-        temp_hs = hs.reshape(len_hs // 2, 2)
-        temp_hs = temp_hs[:, ::-1]
-        hs = temp_hs.flatten()
-
     # ; construct the reference data
     r0 = np.zeros_like(data0)
-    r0[:, :, :, ht] = data0[:, :, :, hs]
+    r0[:, :, :, irs2.ht] = data0[:, :, :, irs2.hs]
     #;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;;
 
     # data0 has shape (5, ngroups, ny, row).  See the section above where
@@ -675,45 +798,36 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     # s[1] = shape[2] = nx
     # s[2] = shape[1] = ny
     # s[3] = shape[0] = ngroups
+    nsamples = shape_d[2] * shape_d[3]
 
-    # IDL and numpy differ in where they apply the normalization for the
-    # FFT.  This really shouldn't matter.
-    normalization = float(shape_d[2] * shape_d[3])
-
-    if beta is not None:
-        # IDL:  refout0 = reform(data0[*,*,*,0], sd[1] * sd[2], sd[3])
-        refout0 = data0[0, :, :, :].reshape((shape_d[1],
-                                           shape_d[2] * shape_d[3]))
-        # IDL:  refout0 = fft(refout0, dim=1, /over)
-        # Divide by the length of the axis to be consistent with IDL.
-        refout0 = np.fft.fft(refout0, axis=1) / normalization
-
+    # The IDL code divides the forward FFTs by the number of samples and
+    # multiplies the inverse FFT by it, which cancels out.  The reference
+    # data and reference output are real, and only the real part of the
+    # result is kept, so real FFTs of all the groups of the four sectors
+    # are used.
     # IDL:  r0 = reform(r0, sd[1] * sd[2], sd[3], 5, /over)
-    r0 = r0.reshape((5, shape_d[1], shape_d[2] * shape_d[3]))
-    r0 = r0.astype(np.complex64)
-    r0f = ["dummy", 1, 1, 1, 1]         # elements 1 - 4 populated in loop
-    for k in range(1, 5):
-        r0f[k] = np.fft.fft(r0[k, :, :], axis=1) / normalization
+    r0 = r0.reshape((5, shape_d[1], nsamples))
+    # IDL:  r0 = fft(r0, dim=1, /over)
+    r0f = np.fft.rfft(r0[1:], axis=-1)
 
     # Note that where the IDL code uses alpha, we use beta, and vice versa.
     # IDL:  for k=0,3 do oBridge[k]->Execute,
     #           "for i=0, s3-1 do r0[*,i] *= alpha"
-    for k in range(1, 5):
-        for i in range(ngroups):
-            # Each element of r0f is the fft of r0[k, :, :], for some k.
-            r0f[k][i, :] *= beta[k - 1]
+    r0f *= irs2.beta[:, np.newaxis, :]
 
     # IDL:  for k=0,3 do oBridge[k]->Execute,
     #           "for i=0, s3-1 do r0[*,i] += beta * refout0[*,i]"
-    if beta is not None:
-        for k in range(1, 5):
-            for i in range(ngroups):
-                r0f[k][i, :] += (alpha[k - 1] * refout0[i, :])
+    if irs2.beta is not None:
+        # IDL:  refout0 = reform(data0[*,*,*,0], sd[1] * sd[2], sd[3])
+        # IDL:  refout0 = fft(refout0, dim=1, /over)
+        refout0 = np.fft.rfft(data0[0].reshape((shape_d[1], nsamples)), axis=-1)
+        r0f += irs2.alpha[:, np.newaxis, :] * refout0
+        del refout0
 
     # IDL:  for k=0,3 do oBridge[k]->Execute,
     #           "r0 = fft(r0, 1, dim=1, /overwrite)", /nowait
-    for k in range(1, 5):
-        r0[k, :, :] = np.fft.ifft(r0f[k], axis=1) * normalization
+    r0[1:] = np.fft.irfft(r0f, nsamples, axis=-1)
+    del r0f
 
     # sd[1] = shape_d[3]   row (712)
     # sd[2] = shape_d[2]   ny (2048)
@@ -721,7 +835,6 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     # sd[4] = shape_d[0]   5
     # IDL:  r0 = reform(r0, sd[1], sd[2], sd[3], 5, /over)
     r0 = r0.reshape(shape_d)
-    r0 = r0.real
     r0 = r0[:, :, :, hnorm1]
     data0 = data0[:, :, :, hnorm1]
 
@@ -742,29 +855,73 @@ def subtract_reference(data0, alpha, beta, irs2_mask,
     # IDL:  data0 = reform(data0[*, 1:*, *, *], s[2], s[2], s[3], /over)
     # Note:  ny x ny, not ny x nx.
     data0 = data0[:, :, 1:, :].reshape((ngroups, ny, ny))
-    # b_offset is the average over the ramp that we subtracted near the
-    # beginning; add it back in.
-    # Shape of b_offset is (2048, 3200), data0 is (ngroups, 2048, 2048).
-    data0 += b_offset[..., irs2_mask]
 
     return data0
 
 
 def fft_interp_norm(dd0, mask0, row, hnorm, hnorm1,
                     ny, ngroups, aa, n_iter_norm):
+    """Replace the masked samples of the time-ordered reference output by
+    iterative Fourier filtering, for all groups at once.
+
+    `aa` is the filter for the non-negative frequencies of the real FFT of
+    the ny * row time-ordered samples of a group; see `hermitian_filter`.
+    `dd0`, with shape (ngroups, ny, row), is modified in-place.
+    """
 
     mm = np.zeros((ny, row), dtype=np.int8)
     mm[:, hnorm1] = mask0[:, hnorm]
-    hm = (mm != 0)                      # 2-D boolean mask
-    for j in range(ngroups):
-        dd = dd0[j, :, :].copy()
-        p = dd.flatten()                        # make a copy, not a view
-        for it in range(n_iter_norm):
-            pp = np.fft.fft(p)
-            pp *= aa
-            p[:] = np.fft.ifft(pp).real
-            p[hm.ravel()] = dd[hm]
-        dd0[j, :, :] = p.reshape((ny, row))
+    hm = (mm != 0).ravel()              # boolean mask of the samples to keep
+    p = dd0.reshape((ngroups, ny * row)).copy()
+    keep = p[:, hm]
+    for it in range(n_iter_norm):
+        pp = np.fft.rfft(p, axis=1)
+        pp *= aa
+        p[:] = np.fft.irfft(pp, ny * row, axis=1)
+        p[:, hm] = keep
+    dd0[:] = p.reshape((ngroups, ny, row))
+
+
+def ols_lines(x, y):
+    """Fit straight lines to the nonzero values of a stack of arrays using
+    ordinary least squares.
+
+    Parameters
+    ----------
+    x: ndarray
+        The independent variable, with the shape of the last axes of `y`.
+
+    y: ndarray
+        The data to fit.  A line is fitted to the nonzero values of each
+        of the arrays along the leading axes of `y`, with the same shape
+        as `x`.
+
+    Returns
+    -------
+    ndarray
+        The intercepts and slopes, with shape (2,) + leading shape of `y`.
+        Both are zero where there are no nonzero values.
+    """
+
+    axes = tuple(range(y.ndim - x.ndim, y.ndim))
+    weight = (y != 0.)
+    groups = weight.sum(axis=axes)
+    xw = np.where(weight, x.astype(np.float64), 0.)
+    sum_x = xw.sum(axis=axes)
+    sum_y = y.sum(axis=axes, dtype=np.float64)
+    sum_x2 = (xw**2).sum(axis=axes)
+    sum_xy = (xw * y).sum(axis=axes)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = sum_x / groups
+        mean_y = sum_y / groups
+        slope = (sum_xy - groups * mean_x * mean_y) / \
+                (sum_x2 - groups * mean_x**2)
+        intercept = mean_y - slope * mean_x
+
+    empty = (groups == 0)
+    return np.array([np.where(empty, 0., intercept),
+                     np.where(empty, 0., slope)])
 
 
 def ols_line(x, y):
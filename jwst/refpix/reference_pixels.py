@@ -42,6 +42,7 @@ from scipy import stats
 import logging
 from ..datamodels import dqflags
 from ..lib import reffile_utils
+from ..lib.parallel_utils import compute_num_processes, map_threaded
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -172,6 +173,7 @@ class Dataset():
         self.side_gain = side_gain
         self.odd_even_rows = odd_even_rows
         self.bad_reference_pixels = False
+        self.num_threads = 1
 
         # Define temp array for processing every group
         self.pixeldq = self.get_pixeldq()
@@ -223,6 +225,55 @@ class Dataset():
 
         return mean
 
+    def sigma_clip_stack(self, data, dq, low=3.0, high=3.0):
+        """Sigma-clipped mean of each image of a stack, with the same
+        iterative clipping as scipy.stats.sigmaclip
+
+        Parameters:
+        -----------
+
+        data: NDArray
+            Stack of pixels to be sigma-clipped, where the last dimensions
+            match the shape of dq and any leading dimensions (e.g. groups)
+            are clipped separately
+
+        dq: NDArray
+            DQ array for each image of data
+
+        low: float
+            lower clipping boundary, in standard deviations from the mean (default=3.0)
+
+        high: float
+            upper clipping boundary, in standard deviations from the mean (default=3.0)
+
+        Returns:
+        --------
+
+        mean: NDArray
+            clipped mean of each image of the stack, with shape
+            data.shape[:-dq.ndim], or None if there are no good pixels
+
+        """
+        goodpixels = np.bitwise_and(dq, dqflags.pixel['DO_NOT_USE']) == 0
+        if not goodpixels.any():
+            return None
+        nstack = data.shape[:data.ndim - dq.ndim]
+        values = data[..., goodpixels].astype(np.float64)
+        keep = np.ones(values.shape, dtype=bool)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            while True:
+                npix = keep.sum(axis=-1)
+                mean = np.where(keep, values, 0.).sum(axis=-1) / npix
+                resid = np.where(keep, values - mean[..., np.newaxis], 0.)
+                std = np.sqrt((resid**2).sum(axis=-1) / npix)
+                clipped = (keep &
+                           (values >= (mean - std * low)[..., np.newaxis]) &
+                           (values <= (mean + std * high)[..., np.newaxis]))
+                if np.array_equal(clipped, keep):
+                    break
+                keep = clipped
+        return mean.reshape(nstack)
+
     def get_pixeldq(self):
         """Get the properly sized version of the pixeldq array from the
         input model.
@@ -331,6 +382,57 @@ class NIRDataset(Dataset):
                                          side_gain,
                                          odd_even_rows=False)
 
+    def DMS_to_detector_stack(self, data):
+        """Transform an array from DMS to detector coordinates
+
+        Parameters:
+        -----------
+
+        data: NDArray
+            Array whose last two axes are the rows and columns of the
+            detector in DMS orientation, such as a group, the groups of an
+            integration or the pixeldq array
+
+        Returns:
+        --------
+
+        NDArray
+            View of the array in detector orientation
+
+        """
+        return data
+
+    def detector_to_DMS_stack(self, data):
+        """Transform an array from detector to DMS coordinates; the inverse
+        of DMS_to_detector_stack
+
+        Parameters:
+        -----------
+
+        data: NDArray
+            Array whose last two axes are in detector orientation
+
+        Returns:
+        --------
+
+        NDArray
+            View of the array in DMS orientation
+
+        """
+        return data
+
+    def DMS_to_detector(self, integration, group):
+        self.get_group(integration, group)
+        self.group = self.DMS_to_detector_stack(self.group)
+
+    def detector_to_DMS(self, integration, group):
+        self.group = self.detector_to_DMS_stack(self.group)
+        self.restore_group(integration, group)
+
+    def DMS_to_detector_dq(self):
+        # pixeldq only has to be done once
+        self.pixeldq = self.DMS_to_detector_stack(self.pixeldq)
+
 #
 #  Even though the recommendation specifies calculating the mean of the
 #  combined top and bottom reference sections, there's a good chance we
@@ -365,7 +467,7 @@ class NIRDataset(Dataset):
         rowstart, rowstop, colstart, colstop = \
             NIR_reference_sections[amplifier][top_or_bottom]
 
-        oddref = group[rowstart:rowstop, colstart:colstop: 2]
+        oddref = group[..., rowstart:rowstop, colstart:colstop: 2]
         odddq = self.pixeldq[rowstart:rowstop, colstart:colstop: 2]
         return oddref, odddq
 
@@ -401,7 +503,7 @@ class NIRDataset(Dataset):
         #
         # Even columns start on the second column
         colstart = colstart + 1
-        evenref = group[rowstart:rowstop, colstart:colstop: 2]
+        evenref = group[..., rowstart:rowstop, colstart:colstop: 2]
         evendq = self.pixeldq[rowstart:rowstop, colstart:colstop: 2]
         return evenref, evendq
 
@@ -432,7 +534,7 @@ class NIRDataset(Dataset):
         """
 
         ref, dq = self.collect_odd_refpixels(group, amplifier, top_or_bottom)
-        odd = self.sigma_clip(ref, dq)
+        odd = self.sigma_clip_stack(ref, dq)
         return odd
 
 
@@ -462,7 +564,7 @@ class NIRDataset(Dataset):
         """
 
         ref, dq = self.collect_even_refpixels(group, amplifier, top_or_bottom)
-        even = self.sigma_clip(ref, dq)
+        even = self.sigma_clip_stack(ref, dq)
         return even
 
 
@@ -507,9 +609,9 @@ class NIRDataset(Dataset):
         else:
             rowstart, rowstop, colstart, colstop = \
                 NIR_reference_sections[amplifier][top_or_bottom]
-            ref = group[rowstart:rowstop, colstart:colstop]
+            ref = group[..., rowstart:rowstop, colstart:colstop]
             dq = self.pixeldq[rowstart:rowstop, colstart:colstop]
-            mean = self.sigma_clip(ref, dq)
+            mean = self.sigma_clip_stack(ref, dq)
             if mean is None: self.bad_reference_pixels = True
             return mean
 
@@ -556,10 +658,11 @@ class NIRDataset(Dataset):
         ----------
 
         group: NDArray
-            Group that is being processed
+            Group, or stack of groups, that is being processed
 
         refvalues: dictionary
-            Dictionary of reference pixel clipped means
+            Dictionary of reference pixel clipped means, with one value
+            per group of the stack
 
         Returns:
         --------
@@ -585,21 +688,46 @@ class NIRDataset(Dataset):
                 # For now, just average the top and bottom corrections
                 oddrefsignal = 0.5 * (oddreftop + oddrefbottom)
                 evenrefsignal = 0.5 * (evenreftop + evenrefbottom)
-                oddslice = (slice(datarowstart, datarowstop, 1),
+                oddslice = (Ellipsis,
+                            slice(datarowstart, datarowstop, 1),
                             slice(datacolstart, datacolstop, 2))
-                evenslice = (slice(datarowstart, datarowstop, 1),
+                evenslice = (Ellipsis,
+                             slice(datarowstart, datarowstop, 1),
                              slice(datacolstart + 1, datacolstop, 2))
-                group[oddslice] = group[oddslice] - oddrefsignal
-                group[evenslice] = group[evenslice] - evenrefsignal
+                self.subtract_stack(group[oddslice], oddrefsignal)
+                self.subtract_stack(group[evenslice], evenrefsignal)
             else:
                 reftop = refvalues[amplifier]['top']
                 refbottom = refvalues[amplifier]['bottom']
                 refsignal = 0.5 * (reftop + refbottom)
-                dataslice = (slice(datarowstart, datarowstop, 1),
+                dataslice = (Ellipsis,
+                             slice(datarowstart, datarowstop, 1),
                              slice(datacolstart, datacolstop, 1))
-                group[dataslice] = group[dataslice] - refsignal
+                self.subtract_stack(group[dataslice], refsignal)
         return
 
+    def subtract_stack(self, data, values):
+        """Subtract one value from each image of a stack, in place
+
+        The subtraction is done at the precision of the values, and the
+        result rounded to the type of data, without a full-size temporary
+        array.
+
+        Parameters:
+        -----------
+
+        data: NDArray
+            Image, or stack of images, to be corrected in place
+
+        values: float or NDArray
+            Value to subtract from each image, with shape data.shape[:-2],
+            or data.shape[:-1] for a value per row
+
+        """
+        values = np.asarray(values)
+        values = values.reshape(values.shape + (1,) * (data.ndim - values.ndim))
+        np.subtract(data, values, out=data, casting='unsafe')
+
     def create_reflected(self, data, smoothing_length):
         """Make an array bigger by extending it at the top and bottom by
         an amount equal to .5(smoothing length-1)
@@ -610,7 +738,8 @@ class NIRDataset(Dataset):
         -----------
 
         data: NDArray
-            input data array
+            input data array, or stack of arrays, with rows along the
+            second-to-last axis
 
         smoothing_length: integer (should be odd, will be converted if not)
             smoothing length.  Amount by which the input array is extended is
@@ -626,27 +755,32 @@ class NIRDataset(Dataset):
 
         """
 
-        nrows, ncols = data.shape
+        nrows, ncols = data.shape[-2:]
         if smoothing_length % 2 == 0:
             log.info("Smoothing length must be odd, adding 1")
             smoothing_length = smoothing_length + 1
         newheight = nrows + smoothing_length - 1
-        reflected = np.zeros((newheight, ncols), dtype=data.dtype)
+        reflected = np.zeros(data.shape[:-2] + (newheight, ncols), dtype=data.dtype)
         bufsize = smoothing_length // 2
-        reflected[bufsize:bufsize + nrows] = data[:]
-        reflected[:bufsize] = data[bufsize:0:-1]
-        reflected[-(bufsize):] = data[-2:-(bufsize+2):-1]
+        reflected[..., bufsize:bufsize + nrows, :] = data
+        reflected[..., :bufsize, :] = data[..., bufsize:0:-1, :]
+        reflected[..., -(bufsize):, :] = data[..., -2:-(bufsize+2):-1, :]
         return reflected
 
     def median_filter(self, data, dq, smoothing_length):
         """Simple median filter.  Run a box of the same width as the data and
         height = smoothing_length.  Reflect the data at the top and bottom
 
+        The medians of all the rows, and of all the arrays of a stack, are
+        found at once, by sorting each box with the pixels flagged
+        DO_NOT_USE moved to the end and picking the middle of the good
+        pixels.
+
         Parameters:
         -----------
 
         data: NDArray
-            input 2-d science array
+            input 2-d science array, or stack of 2-d arrays
 
         dq: NDArray
             input 2-d dq array
@@ -658,21 +792,64 @@ class NIRDataset(Dataset):
         --------
 
         result: NDArray
-            1-d array that is a median filtered version of the input data
+            1-d array that is a median filtered version of the input data,
+            or one such array for each array of the stack
         """
 
         augmented_data = self.create_reflected(data, smoothing_length)
         augmented_dq = self.create_reflected(dq, smoothing_length)
-        nrows, ncols = data.shape
-        result = np.zeros(nrows)
-        for i in range(nrows):
-            rowstart = i
-            rowstop = rowstart + smoothing_length
-            goodpixels = np.where(np.bitwise_and(augmented_dq[rowstart:rowstop],
-                                                 dqflags.pixel['DO_NOT_USE']) == 0)
-            window = augmented_data[rowstart:rowstop][goodpixels]
-            result[i] = np.median(window)
-        return result
+        nrows, ncols = data.shape[-2:]
+        #
+        # Boxes of (smoothing_length, ncols) pixels, one per row
+        boxes = self.running_boxes(augmented_data, nrows, smoothing_length)
+        baddq = self.running_boxes(
+            np.bitwise_and(augmented_dq, dqflags.pixel['DO_NOT_USE']) != 0,
+            nrows, smoothing_length)
+        ngood = (~baddq).sum(axis=-1)
+        #
+        # Like np.median, return NaN if a good pixel in the box is NaN
+        hasnan = (np.isnan(boxes) & ~baddq).any(axis=-1)
+        boxes = np.where(baddq, np.inf, boxes)
+        boxes.sort(axis=-1)
+        middle = np.broadcast_to(np.maximum((ngood - 1) // 2, 0)[:, np.newaxis],
+                                 boxes.shape[:-1] + (1,))
+        lower = np.take_along_axis(boxes, middle, axis=-1)[..., 0]
+        middle = np.broadcast_to((ngood // 2)[:, np.newaxis], boxes.shape[:-1] + (1,))
+        upper = np.take_along_axis(boxes, middle, axis=-1)[..., 0]
+        result = np.where(ngood % 2 == 1, lower, (lower + upper) / 2)
+        result = np.where(hasnan | (ngood == 0), np.nan, result)
+        return result.astype(np.float64)
+
+    def running_boxes(self, data, nrows, height):
+        """Copy out the boxes of a running filter down the rows of an array
+
+        Parameters:
+        -----------
+
+        data: NDArray
+            2-d array, or stack of 2-d arrays, with rows along the
+            second-to-last axis
+
+        nrows: integer
+            number of boxes, starting at the first row
+
+        height: integer
+            number of rows in each box
+
+        Returns:
+        --------
+
+        boxes: NDArray
+            array with one row of height * ncols values for each box
+        """
+
+        ncols = data.shape[-1]
+        rowstride, colstride = data.strides[-2:]
+        boxes = np.lib.stride_tricks.as_strided(
+            data, shape=data.shape[:-2] + (nrows, height, ncols),
+            strides=data.strides[:-2] + (rowstride, rowstride, colstride),
+            writeable=False)
+        return boxes.reshape(data.shape[:-2] + (nrows, height * ncols))
 
     def calculate_side_ref_signal(self, group, colstart, colstop):
         """Calculate the reference pixel signal from the side reference pixels
@@ -683,7 +860,7 @@ class NIRDataset(Dataset):
         -----------
 
         group: NDArray
-            Group that is being processed
+            Group, or stack of groups, that is being processed
 
         colstart: integer
             Starting column
@@ -700,7 +877,7 @@ class NIRDataset(Dataset):
         """
 
         smoothing_length = self.side_smoothing_length
-        data = group[:, colstart:colstop + 1]
+        data = group[..., :, colstart:colstop + 1]
         dq = self.pixeldq[:, colstart:colstop + 1]
         return self.median_filter(data, dq, smoothing_length)
 
@@ -712,23 +889,24 @@ class NIRDataset(Dataset):
         -----------
 
         left: NDArray
-            1-d array of median-filtered reference pixel values from the left side
+            1-d array of median-filtered reference pixel values from the left
+            side, or one such array per group of a stack
 
         right: NDArray
-            1-d array of median-filtered reference pixel values from the right side
+            1-d array of median-filtered reference pixel values from the right
+            side, or one such array per group of a stack
 
         Returns:
         --------
 
         sidegroup: NDArray
-            2-d array of average reference pixel vector replicated horizontally
+            average reference pixel vector, as a column that is broadcast
+            horizontally across the group
 
         """
 
         combined = 0.5 * (left + right)
-        sidegroup = np.zeros((2048, 2048))
-        for column in range(2048):
-            sidegroup[:, column] = combined
+        sidegroup = combined[..., np.newaxis]
         return sidegroup
 
     def apply_side_correction(self, group, sidegroup):
@@ -738,10 +916,11 @@ class NIRDataset(Dataset):
         -----------
 
         group: NDArray
-            Group being processed
+            Group, or stack of groups, being processed; it is corrected in
+            place
 
         sidegroup: NDArray
-            Side reference pixel signal replicated horizontally
+            Side reference pixel signal, broadcast horizontally
 
         Returns:
         --------
@@ -751,7 +930,8 @@ class NIRDataset(Dataset):
 
         """
 
-        corrected_group = group - self.side_gain * sidegroup
+        self.subtract_stack(group, self.side_gain * sidegroup)
+        corrected_group = group
         return corrected_group
 
     def do_side_correction(self, group):
@@ -761,7 +941,7 @@ class NIRDataset(Dataset):
         -----------
 
         group: NDArray
-            Group being processed
+            Group, or stack of groups, being processed
 
         Returns:
         --------
@@ -786,34 +966,44 @@ class NIRDataset(Dataset):
     def do_fullframe_corrections(self):
         """Do Reference Pixels Corrections for all amplifiers, NIR detectors
         First read of each integration is NOT subtracted, as the signal is removed
-        in the superbias subtraction step"""
+        in the superbias subtraction step
+
+        All the groups of an integration are corrected at once, and the
+        integrations are processed in self.num_threads threads"""
         #
         #  First transform pixeldq array to detector coordinates
         self.DMS_to_detector_dq()
 
-        for integration in range(self.nints):
-            for group in range(self.ngroups):
-                #
-                # Get the reference values from the top and bottom reference
-                # pixels
-                #
-                self.DMS_to_detector(integration, group)
-                thisgroup = self.group
-                refvalues = self.get_refvalues(thisgroup)
-                if self.bad_reference_pixels:
-                    break
-                self.do_top_bottom_correction(thisgroup, refvalues)
-                if self.use_side_ref_pixels:
-                    corrected_group = self.do_side_correction(thisgroup)
-                    self.group = corrected_group
-                else:
-                    self.group = thisgroup
-                #
-                #  Now transform back from detector to DMS coordinates.
-                self.detector_to_DMS(integration, group)
+        map_threaded(self.do_integration_corrections, range(self.nints),
+                     self.num_threads, label='integration')
         log.setLevel(logging.INFO)
         return
 
+    def do_integration_corrections(self, integration):
+        """Correct all the groups of a full-frame integration in place
+
+        Parameters:
+        -----------
+
+        integration: int
+            Index of the integration to correct
+
+        """
+        #
+        # The stack of groups in detector coordinates is a view of the
+        # input data, so the corrections are made directly in the model
+        stack = self.DMS_to_detector_stack(self.input_model.data[integration])
+        #
+        # Get the reference values from the top and bottom reference
+        # pixels
+        #
+        refvalues = self.get_refvalues(stack)
+        if self.bad_reference_pixels:
+            return
+        self.do_top_bottom_correction(stack, refvalues)
+        if self.use_side_ref_pixels:
+            self.do_side_correction(stack)
+
     def do_subarray_corrections(self):
         """Do corrections for subarray.  Reference pixel value calculated
         separately for odd and even columns if odd_even_columns is True,
@@ -879,289 +1069,198 @@ class NIRDataset(Dataset):
 class NRS1Dataset(NIRDataset):
     """For NRS1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRS1 is just flipped over the line X=Y
-        self.get_group(integration, group)
-        self.group = np.swapaxes(self.group, 0, 1)
+        return np.swapaxes(data, -2, -1)
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = np.swapaxes(self.group, 0, 1)
-        self.restore_group(integration, group)
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = np.swapaxes(self.pixeldq, 0, 1)
+        return np.swapaxes(data, -2, -1)
 
 class NRS2Dataset(NIRDataset):
     """NRS2 Data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRS2 is flipped over the line Y=X, then rotated 180 degrees
-        self.get_group(integration, group)
-        self.group = np.swapaxes(self.group, 0, 1)[::-1, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = np.swapaxes(self.pixeldq, 0, 1)[::-1, ::-1]
+        return np.swapaxes(data, -2, -1)[..., ::-1, ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # The inverse is to rotate 180 degrees, then flip over the line Y=X
-        self.group = np.swapaxes(self.group[::-1, ::-1], 0, 1)
-        self.restore_group(integration, group)
+        return np.swapaxes(data[..., ::-1, ::-1], -2, -1)
 
 class NRCA1Dataset(NIRDataset):
     """For NRCA1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCA1 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 class NRCA2Dataset(NIRDataset):
     """For NRCA2 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCA2 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
+        return data[..., ::-1, :]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 class NRCA3Dataset(NIRDataset):
     """For NRCA3 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCA3 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 class NRCA4Dataset(NIRDataset):
     """For NRCA4 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCA4 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
+        return data[..., ::-1, :]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 class NRCALONGDataset(NIRDataset):
     """For NRCALONG data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCALONG is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 class NRCB1Dataset(NIRDataset):
     """For NRCB1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCB1 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
+        return data[..., ::-1, :]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 class NRCB2Dataset(NIRDataset):
     """For NRCB2 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCB2 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
+        return data[..., ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
-        #self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
 class NRCB3Dataset(NIRDataset):
     """For NRCB3 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCB3 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
+        return data[..., ::-1, :]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 class NRCB4Dataset(NIRDataset):
     """For NRCB4 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCB4 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
+        return data[..., ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 class NRCBLONGDataset(NIRDataset):
     """For NRCBLONG data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NRCBLONG is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
+        return data[..., ::-1, :]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 class NIRISSDataset(NIRDataset):
     """For NIRISS data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # NIRISS has a 180 degree rotation followed by a flip across the line
         # X=Y
-        self.get_group(integration, group)
-        self.group = np.swapaxes(self.group[::-1, ::-1], 0, 1)
+        return np.swapaxes(data[..., ::-1, ::-1], -2, -1)
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = np.swapaxes(self.pixeldq[::-1, ::-1], 0, 1)
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip and rotate back
-        self.group = np.swapaxes(self.group, 0, 1)[ ::-1, ::-1]
-        self.restore_group(integration, group)
+        return np.swapaxes(data, -2, -1)[..., ::-1, ::-1]
 
 class GUIDER1Dataset(NIRDataset):
     """For GUIDER1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # GUIDER1 is flipped in X and Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1, ::-1]
+        return data[..., ::-1, ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, ::-1]
 
 class GUIDER2Dataset(NIRDataset):
     """For GUIDER2 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_stack(self, data):
         #
         # GUIDER2 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
+        return data[..., ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_stack(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 
 class MIRIDataset(Dataset):
@@ -1674,7 +1773,7 @@ def create_dataset(input_model,
 def correct_model(input_model, odd_even_columns,
                    use_side_ref_pixels,
                    side_smoothing_length, side_gain,
-                   odd_even_rows):
+                   odd_even_rows, max_cores='none'):
     """Wrapper to do Reference Pixel Correction on a JWST Model.
     Performs the correction on the datamodel
 
@@ -1704,6 +1803,10 @@ def correct_model(input_model, odd_even_columns,
         flag that controls whether odd and even-numbered rows are handled
         separately (MIR only)
 
+    max_cores: string or int
+        number of threads in which the integrations of full-frame NIR
+        data are corrected: 'none', 'quarter', 'half', 'all' or an integer
+
     """
     if input_model.meta.instrument.name == 'MIRI':
         if reffile_utils.is_subarray(input_model):
@@ -1720,6 +1823,7 @@ def correct_model(input_model, odd_even_columns,
     if input_dataset is None:
         status = SUBARRAY_DOESNTFIT
         return status
+    input_dataset.num_threads = compute_num_processes(max_cores)
     result_dataset = reference_pixel_correction(input_dataset)
 
     if result_dataset.bad_reference_pixels:
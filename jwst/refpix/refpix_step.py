@@ -23,6 +23,8 @@ class RefPixStep(Step):
         side_smoothing_length = integer(default=11)
         side_gain = float(default=1.0)
         odd_even_rows = boolean(default=True)
+        maximum_cores = max_cores(default='none') # max number of threads: 'none', 'quarter', 'half', 'all' or an integer
+        irs2_groups_per_batch = integer(default=4, min=1) # number of groups corrected together in IRS2 mode
     """
 
     reference_file_types = ['refpix']
@@ -40,14 +42,15 @@ class RefPixStep(Step):
                 if self.irs2_name == 'N/A':
                     self.log.warning('No refpix reference file found')
                     self.log.warning('RefPix step will be skipped')
-                    result = input_model.copy()
+                    result = input_model.writable_copy()
                     result.meta.cal_step.refpix = 'SKIPPED'
                     input_model.close()
                     return result
 
                 irs2_model = datamodels.IRS2Model(self.irs2_name)
-                result = irs2_subtract_reference.correct_model(input_model,
-                                                               irs2_model)
+                result = irs2_subtract_reference.correct_model(
+                    input_model, irs2_model,
+                    groups_per_batch=self.irs2_groups_per_batch)
                 if result.meta.cal_step.refpix != 'SKIPPED':
                     result.meta.cal_step.refpix = 'COMPLETE'
                 irs2_model.close()
@@ -61,13 +64,14 @@ class RefPixStep(Step):
                               (self.side_smoothing_length,))
                 self.log.info('side_gain = %f' % (self.side_gain,))
                 self.log.info('odd_even_rows = %s' % (self.odd_even_rows,))
-                datamodel = input_model.copy()
+                datamodel = input_model.writable_copy()
                 status = reference_pixels.correct_model(datamodel,
                                                         self.odd_even_columns,
                                                         self.use_side_ref_pixels,
                                                         self.side_smoothing_length,
                                                         self.side_gain,
-                                                        self.odd_even_rows)
+                                                        self.odd_even_rows,
+                                                        self.maximum_cores)
                 if status == reference_pixels.REFPIX_OK:
                     datamodel.meta.cal_step.refpix = 'COMPLETE'
                 elif status == reference_pixels.SUBARRAY_DOESNTFIT:
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from ..irs2_subtract_reference import (hermitian_filter, ols_line, ols_lines,
+                                       subtract_reference)
+
+
+@pytest.mark.parametrize("n", [16, 17])
+def test_hermitian_filter(n):
+    rng = np.random.RandomState(3)
+    data = rng.normal(size=(2, n))
+    filt = rng.normal(size=(2, n)) + 1j * rng.normal(size=(2, n))
+    symmetric = np.abs(rng.normal(size=n // 2 + 1))
+    symmetric = np.concatenate((symmetric, symmetric[1:(n + 1) // 2][::-1]))
+
+    for f in (filt, symmetric):
+        expected = np.fft.ifft(np.fft.fft(data) * f).real
+        result = np.fft.irfft(np.fft.rfft(data) * hermitian_filter(f), n)
+        assert np.allclose(result, expected)
+    assert np.array_equal(hermitian_filter(symmetric), symmetric[:n // 2 + 1])
+
+
+def test_ols_lines():
+    rng = np.random.RandomState(5)
+    x = np.arange(24, dtype=np.float32).reshape((3, 8)) - 11.5
+    y = (2. + 0.5 * x + rng.normal(size=(5, 2, 3, 8))).astype(np.float32)
+    y[0, 1, :, ::3] = 0.
+    y[4, 0] = 0.
+
+    result = ols_lines(x, y)
+
+    assert result.shape == (2, 5, 2)
+    for i, k in np.ndindex(5, 2):
+        mask = (y[i, k] != 0.)
+        expected = ols_line(x[mask], y[i, k][mask])
+        assert np.allclose(result[:, i, k], expected, rtol=1e-5, atol=1e-6)
+    assert np.all(result[:, 4, 0] == 0.)
+
+
+def test_subtract_reference_batches():
+    rng = np.random.RandomState(7)
+    ngroups, ny, nx = 2, 2048, 3200
+    nsamples = 712 * ny
+    alpha = (1. + 0.01 * rng.normal(size=(4, nsamples))).astype(np.complex64)
+    beta = (0.1 * rng.normal(size=(4, nsamples)) +
+            0.1j * rng.normal(size=(4, nsamples))).astype(np.complex64)
+    irs2_mask = np.ones(nx, dtype=bool)
+    irs2_mask[:640] = False
+    for i in range(648, nx, 20):
+        irs2_mask[i:i + 4] = False
+    data = (1000. + 10. * np.arange(ngroups)[:, None, None] +
+            rng.normal(0., 10., (ngroups, ny, nx))).astype(np.float32)
+
+    results = [subtract_reference(data.copy(), alpha, beta, irs2_mask,
+                                  16, 4, 8, groups_per_batch)
+               for groups_per_batch in (None, 1)]
+
+    assert results[0].shape == (ngroups, ny, ny)
+    assert np.all(np.isfinite(results[0]))
+    assert np.allclose(results[0], results[1], rtol=0., atol=1e-3)
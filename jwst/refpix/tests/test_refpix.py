@@ -695,3 +695,68 @@ def test_correct_model(setup_cube, instr, det):
 
     np.testing.assert_almost_equal(np.mean(input_model.data[0, 0, :4, 4:-4]), 0, decimal=0)
     np.testing.assert_almost_equal(np.mean(input_model.data[0, 0, 4:-4, 4:-4]), dataval - rpix, decimal=0)
+
+
+@pytest.mark.parametrize("smoothing_length", [11, 10])
+def test_median_filter_stack(setup_cube, smoothing_length):
+    '''Test the running median of a stack of groups against each row and group.'''
+
+    input_model = setup_cube('NIRCAM', 'NRCA1', 3, 2048, 2048)
+    dataset = NIRDataset(input_model, True, True, smoothing_length, 1.0)
+
+    rng = np.random.RandomState(5)
+    data = rng.normal(100., 10., (3, 60, 4)).astype(np.float32)
+    data[1, 20, 2] = np.nan
+    dq = np.zeros((60, 4), dtype=np.uint32)
+    dq[30:33, 1] = dqflags.pixel['DO_NOT_USE']
+    dq[45:, :3] = dqflags.pixel['DO_NOT_USE']
+
+    result = dataset.median_filter(data, dq, smoothing_length)
+
+    bufsize = (smoothing_length + 1 - smoothing_length % 2) // 2
+    reflected = np.concatenate((data[:, bufsize:0:-1], data,
+                                data[:, -2:-(bufsize + 2):-1]), axis=1)
+    good = np.concatenate((dq[bufsize:0:-1], dq, dq[-2:-(bufsize + 2):-1])) == 0
+    assert result.shape == (3, 60)
+    for group, row in np.ndindex(3, 60):
+        window = reflected[group, row:row + smoothing_length]
+        expected = np.median(window[good[row:row + smoothing_length]])
+        np.testing.assert_array_equal(result[group, row], expected)
+
+
+def test_sigma_clip_stack(setup_cube):
+    '''Test the clipped means of a stack of groups against each group.'''
+
+    input_model = setup_cube('NIRCAM', 'NRCA1', 3, 2048, 2048)
+    dataset = NIRDataset(input_model, True, True, 11, 1.0)
+
+    rng = np.random.RandomState(7)
+    data = rng.normal(10., 1., (4, 4, 256))
+    data[1, 2, 30] = 100.
+    data[2, 0, :40] = -20.
+    data[3] = 5.
+    dq = np.zeros((4, 256), dtype=np.uint32)
+    dq[1, 100:110] = dqflags.pixel['DO_NOT_USE']
+
+    means = dataset.sigma_clip_stack(data, dq)
+
+    assert means.shape == (4,)
+    for group in range(4):
+        np.testing.assert_allclose(means[group], dataset.sigma_clip(data[group], dq))
+    assert dataset.sigma_clip_stack(data, dq | dqflags.pixel['DO_NOT_USE']) is None
+
+
+def test_correct_model_threads(setup_cube):
+    '''Test that correcting the integrations in threads gives the same result.'''
+
+    rng = np.random.RandomState(9)
+    data = rng.normal(1000., 20., (3, 2, 2048, 2048)).astype(np.float32)
+    results = []
+    for max_cores in ('none', '3'):
+        input_model = setup_cube('NIRSPEC', 'NRS2', 2, 2048, 2048)
+        input_model.data = data.copy()
+        correct_model(input_model, True, True, 11, 1.0, False, max_cores)
+        results.append(input_model.data)
+
+    np.testing.assert_array_equal(results[0], results[1])
+    assert np.abs(results[0][:, :, 4:-4, 4:-4].mean()) < 1.
@@ -16,7 +16,7 @@ class GWCSDrizzle:
     """
     def __init__(self, product, outwcs=None, single=False,
                  wt_scl="exptime", pixfrac=1.0, kernel="square",
-                 fillval="INDEF"):
+                 fillval="INDEF", pixmap_step=1):
         """
         Create a new Drizzle output object and set the drizzle parameters.
 
@@ -55,6 +55,12 @@ class GWCSDrizzle:
         fillval : str, otional
             The value a pixel is set to in the output if the input image does
             not overlap it. The default value of INDEF does not set a value.
+
+        pixmap_step : int, optional
+            Spacing, in input pixels, of the grid on which the WCS transforms
+            are evaluated when mapping input to output pixels. The default
+            value of 1 evaluates them at every pixel; larger values
+            interpolate in between, within `resample_utils.PIXMAP_TOLERANCE`.
         """
 
         # Initialize the object fields
@@ -69,6 +75,7 @@ class GWCSDrizzle:
         self.kernel = kernel
         self.fillval = fillval
         self.pixfrac = pixfrac
+        self.pixmap_step = pixmap_step
 
         self.sciext = "SCI"
         self.whtext = "WHT"
@@ -202,7 +209,7 @@ class GWCSDrizzle:
                             pscale_ratio=pscale_ratio, uniqid=self.uniqid,
                             xmin=xmin, xmax=xmax, ymin=ymin, ymax=ymax,
                             pixfrac=self.pixfrac, kernel=self.kernel,
-                            fillval=self.fillval)
+                            fillval=self.fillval, pixmap_step=self.pixmap_step)
 
     def blot_image(self, blotwcs, interp='poly5', sinscl=1.0):
         """
@@ -263,7 +270,7 @@ def dodrizzle(insci, input_wcs, inwht,
               expin, in_units, wt_scl,
               pscale_ratio=1.0, uniqid=1,
               xmin=0, xmax=0, ymin=0, ymax=0,
-              pixfrac=1.0, kernel='square', fillval="INDEF"):
+              pixfrac=1.0, kernel='square', fillval="INDEF", pixmap_step=1):
     """
     Low level routine for performing 'drizzle' operation on one image.
 
@@ -368,6 +375,11 @@ def dodrizzle(insci, input_wcs, inwht,
         The value a pixel is set to in the output if the input image does
         not overlap it. The default value of INDEF does not set a value.
 
+    pixmap_step: int, optional
+        Spacing, in input pixels, of the grid on which the WCS transforms
+        are evaluated to map input to output pixels. See
+        `resample_utils.calc_gwcs_pixmap`.
+
     Returns
     -------
     A tuple with three values: a version string, the number of pixels
@@ -422,7 +434,8 @@ def dodrizzle(insci, input_wcs, inwht,
 
     # Compute the mapping between the input and output pixel coordinates
     # for use in drizzle.cdrizzle.tdriz
-    pixmap = resample_utils.calc_gwcs_pixmap(input_wcs, output_wcs, insci.shape)
+    pixmap = resample_utils.calc_gwcs_pixmap(input_wcs, output_wcs, insci.shape,
+                                             grid_step=pixmap_step)
     # pixmap[np.isnan(pixmap)] = -10
     # print("Number of NaNs: ", len(np.isnan(pixmap)) / 2)
     # inwht[np.isnan(pixmap[:,:,0])] = 0.
@@ -1,8 +1,10 @@
 import logging
 from collections import OrderedDict
+import os
 import numpy as np
 
 from .. import datamodels
+from ..lib import parallel_utils
 
 from . import gwcs_drizzle
 from . import resample_utils
@@ -35,7 +37,7 @@ class ResampleData:
       5. Updates output data model with output arrays from drizzle, including
          (eventually) a record of metadata from all input models.
     """
-    def __init__(self, input_models, output=None, **pars):
+    def __init__(self, input_models, output=None, memmap_dir=None, **pars):
         """
         Parameters
         ----------
@@ -44,8 +46,16 @@ class ResampleData:
 
         output : str
             filename for output
+
+        memmap_dir : str or None
+            If given, the arrays of each output image are written to
+            memory-mapped files in this directory as soon as the image is
+            drizzled, rather than all output images being held in memory.
+            The directory must remain in place as long as the output
+            models are in use.
         """
         self.input_models = input_models
+        self.memmap_dir = memmap_dir
         self.drizpars = pars
         if output is None:
             output = input_models.meta.resample.output
@@ -109,46 +119,47 @@ class ResampleData:
             group_exptime = [total_exposure_time]
         pointings = len(self.input_models.group_names)
 
-        for obs_product, exposure, texptime in zip(driz_outputs, exposures,
-                                                   group_exptime):
-            output_model = self.blank_output.copy()
-            output_model.meta.filename = obs_product
-
-            if self.drizpars['blendheaders']:
-                self.blend_output_metadata(output_model)
-
-            exposure_times = {'start': [], 'end': []}
-
-            # Initialize the output with the wcs
-            driz = gwcs_drizzle.GWCSDrizzle(output_model,
-                                            single=self.drizpars['single'],
-                                            pixfrac=self.drizpars['pixfrac'],
-                                            kernel=self.drizpars['kernel'],
-                                            fillval=self.drizpars['fillval'])
-
-            for n, img in enumerate(exposure):
-                exposure_times['start'].append(img.meta.exposure.start_time)
-                exposure_times['end'].append(img.meta.exposure.end_time)
-
-                # apply sky subtraction
+        # Apply sky subtraction to the inputs here, so that it also applies
+        # to the input models when the drizzling is done by worker processes
+        for exposure in exposures:
+            for img in exposure:
                 blevel = img.meta.background.level
                 if not img.meta.background.subtracted and blevel is not None:
                     img.data -= blevel
 
-                outwcs_pscale = output_model.meta.wcsinfo.cdelt1
-                wcslin_pscale = img.meta.wcsinfo.cdelt1
+        # Each output is drizzled independently, possibly in parallel
+        num_processes = parallel_utils.compute_num_processes(
+            self.drizpars.get('maximum_cores', 'none'))
+        if self.memmap_dir is None:
+            driz_arrays = parallel_utils.map_forked(
+                self.drizzle_exposure, exposures, num_processes,
+                label='output image')
+        else:
+            driz_paths = parallel_utils.map_forked(
+                self.drizzle_exposure_to_disk, list(enumerate(exposures)),
+                num_processes, label='output image')
+            driz_arrays = [[np.load(path, mmap_mode='r+') for path in paths]
+                           for paths in driz_paths]
+            log.debug('Moved {} resampled images to {}'.format(
+                len(driz_paths), self.memmap_dir))
+
+        for obs_product, exposure, texptime, (outsci, outwht, outcon) in zip(
+                driz_outputs, exposures, group_exptime, driz_arrays):
+            output_model = self.blank_output.copy()
+            output_model.meta.filename = obs_product
+            output_model.data = outsci
+            output_model.wht = outwht
+            output_model.con = outcon
 
-                inwht = resample_utils.build_driz_weight(img,
-                    weight_type=self.drizpars['weight_type'],
-                    good_bits=self.drizpars['good_bits'])
-                driz.add_image(img.data, img.meta.wcs, inwht=inwht,
-                        expin=img.meta.exposure.exposure_time,
-                        pscale_ratio=outwcs_pscale / wcslin_pscale)
+            if self.drizpars['blendheaders']:
+                self.blend_output_metadata(output_model)
 
             # Update some basic exposure time values based on all the inputs
             output_model.meta.exposure.exposure_time = texptime
-            output_model.meta.exposure.start_time = min(exposure_times['start'])
-            output_model.meta.exposure.end_time = max(exposure_times['end'])
+            output_model.meta.exposure.start_time = min(
+                img.meta.exposure.start_time for img in exposure)
+            output_model.meta.exposure.end_time = max(
+                img.meta.exposure.end_time for img in exposure)
             output_model.meta.resample.product_exposure_time = texptime
             output_model.meta.resample.weight_type = self.drizpars['weight_type']
             output_model.meta.resample.pointings = pointings
@@ -157,6 +168,66 @@ class ResampleData:
 
             self.output_models.append(output_model)
 
+    def drizzle_exposure(self, exposure):
+        """Drizzle a group of input images onto a new output image.
+
+        Parameters
+        ----------
+        exposure : list of DataModels
+            The input images that make up one output image.
+
+        Returns
+        -------
+        outsci, outwht, outcon : numpy.ndarray
+            The science, weight and context arrays of the output image.
+        """
+        output_model = self.blank_output.copy()
+        outwcs_pscale = output_model.meta.wcsinfo.cdelt1
+
+        # Initialize the output with the wcs
+        driz = gwcs_drizzle.GWCSDrizzle(output_model,
+                                        single=self.drizpars['single'],
+                                        pixfrac=self.drizpars['pixfrac'],
+                                        kernel=self.drizpars['kernel'],
+                                        fillval=self.drizpars['fillval'],
+                                        pixmap_step=self.drizpars.get('pixmap_step', 1))
+
+        for img in exposure:
+            wcslin_pscale = img.meta.wcsinfo.cdelt1
+
+            inwht = resample_utils.build_driz_weight(img,
+                weight_type=self.drizpars['weight_type'],
+                good_bits=self.drizpars['good_bits'])
+            driz.add_image(img.data, img.meta.wcs, inwht=inwht,
+                    expin=img.meta.exposure.exposure_time,
+                    pscale_ratio=outwcs_pscale / wcslin_pscale)
+
+        return output_model.data, output_model.wht, output_model.con
+
+    def drizzle_exposure_to_disk(self, item):
+        """Drizzle a group of input images and write the output arrays to
+        files in `memmap_dir`.
+
+        Parameters
+        ----------
+        item : (int, list of DataModels)
+            The index of the output image, and the input images that make
+            it up.
+
+        Returns
+        -------
+        paths : list of str
+            The ``.npy`` files of the science, weight and context arrays.
+        """
+        index, exposure = item
+        paths = []
+        for name, array in zip(('data', 'wht', 'con'),
+                               self.drizzle_exposure(exposure)):
+            path = os.path.join(self.memmap_dir, '{}_{}.npy'.format(index, name))
+            np.save(path, array)
+            paths.append(path)
+        return paths
+
     def update_fits_wcs(self, model):
         """
         Update FITS WCS keywords of the resampled image.
@@ -36,6 +36,7 @@ class ResampleStep(Step):
         weight_type = option('exptime', default='exptime')
         single = boolean(default=False)
         blendheaders = boolean(default=True)
+        pixmap_step = integer(default=1, min=1)  # pixels between exact WCS evaluations
     """
 
     reference_file_types = ['drizpars']
@@ -168,7 +169,8 @@ class ResampleStep(Step):
         kwargs = dict(
             good_bits=GOOD_BITS,
             single=self.single,
-            blendheaders=self.blendheaders
+            blendheaders=self.blendheaders,
+            pixmap_step=self.pixmap_step
             )
 
         kwargs.update(all_drizpars)
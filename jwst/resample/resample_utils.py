@@ -1,10 +1,17 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+import io
 import logging
+import os
 import warnings
 
+import asdf
 import numpy as np
 from astropy import wcs as fitswcs
 from astropy.modeling import Model
 from gwcs import WCS, wcstools
+from scipy.interpolate import RectBivariateSpline
 
 from jwst.datamodels.dqflags import interpret_bit_flags
 
@@ -13,6 +20,12 @@ from ..assign_wcs.util import wcs_from_footprints, wcs_bbox_from_shape
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Memory, in MB, of the pixel maps kept in memory by `pixmap_cache`
+PIXMAP_CACHE_SIZE = 1024.
+
+# Maximum error, in pixels, of pixel maps interpolated from a coarse grid
+PIXMAP_TOLERANCE = 0.01
+
 
 def make_output_wcs(input_models):
     """ Generate output WCS here based on footprints of all input WCS objects
@@ -64,8 +77,39 @@ def shape_from_bounding_box(bounding_box):
     return tuple(reversed(size))
 
 
-def calc_gwcs_pixmap(in_wcs, out_wcs, shape=None):
+def calc_gwcs_pixmap(in_wcs, out_wcs, shape=None, grid_step=1,
+                     tolerance=PIXMAP_TOLERANCE, use_cache=True):
     """ Return a pixel grid map from input frame to output frame.
+
+    Parameters
+    ----------
+    in_wcs, out_wcs : `~gwcs.wcs.WCS`
+        The WCS of the input and output frames.
+
+    shape : tuple of int, optional
+        Shape of the input image. If not given, the map covers the bounding
+        box of ``in_wcs``.
+
+    grid_step : int, optional
+        If larger than 1, the WCS transforms are only evaluated on a grid
+        with this spacing, in pixels, and interpolated in between. The
+        interpolation is checked against the exact transforms halfway
+        between the grid points, and the map is computed at every pixel
+        instead if it is off by more than ``tolerance`` pixels.
+
+    tolerance : float, optional
+        Maximum interpolation error, in output pixels, when ``grid_step``
+        is larger than 1.
+
+    use_cache : bool, optional
+        Look up the map in, and add it to, ``pixmap_cache``, if it is
+        active.
+
+    Returns
+    -------
+    pixmap : numpy.ndarray
+        The x and y output pixel coordinates of every input pixel, with a
+        shape of ``(ny, nx, 2)``.
     """
     if shape:
         bb = wcs_bbox_from_shape(shape)
@@ -74,12 +118,209 @@ def calc_gwcs_pixmap(in_wcs, out_wcs, shape=None):
         bb = in_wcs.bounding_box
         log.debug("Bounding box from WCS: {}".format(in_wcs.bounding_box))
 
+    key = None
+    if use_cache and pixmap_cache.enabled:
+        key = pixmap_cache.key(in_wcs, out_wcs, bb, grid_step, tolerance)
+        pixmap = pixmap_cache.get(key)
+        if pixmap is not None:
+            log.debug("Using cached pixel map")
+            return pixmap.copy()
+
     grid = wcstools.grid_from_bounding_box(bb)
-    pixmap = np.dstack(reproject(in_wcs, out_wcs)(grid[0], grid[1]))
+    transform = reproject(in_wcs, out_wcs)
+
+    pixmap = None
+    if grid_step > 1:
+        pixmap = _interpolated_pixmap(transform, grid, grid_step, tolerance)
+    if pixmap is None:
+        pixmap = np.dstack(transform(grid[0], grid[1]))
+
+    if key is not None:
+        pixmap_cache.put(key, pixmap.copy())
 
     return pixmap
 
 
+def _interpolated_pixmap(transform, grid, grid_step, tolerance):
+    """Pixel map interpolated from a coarse grid, or None if not accurate enough"""
+    x = grid[0][0]
+    y = grid[1][:, 0]
+    xnodes = np.unique(np.append(np.arange(0, x.size, grid_step), x.size - 1))
+    ynodes = np.unique(np.append(np.arange(0, y.size, grid_step), y.size - 1))
+    if xnodes.size < 4 or ynodes.size < 4:
+        return None
+    xnodes = x[xnodes]
+    ynodes = y[ynodes]
+
+    coarse = transform(*np.meshgrid(xnodes, ynodes))
+    if not all(np.isfinite(axis).all() for axis in coarse):
+        log.debug("Pixel map has undefined values, computing it at every pixel")
+        return None
+    splines = [RectBivariateSpline(ynodes, xnodes, axis) for axis in coarse]
+
+    # The interpolation error is largest halfway between the grid points
+    xmid = (xnodes[:-1] + xnodes[1:]) / 2.
+    ymid = (ynodes[:-1] + ynodes[1:]) / 2.
+    exact = transform(*np.meshgrid(xmid, ymid))
+    error = max(np.max(np.abs(spline(ymid, xmid) - axis))
+                for spline, axis in zip(splines, exact))
+    if not error <= tolerance:
+        log.debug("Pixel map interpolation error of {:.3g} pixels exceeds "
+                  "{:.3g}, computing it at every pixel".format(error, tolerance))
+        return None
+
+    log.debug("Pixel map interpolated from a grid of {} x {} points, "
+              "maximum error {:.3g} pixels".format(xnodes.size, ynodes.size, error))
+    return np.dstack([spline(y, x) for spline in splines])
+
+
+def _wcs_fingerprint(wcs):
+    """Digest of the ASDF serialization of a WCS, or None if it has none"""
+    buff = io.BytesIO()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            asdf.AsdfFile({'wcs': wcs}).write_to(buff)
+    except Exception as exc:
+        log.debug("Cannot serialize WCS, pixel map not cached: {}".format(exc))
+        return None
+    return hashlib.sha1(buff.getvalue()).hexdigest()
+
+
+class PixmapCache:
+    """Least-recently-used cache of pixel maps between pairs of WCS.
+
+    The cache is only used within `active`, which a step wraps around the
+    work that computes the same pixel maps more than once; the maps are
+    dropped when the outermost such block ends.
+
+    Pixel maps are kept in memory up to a total size, after which the
+    least recently used maps are dropped. If a directory is set, every map
+    is also saved there, so that maps dropped from memory, or computed by
+    other processes, are read back instead of being computed again.
+
+    Parameters
+    ----------
+    max_memory : float
+        Memory, in MB, of the maps kept in memory.
+
+    directory : str or None
+        Directory in which the maps are saved, if any. It is up to the
+        caller to remove the directory.
+    """
+
+    def __init__(self, max_memory=PIXMAP_CACHE_SIZE, directory=None):
+        self.max_memory = max_memory
+        self.directory = directory
+        self._pixmaps = OrderedDict()
+        self._nbytes = 0
+        self._fingerprints = {}
+        self._depth = 0
+
+    @property
+    def enabled(self):
+        return self._depth > 0
+
+    @contextmanager
+    def active(self, directory=None):
+        """Cache the pixel maps computed within the block.
+
+        The WCS objects the maps are computed for must not be modified
+        within the block, as each is serialized only once to identify it.
+
+        Parameters
+        ----------
+        directory : str or None
+            Directory in which to save the maps within the block, if any.
+        """
+        saved_directory = self.directory
+        if directory is not None:
+            self.directory = directory
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            self.directory = saved_directory
+            if self._depth == 0:
+                self.clear()
+
+    def key(self, in_wcs, out_wcs, bounding_box, grid_step, tolerance):
+        """Key of a pixel map in the cache, or None if it cannot be cached"""
+        fingerprints = [self._fingerprint(in_wcs), self._fingerprint(out_wcs)]
+        if None in fingerprints:
+            return None
+        parts = fingerprints + [repr(bounding_box), str(grid_step), str(tolerance)]
+        return hashlib.sha1('/'.join(parts).encode('ascii')).hexdigest()
+
+    def get(self, key):
+        """Return the pixel map for a key, or None if not cached"""
+        if key is None:
+            return None
+
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+
+        if self.directory is not None:
+            try:
+                pixmap = np.load(self._path(key))
+            except (OSError, ValueError):
+                return None
+            self._keep(key, pixmap)
+        return pixmap
+
+    def put(self, key, pixmap):
+        """Add a pixel map to the cache"""
+        if key is None:
+            return
+
+        self._keep(key, pixmap)
+        if self.directory is not None:
+            # Write to a temporary name first, for processes sharing the directory
+            path = self._path(key)
+            tmp_path = '{}.{}.tmp.npy'.format(path[:-4], os.getpid())
+            try:
+                np.save(tmp_path, pixmap)
+                os.replace(tmp_path, path)
+            except OSError as exc:
+                log.warning("Cannot save pixel map to {}: {}".format(
+                    self.directory, exc))
+
+    def clear(self):
+        """Drop all pixel maps held in memory"""
+        self._pixmaps.clear()
+        self._nbytes = 0
+        self._fingerprints.clear()
+
+    def _fingerprint(self, wcs):
+        # The WCS is kept along with its digest, so that its id is not reused
+        try:
+            return self._fingerprints[id(wcs)][1]
+        except KeyError:
+            fingerprint = _wcs_fingerprint(wcs)
+            self._fingerprints[id(wcs)] = (wcs, fingerprint)
+            return fingerprint
+
+    def _keep(self, key, pixmap):
+        max_bytes = self.max_memory * 1024 * 1024
+        if pixmap.nbytes > max_bytes:
+            return
+        self._pixmaps[key] = pixmap
+        self._nbytes += pixmap.nbytes
+        while self._nbytes > max_bytes:
+            _, dropped = self._pixmaps.popitem(last=False)
+            self._nbytes -= dropped.nbytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, 'pixmap_{}.npy'.format(key))
+
+
+# Pixel maps computed by calc_gwcs_pixmap
+pixmap_cache = PixmapCache()
+
+
 def reproject(wcs1, wcs2):
     """
     Given two WCSs or transforms return a function which takes pixel
@@ -2,10 +2,16 @@
 import pytest
 
 import numpy as np
+from astropy import coordinates as coord
+from astropy import units as u
+from astropy.modeling import models
+from gwcs import coordinate_frames as cf
+from gwcs import wcs
 
 from jwst.datamodels import SlitModel
+from jwst.resample import resample_utils
 from jwst.resample.resample_spec import find_dispersion_axis
-from jwst.resample.resample_utils import build_mask
+from jwst.resample.resample_utils import build_mask, calc_gwcs_pixmap, PixmapCache
 
 
 DQ = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8])
@@ -54,3 +60,74 @@ def test_find_dispersion_axis():
 
     dm.meta.wcsinfo.dispersion_direction = 2    # vertical
     assert find_dispersion_axis(dm) == 1        # Y axis for wcs functions
+
+
+def make_tan_wcs(crval, shape, scale=0.1 / 3600):
+    """Simple tangent-plane WCS centered on the image"""
+    transform = (models.Shift(-shape[1] / 2) & models.Shift(-shape[0] / 2) |
+                 models.Scale(scale) & models.Scale(scale) |
+                 models.Pix2Sky_TAN() |
+                 models.RotateNative2Celestial(crval[0], crval[1], 180))
+    detector = cf.Frame2D(name='detector', axes_names=('x', 'y'),
+                          unit=(u.pix, u.pix))
+    sky = cf.CelestialFrame(reference_frame=coord.ICRS(), name='world')
+    return wcs.WCS([(detector, transform), (sky, None)])
+
+
+def test_pixmap_cache(tmp_path, monkeypatch):
+    """Pixel maps are reused, evicted when over budget and reloaded from disk"""
+    cache = PixmapCache(max_memory=0.3)
+    monkeypatch.setattr(resample_utils, 'pixmap_cache', cache)
+    in_wcs = make_tan_wcs((10, 20), (100, 120))
+    out_wcs = make_tan_wcs((10.0001, 20), (150, 150), scale=0.07 / 3600)
+
+    # Nothing is cached unless the cache is active
+    calc_gwcs_pixmap(in_wcs, out_wcs, (100, 120))
+    assert len(cache._pixmaps) == 0
+
+    with cache.active():
+        pixmap = calc_gwcs_pixmap(in_wcs, out_wcs, (100, 120))
+        assert len(cache._pixmaps) == 1
+
+        # A cached map is returned as a copy
+        pixmap[:] = 0
+        cached = calc_gwcs_pixmap(in_wcs, out_wcs, (100, 120))
+        assert np.all(cached != 0)
+        np.testing.assert_allclose(
+            cached, calc_gwcs_pixmap(in_wcs, out_wcs, (100, 120), use_cache=False))
+
+        # A different shape or WCS is another map; two maps exceed the budget
+        other = calc_gwcs_pixmap(make_tan_wcs((10, 20.0001), (100, 120)), out_wcs,
+                                 (100, 120))
+        assert len(cache._pixmaps) == 1
+        assert not np.allclose(other, cached)
+
+    # The maps are dropped at the end of the block
+    assert len(cache._pixmaps) == 0
+    assert len(cache._fingerprints) == 0
+
+    # Maps dropped from memory are read back from the directory
+    with cache.active(str(tmp_path)):
+        calc_gwcs_pixmap(in_wcs, out_wcs, (100, 120))
+        assert len(list(tmp_path.glob('pixmap_*.npy'))) == 1
+        cache.clear()
+        monkeypatch.setattr(resample_utils, 'reproject', None)
+        np.testing.assert_array_equal(
+            calc_gwcs_pixmap(in_wcs, out_wcs, (100, 120)), cached)
+    assert cache.directory is None
+
+
+@pytest.mark.parametrize('tolerance, interpolated', [(1e-3, True), (1e-12, False)])
+def test_calc_gwcs_pixmap_grid_step(tolerance, interpolated):
+    """Pixel maps interpolated from a coarse grid are within the tolerance"""
+    in_wcs = make_tan_wcs((10, 20), (300, 400), scale=10. / 3600)
+    out_wcs = make_tan_wcs((10.1, 20.1), (300, 300), scale=7. / 3600)
+    shape = (300, 400)
+
+    exact = calc_gwcs_pixmap(in_wcs, out_wcs, shape, use_cache=False)
+    pixmap = calc_gwcs_pixmap(in_wcs, out_wcs, shape, grid_step=32,
+                              tolerance=tolerance, use_cache=False)
+
+    assert pixmap.shape == exact.shape
+    assert np.max(np.abs(pixmap - exact)) <= tolerance
+    assert np.array_equal(pixmap, exact) != interpolated
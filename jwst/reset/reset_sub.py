@@ -53,13 +53,17 @@ def do_correction(input_model, reset_model):
     output = input_model.copy()
 
 
+    # The first integration may be a later one of the exposure, for a
+    # segment or block of integrations
+    int_start = (input_model.meta.exposure.integration_start or 1) - 1
+
     # loop over all integrations
 
     for i in range(sci_nints):
         # check if integration # > reset_nints
-        ir = i
+        ir = i + int_start
 
-        if i >= reset_nints:
+        if ir >= reset_nints:
             ir = reset_nints - 1
 
         # combine the science and reset DQ arrays
@@ -57,7 +57,7 @@ class RSCD_Step(Step):
             else:
                 self.log.warning('RSCD correction is only for MIRI data')
                 self.log.warning('RSCD step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.rscd = 'SKIPPED'
 
         return result
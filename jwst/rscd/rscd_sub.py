@@ -87,7 +87,7 @@ def correction_skip_groups(input_model, group_skip):
               (sci_nints, sci_ngroups))
 
     # Create output as a copy of the input science data model
-    output = input_model.copy()
+    output = input_model.writable_copy()
 
     # If ngroups <= group_skip+3, skip the flagging
     # the +3 is to ensure there is a slope to be fit including the flagging for
@@ -98,9 +98,15 @@ def correction_skip_groups(input_model, group_skip):
         output.meta.cal_step.rscd = 'SKIPPED'
         return output
 
+    # The first integration of the exposure is not affected, but the first
+    # integration of a later segment or block of integrations is
+    first_int = 1
+    if (input_model.meta.exposure.integration_start or 1) > 1:
+        first_int = 0
+
     # If ngroups > group_skip+3, set all of the GROUPDQ in the first group to 'DO_NOT_USE'
-    output.groupdq[1:, 0:group_skip :, :] = \
-        np.bitwise_or(output.groupdq[1:, 0:group_skip,:,:], dqflags.group['DO_NOT_USE'])
+    output.groupdq[first_int:, 0:group_skip :, :] = \
+        np.bitwise_or(output.groupdq[first_int:, 0:group_skip,:,:], dqflags.group['DO_NOT_USE'])
     log.debug(f"RSCD Sub: adding DO_NOT_USE to GROUPDQ for the first {group_skip} groups")
     output.meta.cal_step.rscd = 'COMPLETE'
 
@@ -153,7 +159,7 @@ def correction_decay_function(input_model, param):
               (sci_nints, sci_ngroups))
 
     # Create output as a copy of the input science data model
-    output = input_model.copy()
+    output = input_model.writable_copy()
 
     # Check for valid parameters
     if sci_ngroups < 2:
@@ -200,9 +206,11 @@ def correction_decay_function(input_model, param):
     tau_even = param['even']['tau'].item()
     tau_odd = param['odd']['tau'].item()
 
-    # loop over all integrations except the first
+    # loop over all integrations except the first, last to first, so that
+    # the previous integration is not yet corrected when the output is the
+    # input model itself
     mdelta = int(sci_nints / 10) + 1
-    for i in range(1, sci_nints):
+    for i in range(sci_nints - 1, 0, -1):
         if ((i + 1) % mdelta) == 0:
             log.info(' Working on integration %d', i + 1)
 
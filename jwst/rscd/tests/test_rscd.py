@@ -64,6 +64,28 @@ def test_rscd_baseline_set_groupdq():
                                   + 'integration this should not happen')
 
 
+def test_rscd_baseline_later_segment():
+    """
+    For a segment of an exposure that does not start with the first
+    integration, test that the groups are also flagged in the first
+    integration of the segment
+    """
+
+    csize = (2, 10, 10, 10)
+    data = np.full(csize, 1.0, dtype=np.float32)
+    groupdq = np.zeros(csize, dtype=np.uint8)
+
+    dm_ramp = RampModel(data=data, groupdq=groupdq)
+    dm_ramp.meta.exposure.integration_start = 5
+    dm_ramp.meta.exposure.integration_end = 6
+
+    nflag = 3
+    dm_ramp_rscd = correction_skip_groups(dm_ramp, nflag)
+
+    assert np.all(dm_ramp_rscd.groupdq[:, :nflag] == dqflags.group['DO_NOT_USE'])
+    assert np.all(dm_ramp_rscd.groupdq[:, nflag:] == 0)
+
+
 def test_rscd_baseline_too_few_groups():
     """
     Test that the baseline algorithm is skipped if too few groups are present
@@ -99,3 +121,36 @@ def test_rscd_baseline_too_few_groups():
                                   dq_diff,
                                   err_msg='groupdq flags changed when '
                                   + 'not enough groups are present')
+
+
+def test_rscd_enhanced_in_place():
+    """
+    The enhanced correction of a model handed over to be corrected in place
+    is the same as that of a copy
+    """
+    from jwst.rscd.rscd_sub import correction_decay_function
+
+    rng = np.random.RandomState(2)
+    nints, ngroups, ysize, xsize = 4, 8, 6, 5
+    slope = rng.uniform(50., 500., (1, 1, ysize, xsize))
+    data = (slope * np.arange(1, ngroups + 1)[None, :, None, None] +
+            rng.normal(0., 5., (nints, ngroups, ysize, xsize)))
+    dm_ramp = RampModel(data=data.astype(np.float32))
+    dm_ramp.groupdq = np.zeros(data.shape, dtype=np.uint8)
+    dm_ramp.pixeldq = np.zeros((ysize, xsize), dtype=np.uint32)
+
+    row = dict(ascale=1., illum_zp=0.1, illum_slope=0.01, illum2=0.001,
+               sat_zp=0.1, sat_slope=0.01, sat2=0.001, sat_rowterm=0.,
+               pow=1.2, param3=3000., crossopt=10., sat_mzp=0.1,
+               sat_scale=1., tau=5.)
+    param = {parity: {key: np.float64(value) for key, value in row.items()}
+             for parity in ('even', 'odd')}
+
+    expected = correction_decay_function(dm_ramp, param)
+    assert expected is not dm_ramp
+    assert not np.array_equal(expected.data[2:], dm_ramp.data[2:])
+
+    with dm_ramp.handed_over():
+        result = correction_decay_function(dm_ramp, param)
+    assert result is dm_ramp
+    np.testing.assert_array_equal(result.data, expected.data)
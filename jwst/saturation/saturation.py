@@ -43,7 +43,7 @@ def do_correction(input_model, ref_model):
         irs2_mask = x_irs2.make_mask(input_model)
 
    # Create the output model as a copy of the input
-    output_model = input_model.copy()
+    output_model = input_model.writable_copy()
     groupdq = output_model.groupdq
 
     # Extract subarray from reference file, if necessary
@@ -28,7 +28,7 @@ class SaturationStep(Step):
             if self.ref_name == 'N/A':
                 self.log.warning('No SATURATION reference file found')
                 self.log.warning('Saturation step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.saturation = 'SKIPPED'
                 return result
 
@@ -10,6 +10,7 @@ import numpy as np
 
 # LOCAL
 from . skyimage import SkyImage, SkyGroup
+from .. lib.parallel_utils import map_forked
 
 
 __all__ = ['match']
@@ -24,8 +25,13 @@ __local_debug__ = True
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Margin (in radians) added to the radii of the bounding caps of images
+# when checking whether they overlap
+CAP_TOLERANCE = 1.0e-8
 
-def match(images, skymethod='global+match', match_down=True, subtract=False):
+
+def match(images, skymethod='global+match', match_down=True, subtract=False,
+          num_processes=1):
     """
     A function to compute and/or "equalize" sky background in input images.
 
@@ -92,6 +98,14 @@ def match(images, skymethod='global+match', match_down=True, subtract=False):
     subtract : bool (Default = False)
         Subtract computed sky value from image data.
 
+    num_processes : int (Default = 1)
+        Number of worker processes computing the sky statistics in the
+        overlaps of pairs of images.
+
+        .. note::
+          This setting applies *only* when `skymethod` parameter is
+          either `'match'` or `'global+match'`.
+
 
     Raises
     ------
@@ -306,7 +320,8 @@ def match(images, skymethod='global+match', match_down=True, subtract=False):
                  "overlapping regions.")
 
         # find "optimum" sky changes:
-        sky_deltas = _find_optimum_sky_deltas(images, apply_sky=not subtract)
+        sky_deltas = _find_optimum_sky_deltas(images, apply_sky=not subtract,
+                                              num_processes=num_processes)
         sky_good = np.isfinite(sky_deltas)
 
         if np.any(sky_good):
@@ -475,37 +490,100 @@ def _apply_sky(images, sky_deltas, do_global, do_skysub, show_old):
     #return A, W
 
 # bug workaround version:
-def _overlap_matrix(images, apply_sky=True):
-    #TODO: to improve performance, the nested loops could be parallelized
-    # since _calc_sky() here can be called independently from previous steps.
+def _overlap_matrix(images, apply_sky=True, num_processes=1):
     ns = len(images)
     A = np.zeros((ns, ns), dtype=float)
     W = np.zeros((ns, ns), dtype=float)
 
-    for i in range(ns):
-        for j in range(i + 1, ns):
-            s1, w1, area1 = images[i].calc_sky(
-                overlap=images[j], delta=apply_sky
-            )
+    # Only the pairs of images with overlapping bounding caps can
+    # intersect. _calc_sky() for the different pairs can be called
+    # independently, so they are handed out to worker processes.
+    pairs = _overlapping_pairs(images)
+    log.debug("Computing sky in the overlaps of {:d} of {:d} pairs of "
+              "images".format(len(pairs), ns * (ns - 1) // 2))
+
+    def calc_pair_sky(pair):
+        i, j = pair
+        return (
+            images[i].calc_sky(overlap=images[j], delta=apply_sky),
+            images[j].calc_sky(overlap=images[i], delta=apply_sky)
+        )
 
-            s2, w2, area2 = images[j].calc_sky(
-                overlap=images[i], delta=apply_sky
-            )
+    pair_skies = map_forked(calc_pair_sky, pairs, num_processes,
+                            label='image pair')
 
-            if area1 == 0.0 or area2 == 0.0 or s1 is None or s2 is None:
-                continue
+    for (i, j), ((s1, w1, area1), (s2, w2, area2)) in zip(pairs, pair_skies):
+        if area1 == 0.0 or area2 == 0.0 or s1 is None or s2 is None:
+            continue
 
-            A[j, i] = s1
-            W[j, i] = w1
-            A[i, j] = s2
-            W[i, j] = w2
+        A[j, i] = s1
+        W[j, i] = w1
+        A[i, j] = s2
+        W[i, j] = w2
 
     return A, W
 
 
-def _find_optimum_sky_deltas(images, apply_sky=True):
+def _bounding_cap(image):
+    """
+    Compute a spherical cap that contains the bounding polygon(s) of a
+    `SkyImage` or of all images in a `SkyGroup`.
+
+    Returns
+    -------
+    center : numpy.ndarray, None
+        Unit vector of the center of the cap, or `None` when the image
+        has an empty bounding polygon.
+
+    radius : float
+        Angular radius of the cap in radians. Caps wider than a hemisphere
+        are not guaranteed to contain the polygons, so for those the
+        radius is set to pi.
+
+    """
+    members = image if isinstance(image, SkyGroup) else [image]
+    points = [p for im in members for p in im.polygon.points]
+    if not points:
+        return None, 0.0
+
+    points = np.vstack(points)
+    center = points.sum(axis=0)
+    norm = np.linalg.norm(center)
+    if norm == 0.0:
+        return points[0], np.pi
+    center /= norm
+
+    radius = np.arccos(np.clip(np.dot(points, center), -1.0, 1.0)).max()
+    if radius >= 0.5 * np.pi:
+        radius = np.pi
+    return center, radius
+
+
+def _overlapping_pairs(images):
+    """
+    Find the pairs ``(i, j)``, ``i < j``, of images whose bounding caps
+    overlap. The polygons of all other pairs cannot intersect.
+    """
+    caps = [_bounding_cap(im) for im in images]
+    valid = np.array([center is not None for center, _ in caps])
+    if not valid.any():
+        return []
+
+    centers = np.array([center if center is not None else (1.0, 0.0, 0.0)
+                        for center, _ in caps])
+    radii = np.array([radius for _, radius in caps])
+    separation = np.arccos(np.clip(np.dot(centers, centers.T), -1.0, 1.0))
+    overlap = separation <= radii[:, np.newaxis] + radii + CAP_TOLERANCE
+    overlap &= valid[:, np.newaxis] & valid
+
+    i, j = np.nonzero(np.triu(overlap, k=1))
+    return list(zip(i.tolist(), j.tolist()))
+
+
+def _find_optimum_sky_deltas(images, apply_sky=True, num_processes=1):
     ns = len(images)
-    A, W = _overlap_matrix(images, apply_sky=apply_sky)
+    A, W = _overlap_matrix(images, apply_sky=apply_sky,
+                           num_processes=num_processes)
 
     def is_valid(i, j):
         return (W[i, j] > 0 and W[j, i] > 0)
@@ -13,6 +13,7 @@ import logging
 
 from ..stpipe import Step
 from .. import datamodels
+from ..lib.parallel_utils import compute_num_processes
 
 from astropy.nddata.bitmask import (
     bitfield_to_boolean_mask,
@@ -50,6 +51,9 @@ class SkyMatchStep(Step):
         lsigma = float(min=0.0, default=4.0) # Lower clipping limit, in sigma
         usigma = float(min=0.0, default=4.0) # Upper clipping limit, in sigma
         binwidth = float(min=0.0, default=0.1) # Bin width for 'mode' and 'midpt' `skystat`, in sigma
+
+        # Parallel processing of the overlaps of image pairs:
+        maximum_cores = max_cores(default='none') # max number of processes: 'none', 'quarter', 'half', 'all' or an integer
     """
 
     reference_file_types = []
@@ -94,7 +98,8 @@ class SkyMatchStep(Step):
 
         # match/compute sky values:
         match(images, skymethod=self.skymethod, match_down=self.match_down,
-              subtract=self.subtract)
+              subtract=self.subtract,
+              num_processes=compute_num_processes(self.maximum_cores))
 
         # set sky background value in each image's meta:
         for im in images:
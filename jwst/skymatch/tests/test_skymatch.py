@@ -0,0 +1,76 @@
+"""Test the overlap matrix of skymatch"""
+import numpy as np
+from astropy.wcs import WCS
+import pytest
+
+from jwst.skymatch import skymatch
+from jwst.skymatch.skyimage import SkyImage, SkyGroup
+
+
+def make_sky_image(ra, dec, sky, id, shape=(40, 50), rng=None):
+    """A TAN image of constant sky plus noise centered at (ra, dec)"""
+    w = WCS(naxis=2)
+    w.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+    w.wcs.crval = [ra, dec]
+    w.wcs.crpix = [shape[1] / 2, shape[0] / 2]
+    w.wcs.cdelt = [-1e-4, 1e-4]
+
+    def wcs_fwd(x, y, with_bounding_box=False):
+        return w.all_pix2world(x, y, 0)
+
+    def wcs_inv(ra, dec):
+        return w.all_world2pix(ra, dec, 0)
+
+    rng = rng or np.random.RandomState(id)
+    data = sky + rng.normal(scale=0.1, size=shape)
+    return SkyImage(data, wcs_fwd, wcs_inv, id=id)
+
+
+@pytest.fixture
+def images():
+    # A row of overlapping images, a group and an image far away
+    return [
+        make_sky_image(10.000, 20.0, 1.0, 1),
+        make_sky_image(10.003, 20.0, 2.0, 2),
+        make_sky_image(10.006, 20.001, 3.0, 3),
+        SkyGroup([make_sky_image(10.009, 20.0, 4.0, 4),
+                  make_sky_image(10.012, 20.0, 4.0, 5)], id=1),
+        make_sky_image(40.0, -30.0, 5.0, 6),
+    ]
+
+
+def test_overlapping_pairs(images):
+    """Pairs with intersecting footprints are kept, distant pairs pruned"""
+    pairs = skymatch._overlapping_pairs(images)
+    assert (0, 1) in pairs
+    assert (2, 3) in pairs
+    assert (0, 3) not in pairs
+    assert not [pair for pair in pairs if 4 in pair]
+
+    for i in range(len(images)):
+        for j in range(i + 1, len(images)):
+            area = images[i].calc_sky(overlap=images[j])[2]
+            if area > 0.0:
+                assert (i, j) in pairs
+
+
+@pytest.mark.parametrize('num_processes', [1, 2])
+def test_overlap_matrix(images, num_processes):
+    """The pruned, parallel matrix is the matrix of all pairs"""
+    ns = len(images)
+    A_all = np.zeros((ns, ns))
+    W_all = np.zeros((ns, ns))
+    for i in range(ns):
+        for j in range(i + 1, ns):
+            s1, w1, area1 = images[i].calc_sky(overlap=images[j])
+            s2, w2, area2 = images[j].calc_sky(overlap=images[i])
+            if area1 == 0.0 or area2 == 0.0 or s1 is None or s2 is None:
+                continue
+            A_all[j, i], W_all[j, i] = s1, w1
+            A_all[i, j], W_all[i, j] = s2, w2
+
+    A, W = skymatch._overlap_matrix(images, num_processes=num_processes)
+
+    assert np.count_nonzero(W) >= 6
+    np.testing.assert_array_equal(A, A_all)
+    np.testing.assert_array_equal(W, W_all)
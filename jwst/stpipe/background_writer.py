@@ -0,0 +1,233 @@
+"""
+Writing of step outputs in a background thread.
+
+Saving a model serializes its tree to FITS or ASDF and writes the file,
+which on slow or network file systems takes much of the run time of a
+pipeline. With background writes turned on, with `BackgroundWriter.configure`,
+the ``--background-writes`` command line option or the
+``STPIPE_BACKGROUND_WRITES`` environment variable, `Step.save_model`
+hands a snapshot of the model to a writer thread and the step carries on.
+At the end of the outermost step or pipeline run, the queued files are
+written out, and any that failed are reported. When steps are profiled,
+a nested step also waits for the files queued so far at its end, so that
+their sizes are in its record.
+"""
+from contextlib import contextmanager
+import logging
+import os
+import queue
+import threading
+
+from ..datamodels import DataModel, ModelContainer
+from .profiling import profiler
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ['BackgroundWriter', 'background_writer']
+
+# Environment variable with the number of models that may wait to be written
+BACKGROUND_WRITES_ENV = 'STPIPE_BACKGROUND_WRITES'
+
+
+class BackgroundWriter:
+    """Save data models in a background thread.
+
+    The snapshots of the models waiting to be written are kept in memory,
+    so their number is limited; `save` blocks while the queue is full.
+
+    Parameters
+    ----------
+    max_queued : int
+        Number of models that may wait to be written. Zero saves the
+        models in the calling thread instead.
+    """
+
+    def __init__(self, max_queued=0):
+        self.max_queued = max_queued
+        self._queue = None
+        self._thread = None
+        self._errors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.max_queued > 0
+
+    def configure(self, max_queued):
+        """Set the number of models that may wait to be written.
+
+        The files already queued are written first.
+
+        Parameters
+        ----------
+        max_queued : int
+            Number of models that may wait to be written. Zero turns
+            background writes off.
+        """
+        self._stop()
+        self.max_queued = max_queued
+
+    def save(self, model, path, dir_path=None, *args, **kwargs):
+        """Save a model, in the background if enabled.
+
+        A deep copy of the model is queued, so that the caller can go on
+        modifying the model. The metadata of the model is updated for the
+        save right away, as `DataModel.save` does, and the file type is
+        checked.
+
+        Parameters
+        ----------
+        model : `~jwst.datamodels.DataModel`
+            The model to save.
+
+        path : str or func
+            File path to save to. For a `~jwst.datamodels.ModelContainer`,
+            a function of the file name and index of each model, as for
+            `ModelContainer.save`.
+
+        dir_path : str or None
+            Directory to save to, overriding any in `path`.
+
+        args, kwargs
+            Passed on to `DataModel.save`.
+
+        Returns
+        -------
+        output_path : str or [str[, ...]]
+            The file path the model is saved in, or the paths of the
+            models of a container.
+
+        Raises
+        ------
+        ValueError
+            If the file type of `path` is neither FITS nor ASDF.
+        """
+        if self.enabled and isinstance(model, ModelContainer) and callable(path):
+            return [
+                self.save(member, path(member.meta.filename,
+                                       idx=None if len(model) <= 1 else idx),
+                          dir_path, *args, **kwargs)
+                for idx, member in enumerate(model)
+            ]
+
+        if (not self.enabled or not isinstance(model, DataModel) or
+                isinstance(model, ModelContainer) or
+                not isinstance(path, str)):
+            output_path = model.save(path, dir_path, *args, **kwargs)
+            profiler.add_file_size('bytes_written', output_path)
+            return output_path
+
+        path_head, path_tail = os.path.split(path)
+        if dir_path:
+            path_head = dir_path
+        output_path = os.path.join(path_head, path_tail)
+        ext = os.path.splitext(path_tail)[1]
+        if ext not in ('.fits', '.asdf'):
+            raise ValueError("unknown filetype {0}".format(ext))
+
+        model.on_save(output_path)
+        snapshot = model.copy()
+        self._start()
+        self._queue.put((snapshot, output_path, args, kwargs, profiler.running()))
+        log.debug('Queued {} for writing'.format(output_path))
+        return output_path
+
+    def flush(self):
+        """Wait until the queued models are written.
+
+        Returns
+        -------
+        errors : list of (str, Exception)
+            The paths of the files that could not be written since the
+            last flush, and the reason.
+        """
+        self._wait()
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+    @contextmanager
+    def run(self):
+        """Context of a step run, which writes out the queued files at the
+        end of the outermost run.
+
+        Raises
+        ------
+        OSError
+            If any of the files queued during the run could not be written.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        errors = []
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                errors = self.flush()
+                for path, error in errors:
+                    log.error('Writing {} failed: {}'.format(path, error))
+            elif profiler.enabled:
+                # The record of a nested step is written as it ends
+                self._wait()
+        if errors:
+            raise OSError('{} of the output files could not be written'.format(
+                len(errors))) from errors[0][1]
+
+    def _wait(self):
+        if self._queue is not None:
+            self._queue.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._queue = queue.Queue(self.max_queued)
+                self._thread = threading.Thread(
+                    target=self._work, name='stpipe-writer', daemon=True)
+                self._thread.start()
+
+    def _stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+            self._queue = None
+
+    def _before_fork(self):
+        # A forked process has no writer thread, and would inherit any lock
+        # held by it, so the queued files are written and the thread is
+        # stopped first; it starts again on the next save
+        if (self._thread is not None and
+                threading.current_thread() is not self._thread):
+            self._stop()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            snapshot, path, args, kwargs, records = item
+            try:
+                snapshot.save(path, None, *args, **kwargs)
+                profiler.add_file_size('bytes_written', path, records)
+                log.debug('Wrote {}'.format(path))
+            except Exception as error:
+                with self._lock:
+                    self._errors.append((path, error))
+            finally:
+                snapshot.close()
+                self._queue.task_done()
+
+
+# Writer of Step.save_model
+background_writer = BackgroundWriter(
+    int(os.environ.get(BACKGROUND_WRITES_ENV) or 0))
+
+# Worker processes, such as those of `~jwst.lib.parallel_utils.map_forked`,
+# are forked without the writer thread running
+if hasattr(os, 'register_at_fork'):  # Python >= 3.7
+    os.register_at_fork(before=background_writer._before_fork)
@@ -8,6 +8,8 @@ import textwrap
 
 from . import config_parser
 from . import log
+from .background_writer import background_writer
+from .profiling import profiler
 from . import Step
 from . import utilities
 from .step import get_disable_crds_steppars
@@ -188,6 +190,14 @@ def just_the_step_from_cmdline(args, cls=None):
         '--disable-crds-steppars', action='store_true',
         help='Disable retrieval of step parameter references files from CRDS'
     )
+    parser1.add_argument(
+        '--step-profile', type=str,
+        help='Append the resources used by each step, as JSON lines, to this file'
+    )
+    parser1.add_argument(
+        '--background-writes', type=int,
+        help='Save the outputs in a background thread, with up to this many waiting'
+    )
     known, _ = parser1.parse_known_args(args)
 
     try:
@@ -229,6 +239,11 @@ def just_the_step_from_cmdline(args, cls=None):
 
     debug_on_exception = known.debug
 
+    if known.step_profile:
+        profiler.configure(known.step_profile)
+    if known.background_writes is not None:
+        background_writer.configure(known.background_writes)
+
     # Determine whether CRDS should be queried for step parameters
     disable_crds_steppars = get_disable_crds_steppars(known.disable_crds_steppars)
 
@@ -252,6 +267,8 @@ def just_the_step_from_cmdline(args, cls=None):
     del args.debug
     del args.save_parameters
     del args.disable_crds_steppars
+    del args.step_profile
+    del args.background_writes
     positional = args.args
     del args.args
 
@@ -41,10 +41,12 @@ from asdf import ValidationError as AsdfValidationError
 
 from ..extern.configobj.configobj import (
     ConfigObj, Section, flatten_errors, get_extra_values)
-from ..extern.configobj.validate import Validator, ValidateError, VdtTypeError
+from ..extern.configobj.validate import (
+    Validator, ValidateError, VdtTypeError, VdtValueError)
 
 from ..datamodels import DataModel, StepParsModel
 from ..lib import s3_utils
+from ..lib.parallel_utils import check_max_cores
 
 from . import utilities
 
@@ -126,6 +128,17 @@ def _is_string_or_datamodel(value, default=None):
         raise VdtTypeError(value)
 
 
+def _is_max_cores(value, default=None):
+    """Verify that value is a maximum number of cores: 'none', 'quarter',
+    'half', 'all' or a positive integer.
+    """
+    try:
+        check_max_cores(value)
+    except (TypeError, ValueError):
+        raise VdtValueError(value)
+    return value
+
+
 def load_config_file(config_file):
     """
     Read the file `config_file` and return the parsed configuration.
@@ -342,6 +355,7 @@ def validate(config, spec, section=None, validator=None, root_dir=None, allow_mi
         validator.functions['output_file'] = _get_output_file_check(root_dir)
         validator.functions['is_datamodel'] = _is_datamodel
         validator.functions['is_string_or_datamodel'] = _is_string_or_datamodel
+        validator.functions['max_cores'] = _is_max_cores
 
     orig_configspec = config.main.configspec
     config.main.configspec = spec
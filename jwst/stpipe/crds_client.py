@@ -36,6 +36,7 @@ directly in modules other than this crds_client so that dependency order and
 general integration can be managed here.
 """
 
+from contextlib import contextmanager
 import re
 
 import crds
@@ -90,7 +91,11 @@ def get_multiple_reference_paths(dataset_model, reference_file_types, observator
     if observatory is None:
         observatory = dataset_model.meta.telescope or 'jwst'
     observatory = observatory.lower()
-    refpaths = _get_refpaths(data_dict, tuple(reference_file_types), observatory)
+    if _BESTREFS_MEMO is not None:
+        refpaths = _BESTREFS_MEMO.get_refpaths(
+            data_dict, tuple(reference_file_types), observatory)
+    else:
+        refpaths = _get_refpaths(data_dict, tuple(reference_file_types), observatory)
     return refpaths
 
 def get_first_science_exposure(dataset_model):
@@ -133,6 +138,93 @@ def _get_refpaths(data_dict, reference_file_types, observatory):
     return refpaths
 
 
+# The best references memo of the active session, if any
+_BESTREFS_MEMO = None
+
+
+@contextmanager
+def bestrefs_session():
+    """Memoize best references within the block, such as a pipeline run.
+
+    Within a session, `get_multiple_reference_paths`, and therefore also
+    `get_reference_file`, look up the best references of each distinct
+    combination of CRDS matching parameter values once, however many
+    exposures and steps ask for them. Nested sessions share the memo of
+    the outermost session, which is dropped when it ends, so that new
+    CRDS rules are picked up by the next run.
+    """
+    global _BESTREFS_MEMO
+    if _BESTREFS_MEMO is not None:
+        yield _BESTREFS_MEMO
+        return
+
+    _BESTREFS_MEMO = BestrefsMemo()
+    try:
+        yield _BESTREFS_MEMO
+    finally:
+        log.verbose("Best references memo: {} lookups, {} hits".format(
+            _BESTREFS_MEMO.lookups, _BESTREFS_MEMO.hits))
+        _BESTREFS_MEMO = None
+
+
+class BestrefsMemo:
+    """Best reference paths keyed on the CRDS matching parameter values.
+
+    The matching parameters (parkeys) of an instrument are those required
+    by the CRDS context in use. When they cannot be determined, the key
+    is made of all the header values instead, except for the step
+    completion flags, which do not select references.
+    """
+
+    def __init__(self):
+        self._refpaths = {}
+        self._parkeys = {}
+        self.lookups = 0
+        self.hits = 0
+
+    def get_refpaths(self, data_dict, reference_file_types, observatory):
+        """Return best references, looking up only the types not yet known
+        for the matching parameters of `data_dict`.
+
+        See `_get_refpaths`.
+        """
+        key = self._key(data_dict, observatory)
+        known = self._refpaths.setdefault(key, {})
+        missing = tuple(reftype for reftype in reference_file_types
+                        if reftype not in known)
+        self.lookups += 1
+        if missing:
+            known.update(_get_refpaths(data_dict, missing, observatory))
+        else:
+            self.hits += 1
+        return {reftype: known[reftype] for reftype in reference_file_types
+                if reftype in known}
+
+    def _key(self, data_dict, observatory):
+        header = {key.upper(): val for key, val in data_dict.items()}
+        instrument = str(header.get("META.INSTRUMENT.NAME", "")).lower()
+        parkeys = self._get_parkeys(observatory, instrument)
+        if parkeys is None:
+            items = tuple(sorted(item for item in header.items()
+                                 if not item[0].startswith("META.CAL_STEP.")))
+        else:
+            items = tuple((parkey, header.get(parkey)) for parkey in parkeys)
+        return (observatory, instrument, items)
+
+    def _get_parkeys(self, observatory, instrument):
+        if (observatory, instrument) not in self._parkeys:
+            try:
+                _mode, context = heavy_client.get_processing_mode(observatory)
+                parkeys = heavy_client.get_context_parkeys(context, instrument)
+                parkeys = tuple(sorted(parkey.upper() for parkey in parkeys))
+            except Exception as exc:
+                log.verbose("Cannot determine CRDS matching parameters for",
+                            repr(instrument), ":", str(exc))
+                parkeys = None
+            self._parkeys[(observatory, instrument)] = parkeys
+        return self._parkeys[(observatory, instrument)]
+
+
 def check_reference_open(refpath):
     """Verify that `refpath` exists and is readable for the current user.
 
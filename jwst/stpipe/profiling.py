@@ -0,0 +1,230 @@
+"""
+Resource profiling of step runs.
+
+When a sink is configured, with `StepProfiler.configure`, the
+``--step-profile`` command line option or the ``STPIPE_STEP_PROFILE``
+environment variable, every run of a step writes one JSON line with the
+wall and CPU time of the run, the growth of the peak resident memory of
+the process, the bytes read by `Step.open_model` and written by
+`Step.save_model`, and the time spent getting reference files, in the
+pre and post hooks and in garbage collection. The figures of a pipeline
+include those of the steps it runs, and at the end of the outermost run
+a summary of the steps is written and logged.
+"""
+from contextlib import contextmanager
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ['StepProfiler', 'profiler']
+
+# Environment variable with the path of the file to append the records to
+PROFILE_ENV = 'STPIPE_STEP_PROFILE'
+
+# Figures of a record that add up over the steps of a summary
+SUMMED_FIELDS = ('wall_time', 'cpu_time', 'bytes_read', 'bytes_written',
+                 'reference_time', 'hook_time', 'gc_time')
+
+
+def _peak_rss():
+    """Peak resident memory of the process so far, in MB"""
+    if resource is None:
+        return 0.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    scale = 1024.**2 if os.uname()[0] == 'Darwin' else 1024.
+    return peak / scale
+
+
+class StepProfiler:
+    """Record the resources used by each run of a step.
+
+    Runs nest: a record is open for every step running in the current
+    thread, and the figures added while a nested step runs count for all
+    the open records.
+
+    Parameters
+    ----------
+    sink : str, file-like or None
+        Path of the file to append the JSON lines to, or an object with a
+        ``write`` method. None disables profiling.
+    """
+
+    def __init__(self, sink=None):
+        self._sink = None
+        self._owns_sink = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.configure(sink)
+
+    @property
+    def enabled(self):
+        return self._sink is not None
+
+    def configure(self, sink):
+        """Set the sink of the records, replacing any earlier one.
+
+        Parameters
+        ----------
+        sink : str, file-like or None
+            Path of the file to append the JSON lines to, or an object
+            with a ``write`` method. None disables profiling.
+        """
+        with self._lock:
+            if self._owns_sink:
+                self._sink.close()
+            self._owns_sink = isinstance(sink, str)
+            if self._owns_sink:
+                sink = open(sink, 'a', buffering=1)
+            self._sink = sink
+
+    @property
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            self._local.finished = []
+            return self._local.stack
+
+    @contextmanager
+    def run(self, step):
+        """Profile a run of a step.
+
+        Parameters
+        ----------
+        step : `~jwst.stpipe.Step`
+            The running step.
+
+        Yields
+        ------
+        record : dict or None
+            The record of the run, which is written when the run ends, or
+            None if profiling is disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        stack = self._stack
+        record = {
+            'step': step.name,
+            'class': step.__class__.__name__,
+            'parent': step.parent.name if step.parent is not None else None,
+            'start': time.time(),
+            'status': 'error',
+        }
+        record.update((field, 0) for field in SUMMED_FIELDS)
+        start_rss = _peak_rss()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        stack.append(record)
+        try:
+            yield record
+            record['status'] = 'skipped' if step.skip else 'done'
+        finally:
+            stack.pop()
+            record['wall_time'] += time.perf_counter() - start_wall
+            record['cpu_time'] += time.process_time() - start_cpu
+            record['peak_rss_delta'] = _peak_rss() - start_rss
+            self._write(record)
+            finished = self._local.finished
+            finished.append(record)
+            if not stack:
+                self._local.finished = []
+                if len(finished) > 1:
+                    self._write_summary(finished)
+
+    def running(self):
+        """The records of the steps running in the current thread"""
+        return list(self._stack) if self.enabled else []
+
+    def add(self, field, value, records=None):
+        """Add to a figure of the records of all the running steps
+
+        Parameters
+        ----------
+        field : str
+            Name of the figure.
+
+        value : number
+            Amount to add.
+
+        records : list of dict or None
+            The records to add to, as returned by `running`, for work
+            done in another thread. By default, those of the steps
+            running in the current thread.
+        """
+        if records is None:
+            records = self._stack if self.enabled else ()
+        with self._lock:
+            for record in records:
+                record[field] += value
+
+    @contextmanager
+    def timing(self, field):
+        """Add the time spent in the block to a figure of the running steps"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(field, time.perf_counter() - start)
+
+    def add_file_size(self, field, path, records=None):
+        """Add the size of a file to a figure of the running steps"""
+        if self.enabled and isinstance(path, str):
+            try:
+                self.add(field, os.path.getsize(path), records)
+            except OSError:
+                pass
+
+    def _write(self, record):
+        with self._lock:
+            line = json.dumps(record)
+            if self._sink is not None:
+                self._sink.write(line + '\n')
+
+    def _write_summary(self, records):
+        """Write and log the figures of the steps of an outermost run"""
+        top = records[-1]
+        steps = {}
+        for record in records[:-1]:
+            summary = steps.setdefault(record['step'], dict(
+                {field: 0 for field in SUMMED_FIELDS},
+                runs=0, peak_rss_delta=0.))
+            summary['runs'] += 1
+            for field in SUMMED_FIELDS:
+                summary[field] += record[field]
+            summary['peak_rss_delta'] = max(summary['peak_rss_delta'],
+                                            record['peak_rss_delta'])
+
+        self._write({'summary': top['step'], 'total': top, 'steps': steps})
+
+        log.info('Profile of %s: %.2f s wall, %.2f s CPU, peak RSS +%.1f MB',
+                 top['step'], top['wall_time'], top['cpu_time'],
+                 top['peak_rss_delta'])
+        for name, summary in steps.items():
+            log.info('  %-24s %3d run(s) %9.2f s wall %9.2f s CPU'
+                     ' %9.2f s refs %10.1f MB read %10.1f MB written',
+                     name, summary['runs'], summary['wall_time'],
+                     summary['cpu_time'], summary['reference_time'],
+                     summary['bytes_read'] / 1024.**2,
+                     summary['bytes_written'] / 1024.**2)
+
+
+# Profiler of Step.run
+profiler = StepProfiler(os.environ.get(PROFILE_ENV) or None)
@@ -0,0 +1,303 @@
+"""
+Process-wide cache of the data models of reference files.
+
+Steps that open the same reference files for every exposure, such as the
+gain, read noise, dark and linearity references of a long-running
+detector1 worker, get them from this cache instead of parsing and
+validating the files again.  Models derived from a reference file, such
+as the darks averaged to the readout pattern of the science data, are
+cached along with it.
+"""
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from ..datamodels import properties
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ['ReferenceModelCache', 'reference_cache']
+
+# Default memory, in MB, of the arrays of the cached reference models
+REFERENCE_CACHE_SIZE = 2048.
+
+# Default disk space, in MB, of the files of the derived models
+DERIVED_CACHE_DISK_SIZE = 8192.
+
+# Prefix of the names of the files of the derived models
+DERIVED_PREFIX = 'jwst_derived_'
+
+
+def _tree_arrays(tree):
+    """Yield the arrays of a model tree"""
+    if isinstance(tree, dict):
+        values = tree.values()
+    elif isinstance(tree, list):
+        values = tree
+    else:
+        if isinstance(tree, np.ndarray):
+            yield tree
+        return
+    for val in values:
+        yield from _tree_arrays(val)
+
+
+class ReferenceModelCache:
+    """Least-recently-used cache of reference file data models.
+
+    Models are keyed on the absolute path, modification time and size of
+    the file and the model class. The files are opened with their arrays
+    memory-mapped where possible, the arrays are read when the model is
+    added, and they are then marked read-only, since they are shared by
+    all the models handed out for the file.
+
+    Each `get` returns a new model that shares the arrays, but not the
+    metadata, of the cached model, so it can be closed, or its arrays
+    replaced, without affecting other users. The arrays themselves must
+    not be modified in place; copy them first.
+
+    Models derived from a reference file are cached with `get_derived`,
+    keyed on the reference file and the parameters of the derivation, and
+    can also be kept on disk between runs.
+
+    Parameters
+    ----------
+    max_memory : float
+        Memory, in MB, of the arrays of the cached models. Models are
+        dropped, least recently used first, beyond this size. Zero
+        disables the cache.
+
+    max_disk : float
+        Disk space, in MB, of the files of the derived models kept in a
+        directory. Files are deleted, least recently used first, beyond
+        this size.
+    """
+
+    def __init__(self, max_memory=REFERENCE_CACHE_SIZE,
+                 max_disk=DERIVED_CACHE_DISK_SIZE):
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._models = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, reference_name, model_class):
+        """Open a reference file as a data model, from the cache if possible.
+
+        Parameters
+        ----------
+        reference_name : str
+            Path of the reference file.
+
+        model_class : class
+            The `~jwst.datamodels.DataModel` class to open the file with.
+
+        Returns
+        -------
+        model : `~jwst.datamodels.DataModel`
+            Model of the reference file, whose arrays are read-only if it
+            is cached.
+
+        hit : bool
+            Whether the model was already cached.
+        """
+        key = self._key(reference_name, model_class)
+        if key is None or self.max_memory <= 0:
+            return model_class(reference_name), False
+
+        entry = self._models.get(key)
+        if entry is not None:
+            self._models.move_to_end(key)
+            self.hits += 1
+            return self._share(entry[0]), True
+
+        self.misses += 1
+        return self._add(key, self._open(reference_name, model_class)), False
+
+    def get_derived(self, reference_name, model_class, params, derive,
+                    directory=None):
+        """Get a model derived from a reference file, from the cache if possible.
+
+        Derived models share the memory of the cache with the reference
+        models, and the same rules apply to the models handed out.
+
+        Parameters
+        ----------
+        reference_name : str
+            Path of the reference file the model is derived from.
+
+        model_class : class
+            The `~jwst.datamodels.DataModel` class of the derived model.
+
+        params : tuple
+            The parameters that, with the reference file, determine the
+            derived model.
+
+        derive : callable
+            Function called without arguments to make the derived model
+            when it is not cached.
+
+        directory : str or None
+            Directory in which the derived models are also kept, as FITS
+            files that later runs open memory-mapped. None to keep them in
+            memory only.
+
+        Returns
+        -------
+        model : `~jwst.datamodels.DataModel`
+            The derived model, whose arrays are read-only if it is cached.
+
+        hit : bool
+            Whether the model was already cached, in memory or on disk.
+        """
+        key = self._key(reference_name, model_class)
+        if key is None:
+            return derive(), False
+        key += (params,)
+
+        entry = self._models.get(key) if self.max_memory > 0 else None
+        if entry is not None:
+            self._models.move_to_end(key)
+            self.hits += 1
+            return self._share(entry[0]), True
+
+        path = None
+        if directory is not None:
+            path = os.path.join(directory, self._file_name(key))
+            if os.path.isfile(path):
+                self.hits += 1
+                os.utime(path)
+                return self._add(key, self._open(path, model_class)), True
+
+        self.misses += 1
+        model = derive()
+        if path is not None:
+            self._save(model, path)
+        if self.max_memory <= 0:
+            return model, False
+        return self._add(key, model), False
+
+    def clear(self):
+        """Close and drop all cached models"""
+        for model, _ in self._models.values():
+            model.close()
+        self._models.clear()
+        self._nbytes = 0
+
+    @staticmethod
+    def _open(path, model_class):
+        """Open a file with its arrays memory-mapped where possible"""
+        model = None
+        try:
+            model = model_class(path, memmap=True)
+            properties._load_lazy_arrays(model._instance)
+        except ValueError:
+            # Arrays with BZERO/BSCALE/BLANK keywords cannot be mapped
+            if model is not None:
+                model.close()
+            model = model_class(path)
+        return model
+
+    def _add(self, key, model):
+        """Cache a model, returning the model to hand out"""
+        properties._load_lazy_arrays(model._instance)
+        nbytes = 0
+        for array in _tree_arrays(model._instance):
+            array.flags.writeable = False
+            nbytes += array.nbytes
+
+        if not self._keep(key, model, nbytes):
+            return model
+        return self._share(model)
+
+    def _keep(self, key, model, nbytes):
+        max_bytes = self.max_memory * 1024 * 1024
+        if nbytes > max_bytes:
+            return False
+        self._models[key] = (model, nbytes)
+        self._nbytes += nbytes
+        while self._nbytes > max_bytes:
+            _, (dropped, dropped_nbytes) = self._models.popitem(last=False)
+            log.debug('Dropping {} from the reference model cache'.format(
+                dropped.meta.filename))
+            dropped.close()
+            self._nbytes -= dropped_nbytes
+        return True
+
+    @staticmethod
+    def _share(model):
+        """Copy a model, except for its arrays"""
+        memo = {id(array): array for array in _tree_arrays(model._instance)}
+        return model.copy(memo=memo)
+
+    def _save(self, model, path):
+        """Save a derived model, then trim its directory to the disk budget"""
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Write to a temporary file, so that other processes never see
+            # a partial file
+            fd, temp_path = tempfile.mkstemp(suffix='.fits', dir=directory)
+            os.close(fd)
+            try:
+                self._share(model).save(temp_path)
+                os.replace(temp_path, path)
+            except Exception:
+                os.remove(temp_path)
+                raise
+        except OSError as error:
+            log.warning('Cannot save the derived model to {}: {}'.format(
+                path, error))
+            return
+
+        files = []
+        for name in os.listdir(directory):
+            if name.startswith(DERIVED_PREFIX) and name.endswith('.fits'):
+                file_path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, file_path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        max_bytes = self.max_disk * 1024 * 1024
+        for _, size, file_path in files:
+            if total <= max_bytes:
+                break
+            log.debug('Deleting {} from the derived model cache'.format(
+                file_path))
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            total -= size
+
+    @staticmethod
+    def _file_name(key):
+        """Name of the file of a derived model"""
+        path, mtime, size, model_class, params = key
+        digest = hashlib.sha1(repr(
+            (path, mtime, size, model_class.__name__, params)).encode())
+        return DERIVED_PREFIX + digest.hexdigest() + '.fits'
+
+    @staticmethod
+    def _key(reference_name, model_class):
+        if not isinstance(reference_name, str):
+            return None
+        try:
+            path = os.path.abspath(reference_name)
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        return (path, stat.st_mtime_ns, stat.st_size, model_class)
+
+
+# Reference models opened by Step.open_reference_model
+reference_cache = ReferenceModelCache()
@@ -27,6 +27,9 @@ except ImportError:
 from . import config_parser
 from . import crds_client
 from . import log
+from .background_writer import background_writer
+from .profiling import profiler
+from .reference_cache import reference_cache
 from . import utilities
 from .. import __version_commit__, __version__
 from ..associations.load_as_asn import (LoadAsAssociation, LoadAsLevel2Asn)
@@ -340,8 +343,20 @@ class Step():
         the running of each step.  The real work that is unique to
         each step type is done in the `process` method.
         """
+        with profiler.run(self), background_writer.run():
+            return self._run(*args)
+
+    __call__ = run
+
+    def _run(self, *args):
         from .. import datamodels
-        gc.collect()
+
+        # Free the garbage of the previous steps before this one allocates
+        # its own arrays, unless there is nothing to run or the caller has
+        # turned the collector off.
+        if not self.skip and gc.isenabled():
+            with profiler.timing('gc_time'):
+                gc.collect()
 
         # Make generic log messages go to this step's logger
         orig_log = log.delegator.log
@@ -370,7 +385,8 @@ class Step():
 
             hook_args = args
             for pre_hook in self._pre_hooks:
-                hook_results = pre_hook.run(*hook_args)
+                with profiler.timing('hook_time'):
+                    hook_results = pre_hook.run(*hook_args)
                 if hook_results is not None:
                     hook_args = hook_results
             args = hook_args
@@ -386,23 +402,28 @@ class Step():
                 self.log.info('Step skipped.')
                 step_result = args[0]
             else:
-                if self.prefetch_references:
-                    self.prefetch(*args)
-                try:
-                    step_result = self.process(*args)
-                except TypeError as e:
-                    if "process() takes exactly" in str(e):
-                        raise TypeError(
-                            "Incorrect number of arguments to step"
-                        )
-                    raise
+                # Best references are looked up once per distinct set of
+                # CRDS matching parameters for the whole (pipeline) run
+                with crds_client.bestrefs_session():
+                    if self.prefetch_references:
+                        with profiler.timing('reference_time'):
+                            self.prefetch(*args)
+                    try:
+                        step_result = self.process(*args)
+                    except TypeError as e:
+                        if "process() takes exactly" in str(e):
+                            raise TypeError(
+                                "Incorrect number of arguments to step"
+                            )
+                        raise
 
             # Warn if returning a discouraged object
             self._check_args(step_result, DISCOURAGED_TYPES, "Returned")
 
             # Run the post hooks
             for post_hook in self._post_hooks:
-                hook_results = post_hook.run(step_result)
+                with profiler.timing('hook_time'):
+                    hook_results = post_hook.run(step_result)
                 if hook_results is not None:
                     step_result = hook_results
 
@@ -462,6 +483,8 @@ class Step():
                                 'Saving file {0}'.format(output_path)
                             )
                             result.save(output_path, overwrite=True)
+                            profiler.add_file_size('bytes_written',
+                                                   output_path)
 
             self.log.info(
                 'Step {0} done'.format(self.name))
@@ -470,8 +493,6 @@ class Step():
 
         return step_result
 
-    __call__ = run
-
     def prefetch(self, *args):
         """Prefetch reference files,  nominally called when
         self.prefetch_references is True.  Can be called explictly
@@ -660,6 +681,10 @@ class Step():
         -------
         reference_file : path of reference file,  a string
         """
+        with profiler.timing('reference_time'):
+            return self._get_reference_file(input_file, reference_file_type)
+
+    def _get_reference_file(self, input_file, reference_file_type):
         override = self.get_ref_override(reference_file_type)
         if override is not None:
             if isinstance(override, DataModel):
@@ -683,6 +708,36 @@ class Step():
                 (reference_file_type, hdr_name))
         return crds_client.check_reference_open(reference_name)
 
+    def open_reference_model(self, reference_name, model_class):
+        """
+        Open a reference file as a data model, reusing the model of an
+        earlier call from the process-wide reference model cache.
+
+        The arrays of a cached model are shared by all steps using the
+        reference file, so they are read-only.
+
+        Parameters
+        ----------
+        reference_name : str or `~jwst.datamodels.DataModel`
+            Path of the reference file, as returned by `get_reference_file`,
+            or an overriding data model.
+
+        model_class : class
+            The `~jwst.datamodels.DataModel` class of the reference file.
+
+        Returns
+        -------
+        reference_model : `~jwst.datamodels.DataModel`
+        """
+        if not isinstance(reference_name, str):
+            return model_class(reference_name)
+
+        with profiler.timing('reference_time'):
+            model, hit = reference_cache.get(reference_name, model_class)
+        self.log.info('Reference model cache %s: %s',
+                      'hit' if hit else 'miss', basename(reference_name))
+        return model
+
     @classmethod
     def get_config_from_reference(cls, dataset, observatory=None, disable=None):
         """Retrieve step parameters from reference database
@@ -869,7 +924,8 @@ class Step():
             ):
                 output_file = model.meta.filename
                 idx = None
-            output_path = model.save(
+            output_path = background_writer.save(
+                model,
                 self.make_output_path(
                     basepath=output_file,
                     suffix=suffix,
@@ -1062,7 +1118,9 @@ class Step():
         datamodel : DataModel
             Object opened as a datamodel
         """
-        return dm_open(self.make_input_path(obj))
+        input_path = self.make_input_path(obj)
+        profiler.add_file_size('bytes_read', input_path)
+        return dm_open(input_path)
 
     def make_input_path(self, file_path):
         """Create an input path for a given file path
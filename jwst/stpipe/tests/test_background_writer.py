@@ -0,0 +1,130 @@
+"""Test the background writing of step outputs"""
+import io
+import json
+from os import path
+
+import numpy as np
+import pytest
+
+from jwst import datamodels
+from jwst.lib.parallel_utils import map_forked
+from jwst.stpipe.background_writer import BackgroundWriter, background_writer
+from jwst.stpipe.profiling import profiler
+from jwst.stpipe.tests.steps import SavePipeline
+
+data_fn_path = path.join(path.dirname(__file__), 'data', 'flat.fits')
+
+
+@pytest.fixture
+def writer():
+    writer = BackgroundWriter(max_queued=2)
+    yield writer
+    writer.configure(0)
+
+
+def test_background_save(writer, tmp_path):
+    output_path = str(tmp_path / 'image.fits')
+    with datamodels.ImageModel(np.ones((20, 30), dtype=np.float32)) as model:
+        assert writer.save(model, output_path) == output_path
+        assert model.meta.filename == 'image.fits'
+
+        # The snapshot is written, not the model as modified later
+        model.data[...] = 2.
+        assert writer.flush() == []
+
+    with datamodels.ImageModel(output_path) as saved:
+        np.testing.assert_array_equal(saved.data, 1.)
+        assert saved.meta.filename == 'image.fits'
+
+
+def test_background_save_container(writer, tmp_path):
+    container = datamodels.ModelContainer()
+    for name in ('a', 'b'):
+        model = datamodels.ImageModel((5, 5))
+        model.meta.filename = name + '.fits'
+        container.append(model)
+
+    def make_path(filename, idx=None):
+        return str(tmp_path / '{}_{}'.format(idx, filename))
+
+    paths = writer.save(container, make_path)
+    assert writer.flush() == []
+    assert paths == [make_path('a.fits', 0), make_path('b.fits', 1)]
+    assert all(path.isfile(output_path) for output_path in paths)
+
+
+def test_background_save_dir_path(writer, tmp_path):
+    model = datamodels.ImageModel((5, 5))
+    output_path = writer.save(model, 'somewhere/image.fits', str(tmp_path))
+    assert output_path == str(tmp_path / 'image.fits')
+    assert writer.flush() == []
+    assert path.isfile(output_path)
+
+    # The file type is checked before the model is queued
+    with pytest.raises(ValueError):
+        writer.save(model, str(tmp_path / 'image.txt'))
+
+
+def test_background_save_errors(writer, tmp_path):
+    model = datamodels.ImageModel((5, 5))
+    bad_path = str(tmp_path / 'missing' / 'image.fits')
+
+    nested_done = False
+    with pytest.raises(OSError):
+        with writer.run():
+            # A nested run leaves the files to the outermost one
+            with writer.run():
+                writer.save(model, bad_path)
+            nested_done = True
+    assert nested_done
+
+    # The errors are reported only once
+    assert writer.flush() == []
+
+
+def test_background_pipeline(_jail):
+    background_writer.configure(2)
+    try:
+        pipeline = SavePipeline(steps={'savestep': {'save_results': True}})
+        pipeline.run(data_fn_path)
+    finally:
+        background_writer.configure(0)
+
+    # The pipeline waits for the files before it returns
+    assert background_writer.flush() == []
+    assert path.isfile('flat_processed.fits')
+    assert path.isfile('flat_savestep.fits')
+
+
+def test_background_pipeline_profile(_jail):
+    sink = io.StringIO()
+    profiler.configure(sink)
+    background_writer.configure(2)
+    try:
+        pipeline = SavePipeline(steps={'savestep': {'save_results': True}})
+        pipeline.run(data_fn_path)
+    finally:
+        background_writer.configure(0)
+        profiler.configure(None)
+
+    # The files of a nested step are written before its record
+    records = [json.loads(line) for line in sink.getvalue().splitlines()]
+    save = next(record for record in records if record.get('step') == 'savestep')
+    assert save['bytes_written'] == (path.getsize('flat_processed.fits') +
+                                     path.getsize('flat_savestep.fits'))
+
+
+def test_background_writes_before_fork(tmp_path):
+    output_path = str(tmp_path / 'image.fits')
+    background_writer.configure(2)
+    try:
+        with datamodels.ImageModel((5, 5)) as model:
+            background_writer.save(model, output_path)
+
+        # The writer thread is not running when the workers are forked
+        results = map_forked(lambda _: path.isfile(output_path), range(2), 2)
+        assert background_writer._thread is None
+        assert results == [True, True]
+    finally:
+        background_writer.configure(0)
+    assert background_writer.flush() == []
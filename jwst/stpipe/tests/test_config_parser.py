@@ -14,3 +14,19 @@ def test_load_config_file_s3(s3_root_dir):
 
     with pytest.raises(ValueError):
         config_parser.load_config_file("s3://test-s3-data/missing.asdf")
+
+
+@pytest.mark.parametrize('value', ['none', 'Half', '4', 2])
+def test_validate_max_cores(value):
+    spec = ConfigObj(["maximum_cores = max_cores(default='none')"], _inspec=True)
+    config = ConfigObj({'maximum_cores': value})
+    config_parser.validate(config, spec)
+    assert config['maximum_cores'] == value
+
+
+@pytest.mark.parametrize('value', ['halve', '0', -1])
+def test_validate_max_cores_invalid(value):
+    spec = ConfigObj(["maximum_cores = max_cores(default='none')"], _inspec=True)
+    config = ConfigObj({'maximum_cores': value})
+    with pytest.raises(config_parser.ValidationError):
+        config_parser.validate(config, spec)
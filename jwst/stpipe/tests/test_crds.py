@@ -143,3 +143,60 @@ def test_check_reference_open_s3(s3_root_dir):
 
     with pytest.raises(RuntimeError):
         assert crds_client.check_reference_open("s3://test-s3-data/missing.fits")
+
+
+@pytest.mark.parametrize('parkeys', [
+    ['META.INSTRUMENT.NAME', 'META.INSTRUMENT.FILTER'],
+    None,
+])
+def test_bestrefs_session(monkeypatch, parkeys):
+    """Best references are looked up once per set of matching parameters"""
+    from ... import datamodels
+
+    lookups = []
+
+    def get_refpaths(data_dict, reference_file_types, observatory):
+        lookups.append(reference_file_types)
+        return {reftype: data_dict['meta.instrument.filter'] + '_' + reftype
+                for reftype in reference_file_types}
+
+    def get_context_parkeys(context, instrument):
+        if parkeys is None:
+            raise crds_client.exceptions.CrdsError('no context')
+        return parkeys
+
+    monkeypatch.setattr(crds_client, '_get_refpaths', get_refpaths)
+    monkeypatch.setattr(crds_client.heavy_client, 'get_processing_mode',
+                        lambda observatory: (False, 'jwst_0001.pmap'))
+    monkeypatch.setattr(crds_client.heavy_client, 'get_context_parkeys',
+                        get_context_parkeys)
+
+    def make_model(filt, filename):
+        model = datamodels.ImageModel()
+        model.meta.instrument.name = 'MIRI'
+        model.meta.instrument.filter = filt
+        model.meta.filename = filename
+        return model
+
+    with crds_client.bestrefs_session():
+        model = make_model('F770W', 'a.fits')
+        refs = crds_client.get_multiple_reference_paths(model, ['flat', 'dark'])
+        assert refs == {'flat': 'F770W_flat', 'dark': 'F770W_dark'}
+
+        # Later steps ask again, after earlier ones updated the model
+        model.meta.cal_step.dq_init = 'COMPLETE'
+        assert crds_client.get_reference_file(model, 'flat') == 'F770W_flat'
+        assert crds_client.get_reference_file(
+            make_model('F1000W', 'a.fits'), 'flat') == 'F1000W_flat'
+        assert crds_client.get_multiple_reference_paths(
+            model, ['flat', 'photom']) == {
+                'flat': 'F770W_flat', 'photom': 'F770W_photom'}
+        if parkeys is not None:
+            # Parameters that CRDS does not match on are ignored
+            crds_client.get_reference_file(make_model('F770W', 'b.fits'), 'dark')
+
+    assert lookups == [('flat', 'dark'), ('flat',), ('photom',)]
+
+    # Without a session every call looks up the references
+    crds_client.get_reference_file(make_model('F770W', 'a.fits'), 'flat')
+    assert len(lookups) == 4
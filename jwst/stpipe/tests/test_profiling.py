@@ -0,0 +1,67 @@
+"""Test the profiling of step runs"""
+import io
+import json
+from os import path
+
+import pytest
+
+from jwst.stpipe.profiling import profiler
+from jwst.stpipe.tests.steps import SavePipeline, StepWithModel
+
+data_fn_path = path.join(path.dirname(__file__), 'data', 'flat.fits')
+
+
+@pytest.fixture
+def sink():
+    sink = io.StringIO()
+    profiler.configure(sink)
+    yield sink
+    profiler.configure(None)
+
+
+def read_records(sink):
+    return [json.loads(line) for line in sink.getvalue().splitlines()]
+
+
+def test_profile_step(sink):
+    StepWithModel().run(data_fn_path)
+
+    records = read_records(sink)
+    assert len(records) == 1
+    record = records[0]
+    assert (record['step'], record['class'], record['status']) == \
+        ('StepWithModel', 'StepWithModel', 'done')
+    assert record['parent'] is None
+    assert record['bytes_read'] == path.getsize(data_fn_path)
+    assert record['bytes_written'] == 0
+    assert record['wall_time'] > 0.
+    assert record['peak_rss_delta'] >= 0.
+
+
+def test_profile_pipeline(sink, _jail):
+    pipeline = SavePipeline(steps={'savestep': {'save_results': True}})
+    pipeline.run(data_fn_path)
+
+    records = read_records(sink)
+    assert [record.get('step') for record in records] == \
+        ['stepwithmodel', 'savestep', 'SavePipeline', None]
+    step, save, pipe, summary = records
+
+    assert step['parent'] == save['parent'] == 'SavePipeline'
+    # SaveStep saves a model itself, and its result is saved too
+    assert save['bytes_written'] == (path.getsize('flat_processed.fits') +
+                                     path.getsize('flat_savestep.fits'))
+    assert pipe['bytes_written'] == save['bytes_written']
+    assert pipe['wall_time'] >= step['wall_time'] + save['wall_time']
+
+    assert summary['summary'] == 'SavePipeline'
+    assert summary['total'] == pipe
+    assert sorted(summary['steps']) == ['savestep', 'stepwithmodel']
+    assert summary['steps']['savestep']['runs'] == 1
+    assert summary['steps']['savestep']['bytes_written'] == \
+        save['bytes_written']
+
+
+def test_profile_disabled(_jail):
+    assert not profiler.enabled
+    StepWithModel().run(data_fn_path)
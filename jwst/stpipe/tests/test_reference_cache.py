@@ -0,0 +1,123 @@
+"""Test the reference model cache"""
+import os
+
+import numpy as np
+import pytest
+
+from jwst import datamodels
+from jwst.stpipe import Step
+from jwst.stpipe.reference_cache import ReferenceModelCache, reference_cache
+
+
+@pytest.fixture
+def gain_file(tmp_path):
+    path = str(tmp_path / 'gain.fits')
+    with datamodels.GainModel(data=np.full((10, 12), 2., dtype=np.float32)) as model:
+        model.meta.instrument.name = 'MIRI'
+        model.save(path)
+    return path
+
+
+def test_reference_cache_hit(gain_file):
+    cache = ReferenceModelCache(max_memory=1.)
+    first, hit = cache.get(gain_file, datamodels.GainModel)
+    assert not hit
+    second, hit = cache.get(gain_file, datamodels.GainModel)
+    assert hit
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The models share read-only arrays, but not their metadata
+    assert np.shares_memory(first.data, second.data)
+    with pytest.raises(ValueError):
+        second.data[0, 0] = 5.
+    second.meta.instrument.name = 'NIRCAM'
+    second.data = np.zeros((10, 12), dtype=np.float32)
+    second.close()
+    third, _ = cache.get(gain_file, datamodels.GainModel)
+    assert third.meta.instrument.name == 'MIRI'
+    np.testing.assert_array_equal(third.data, 2.)
+
+    # Another model class is another entry
+    _, hit = cache.get(gain_file, datamodels.ReadnoiseModel)
+    assert not hit
+    cache.clear()
+
+
+def test_reference_cache_budget(gain_file, tmp_path):
+    # Each gain array is 480 bytes
+    cache = ReferenceModelCache(max_memory=700. / 1024 / 1024)
+    other_file = str(tmp_path / 'other_gain.fits')
+    with datamodels.GainModel(gain_file) as model:
+        model.save(other_file)
+
+    cache.get(gain_file, datamodels.GainModel)
+    cache.get(other_file, datamodels.GainModel)
+    _, hit = cache.get(gain_file, datamodels.GainModel)
+    assert not hit
+
+    # A changed file is read again
+    _, hit = cache.get(gain_file, datamodels.GainModel)
+    assert hit
+    with datamodels.GainModel(data=np.ones((10, 12), dtype=np.float32)) as model:
+        model.save(gain_file)
+    model, hit = cache.get(gain_file, datamodels.GainModel)
+    assert not hit
+    np.testing.assert_array_equal(model.data, 1.)
+
+    # Nothing is kept with a zero budget
+    cache.max_memory = 0
+    model, hit = cache.get(gain_file, datamodels.GainModel)
+    assert not hit
+    model.data[0, 0] = 3.
+    cache.clear()
+
+
+def test_reference_cache_derived(gain_file, tmp_path):
+    cache = ReferenceModelCache(max_memory=1.)
+    derived = []
+
+    def derive():
+        model, _ = cache.get(gain_file, datamodels.GainModel)
+        derived.append(datamodels.GainModel(data=model.data * 2))
+        return derived[-1]
+
+    first, hit = cache.get_derived(gain_file, datamodels.GainModel, (2,), derive)
+    assert not hit
+    second, hit = cache.get_derived(gain_file, datamodels.GainModel, (2,), derive)
+    assert hit
+    assert len(derived) == 1
+    assert np.shares_memory(first.data, second.data)
+    _, hit = cache.get_derived(gain_file, datamodels.GainModel, (3,), derive)
+    assert not hit
+
+    # Derived models saved to a directory are read by other caches, until
+    # they are deleted beyond the disk budget
+    directory = str(tmp_path / 'derived')
+    cache.clear()
+    cache.get_derived(gain_file, datamodels.GainModel, (2,), derive, directory)
+    other = ReferenceModelCache(max_memory=1.)
+    model, hit = other.get_derived(gain_file, datamodels.GainModel, (2,),
+                                   derive, directory)
+    assert hit
+    np.testing.assert_array_equal(model.data, 4.)
+
+    other.max_disk = 0
+    other.get_derived(gain_file, datamodels.GainModel, (3,), derive, directory)
+    assert os.listdir(directory) == []
+    cache.clear()
+    other.clear()
+
+
+def test_open_reference_model(gain_file):
+    step = Step()
+    try:
+        first = step.open_reference_model(gain_file, datamodels.GainModel)
+        second = step.open_reference_model(gain_file, datamodels.GainModel)
+        assert np.shares_memory(first.data, second.data)
+    finally:
+        reference_cache.clear()
+
+    # Overriding models are not cached
+    model = datamodels.GainModel(gain_file)
+    override = step.open_reference_model(model, datamodels.GainModel)
+    override.data[0, 0] = 3.
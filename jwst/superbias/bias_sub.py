@@ -70,7 +70,7 @@ def subtract_bias(input, bias):
     """
 
     # Create output as a copy of the input science data model
-    output = input.copy()
+    output = input.writable_copy()
 
     # combine the science and superbias DQ arrays
     output.pixeldq = np.bitwise_or(input.pixeldq, bias.dq)
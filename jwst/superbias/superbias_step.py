@@ -30,7 +30,7 @@ class SuperBiasStep(Step):
             if self.bias_name == 'N/A':
                 self.log.warning('No SUPERBIAS reference file found')
                 self.log.warning('Superbias step will be skipped')
-                result = input_model.copy()
+                result = input_model.writable_copy()
                 result.meta.cal_step.superbias = 'SKIPPED'
                 return result
 